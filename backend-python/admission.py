@@ -0,0 +1,233 @@
+"""
+Admission control for LLM calls.
+
+Bounds how many ``process_query`` calls run at once across the whole
+process. Callers beyond the cap wait in a priority queue (interactive
+chat ahead of batch jobs) and are rejected with ``OverloadedError`` once
+they have waited longer than the configured maximum, so the API can shed
+load with a 429 instead of slowing every request down together.
+
+Within a priority, waiters are ordered by weighted fair queuing across
+tenants: each queued call gets a virtual finish tag one ``1 / weight``
+step after its tenant's previous call, so a tenant with many queued calls
+cannot starve one that has a single call waiting.
+
+Flask runs each request on its own thread and event loop, so the
+controller's state is guarded by a threading lock and a freed slot is
+handed to the next waiter through that waiter's own loop.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Lower value is served first
+PRIORITIES: Dict[str, int] = {
+    'interactive': 0,
+    'batch': 10,
+}
+
+
+class OverloadedError(Exception):
+    """Raised when a call could not be admitted within the maximum queue wait."""
+    
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    """A queued acquire; ordered by priority, fair-queuing tag, then arrival."""
+    
+    __slots__ = ('rank', 'tag', 'sequence', 'loop', 'future', 'granted', 'abandoned')
+    
+    def __init__(self, rank: int, tag: float, sequence: int, loop: asyncio.AbstractEventLoop):
+        self.rank = rank
+        self.tag = tag
+        self.sequence = sequence
+        self.loop = loop
+        self.future = loop.create_future()
+        self.granted = False
+        self.abandoned = False
+    
+    def __lt__(self, other: '_Waiter') -> bool:
+        return (self.rank, self.tag, self.sequence) < (other.rank, other.tag, other.sequence)
+
+
+class AdmissionController:
+    """
+    Concurrency cap with a priority wait queue and bounded waiting.
+    
+    Slots are handed directly from a finishing call to the best waiter, so
+    a newly arriving request can never overtake queued ones.
+    """
+    
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_wait_seconds: float = 10.0,
+        max_queue: int = 0,
+        weights: Optional[Dict[str, float]] = None
+    ):
+        """
+        Args:
+            max_concurrent: Maximum calls running at once
+            max_wait_seconds: Longest a call may wait for a slot
+            max_queue: Maximum waiting calls before rejecting immediately
+                (0 for unbounded)
+            weights: Fair-queuing weight by tenant (default 1)
+        """
+        self.max_concurrent = max_concurrent
+        self.max_wait_seconds = max_wait_seconds
+        self.max_queue = max_queue
+        self.weights = weights or {}
+        # Weighted fair queuing state: tag of the last dispatched waiter and
+        # each tenant's latest finish tag
+        self._virtual_time = 0.0
+        self._finish: Dict[str, float] = {}
+        self._active = 0
+        # Heap of waiters; abandoned ones are skipped lazily on release
+        self._waiters: List[_Waiter] = []
+        self._queued = 0
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        # Smoothed duration of an admitted call, for Retry-After estimates
+        self._mean_hold_seconds = 1.0
+    
+    @property
+    def active(self) -> int:
+        """Calls currently holding a slot."""
+        return self._active
+    
+    @property
+    def queued(self) -> int:
+        """Calls waiting for a slot."""
+        return self._queued
+    
+    def retry_after(self) -> int:
+        """Seconds until a rejected caller is likely to be admitted."""
+        with self._lock:
+            estimate = self._mean_hold_seconds * (self._queued + 1) / max(1, self.max_concurrent)
+        return max(1, math.ceil(estimate))
+    
+    def _reject(self, reason: str) -> OverloadedError:
+        metrics.increment('admission_rejected')
+        return OverloadedError(f"LLM capacity exhausted: {reason}", self.retry_after())
+    
+    def _fair_tag(self, tenant: Optional[str]) -> float:
+        """Virtual finish tag for a new waiter; caller holds the lock."""
+        if tenant is None:
+            return self._virtual_time + 1.0
+        weight = self.weights.get(tenant, 1.0)
+        tag = max(self._virtual_time, self._finish.get(tenant, 0.0)) + 1.0 / weight
+        self._finish[tenant] = tag
+        return tag
+    
+    async def acquire(self, priority: str = 'interactive', tenant: Optional[str] = None) -> None:
+        """
+        Wait for a slot.
+        
+        Args:
+            priority: Key of ``PRIORITIES``
+            tenant: Caller identity for fair queuing (wallet address or agent_id)
+        
+        Raises:
+            OverloadedError: If the queue is full or the wait exceeded the maximum
+        """
+        rank = PRIORITIES.get(priority, PRIORITIES['interactive'])
+        
+        with self._lock:
+            if self._active < self.max_concurrent and not self._queued:
+                self._active += 1
+                metrics.observe('admission_wait_seconds', 0.0)
+                return
+            full = self.max_queue > 0 and self._queued >= self.max_queue
+            if not full:
+                waiter = _Waiter(
+                    rank,
+                    self._fair_tag(tenant),
+                    next(self._sequence),
+                    asyncio.get_running_loop()
+                )
+                heapq.heappush(self._waiters, waiter)
+                self._queued += 1
+        
+        if full:
+            raise self._reject(f"{self.max_queue} calls already queued")
+        
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.max_wait_seconds)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    waiter.abandoned = True
+                    self._queued -= 1
+            if granted:
+                # The slot was handed over just as the wait ended; pass it on
+                self.release()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise self._reject(f"waited {self.max_wait_seconds:g}s for a slot")
+        
+        metrics.observe('admission_wait_seconds', time.monotonic() - started)
+    
+    def release(self, held_seconds: Optional[float] = None) -> None:
+        """
+        Free a slot, handing it to the best waiter if there is one.
+        
+        Args:
+            held_seconds: How long the slot was held (updates Retry-After estimates)
+        """
+        with self._lock:
+            if held_seconds is not None:
+                self._mean_hold_seconds = 0.8 * self._mean_hold_seconds + 0.2 * held_seconds
+            while self._waiters:
+                waiter = heapq.heappop(self._waiters)
+                if waiter.abandoned:
+                    continue
+                try:
+                    waiter.loop.call_soon_threadsafe(_grant, waiter.future)
+                except RuntimeError:
+                    # The waiter's loop has closed; it will never take the slot
+                    self._queued -= 1
+                    continue
+                # The slot moves to the waiter; the active count is unchanged
+                waiter.granted = True
+                self._queued -= 1
+                self._advance(waiter.tag)
+                return
+            self._active -= 1
+    
+    def _advance(self, tag: float) -> None:
+        """Move virtual time to a dispatched tag; caller holds the lock."""
+        self._virtual_time = max(self._virtual_time, tag)
+        if len(self._finish) > 4096:
+            # Tenants whose calls have all been dispatched start afresh anyway
+            self._finish = {t: f for t, f in self._finish.items() if f > self._virtual_time}
+    
+    @asynccontextmanager
+    async def slot(self, priority: str = 'interactive', tenant: Optional[str] = None) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the block."""
+        await self.acquire(priority, tenant)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+
+def _grant(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
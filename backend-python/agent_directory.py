@@ -0,0 +1,398 @@
+"""
+Shared directory of agents across service replicas.
+
+Each replica keeps live agents in its own memory. The directory records,
+for every initialized agent, its initialization metadata (description and
+Memory Hub address) and which replica currently owns it, so a replica
+receiving a request for an agent it does not hold can adopt the agent
+from the recorded metadata, or redirect the caller to the owner, instead
+of failing with "not initialized".
+
+Ownership is a lease: replicas heartbeat on a timer, and an agent whose
+owner has not been seen for ``lease_seconds`` is free to be adopted by any
+replica. Claims are compare-and-set, so of two replicas adopting an agent
+at once only one becomes its owner; replicas recheck ownership of the
+agents they hold and drop those claimed elsewhere.
+
+Two implementations share one interface:
+
+- ``SQLiteAgentDirectory``: a SQLite file, for replicas on one host
+- ``RemoteAgentDirectory``: a client of the directory service, which is
+  this module run as a script (``python agent_directory.py``); every call
+  carries a token shared by the service and its replicas
+"""
+
+import hmac
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote
+
+logger = logging.getLogger(__name__)
+
+# Seconds without a heartbeat after which a replica's agents may be adopted
+DEFAULT_LEASE_SECONDS = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS directory_agents (
+    agent_id TEXT PRIMARY KEY,
+    description TEXT NOT NULL,
+    memory_hub_address TEXT NOT NULL,
+    owner TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS directory_replicas (
+    replica_id TEXT PRIMARY KEY,
+    url TEXT,
+    last_seen REAL NOT NULL
+);
+"""
+
+
+class AgentOwnedElsewhere(Exception):
+    """Raised when an agent is held by another live replica and should be reached there."""
+    
+    def __init__(self, agent_id: str, owner: str, owner_url: str):
+        super().__init__(f"Agent {agent_id} is served by replica {owner}")
+        self.agent_id = agent_id
+        self.owner = owner
+        self.owner_url = owner_url
+
+
+@dataclass(frozen=True)
+class DirectoryEntry:
+    """An agent's initialization metadata and current owner."""
+    agent_id: str
+    description: str
+    memory_hub_address: str
+    owner: Optional[str] = None
+    owner_url: Optional[str] = None
+    owner_alive: bool = False
+
+
+class AgentDirectory:
+    """Interface shared by the directory implementations."""
+    
+    lease_seconds: float = DEFAULT_LEASE_SECONDS
+    
+    def register(
+        self,
+        agent_id: str,
+        description: str,
+        memory_hub_address: str,
+        replica_id: str
+    ) -> None:
+        """Record an initialized agent (upsert), owned by ``replica_id``."""
+        raise NotImplementedError
+    
+    def claim(self, agent_id: str, replica_id: str, expected_owner: Optional[str]) -> bool:
+        """
+        Make ``replica_id`` the owner of an already recorded agent.
+        
+        The claim only succeeds while the owner is still ``expected_owner``
+        (the owner the claimant looked up), ``replica_id`` itself, or a
+        replica whose lease has expired.
+        
+        Returns:
+            Whether ``replica_id`` now owns the agent
+        """
+        raise NotImplementedError
+    
+    def owned_elsewhere(self, replica_id: str, agent_ids: List[str]) -> List[str]:
+        """Those of ``agent_ids`` recorded as owned by a replica other than ``replica_id``."""
+        raise NotImplementedError
+    
+    def lookup(self, agent_id: str) -> Optional[DirectoryEntry]:
+        """Return an agent's entry, or None if it was never initialized."""
+        raise NotImplementedError
+    
+    def heartbeat(self, replica_id: str, url: Optional[str]) -> None:
+        """Mark a replica as alive, renewing the lease on its agents."""
+        raise NotImplementedError
+
+
+class SQLiteAgentDirectory(AgentDirectory):
+    """
+    Directory in a SQLite file shared by the replicas on one host.
+    
+    Like the state store, it runs in WAL mode with one lock-serialized
+    connection per process.
+    """
+    
+    def __init__(self, path: str, lease_seconds: float = DEFAULT_LEASE_SECONDS):
+        """
+        Args:
+            path: SQLite database file path (``:memory:`` for tests)
+            lease_seconds: Heartbeat age after which an owner is considered gone
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+        
+        logger.info(f"Agent directory opened: {path}")
+    
+    def register(
+        self,
+        agent_id: str,
+        description: str,
+        memory_hub_address: str,
+        replica_id: str
+    ) -> None:
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO directory_agents (agent_id, description, memory_hub_address, owner, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(agent_id) DO UPDATE SET
+                    description = excluded.description,
+                    memory_hub_address = excluded.memory_hub_address,
+                    owner = excluded.owner,
+                    updated_at = excluded.updated_at
+                """,
+                (agent_id, description, memory_hub_address, replica_id, time.time())
+            )
+    
+    def claim(self, agent_id: str, replica_id: str, expected_owner: Optional[str]) -> bool:
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                """
+                UPDATE directory_agents SET owner = ?, updated_at = ?
+                WHERE agent_id = ? AND (
+                    owner IS ? OR owner = ? OR NOT EXISTS (
+                        SELECT 1 FROM directory_replicas r
+                        WHERE r.replica_id = directory_agents.owner AND r.last_seen > ?
+                    )
+                )
+                """,
+                (replica_id, now, agent_id, expected_owner, replica_id, now - self.lease_seconds)
+            )
+        return cursor.rowcount > 0
+    
+    def owned_elsewhere(self, replica_id: str, agent_ids: List[str]) -> List[str]:
+        owned = []
+        # Chunked to stay under SQLite's bound-parameter limit
+        for start in range(0, len(agent_ids), 500):
+            chunk = agent_ids[start:start + 500]
+            with self._lock:
+                rows = self._conn.execute(
+                    f"""
+                    SELECT agent_id FROM directory_agents
+                    WHERE agent_id IN ({', '.join('?' * len(chunk))})
+                        AND owner IS NOT NULL AND owner != ?
+                    """,
+                    (*chunk, replica_id)
+                ).fetchall()
+            owned.extend(row[0] for row in rows)
+        return owned
+    
+    def lookup(self, agent_id: str) -> Optional[DirectoryEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT a.agent_id, a.description, a.memory_hub_address, a.owner, r.url, r.last_seen
+                FROM directory_agents a
+                LEFT JOIN directory_replicas r ON r.replica_id = a.owner
+                WHERE a.agent_id = ?
+                """,
+                (agent_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        last_seen = row[5]
+        return DirectoryEntry(
+            agent_id=row[0],
+            description=row[1],
+            memory_hub_address=row[2],
+            owner=row[3],
+            owner_url=row[4],
+            owner_alive=last_seen is not None and time.time() - last_seen < self.lease_seconds
+        )
+    
+    def heartbeat(self, replica_id: str, url: Optional[str]) -> None:
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO directory_replicas (replica_id, url, last_seen)
+                VALUES (?, ?, ?)
+                ON CONFLICT(replica_id) DO UPDATE SET
+                    url = excluded.url,
+                    last_seen = excluded.last_seen
+                """,
+                (replica_id, url, time.time())
+            )
+    
+    def close(self) -> None:
+        """Close the underlying connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class RemoteAgentDirectory(AgentDirectory):
+    """Client of the directory service, for replicas on several hosts."""
+    
+    def __init__(
+        self,
+        base_url: str,
+        token: str,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        timeout: float = 2.0,
+        session: Any = None
+    ):
+        """
+        Args:
+            base_url: URL of the directory service
+            token: Token shared with the service
+            lease_seconds: The service's lease, which sets how often to heartbeat
+            timeout: Seconds to wait for the service per call
+            session: HTTP session (a new ``requests.Session`` by default)
+        """
+        import requests
+        self.base_url = base_url.rstrip('/')
+        self.lease_seconds = lease_seconds
+        self.timeout = timeout
+        self._headers = {'Authorization': f"Bearer {token}"}
+        self._session = session or requests.Session()
+    
+    def _call(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None):
+        response = self._session.request(
+            method, self.base_url + path, json=payload, headers=self._headers, timeout=self.timeout
+        )
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+    
+    def register(
+        self,
+        agent_id: str,
+        description: str,
+        memory_hub_address: str,
+        replica_id: str
+    ) -> None:
+        self._call('PUT', f"/agents/{_segment(agent_id)}", {
+            'description': description,
+            'memory_hub_address': memory_hub_address,
+            'replica_id': replica_id
+        })
+    
+    def claim(self, agent_id: str, replica_id: str, expected_owner: Optional[str]) -> bool:
+        result = self._call('POST', f"/agents/{_segment(agent_id)}/claim", {
+            'replica_id': replica_id,
+            'expected_owner': expected_owner
+        })
+        return bool(result and result.get('claimed'))
+    
+    def owned_elsewhere(self, replica_id: str, agent_ids: List[str]) -> List[str]:
+        result = self._call('POST', f"/replicas/{_segment(replica_id)}/owned-elsewhere", {'agent_ids': agent_ids})
+        return result['agent_ids'] if result else []
+    
+    def lookup(self, agent_id: str) -> Optional[DirectoryEntry]:
+        entry = self._call('GET', f"/agents/{_segment(agent_id)}")
+        return DirectoryEntry(**entry) if entry else None
+    
+    def heartbeat(self, replica_id: str, url: Optional[str]) -> None:
+        self._call('POST', f"/replicas/{_segment(replica_id)}/heartbeat", {'url': url})
+
+
+def _segment(name: str) -> str:
+    """An agent or replica ID quoted as one URL path segment."""
+    return quote(name, safe='')
+
+
+def open_directory(
+    spec: str,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    token: Optional[str] = None
+) -> AgentDirectory:
+    """
+    Open the directory at ``spec``: a service URL or a SQLite file path.
+    
+    Raises:
+        ValueError: If ``spec`` is a service URL and no token is given
+    """
+    if spec.startswith(('http://', 'https://')):
+        if not token:
+            raise ValueError("A token is required to use the agent directory service")
+        return RemoteAgentDirectory(spec, token, lease_seconds)
+    return SQLiteAgentDirectory(spec, lease_seconds)
+
+
+def create_directory_app(directory: AgentDirectory, token: str):
+    """
+    Flask app serving ``directory`` to ``RemoteAgentDirectory`` clients.
+    
+    Requests without ``token`` as their bearer token are rejected with 401.
+    IDs are routed as paths, so an ID with a quoted "/" still reaches its
+    own entry.
+    """
+    from flask import Flask, jsonify, request
+    
+    if not token:
+        raise ValueError("The agent directory service needs a token")
+    expected = f"Bearer {token}".encode('utf-8')
+    app = Flask(__name__)
+    
+    @app.before_request
+    def authenticate():
+        supplied = request.headers.get('Authorization', '').encode('utf-8')
+        if not hmac.compare_digest(supplied, expected):
+            return jsonify({'error': 'unauthorized'}), 401
+        return None
+    
+    @app.route('/agents/<path:agent_id>', methods=['GET'])
+    def lookup(agent_id: str):
+        entry = directory.lookup(agent_id)
+        if entry is None:
+            return jsonify({'error': 'not found'}), 404
+        return jsonify(asdict(entry)), 200
+    
+    @app.route('/agents/<path:agent_id>', methods=['PUT'])
+    def register(agent_id: str):
+        body = request.get_json(force=True)
+        directory.register(agent_id, body['description'], body['memory_hub_address'], body['replica_id'])
+        return jsonify({'success': True}), 200
+    
+    @app.route('/agents/<path:agent_id>/claim', methods=['POST'])
+    def claim(agent_id: str):
+        body = request.get_json(force=True)
+        claimed = directory.claim(agent_id, body['replica_id'], body.get('expected_owner'))
+        return jsonify({'success': True, 'claimed': claimed}), 200
+    
+    @app.route('/replicas/<path:replica_id>/owned-elsewhere', methods=['POST'])
+    def owned_elsewhere(replica_id: str):
+        agent_ids = directory.owned_elsewhere(replica_id, request.get_json(force=True)['agent_ids'])
+        return jsonify({'agent_ids': agent_ids}), 200
+    
+    @app.route('/replicas/<path:replica_id>/heartbeat', methods=['POST'])
+    def heartbeat(replica_id: str):
+        directory.heartbeat(replica_id, (request.get_json(silent=True) or {}).get('url'))
+        return jsonify({'success': True}), 200
+    
+    return app
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    directory = SQLiteAgentDirectory(
+        os.getenv('AGENT_DIRECTORY_PATH', 'agent_directory.db'),
+        float(os.getenv('AGENT_LEASE_SECONDS', str(DEFAULT_LEASE_SECONDS)))
+    )
+    # Loopback unless told otherwise; set AGENT_DIRECTORY_HOST=0.0.0.0 to serve other hosts
+    create_directory_app(directory, os.getenv('AGENT_DIRECTORY_TOKEN', '')).run(
+        host=os.getenv('AGENT_DIRECTORY_HOST', '127.0.0.1'),
+        port=int(os.getenv('PORT', 5100)),
+        threaded=True
+    )
@@ -0,0 +1,147 @@
+"""
+Per-agent mailboxes serializing query turns.
+
+A turn reads the agent's history, calls the LLM (which appends a user and
+an assistant message to memory) and reads the history back. Two turns for
+the same agent running at once interleave those writes, and the state
+builder, which pairs messages by strict alternation, then mispairs
+queries and responses. Each agent therefore processes its turns one at a
+time in arrival order, like an actor draining its mailbox, while turns
+for different agents run fully in parallel.
+
+As with admission control, waiters may live on different threads' event
+loops, so the next turn is woken through its own loop.
+"""
+
+import asyncio
+import logging
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict
+
+from admission import OverloadedError
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class MailboxFullError(OverloadedError):
+    """Raised when an agent already has the maximum number of turns pending."""
+
+
+class _PendingTurn:
+    """A turn waiting in a mailbox."""
+    
+    __slots__ = ('loop', 'future', 'started')
+    
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.future = loop.create_future()
+        self.started = False
+
+
+class _Mailbox:
+    """One agent's running flag and FIFO of waiting turns."""
+    
+    __slots__ = ('running', 'waiting')
+    
+    def __init__(self):
+        self.running = False
+        self.waiting: Deque[_PendingTurn] = deque()
+
+
+class AgentMailboxes:
+    """
+    Serializes turns per agent with a bounded queue depth.
+    
+    Mailboxes are created on first use and dropped once idle, so memory is
+    proportional to the number of agents with turns in flight.
+    """
+    
+    def __init__(self, max_depth: int = 8, retry_after_seconds: int = 2):
+        """
+        Args:
+            max_depth: Maximum turns per agent, running or waiting
+            retry_after_seconds: Retry-After reported when a mailbox is full
+        """
+        self.max_depth = max_depth
+        self.retry_after_seconds = retry_after_seconds
+        self._mailboxes: Dict[str, _Mailbox] = {}
+        self._lock = threading.Lock()
+    
+    def depth(self, agent_id: str) -> int:
+        """Turns running or waiting for the agent."""
+        with self._lock:
+            mailbox = self._mailboxes.get(agent_id)
+            return (int(mailbox.running) + len(mailbox.waiting)) if mailbox else 0
+    
+    async def acquire(self, agent_id: str) -> None:
+        """
+        Wait until it is this turn's go for the agent.
+        
+        Raises:
+            MailboxFullError: If the agent already has ``max_depth`` turns
+        """
+        with self._lock:
+            mailbox = self._mailboxes.get(agent_id)
+            if mailbox is None:
+                mailbox = self._mailboxes[agent_id] = _Mailbox()
+            if not mailbox.running:
+                mailbox.running = True
+                return
+            full = 1 + len(mailbox.waiting) >= self.max_depth
+            if not full:
+                pending = _PendingTurn(asyncio.get_running_loop())
+                mailbox.waiting.append(pending)
+        
+        if full:
+            metrics.increment('mailbox_rejected')
+            raise MailboxFullError(
+                f"Agent {agent_id} already has {self.max_depth} turns pending",
+                self.retry_after_seconds
+            )
+        
+        try:
+            await asyncio.shield(pending.future)
+        except asyncio.CancelledError:
+            with self._lock:
+                started = pending.started
+                if not started:
+                    mailbox.waiting.remove(pending)
+            if started:
+                # Our turn arrived as we were cancelled; let the next one run
+                self.release(agent_id)
+            raise
+    
+    def release(self, agent_id: str) -> None:
+        """Finish the running turn and start the next one, if any."""
+        with self._lock:
+            mailbox = self._mailboxes.get(agent_id)
+            if mailbox is None:
+                return
+            while mailbox.waiting:
+                pending = mailbox.waiting.popleft()
+                try:
+                    pending.loop.call_soon_threadsafe(_start, pending.future)
+                except RuntimeError:
+                    # The waiter's loop has closed; skip it
+                    continue
+                pending.started = True
+                return
+            mailbox.running = False
+            del self._mailboxes[agent_id]
+    
+    @asynccontextmanager
+    async def turn(self, agent_id: str) -> AsyncIterator[None]:
+        """Run the block as the agent's only active turn."""
+        await self.acquire(agent_id)
+        try:
+            yield
+        finally:
+            self.release(agent_id)
+
+
+def _start(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
@@ -6,21 +6,188 @@ including blockchain registration, initialization, and query processing.
 """
 
 import os
+import asyncio
+import inspect
 import logging
+import math
+import socket
+import threading
+import time
 import uuid
+from contextlib import nullcontext
 from datetime import datetime
-from typing import Dict, Any, Optional
+from decimal import Decimal
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+from models import (
+    AgentState,
+    CriteriaCompileRequest,
+    Interaction,
+    PortfolioRequest,
+    PropertySearchRequest,
+    RecommendationRequest,
+    StreamBalancesRequest,
+    WalletEventsRequest,
+    YieldSimulationRequest
+)
+from state_store import AgentStateStore
+from interaction_log import InteractionLogStore
+from summarizer import (
+    SUMMARY_MAX_CHARS,
+    SUMMARY_PROMPT,
+    HistorySummarizer,
+    extractive_summary,
+    format_turn,
+    summary_request
+)
+from semantic_index import SemanticMemory
+from response_cache import ResponseCache, state_version
+from token_budget import count_tokens, fit_history
+from metrics import metrics
+from admission import AdmissionController, OverloadedError
+from agent_mailbox import AgentMailboxes
+from deadline import Deadline, DeadlineExceeded
+from circuit_breaker import CLOSED, CircuitBreaker, CircuitOpenError
+from agent_directory import AgentOwnedElsewhere, open_directory
+from sharding import HashRing
+from property_search import EARTH_RADIUS_KM, PropertyIndex
+from recommender import EmbeddingCache, PropertyRecommender
+from intent_router import AGENT_STATUS, PORTFOLIO, PROPERTY_SEARCH, Intent, IntentRouter
+from criteria_compiler import CriteriaCompiler
+from stream_balances import StreamBook
+from event_indexer import EventIndexer, EventStore, IndexerLock, JsonRpcLogSource, StoreFollower
+from portfolio import Portfolio
+from yield_simulator import YieldSimulator, parameters
+from tools import Tool, ToolRegistry
 
 # AIP Agent SDK imports
 try:
     from membase.chain.chain import Client
+    from membase.memory.message import Message
     MEMBASE_AVAILABLE = True
 except ImportError:
+    Message = None
     MEMBASE_AVAILABLE = False
     logging.warning("membase package not available - using mock implementation")
 
 logger = logging.getLogger(__name__)
 
+# Namespace for content-derived interaction IDs. Changing it changes every
+# derived ID, which invalidates client-side caches keyed on them.
+INTERACTION_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, 'continuum:interaction')
+
+
+# Dependencies guarded by a circuit breaker
+DEPENDENCIES = ('memory_hub', 'chain_rpc', 'llm')
+
+# Public JSON-RPC endpoint per network (anything else is BSC mainnet)
+RPC_ENDPOINTS = {'bsc-testnet': "https://bsc-testnet-rpc.publicnode.com"}
+MAINNET_RPC_ENDPOINT = "https://bsc-dataseed.binance.org"
+
+
+def _is_budget_expiry(error: Exception) -> bool:
+    """
+    Whether a stage ran out of the caller's own time budget.
+    
+    Such timeouts say nothing about the dependency, so breakers ignore
+    them; expiries of a stage's own cap (MEMORY_HUB_TIMEOUT, LLM_TIMEOUT,
+    BLOCKCHAIN_TIMEOUT) count as failures.
+    """
+    return isinstance(error, DeadlineExceeded) and not error.capped
+
+
+def _is_chain_outage(error: Exception) -> bool:
+    """Whether a failed transaction points at the RPC rather than the transaction."""
+    if isinstance(error, DeadlineExceeded):
+        return True
+    error_str = str(error).lower()
+    return not any(marker in error_str for marker in ('insufficient', 'gas', 'revert'))
+
+
+# Raw messages sent to the LLM when no summary covers older turns
+DEFAULT_RECENT_MESSAGES = 16
+
+
+@lru_cache(maxsize=None)
+def _accepts_kwarg(agent_cls: type, name: str) -> bool:
+    """Whether ``agent_cls.process_query`` accepts keyword argument ``name``."""
+    try:
+        parameters = inspect.signature(agent_cls.process_query).parameters
+    except (AttributeError, TypeError, ValueError):
+        return False
+    return name in parameters or any(
+        p.kind is inspect.Parameter.VAR_KEYWORD for p in parameters.values()
+    )
+
+
+def _tokens(wei: str) -> str:
+    """Format a decimal wei string as an 18-decimal token amount."""
+    return f"{(Decimal(wei) / Decimal(10) ** 18).normalize():f} tokens"
+
+
+def derive_interaction_id(
+    agent_id: str,
+    user_query: str,
+    agent_response: str,
+    timestamp: Optional[int] = None,
+    occurrence: int = 0
+) -> str:
+    """
+    Derive a stable interaction ID from the interaction's content.
+    
+    The same (agent, query, response, timestamp) always yields the same ID,
+    so repeated reads of the history return identical IDs and clients can
+    use them as cache keys. ``occurrence`` disambiguates identical turns
+    when the underlying messages carry no timestamp.
+    
+    Args:
+        agent_id: Unique agent identifier
+        user_query: User query text
+        agent_response: Agent response text
+        timestamp: Interaction timestamp (Unix), if known
+        occurrence: Number of identical earlier turns in the same history
+    
+    Returns:
+        UUID string derived from the inputs
+    """
+    name = '\x1f'.join([
+        agent_id,
+        '' if timestamp is None else str(timestamp),
+        str(occurrence),
+        user_query,
+        agent_response
+    ])
+    return str(uuid.uuid5(INTERACTION_ID_NAMESPACE, name))
+
+
+def _parse_weights(spec: str) -> Dict[str, float]:
+    """Parse ``tenant=weight`` pairs separated by commas."""
+    weights = {}
+    for entry in filter(None, (part.strip() for part in spec.split(','))):
+        tenant, _, weight = entry.partition('=')
+        tenant = tenant.strip()
+        # Wallet tenants are compared lowercased
+        weights[tenant.lower() if tenant.startswith('0x') else tenant] = float(weight)
+    return weights
+
+
+def _message_timestamp(message: Any) -> Optional[int]:
+    """Return a message's timestamp as Unix seconds, or None if unavailable."""
+    value = getattr(message, 'timestamp', None)
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return int(datetime.fromisoformat(str(value)).timestamp())
+    except ValueError:
+        return None
+
 
 class ConfigurationError(Exception):
     """Raised when environment variables are missing or invalid."""
@@ -58,6 +225,11 @@ class AIPAgentManager:
         self.memory_hub_address = os.getenv('MEMORY_HUB_ADDRESS', '54.169.29.193:8081')
         self.network = os.getenv('MEMBASE_NETWORK', 'bsc-testnet')
         
+        # Per-stage limits applied on top of each request's deadline
+        self.memory_hub_timeout = float(os.getenv('MEMORY_HUB_TIMEOUT', '10'))
+        self.llm_timeout = float(os.getenv('LLM_TIMEOUT', '30'))
+        self.blockchain_timeout = float(os.getenv('BLOCKCHAIN_TIMEOUT', '30'))
+        
         # Validate configuration
         self._validate_config()
         
@@ -67,6 +239,241 @@ class AIPAgentManager:
         # Cache of initialized agents
         self.agents: Dict[str, Any] = {}
         
+        # Durable registry of initialized agents and their latest state
+        # (optional; agents are rehydrated from it lazily after a restart)
+        state_store_path = os.getenv('STATE_STORE_PATH')
+        self.state_store = AgentStateStore(state_store_path) if state_store_path else None
+        
+        # Descriptions (system prompts) of live agents, used when extra
+        # context is passed to process_query
+        self.agent_descriptions: Dict[str, str] = {}
+        
+        # Background summarization of older history (optional; disabled
+        # when SUMMARY_WORKERS is 0). Summaries are written by the LLM of
+        # SUMMARY_AGENT when set, otherwise digested without an LLM
+        summary_workers = int(os.getenv('SUMMARY_WORKERS', '0'))
+        self.summary_agent = os.getenv('SUMMARY_AGENT')
+        self.summarizer = HistorySummarizer(
+            workers=summary_workers,
+            interval_seconds=float(os.getenv('SUMMARY_INTERVAL_SECONDS', '300')),
+            recent_turns=int(os.getenv('SUMMARY_RECENT_TURNS', '4')),
+            summarize_fn=self._summarize_with_llm if self.summary_agent else None,
+            store=self.state_store
+        ) if summary_workers > 0 else None
+        
+        # Semantic retrieval of relevant past turns (optional; disabled when
+        # RETRIEVAL_TOP_K is 0)
+        self.retrieval_top_k = int(os.getenv('RETRIEVAL_TOP_K', '0'))
+        self.semantic_memory = SemanticMemory(
+            brute_force_limit=int(os.getenv('RETRIEVAL_BRUTE_FORCE_LIMIT', '5000')),
+            min_score=float(os.getenv('RETRIEVAL_MIN_SCORE', '0.2'))
+        ) if self.retrieval_top_k > 0 else None
+        
+        # Local append-only interaction logs serving history pagination and
+        # recent context from disk (optional; the Memory Hub stays the source of truth)
+        interaction_log_dir = os.getenv('INTERACTION_LOG_DIR')
+        self.interaction_logs = InteractionLogStore(
+            interaction_log_dir,
+            max_records=int(os.getenv('INTERACTION_LOG_MAX_RECORDS', '10000'))
+        ) if interaction_log_dir else None
+        
+        # Cache of responses to repeated queries (optional; disabled when
+        # RESPONSE_CACHE_SIZE is 0)
+        response_cache_size = int(os.getenv('RESPONSE_CACHE_SIZE', '0'))
+        self.response_cache = ResponseCache(
+            max_entries=response_cache_size,
+            ttl_seconds=float(os.getenv('RESPONSE_CACHE_TTL_SECONDS', '300')),
+            similarity_threshold=float(os.getenv('RESPONSE_CACHE_SIMILARITY', '0'))
+        ) if response_cache_size > 0 else None
+        
+        # Token budget for the conversation context sent with each query
+        # (optional; 0 sends a fixed number of recent messages)
+        self.context_token_budget = int(os.getenv('CONTEXT_TOKEN_BUDGET', '0'))
+        self.max_message_tokens = int(os.getenv('CONTEXT_MAX_MESSAGE_TOKENS') or '0') \
+            or max(1, self.context_token_budget // 4)
+        
+        # Process-wide cap on concurrent LLM calls with a priority wait queue
+        # (optional; disabled when LLM_MAX_CONCURRENCY is 0)
+        llm_max_concurrency = int(os.getenv('LLM_MAX_CONCURRENCY', '0'))
+        self.admission = AdmissionController(
+            max_concurrent=llm_max_concurrency,
+            max_wait_seconds=float(os.getenv('LLM_MAX_QUEUE_WAIT_SECONDS', '10')),
+            max_queue=int(os.getenv('LLM_MAX_QUEUE', '0')),
+            weights=_parse_weights(os.getenv('FAIR_QUEUE_WEIGHTS', ''))
+        ) if llm_max_concurrency > 0 else None
+        
+        # Per-agent FIFO of query turns; turns for one agent run one at a time
+        self.mailboxes = AgentMailboxes(max_depth=int(os.getenv('AGENT_MAILBOX_DEPTH', '8')))
+        
+        # Circuit breakers per dependency, so calls fail fast while one is
+        # down instead of each waiting out its timeout
+        breaker_settings = {
+            'failure_rate': float(os.getenv('CIRCUIT_FAILURE_RATE', '0.5')),
+            'min_calls': int(os.getenv('CIRCUIT_MIN_CALLS', '5')),
+            'window_seconds': float(os.getenv('CIRCUIT_WINDOW_SECONDS', '30')),
+            'open_seconds': float(os.getenv('CIRCUIT_OPEN_SECONDS', '15'))
+        }
+        self.breakers = {name: CircuitBreaker(name, **breaker_settings) for name in DEPENDENCIES}
+        
+        # Last on-chain owner seen per agent, served by status checks while
+        # the chain RPC is unavailable
+        self.chain_owners: Dict[str, Optional[str]] = {}
+        
+        # Directory of agents shared with other replicas (optional; disabled
+        # when AGENT_DIRECTORY is unset). Agents held by no live replica are
+        # adopted; in redirect mode, agents held by another replica are
+        # served there.
+        directory_spec = os.getenv('AGENT_DIRECTORY')
+        self.directory = open_directory(
+            directory_spec,
+            float(os.getenv('AGENT_LEASE_SECONDS', '60')),
+            os.getenv('AGENT_DIRECTORY_TOKEN')
+        ) if directory_spec else None
+        self.directory_mode = os.getenv('AGENT_DIRECTORY_MODE', 'adopt')
+        port = os.getenv('PORT', '5000')
+        self.replica_id = os.getenv('REPLICA_ID') or f"{socket.gethostname()}:{port}"
+        self.replica_url = os.getenv('REPLICA_URL') or f"http://{socket.gethostname()}:{port}"
+        self._last_heartbeat = float('-inf')
+        self._directory_stop = threading.Event()
+        if self.directory is not None:
+            # Heartbeats and ownership checks run on a timer, so a lease
+            # neither lapses between requests nor outlives a lost claim
+            threading.Thread(target=self._watch_ownership, name='agent-directory', daemon=True).start()
+        
+        # Last ring version seen from the dispatcher in multi-process mode;
+        # agents a ring change moves to another worker are evicted here
+        self._ring_version = 0
+        self._ring_lock = threading.Lock()
+        
+        # Searchable property catalog (preloaded from PROPERTY_CATALOG_PATH
+        # when set; listings can also be added through the API)
+        self.properties = PropertyIndex()
+        
+        # Recommendations ranking the catalog against agent profiles; the
+        # listing embeddings follow the catalog and are cached on disk
+        # when EMBEDDING_CACHE_PATH is set
+        embedding_cache_path = os.getenv('EMBEDDING_CACHE_PATH')
+        self.recommender = PropertyRecommender(
+            cache=EmbeddingCache(embedding_cache_path) if embedding_cache_path else None,
+            history_decay=float(os.getenv('RECOMMENDER_HISTORY_DECAY', '0.9')),
+            preference_weight=float(os.getenv('RECOMMENDER_PREFERENCE_WEIGHT', '0.5'))
+        )
+        self.properties.subscribe(self.recommender.upsert, self.recommender.remove)
+        catalog_path = os.getenv('PROPERTY_CATALOG_PATH')
+        if catalog_path:
+            self.properties.load_file(catalog_path)
+        
+        # Lookup queries (agent status, property search, portfolio) answered
+        # from local data without the LLM (optional; disabled when
+        # INTENT_ROUTING is 'off'; 'rules' routes only on rule matches,
+        # 'model' also on the local classifier's)
+        intent_routing = os.getenv('INTENT_ROUTING', 'off')
+        self.intent_router = IntentRouter(
+            use_model=intent_routing == 'model',
+            min_confidence=float(os.getenv('INTENT_ROUTER_MIN_CONFIDENCE', '0.5'))
+        ) if intent_routing in ('rules', 'model') else None
+        
+        # Free-text property requests compiled into search criteria by the
+        # LLM of CRITERIA_COMPILER_AGENT (the rule parser without one), with
+        # compiled criteria cached by normalized request
+        self.criteria_compiler = CriteriaCompiler(
+            max_entries=int(os.getenv('CRITERIA_CACHE_SIZE', '4096')),
+            ttl_seconds=float(os.getenv('CRITERIA_CACHE_TTL_SECONDS', '86400')),
+            similarity_threshold=float(os.getenv('CRITERIA_CACHE_SIMILARITY', '0.9'))
+        )
+        self.criteria_compiler_agent = os.getenv('CRITERIA_COMPILER_AGENT')
+        
+        # StreamingProtocol streams, for bulk balance queries without one
+        # RPC per stream (listings are pushed through the API)
+        self.streams = StreamBook()
+        
+        # Monte Carlo income simulation; large runs use a process pool
+        # (optional; in-process when SIMULATION_WORKERS is 0)
+        self.simulator = YieldSimulator(
+            workers=int(os.getenv('SIMULATION_WORKERS', '0')),
+            max_cells=int(os.getenv('SIMULATION_MAX_CELLS', '500000000'))
+        )
+        
+        # Background indexer of stream and property events serving wallet
+        # history from a local store (optional; disabled when EVENT_INDEX_PATH
+        # is unset). Workers sharing the store elect one indexer through a
+        # lock file next to it; the others take over when it exits.
+        event_index_path = os.getenv('EVENT_INDEX_PATH')
+        self.event_indexer = self._create_event_indexer(event_index_path)
+        self._indexer_lock = IndexerLock(event_index_path) if self.event_indexer else None
+        self._indexer_stop = threading.Event()
+        
+        # Income analytics kept in memory, following the store: every
+        # worker replays its committed ranges and rewinds, right after each
+        # sync on the indexing worker and on a timer on the others
+        self.portfolio = Portfolio() if self.event_indexer else None
+        self.event_follower = None
+        if self.event_indexer:
+            self.event_follower = StoreFollower(self.event_indexer.store, self.portfolio.apply, self.portfolio.rewind)
+            self.event_indexer.subscribe(
+                lambda rows: self.event_follower.poll_once(),
+                lambda block_number: self.event_follower.poll_once()
+            )
+            self._lead_or_follow()
+            threading.Thread(target=self._follow_event_store, name='event-follower', daemon=True).start()
+        
+        # Tools offered to agents. The SDK's agents reach them through the
+        # MCP server named TOOL_SERVER_NAME (tool_server.py), which runs
+        # their calls through the registry (optional; no tools when unset)
+        self.tools = ToolRegistry()
+        self.tool_server = os.getenv('TOOL_SERVER_NAME')
+        self.tools.register(Tool(
+            'search_properties',
+            "Search the property catalog by city, amenities, monthly rent, "
+            "bedrooms, annual yield and location (within radius_km of a "
+            "latitude/longitude, or inside a bounding box). Use it to find "
+            "listings matching a user's request instead of guessing.",
+            PropertySearchRequest,
+            self.search_properties
+        ))
+        self.tools.register(Tool(
+            'recommend_properties',
+            "Recommend catalog listings for an agent's user, ranked by "
+            "similarity to their stated preferences and past queries, "
+            "optionally steered by a free-text query. Use it when the user "
+            "asks for suggestions rather than a specific search.",
+            RecommendationRequest,
+            self.recommend_properties
+        ))
+        self.tools.register(Tool(
+            'get_stream_balances',
+            "Claimable, streamed and remaining rental stream balances in wei, "
+            "per stream and in total, optionally for one recipient address.",
+            StreamBalancesRequest,
+            self.stream_balances
+        ))
+        self.tools.register(Tool(
+            'simulate_stream_income',
+            "Monte Carlo simulation of future rental stream income with "
+            "vacancies (occupancy) and cancellations; returns contracted and "
+            "expected income and p5-p95 percentile bands. Use it for "
+            "what-if questions instead of estimating.",
+            YieldSimulationRequest,
+            self.simulate_income
+        ))
+        if self.event_indexer:
+            self.tools.register(Tool(
+                'get_wallet_stream_history',
+                "On-chain history of the rental streams and properties of a "
+                "wallet (created, claimed, canceled, registered), newest first, "
+                "and the total wei it has been paid as a recipient.",
+                WalletEventsRequest,
+                self.wallet_events
+            ))
+            self.tools.register(Tool(
+                'get_portfolio',
+                "Income analytics for a wallet receiving rental streams: total "
+                "income, a cumulative income series by day, week or month, "
+                "income and annualized yield per property, and how often it claims.",
+                PortfolioRequest,
+                self.portfolio_report
+            ))
+        
         logger.info("AIPAgentManager initialized successfully")
     
     def _validate_config(self):
@@ -94,6 +501,48 @@ class AIPAgentManager:
         
         logger.info("Configuration validated successfully")
     
+    def _create_event_indexer(self, path: Optional[str]) -> Optional[EventIndexer]:
+        """Create the event indexer writing to ``path``, if set (not yet started)."""
+        if not path:
+            return None
+        addresses = [
+            address for address in (os.getenv('STREAMING_PROTOCOL_ADDRESS'), os.getenv('PROPERTY_REGISTRY_ADDRESS'))
+            if address
+        ]
+        if not addresses:
+            error_msg = "EVENT_INDEX_PATH is set but neither STREAMING_PROTOCOL_ADDRESS nor PROPERTY_REGISTRY_ADDRESS is."
+            logger.error(error_msg)
+            raise ConfigurationError(error_msg)
+        
+        start_block = os.getenv('EVENT_INDEXER_START_BLOCK')
+        indexer = EventIndexer(
+            JsonRpcLogSource(
+                os.getenv('EVENT_INDEXER_RPC_URL') or RPC_ENDPOINTS.get(self.network, MAINNET_RPC_ENDPOINT),
+                timeout=self.blockchain_timeout
+            ),
+            EventStore(path),
+            addresses,
+            start_block=int(start_block) if start_block else None,
+            reorg_depth=int(os.getenv('EVENT_INDEXER_REORG_DEPTH', '12')),
+            max_range=int(os.getenv('EVENT_INDEXER_MAX_RANGE', '5000')),
+            poll_seconds=float(os.getenv('EVENT_INDEXER_POLL_SECONDS', '5'))
+        )
+        return indexer
+    
+    def _lead_or_follow(self) -> None:
+        """Start the indexer if this worker wins the store's lock, and replay the store's new events."""
+        if self._indexer_lock.acquire():
+            self.event_indexer.start()
+        try:
+            self.event_follower.poll_once()
+        except Exception as e:
+            logger.warning(f"Event store replay failed: {str(e)}")
+    
+    def _follow_event_store(self) -> None:
+        """Run ``_lead_or_follow`` every indexer poll interval, until stopped."""
+        while not self._indexer_stop.wait(self.event_indexer.poll_seconds):
+            self._lead_or_follow()
+    
     def _initialize_membase_client(self):
         """
         Initialize Membase client for blockchain operations.
@@ -107,16 +556,13 @@ class AIPAgentManager:
         
         Returns:
             Client: Initialized Membase client
-            
+        
         Raises:
             BlockchainError: If connection fails
         """
         try:
             # Determine RPC endpoint based on network
-            if self.network == 'bsc-testnet':
-                rpc_endpoint = "https://bsc-testnet-rpc.publicnode.com"
-            else:
-                rpc_endpoint = "https://bsc-dataseed.binance.org"
+            rpc_endpoint = RPC_ENDPOINTS.get(self.network, MAINNET_RPC_ENDPOINT)
             
             # Membase contract address (BSC Testnet)
             membase_contract = "0x100E3F8c5285df46A8B9edF6b38B8f90F1C32B7b"
@@ -150,7 +596,7 @@ class AIPAgentManager:
                     logger.info("Membase client initialized successfully")
                     logger.info(f"Connection status: Connected to {rpc_endpoint}")
                     logger.info(f"Blockchain connection test: PASSED")
-                    
+                
                 except Exception as conn_error:
                     logger.error(f"Blockchain connection test failed: {str(conn_error)}")
                     raise BlockchainError(f"Failed to connect to blockchain: {str(conn_error)}")
@@ -170,7 +616,7 @@ class AIPAgentManager:
                 logger.info(f"Connection status: Mock connection to {rpc_endpoint}")
                 
                 return client
-            
+        
         except BlockchainError:
             # Re-raise blockchain errors
             raise
@@ -179,7 +625,7 @@ class AIPAgentManager:
             logger.error(f"Error type: {type(e).__name__}")
             raise BlockchainError(f"Blockchain connection failed: {str(e)}")
     
-    async def register_agent(self, agent_id: str) -> Dict[str, Any]:
+    async def register_agent(self, agent_id: str, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
         """
         Register agent on-chain via Membase smart contract.
         
@@ -192,13 +638,16 @@ class AIPAgentManager:
         
         Args:
             agent_id: Unique agent identifier
-            
+            deadline: Request deadline bounding the chain RPC calls
+        
         Returns:
             Dict containing transaction_hash, agent_id, and wallet_address
-            
+        
         Raises:
             BlockchainError: If registration fails with specific error messages
+            DeadlineExceeded: If the deadline passed during an RPC call
         """
+        deadline = deadline or Deadline()
         try:
             logger.info(f"Registering agent on-chain: {agent_id}")
             
@@ -206,7 +655,8 @@ class AIPAgentManager:
                 # Use real Membase client
                 # Check if agent is already registered
                 try:
-                    existing_owner = self.membase_client.get_agent(agent_id)
+                    existing_owner = await self._chain_call(deadline, self.membase_client.get_agent, agent_id)
+                    self.chain_owners[agent_id] = existing_owner
                     
                     # Check if agent is registered to a different wallet
                     if existing_owner and existing_owner != '0x0000000000000000000000000000000000000000':
@@ -222,8 +672,8 @@ class AIPAgentManager:
                                 'agent_id': agent_id,
                                 'wallet_address': self.membase_account
                             }
-                except BlockchainError:
-                    # Re-raise already registered errors
+                except (BlockchainError, DeadlineExceeded, CircuitOpenError):
+                    # Re-raise already registered errors, timeouts and outages
                     raise
                 except Exception as e:
                     # If get_agent fails, agent is not registered yet
@@ -231,7 +681,9 @@ class AIPAgentManager:
                 
                 # Register agent on-chain
                 try:
-                    tx_hash = self.membase_client.register(agent_id)
+                    tx_hash = await self._chain_call(
+                        deadline, self.membase_client.register, agent_id, is_failure=_is_chain_outage
+                    )
                     
                     # Validate transaction hash format
                     if not tx_hash or not isinstance(tx_hash, str):
@@ -239,6 +691,7 @@ class AIPAgentManager:
                     
                     if not tx_hash.startswith('0x'):
                         tx_hash = '0x' + tx_hash
+                    self.chain_owners[agent_id] = self.membase_account
                     
                     logger.info(f"Agent registered successfully")
                     logger.info(f"Transaction hash: {tx_hash}")
@@ -251,7 +704,10 @@ class AIPAgentManager:
                         'agent_id': agent_id,
                         'wallet_address': self.membase_account
                     }
-                    
+                
+                except (DeadlineExceeded, CircuitOpenError) as e:
+                    logger.error(f"Registration transaction for {agent_id} not sent: {str(e)}")
+                    raise
                 except Exception as tx_error:
                     error_str = str(tx_error).lower()
                     
@@ -293,8 +749,8 @@ class AIPAgentManager:
                     'agent_id': agent_id,
                     'wallet_address': self.membase_account
                 }
-            
-        except BlockchainError:
+        
+        except (BlockchainError, DeadlineExceeded, CircuitOpenError):
             # Re-raise blockchain errors with original message
             raise
         except Exception as e:
@@ -321,10 +777,10 @@ class AIPAgentManager:
             agent_id: Unique agent identifier
             description: Agent description/system prompt
             memory_hub_address: Memory Hub gRPC address (optional)
-            
+        
         Returns:
             Dict containing agent_id and status
-            
+        
         Raises:
             AgentInitializationError: If initialization fails
         """
@@ -343,25 +799,26 @@ class AIPAgentManager:
             logger.info(f"Description: {description}")
             logger.info(f"Memory Hub: {hub_address}")
             
-            # Import AIP Agent SDK
-            from aip_agent.agents.full_agent import FullAgentWrapper
-            from aip_agent.agents.custom_agent import CallbackAgent
-            
-            # Create FullAgentWrapper instance
-            agent = FullAgentWrapper(
-                agent_cls=CallbackAgent,
-                name=agent_id,
-                description=description,
-                host_address=hub_address,
-                server_names=[]  # No additional MCP servers for now
-            )
-            
-            # Initialize the agent (connects to Memory Hub, registers on-chain, etc.)
-            await agent.initialize()
+            agent = await self._create_agent(agent_id, description, hub_address)
             
             # Store agent in cache
             self.agents[agent_id] = agent
             
+            # Record the agent so it can be rehydrated after a restart
+            if self.state_store:
+                try:
+                    self.state_store.save_agent(agent_id, description, hub_address)
+                except Exception as store_error:
+                    logger.warning(f"Failed to record agent in state store: {str(store_error)}")
+            
+            # Share the agent with other replicas, owned by this one
+            if self.directory is not None:
+                try:
+                    self.directory.register(agent_id, description, hub_address, self.replica_id)
+                    self._heartbeat(force=True)
+                except Exception as directory_error:
+                    logger.warning(f"Failed to record agent in directory: {str(directory_error)}")
+            
             logger.info(f"Agent initialized successfully: {agent_id}")
             logger.info(f"Memory Hub connected: {hub_address}")
             logger.info(f"Agent registered on-chain via Membase")
@@ -370,7 +827,7 @@ class AIPAgentManager:
                 'agent_id': agent_id,
                 'status': 'initialized'
             }
-            
+        
         except ImportError as e:
             logger.error(f"Failed to import AIP Agent SDK: {str(e)}")
             logger.error("Make sure aip-agent package is installed")
@@ -380,11 +837,918 @@ class AIPAgentManager:
             logger.error(f"Error type: {type(e).__name__}")
             raise AgentInitializationError(f"Failed to initialize agent: {str(e)}")
     
+    async def _create_agent(self, agent_id: str, description: str, hub_address: str) -> Any:
+        """
+        Create and initialize an AIP agent instance.
+        
+        Args:
+            agent_id: Unique agent identifier
+            description: Agent description/system prompt
+            hub_address: Memory Hub gRPC address
+        
+        Returns:
+            Initialized FullAgentWrapper instance
+        
+        Raises:
+            ImportError: If the AIP Agent SDK is not installed
+        """
+        # Import AIP Agent SDK
+        from aip_agent.agents.full_agent import FullAgentWrapper
+        from aip_agent.agents.custom_agent import CallbackAgent
+        
+        # Create FullAgentWrapper instance
+        agent = FullAgentWrapper(
+            agent_cls=CallbackAgent,
+            name=agent_id,
+            description=description,
+            host_address=hub_address,
+            server_names=[self.tool_server] if self.tool_server else []
+        )
+        
+        # Initialize the agent (connects to Memory Hub, registers on-chain, etc.)
+        async with self.breakers['memory_hub'].guard():
+            await agent.initialize()
+        
+        self.agent_descriptions[agent_id] = description
+        return agent
+    
+    async def _get_agent(self, agent_id: str) -> Optional[Any]:
+        """
+        Return the live agent, rehydrating it from the state store if needed.
+        
+        After a restart the in-process cache is empty; agents recorded in the
+        state store are re-created from their stored description and Memory
+        Hub address on first use instead of failing with "not initialized".
+        Agents initialized on another replica are adopted the same way from
+        the shared directory, which then records this replica as the owner.
+        
+        Args:
+            agent_id: Unique agent identifier
+        
+        Returns:
+            Agent instance, or None if the agent was never initialized
+        
+        Raises:
+            AgentInitializationError: If rehydration fails
+            AgentOwnedElsewhere: In redirect mode, if another live replica
+                holds the agent; in either mode, if another replica claimed
+                it first
+        """
+        agent = self.agents.get(agent_id)
+        if agent:
+            self._heartbeat()
+            return agent
+        if not self.state_store and self.directory is None:
+            return None
+        
+        record = self._directory_record(agent_id)
+        if record is None and self.state_store:
+            record = self.state_store.get_agent(agent_id)
+        if not record:
+            return None
+        
+        logger.info(f"Rehydrating agent: {agent_id}")
+        try:
+            agent = await self._create_agent(agent_id, record['description'], record['memory_hub_address'])
+        except Exception as e:
+            logger.error(f"Agent rehydration failed: {str(e)}")
+            raise AgentInitializationError(f"Failed to rehydrate agent: {str(e)}")
+        
+        # Take over from the owner looked up above, unless another replica
+        # claimed the agent in the meantime
+        if self.directory is not None and 'owner' in record:
+            try:
+                claimed = self.directory.claim(agent_id, self.replica_id, record['owner'])
+                self._heartbeat(force=True)
+            except Exception as e:
+                logger.warning(f"Failed to claim agent {agent_id} in directory: {str(e)}")
+                claimed = True
+            if not claimed:
+                entry = self.directory.lookup(agent_id)
+                logger.info(f"Agent {agent_id} was claimed by replica {entry.owner} first")
+                raise AgentOwnedElsewhere(agent_id, entry.owner, entry.owner_url)
+        
+        # Another request may have rehydrated the agent concurrently
+        return self.agents.setdefault(agent_id, agent)
+    
+    def _evict_agent(self, agent_id: str) -> None:
+        """
+        Drop a live agent from this process; it is rehydrated if it comes back.
+        
+        Its semantic index and recommender profile go with it: both are
+        rebuilt from the local log and stored snapshot on its next use here.
+        """
+        if self.agents.pop(agent_id, None) is not None:
+            self.agent_descriptions.pop(agent_id, None)
+            logger.info(f"Evicted agent: {agent_id}")
+        if self.semantic_memory:
+            self.semantic_memory.drop(agent_id)
+        self.recommender.drop_profile(agent_id)
+    
+    def apply_ring(self, worker: str, version: int, nodes: Sequence[str], vnodes: int) -> List[str]:
+        """
+        Evict the live agents the dispatcher's ring no longer places on ``worker``.
+        
+        Views older than the last one seen are ignored. After a gap in
+        versions (views missed while unreachable) every live agent is
+        evicted, since agents may have moved away and back meanwhile.
+        
+        Returns:
+            IDs of the evicted agents
+        """
+        with self._ring_lock:
+            if version <= self._ring_version:
+                return []
+            missed = version != self._ring_version + 1
+            self._ring_version = version
+            ring = HashRing(nodes, vnodes=vnodes)
+            evicted = [
+                agent_id for agent_id in list(self.agents)
+                if missed or ring.owner(agent_id) != worker
+            ]
+            for agent_id in evicted:
+                self._evict_agent(agent_id)
+        if evicted:
+            logger.info(f"Ring version {version} moved {len(evicted)} agents off {worker}")
+        return evicted
+    
+    def _directory_record(self, agent_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Initialization metadata for an agent from the shared directory.
+        
+        Returns None if there is no directory, the agent is not in it, or
+        the directory is unreachable (the state store is used instead).
+        
+        Raises:
+            AgentOwnedElsewhere: In redirect mode, if another live replica
+                holds the agent
+        """
+        if self.directory is None:
+            return None
+        try:
+            entry = self.directory.lookup(agent_id)
+        except Exception as e:
+            logger.warning(f"Agent directory lookup failed: {str(e)}")
+            return None
+        if entry is None:
+            return None
+        if (
+            self.directory_mode == 'redirect'
+            and entry.owner_alive
+            and entry.owner != self.replica_id
+            and entry.owner_url
+        ):
+            raise AgentOwnedElsewhere(agent_id, entry.owner, entry.owner_url)
+        return {
+            'agent_id': entry.agent_id,
+            'description': entry.description,
+            'memory_hub_address': entry.memory_hub_address,
+            'owner': entry.owner
+        }
+    
+    def _in_directory(self, agent_id: str) -> bool:
+        """Whether the shared directory knows the agent (False if unreachable)."""
+        try:
+            return self.directory is not None and self.directory.lookup(agent_id) is not None
+        except Exception as e:
+            logger.warning(f"Agent directory lookup failed: {str(e)}")
+            return False
+    
+    def _heartbeat(self, force: bool = False) -> None:
+        """Renew this replica's lease in the directory, at most every third of a lease."""
+        if self.directory is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_heartbeat < self.directory.lease_seconds / 3:
+            return
+        self._last_heartbeat = now
+        try:
+            self.directory.heartbeat(self.replica_id, self.replica_url)
+        except Exception as e:
+            logger.warning(f"Agent directory heartbeat failed: {str(e)}")
+    
+    def _watch_ownership(self) -> None:
+        """Heartbeat and drop agents claimed elsewhere every third of a lease, until stopped."""
+        interval = max(1.0, self.directory.lease_seconds / 3)
+        while True:
+            self._heartbeat(force=True)
+            self._drop_lost_agents()
+            if self._directory_stop.wait(interval):
+                return
+    
+    def _drop_lost_agents(self) -> List[str]:
+        """
+        Evict live agents the directory records as owned by another replica.
+        
+        Another replica claims an agent once this one's lease has lapsed
+        (or, in adopt mode, when traffic for it reaches that replica), so
+        this replica must stop serving its copy.
+        
+        Returns:
+            IDs of the evicted agents
+        """
+        try:
+            lost = self.directory.owned_elsewhere(self.replica_id, list(self.agents))
+        except Exception as e:
+            logger.warning(f"Agent ownership check failed: {str(e)}")
+            return []
+        for agent_id in lost:
+            self._evict_agent(agent_id)
+        if lost:
+            logger.warning(f"Dropped {len(lost)} agents now owned by other replicas")
+        return lost
+    
+    def _save_snapshot(self, agent_id: str, state: AgentState) -> None:
+        """
+        Persist the latest materialized state; store failures are logged, not raised.
+        
+        States not read from the Memory Hub (``memoryHubConnected`` False)
+        are not saved, so they never replace the last good snapshot.
+        """
+        if not self.state_store or not state.memoryHubConnected:
+            return
+        try:
+            self.state_store.save_state(agent_id, state)
+        except Exception as e:
+            logger.warning(f"Failed to save state snapshot for agent {agent_id}: {str(e)}")
+    
+    def _sync_interaction_log(self, agent_id: str, state: AgentState) -> None:
+        """Append turns from the hub's history that the local log has not seen yet (hub reads only)."""
+        if not self.interaction_logs or not state.memoryHubConnected:
+            return
+        try:
+            self.interaction_logs.sync(agent_id, state.interactionHistory)
+        except Exception as e:
+            logger.warning(f"Failed to sync interaction log for agent {agent_id}: {str(e)}")
+    
+    def _build_query_context(
+        self,
+        agent_id: str,
+        query: str,
+        state: AgentState
+    ) -> Tuple[int, List[str]]:
+        """
+        Decide how much raw history to send and what extra context to add.
+        
+        When a summary covers the agent's older turns, only the turns after
+        its watermark are sent raw alongside it, and never fewer than the
+        summarizer's recent window. The summarizer runs on an interval, so
+        its watermark may trail the recent window; the raw turns then reach
+        back to it and no turn is left out of both.
+        
+        Args:
+            agent_id: Unique agent identifier
+            query: User query
+            state: Agent state read before processing the query
+        
+        Returns:
+            Tuple of (recent_n_messages, context sections for the system prompt)
+        """
+        recent_n_messages = DEFAULT_RECENT_MESSAGES
+        sections: List[str] = []
+        
+        if self.summarizer:
+            record = self.summarizer.get(agent_id)
+            if record and record.summary:
+                ids = [interaction.id for interaction in state.interactionHistory]
+                # A watermark outside the history slid out of it: every turn read is newer
+                unsummarized = (
+                    len(ids) - ids.index(record.summarized_through) - 1
+                    if record.summarized_through in ids else len(ids)
+                )
+                recent_n_messages = 2 * max(self.summarizer.recent_turns, unsummarized)
+                sections.append("Summary of earlier conversation:\n" + record.summary)
+        
+        if self.semantic_memory:
+            # Turns in the recent window are already sent verbatim
+            recent_ids = {i.id for i in state.interactionHistory[-(recent_n_messages // 2):]}
+            hits = self.semantic_memory.search(agent_id, query, self.retrieval_top_k, recent_ids)
+            if hits:
+                # Present retrieved turns in chronological order
+                turns = sorted((interaction for _, interaction in hits), key=lambda i: i.timestamp)
+                sections.append(
+                    "Relevant earlier conversation:\n" + "\n".join(format_turn(i, 300, 500) for i in turns)
+                )
+        
+        return recent_n_messages, sections
+    
+    def _fit_token_budget(
+        self,
+        agent_id: str,
+        query: str,
+        state: AgentState,
+        recent_n_messages: int,
+        sections: List[str],
+        accepts_context: bool
+    ) -> Tuple[int, List[str]]:
+        """
+        Shrink the raw history window to the context token budget.
+        
+        The query and context sections are counted first; the remaining
+        budget goes to as many recent turns as fit, and turns with an
+        oversized message are sent truncated in the prompt instead. The
+        prompt size is recorded in the metrics either way.
+        
+        Returns:
+            Tuple of (recent_n_messages, context sections)
+        """
+        description = self.agent_descriptions.get(agent_id, '')
+        fixed_tokens = count_tokens(query) + count_tokens(description) + sum(count_tokens(s) for s in sections)
+        max_turns = recent_n_messages // 2
+        
+        if self.context_token_budget > 0:
+            plan = fit_history(
+                state.interactionHistory,
+                max(0, self.context_token_budget - fixed_tokens),
+                max_turns,
+                self.max_message_tokens,
+                allow_truncated=accepts_context
+            )
+            recent_n_messages = 2 * plan.raw_turns
+            if plan.truncated:
+                sections = sections + ["Earlier conversation (truncated):\n" + "\n".join(plan.truncated)]
+                metrics.increment('context_truncated_turns', len(plan.truncated))
+            history_tokens, raw_turns = plan.tokens, plan.raw_turns
+        else:
+            window = state.interactionHistory[-max_turns:] if max_turns > 0 else []
+            history_tokens = sum(count_tokens(i.userQuery) + count_tokens(i.agentResponse) for i in window)
+            raw_turns = len(window)
+        
+        prompt_tokens = fixed_tokens + history_tokens
+        metrics.observe('prompt_tokens', prompt_tokens)
+        metrics.observe('context_turns', raw_turns)
+        logger.info(f"Prompt for agent {agent_id}: ~{prompt_tokens} tokens, {raw_turns} raw turns")
+        return recent_n_messages, sections
+    
+    def _update_profile(self, agent_id: str, state: AgentState) -> None:
+        """Fold the agent's preferences and new queries into its recommendation profile (hub reads only)."""
+        if not state.memoryHubConnected:
+            return
+        try:
+            self.recommender.update_profile(agent_id, state.preferences, state.interactionHistory)
+        except Exception as e:
+            logger.warning(f"Failed to update recommendation profile for agent {agent_id}: {str(e)}")
+    
+    def _index_interactions(self, agent_id: str, history: List[Interaction]) -> None:
+        """Embed turns not yet in the agent's semantic index."""
+        if not self.semantic_memory:
+            return
+        try:
+            # Seed a new index from the local log, which reaches further back than the hub window
+            if not self.semantic_memory.has_agent(agent_id) and self.interaction_logs \
+                    and self.interaction_logs.exists(agent_id):
+                log = self.interaction_logs.get(agent_id)
+                self.semantic_memory.add(agent_id, log.read_range(0, len(log)))
+            self.semantic_memory.add(agent_id, history)
+        except Exception as e:
+            logger.warning(f"Failed to index interactions for agent {agent_id}: {str(e)}")
+    
+    async def _read_state(self, agent_id: str, deadline: Deadline) -> AgentState:
+        """
+        Read the agent's state from the Memory Hub within the deadline and its breaker.
+        
+        The hub client is blocking, so the read runs on a worker thread the
+        deadline can abandon instead of holding up the request's loop.
+        """
+        deadline.check('memory_hub')
+        async with self.breakers['memory_hub'].guard(ignore=_is_budget_expiry):
+            return await deadline.call_blocking(
+                'memory_hub', self._get_agent_state_from_membase, agent_id, cap=self.memory_hub_timeout
+            )
+    
+    async def _read_state_or_fallback(self, agent_id: str, deadline: Deadline) -> AgentState:
+        """
+        Read the agent's state, falling back to a degraded empty state if the read fails.
+        
+        The failure has already counted against the Memory Hub breaker;
+        an open breaker and deadline expiries are still raised.
+        """
+        try:
+            return await self._read_state(agent_id, deadline)
+        except (CircuitOpenError, DeadlineExceeded):
+            raise
+        except Exception as e:
+            logger.error(f"Failed to retrieve agent state from Membase: {str(e)}")
+            return self._build_agent_state(agent_id, hub_connected=False)
+    
+    async def _chain_call(self, deadline: Deadline, fn, *args, is_failure=None):
+        """Make a blocking chain RPC call within the deadline and its breaker."""
+        deadline.check('chain_rpc')
+        async with self.breakers['chain_rpc'].guard(is_failure, ignore=_is_budget_expiry):
+            return await deadline.call_blocking('chain_rpc', fn, *args, cap=self.blockchain_timeout)
+    
+    def dependency_health(self) -> Dict[str, Dict[str, Any]]:
+        """Circuit breaker state per dependency."""
+        return {name: breaker.snapshot() for name, breaker in self.breakers.items()}
+    
+    def _llm_slot(self, priority: str, tenant: str):
+        """Async context holding an LLM admission slot (a no-op without a cap)."""
+        return self.admission.slot(priority, tenant) if self.admission is not None else nullcontext()
+    
+    def _context_kwargs(
+        self,
+        agent: Any,
+        agent_id: str,
+        sections: List[str]
+    ) -> Dict[str, Any]:
+        """
+        Extra process_query keyword arguments carrying the context sections.
+        
+        The sections are appended to the agent's description and passed as
+        ``system_prompt``. Returns an empty dict if there is nothing to add
+        or the agent's process_query does not accept a system prompt.
+        """
+        if not sections or not _accepts_kwarg(type(agent), 'system_prompt'):
+            return {}
+        
+        description = self.agent_descriptions.get(agent_id, '')
+        return {'system_prompt': '\n\n'.join([description] + sections).strip()}
+    
+    def search_properties(self, criteria: PropertySearchRequest) -> Dict[str, Any]:
+        """
+        Search the property catalog.
+        
+        A latitude/longitude without a radius only measures distances (for
+        sorting by distance); with one, it also filters.
+        
+        Returns:
+            Dict with the total number of matches, a page of listings and
+            the search time in milliseconds
+        
+        Raises:
+            ValueError: If only one coordinate, or a radius without a
+                location, is given
+        """
+        near = None
+        if (criteria.latitude is None) != (criteria.longitude is None):
+            raise ValueError("latitude and longitude must be given together")
+        if criteria.latitude is not None:
+            near = (criteria.latitude, criteria.longitude, criteria.radius_km or math.pi * EARTH_RADIUS_KM)
+        elif criteria.radius_km is not None:
+            raise ValueError("radius_km needs a latitude and longitude")
+        box = criteria.bounding_box
+        
+        started = time.perf_counter()
+        total, listings = self.properties.search(
+            cities=criteria.cities,
+            amenities=criteria.amenities,
+            ranges={
+                'price': (criteria.min_price, criteria.max_price),
+                'bedrooms': (criteria.min_bedrooms, criteria.max_bedrooms),
+                'annual_yield': (criteria.min_yield, criteria.max_yield)
+            },
+            near=near,
+            box=(box.south, box.west, box.north, box.east) if box else None,
+            sort_by=criteria.sort_by,
+            descending=criteria.descending,
+            limit=criteria.limit,
+            offset=criteria.offset
+        )
+        took_ms = (time.perf_counter() - started) * 1000
+        metrics.observe('property_search_ms', took_ms)
+        return {'total': total, 'properties': listings, 'took_ms': round(took_ms, 3)}
+    
+    async def compile_search(
+        self,
+        request: CriteriaCompileRequest,
+        deadline: Optional[Deadline] = None
+    ) -> Dict[str, Any]:
+        """
+        Compile a free-text property request into search criteria.
+        
+        Cached criteria are reused for repeated and reworded requests; on a
+        miss the LLM of the CRITERIA_COMPILER_AGENT agent compiles the
+        request, or the rule parser when that agent is unset or not
+        initialized.
+        
+        Returns:
+            Dict with the criteria, their source ('cache', 'llm' or
+            'rules') and the compilation time, plus the search's total and
+            listings when ``request.search`` is set
+        
+        Raises:
+            ValueError: If the request is compiled by the rules, which
+                cannot express it (negated criteria or an unknown city)
+            OverloadedError, CircuitOpenError, DeadlineExceeded: If the LLM
+                call is rejected or times out and the rules find no criteria
+            CompileError: If the LLM's reply is not valid criteria and the
+                rules find none
+        """
+        deadline = deadline or Deadline()
+        complete = None
+        if self.criteria_compiler_agent:
+            agent = await self._get_agent(self.criteria_compiler_agent)
+            if agent:
+                async def complete(system_prompt: str, text: str) -> str:
+                    return await self._complete(self.criteria_compiler_agent, agent, system_prompt, text, deadline)
+            else:
+                logger.warning(f"Criteria compiler agent {self.criteria_compiler_agent} is not initialized; using rules")
+        
+        started = time.perf_counter()
+        compiled = await self.criteria_compiler.compile(
+            request.query,
+            complete,
+            self.properties.cities(),
+            self.properties.amenities(),
+            bypass_cache=request.bypass_cache
+        )
+        took_ms = (time.perf_counter() - started) * 1000
+        metrics.observe('criteria_compile_ms', took_ms)
+        metrics.increment(f'criteria_compile_{compiled.source}')
+        
+        result = {'criteria': compiled.criteria, 'source': compiled.source, 'took_ms': round(took_ms, 3)}
+        if request.search:
+            found = self.search_properties(PropertySearchRequest(**compiled.criteria))
+            result.update(total=found['total'], properties=found['properties'])
+        return result
+    
+    async def _complete(
+        self,
+        agent_id: str,
+        agent: Any,
+        system_prompt: str,
+        text: str,
+        deadline: Deadline,
+        priority: str = 'interactive'
+    ) -> str:
+        """
+        One LLM call through an agent, without its history or tools.
+        
+        Runs as one of the agent's turns (the SDK records the exchange in
+        its memory, so a dedicated agent keeps it out of user
+        conversations), within the LLM admission cap, breaker and timeout.
+        """
+        kwargs = {}
+        if _accepts_kwarg(type(agent), 'system_prompt'):
+            kwargs['system_prompt'] = system_prompt
+        else:
+            text = f"{system_prompt}\n\nRequest: {text}"
+        async with deadline.enter('queue', self.mailboxes.turn(agent_id)):
+            async with deadline.enter('queue', self._llm_slot(priority, agent_id)):
+                deadline.check('llm')
+                async with self.breakers['llm'].guard(ignore=_is_budget_expiry):
+                    return await deadline.run('llm', agent.process_query(
+                        query=text,
+                        use_history=False,
+                        recent_n_messages=0,
+                        use_tool_call=False,
+                        **kwargs
+                    ), cap=self.llm_timeout)
+    
+    def _summarize_with_llm(self, previous_summary: str, interactions: Sequence[Interaction]) -> str:
+        """
+        Summary function of the background summarizer using SUMMARY_AGENT's LLM.
+        
+        Runs on a summarizer worker thread, as a batch-priority turn of that
+        agent. Falls back to the extractive digest when the agent is not
+        initialized or the call fails.
+        """
+        try:
+            summary = asyncio.run(self._llm_summary(previous_summary, interactions))
+            if summary:
+                return summary
+            logger.warning(f"Summary agent {self.summary_agent} returned an empty summary")
+        except Exception as e:
+            logger.warning(f"LLM summary by agent {self.summary_agent} failed, using extractive summary: {str(e)}")
+        return extractive_summary(previous_summary, interactions)
+    
+    async def _llm_summary(self, previous_summary: str, interactions: Sequence[Interaction]) -> str:
+        """Fold interactions into the previous summary with SUMMARY_AGENT's LLM."""
+        agent = await self._get_agent(self.summary_agent)
+        if not agent:
+            raise ValueError(f"Agent {self.summary_agent} has not been initialized")
+        reply = await self._complete(
+            self.summary_agent,
+            agent,
+            SUMMARY_PROMPT,
+            summary_request(previous_summary, interactions),
+            Deadline(),
+            priority='batch'
+        )
+        return reply.strip()[:SUMMARY_MAX_CHARS]
+    
+    def recommend_properties(self, criteria: RecommendationRequest) -> Dict[str, Any]:
+        """
+        Recommend listings for an agent from its profile and an optional query.
+        
+        Profiles are built from the turns this process has seen; an agent
+        without one is seeded from its stored state snapshot when there is one.
+        
+        Returns:
+            Dict with the agent ID, the listings (each with its ``score``)
+            and the ranking time in milliseconds
+        
+        Raises:
+            ValueError: If the agent has no profile and no query is given
+        """
+        agent_id = criteria.agent_id
+        if not self.recommender.has_profile(agent_id) and self.state_store:
+            snapshot = self.state_store.load_state(agent_id)
+            if snapshot:
+                self._update_profile(agent_id, snapshot)
+        
+        started = time.perf_counter()
+        ranked = self.recommender.recommend(agent_id, criteria.limit, criteria.query, criteria.exclude)
+        took_ms = (time.perf_counter() - started) * 1000
+        metrics.observe('recommendation_ms', took_ms)
+        return {
+            'agent_id': agent_id,
+            'properties': [dict(listing, score=round(score, 4)) for score, listing in ranked],
+            'took_ms': round(took_ms, 3)
+        }
+    
+    def stream_balances(self, criteria: StreamBalancesRequest) -> Dict[str, Any]:
+        """
+        Balances of the stored streams at a timestamp.
+        
+        Returns:
+            Dict with the timestamp, stream count, per-stream balances (if
+            requested), totals and unknown stream IDs; wei amounts are
+            decimal strings
+        """
+        timestamp = criteria.timestamp if criteria.timestamp is not None else int(time.time())
+        balances, missing = self.streams.balances(timestamp, criteria.stream_ids, criteria.recipient)
+        rows = balances.rows() if criteria.include_streams else []
+        return {
+            'timestamp': timestamp,
+            'count': len(balances.stream_ids),
+            'balances': [
+                {
+                    'stream_id': row['stream_id'],
+                    'claimable': str(row['claimable']),
+                    'streamed': str(row['streamed']),
+                    'remaining': str(row['remaining'])
+                }
+                for row in rows
+            ],
+            'totals': {key: str(value) for key, value in balances.totals().items()},
+            'missing': missing
+        }
+    
+    def wallet_events(self, criteria: WalletEventsRequest) -> Dict[str, Any]:
+        """
+        Indexed stream and property events of a wallet.
+        
+        Returns:
+            Dict with the wallet, its events (newest first), the wei it was
+            paid as a stream recipient (decimal string) and the last indexed
+            block
+        
+        Raises:
+            RuntimeError: If the event indexer is not enabled
+        """
+        if self.event_indexer is None:
+            raise RuntimeError("Event indexer is not enabled (set EVENT_INDEX_PATH)")
+        store = self.event_indexer.store
+        checkpoint = store.checkpoint()
+        return {
+            'wallet': criteria.wallet.lower(),
+            'events': store.wallet_events(criteria.wallet, criteria.events, criteria.limit),
+            'earned': str(store.earned(criteria.wallet)),
+            'indexed_through': checkpoint[0] if checkpoint else None
+        }
+    
+    def simulate_income(self, criteria: YieldSimulationRequest) -> Dict[str, Any]:
+        """
+        Simulate the income of described and/or stored streams from now.
+        
+        Stored streams (selected by ``stream_ids`` and/or ``recipient``, or
+        all of them when no streams are described) use the request's
+        default occupancy and cancel probability.
+        
+        Returns:
+            Dict with the stream count, unknown stream IDs, scenarios,
+            horizon, contracted and expected income, percentiles and bands
+            (wei amounts as decimal strings) and the simulation time
+        
+        Raises:
+            ValueError: If the run is too large
+        """
+        flow_rate, delay, remaining, occupancy, cancel_probability = [], [], [], [], []
+        for stream in criteria.streams or ():
+            flow_rate.append(float(stream.flow_rate))
+            delay.append(stream.delay_seconds)
+            remaining.append(stream.remaining_seconds)
+            occupancy.append(criteria.occupancy if stream.occupancy is None else stream.occupancy)
+            cancel_probability.append(
+                criteria.cancel_probability if stream.cancel_probability is None else stream.cancel_probability
+            )
+        
+        missing: List[int] = []
+        if criteria.stream_ids is not None or criteria.recipient or not criteria.streams:
+            stored, missing = self.streams.schedule(int(time.time()), criteria.stream_ids, criteria.recipient)
+            flow_rate.extend(stored['flow_rate'].tolist())
+            delay.extend(stored['delay'].tolist())
+            remaining.extend(stored['remaining'].tolist())
+            occupancy.extend([criteria.occupancy] * len(stored['stream_id']))
+            cancel_probability.extend([criteria.cancel_probability] * len(stored['stream_id']))
+        
+        result = self.simulator.simulate(
+            parameters(flow_rate, delay, remaining, occupancy, cancel_probability),
+            scenarios=criteria.scenarios,
+            horizon_days=criteria.horizon_days,
+            period_days=criteria.period_days,
+            seed=criteria.seed
+        )
+        metrics.observe('income_simulation_ms', result['took_ms'])
+        return {
+            'streams': len(flow_rate),
+            'missing': missing,
+            'scenarios': criteria.scenarios,
+            'horizon_days': criteria.horizon_days,
+            'contracted': str(result['contracted']),
+            'expected': str(result['expected']),
+            'percentiles': {key: str(value) for key, value in result['percentiles'].items()},
+            'bands': [
+                {key: value if key == 'day' else str(value) for key, value in band.items()}
+                for band in result['bands']
+            ],
+            'took_ms': result['took_ms']
+        }
+    
+    def portfolio_report(self, criteria: PortfolioRequest) -> Dict[str, Any]:
+        """
+        Income analytics of a wallet from the indexed stream events.
+        
+        Returns:
+            Dict with the wallet, granularity, total income, income series,
+            per-property performance and claim cadence (wei amounts as
+            decimal strings), the last indexed block and the computation time
+        
+        Raises:
+            RuntimeError: If the event indexer is not enabled
+        """
+        if self.portfolio is None:
+            raise RuntimeError("Event indexer is not enabled (set EVENT_INDEX_PATH)")
+        started = time.perf_counter()
+        report = self.portfolio.report(criteria.wallet, criteria.granularity, criteria.start, criteria.end)
+        took_ms = (time.perf_counter() - started) * 1000
+        metrics.observe('portfolio_report_ms', took_ms)
+        
+        checkpoint = self.event_indexer.store.checkpoint()
+        amount_fields = ('total_amount', 'received', 'annualized_income')
+        return {
+            'wallet': criteria.wallet.lower(),
+            'granularity': criteria.granularity,
+            'total_income': str(report['total_income']),
+            'income': [
+                {'period': point['period'], 'income': str(point['income']), 'cumulative': str(point['cumulative'])}
+                for point in report['income']
+            ],
+            'properties': [
+                {key: str(value) if key in amount_fields and value is not None else value for key, value in item.items()}
+                for item in report['properties']
+            ],
+            'claim_cadence': report['claim_cadence'],
+            'indexed_through': checkpoint[0] if checkpoint else None,
+            'took_ms': round(took_ms, 3)
+        }
+    
+    async def _answer_intent(
+        self,
+        agent_id: str,
+        query: str,
+        user_context: Optional[Dict[str, Any]],
+        state: AgentState,
+        deadline: Deadline
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Answer a lookup query from local data, without the LLM.
+        
+        The turn is added to the agent's conversation memory as
+        process_query would add it, then snapshotted, logged and indexed
+        like an LLM turn; it is not put in the response cache, since the
+        answer follows the data rather than the history. Caller holds the
+        agent's turn.
+        
+        Returns:
+            The query_agent result, or None when the query is not a lookup
+            (or its data is unavailable) and is left to the LLM
+        """
+        started = time.perf_counter()
+        try:
+            intent = self.intent_router.classify(query, self.properties.cities(), self.properties.amenities())
+            response_text = await self._intent_response(agent_id, intent, user_context, state) if intent else None
+        except Exception as e:
+            logger.warning(f"Intent routing failed for agent {agent_id}, using the LLM: {str(e)}")
+            return None
+        if response_text is None:
+            return None
+        logger.info(f"Answering {intent.name} query for agent {agent_id} without the LLM ({intent.source})")
+        
+        # Not bounded by the deadline: an abandoned write would go on after
+        # the turn is released and interleave with the agent's next turn
+        if await asyncio.to_thread(self._remember_turn, agent_id, query, response_text):
+            try:
+                agent_state = await self._read_state(agent_id, deadline)
+                if user_context:
+                    agent_state.preferences.update(user_context)
+            except Exception as e:
+                logger.warning(f"Failed to re-read state after routed turn for agent {agent_id}: {str(e)}")
+                agent_state = state
+        else:
+            agent_state = state
+        agent_state, interaction_id, synced = self._with_interaction(
+            agent_id, agent_state, query, response_text, user_context
+        )
+        if synced:
+            self._save_snapshot(agent_id, agent_state)
+            self._sync_interaction_log(agent_id, agent_state)
+            self._index_interactions(agent_id, agent_state.interactionHistory)
+            if self.summarizer:
+                self.summarizer.schedule(agent_id, agent_state.interactionHistory)
+        self._update_profile(agent_id, agent_state)
+        metrics.observe('intent_routing_ms', (time.perf_counter() - started) * 1000)
+        
+        return {
+            'response': response_text,
+            'agent_state': agent_state,
+            'interaction_id': interaction_id,
+            'cached': False,
+            'intent': intent.name
+        }
+    
+    def _remember_turn(self, agent_id: str, query: str, response: str) -> bool:
+        """Add a turn to the agent's conversation memory; False if it has none to add to."""
+        memory = getattr(self.agents.get(agent_id), '_memory', None)
+        if memory is None or Message is None:
+            return False
+        try:
+            conversation = memory.get_memory()
+            conversation.add(Message(name=agent_id, content=query, role='user'))
+            conversation.add(Message(name=agent_id, content=response, role='assistant'))
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to add routed turn to memory for agent {agent_id}: {str(e)}")
+            return False
+    
+    async def _intent_response(
+        self,
+        agent_id: str,
+        intent: Intent,
+        user_context: Optional[Dict[str, Any]],
+        state: AgentState
+    ) -> Optional[str]:
+        """The answer to a routed intent, or None if it cannot be answered locally."""
+        if intent.name == AGENT_STATUS:
+            status = await self.get_agent_status(agent_id)
+            registration = (
+                f"registered on-chain to {status['wallet_address']}" if status['registered']
+                else "not registered on-chain"
+            )
+            hub = "connected to" if status['memory_hub_connected'] else "not connected to"
+            return (
+                f"Agent {agent_id} is {status['status']}, {registration}, and {hub} the Memory Hub. "
+                f"It has {len(state.interactionHistory)} interactions in memory."
+            )
+        
+        if intent.name == PROPERTY_SEARCH:
+            result = self.search_properties(PropertySearchRequest(**intent.slots))
+            if not result['properties']:
+                return "No listings match that search."
+            lines = [f"{result['total']} listings match; showing {len(result['properties'])}:"]
+            for listing in result['properties']:
+                details = [listing.get('city')]
+                if listing.get('bedrooms') is not None:
+                    details.append('studio' if listing['bedrooms'] == 0 else f"{listing['bedrooms']} bed")
+                if listing.get('price') is not None:
+                    details.append(f"${listing['price']:,.0f}/month")
+                if listing.get('annual_yield') is not None:
+                    details.append(f"{listing['annual_yield']}% yield")
+                title = listing.get('title') or listing['property_id']
+                lines.append(f"- {title} ({', '.join(d for d in details if d)}) [{listing['property_id']}]")
+            return '\n'.join(lines)
+        
+        if intent.name == PORTFOLIO:
+            context = {**state.preferences, **(user_context or {})}
+            wallet = context.get('wallet') or context.get('wallet_address') or state.walletAddress
+            if self.portfolio is None or not wallet:
+                return None
+            report = self.portfolio_report(PortfolioRequest(wallet=wallet, granularity=intent.slots['granularity']))
+            active = sum(1 for item in report['properties'] if item['status'] == 'active')
+            parts = [
+                f"Wallet {report['wallet']} has received {_tokens(report['total_income'])} "
+                f"from {len(report['properties'])} streams ({active} active)."
+            ]
+            if report['income']:
+                latest = report['income'][-1]
+                parts.append(f"Income for the {report['granularity']} of {latest['period']}: {_tokens(latest['income'])}.")
+            days = report['claim_cadence'].get('days_since_last_claim')
+            if days is not None:
+                parts.append(f"Last claim {days} days ago.")
+            return ' '.join(parts)
+        
+        return None
+    
     async def query_agent(
         self,
         agent_id: str,
         query: str,
-        user_context: Optional[Dict[str, Any]] = None
+        user_context: Optional[Dict[str, Any]] = None,
+        bypass_cache: bool = False,
+        priority: str = 'interactive',
+        tenant: Optional[str] = None,
+        deadline: Optional[Deadline] = None
     ) -> Dict[str, Any]:
         """
         Send query to agent and get response.
@@ -396,73 +1760,176 @@ class AIPAgentManager:
         - Updates the agent's interaction history in Membase
         - Returns both the response and updated agent state
         
+        When the response cache is enabled, a repeated query against an
+        unchanged agent state is answered from the cache without calling
+        the LLM or recording a new interaction.
+        
+        When intent routing is enabled, lookup queries (agent status,
+        property search, portfolio) are answered from local data without
+        calling the LLM; the turn is recorded like any other.
+        
         Args:
             agent_id: Unique agent identifier
             query: User query string
             user_context: Optional context data
-            
+            bypass_cache: Skip the response cache lookup for this query
+            priority: Admission priority of the LLM call ('interactive' or 'batch')
+            tenant: Caller identity used to share LLM capacity fairly
+                (defaults to the agent_id)
+            deadline: Request deadline; every stage runs within what is left of it
+        
         Returns:
-            Dict containing response, agent_state, and interaction_id
-            
+            Dict containing response, agent_state (AgentState), interaction_id,
+            cached (whether the response came from the cache) and intent
+            (the routed intent, or None when the LLM answered)
+        
         Raises:
             ValueError: If agent not initialized
+            OverloadedError: If no LLM slot freed up within the maximum queue
+                wait, or the agent already has too many turns pending
+            CircuitOpenError: If the Memory Hub or LLM circuit breaker is open
+            AgentOwnedElsewhere: In redirect mode, if another replica holds the agent
+            DeadlineExceeded: If the deadline passed; the stage in progress is cancelled
             QueryProcessingError: If query processing fails
         """
+        deadline = deadline or Deadline()
         try:
             # Check if agent is initialized
-            agent = self.agents.get(agent_id)
+            agent = await self._get_agent(agent_id)
             if not agent:
                 raise ValueError(f"Agent {agent_id} has not been initialized")
             
             logger.info(f"Processing query for agent: {agent_id}")
             logger.info(f"Query: {query[:100]}...")  # Log first 100 chars
             
-            # Generate interaction ID
-            interaction_id = str(uuid.uuid4())
-            
-            # Retrieve agent state from Membase before processing
-            agent_state_before = await self._get_agent_state_from_membase(agent_id)
-            logger.info(f"Retrieved agent state from Membase for agent: {agent_id}")
-            
-            # Process query with real LLM using AIP Agent SDK
-            try:
-                # Use the real agent's process_query method
-                response_text = await agent.process_query(
+            # One turn at a time per agent: concurrent turns would interleave
+            # their memory writes and mispair queries and responses
+            async with deadline.enter('queue', self.mailboxes.turn(agent_id)):
+                # Retrieve agent state from Membase before processing
+                agent_state_before = await self._read_state_or_fallback(agent_id, deadline)
+                logger.info(f"Retrieved agent state from Membase for agent: {agent_id}")
+                
+                if self.intent_router is not None:
+                    routed = await self._answer_intent(agent_id, query, user_context, agent_state_before, deadline)
+                    if routed is not None:
+                        return routed
+                
+                if self.response_cache is not None and not bypass_cache:
+                    cached = self.response_cache.get(
+                        agent_id, query, state_version(agent_state_before, user_context)
+                    )
+                    if cached:
+                        logger.info(f"Serving cached response for agent: {agent_id}")
+                        if user_context:
+                            agent_state_before.preferences.update(user_context)
+                        return {
+                            'response': cached.response,
+                            'agent_state': agent_state_before,
+                            'interaction_id': cached.interaction_id,
+                            'cached': True,
+                            'intent': None
+                        }
+                
+                self._index_interactions(agent_id, agent_state_before.interactionHistory)
+                self._update_profile(agent_id, agent_state_before)
+                
+                # Send the summary of older turns, relevant past turns, and a recent window
+                recent_n_messages, context_sections = self._build_query_context(
+                    agent_id, query, agent_state_before
+                )
+                accepts_context = _accepts_kwarg(type(agent), 'system_prompt')
+                if not accepts_context:
+                    # The context cannot be passed to this agent; keep the full raw window
+                    recent_n_messages, context_sections = DEFAULT_RECENT_MESSAGES, []
+                recent_n_messages, context_sections = self._fit_token_budget(
+                    agent_id, query, agent_state_before, recent_n_messages, context_sections, accepts_context
+                )
+                context_kwargs = self._context_kwargs(agent, agent_id, context_sections)
+                
+                # Process query with real LLM using AIP Agent SDK
+                try:
+                    # Use the real agent's process_query method, within the
+                    # process-wide LLM concurrency cap
+                    async with deadline.enter('queue', self._llm_slot(priority, tenant or agent_id)):
+                        deadline.check('llm')
+                        async with self.breakers['llm'].guard(ignore=_is_budget_expiry):
+                            response_text = await deadline.run('llm', agent.process_query(
+                                query=query,
+                                use_history=True,  # Use conversation history from Membase
+                                recent_n_messages=recent_n_messages,  # Include recent messages for context
+                                use_tool_call=True,  # Allow tool usage if available
+                                **context_kwargs
+                            ), cap=self.llm_timeout)
+                    
+                    logger.info(f"LLM generated response for agent: {agent_id}")
+                    logger.info(f"Response length: {len(response_text)} characters")
+                
+                except CircuitOpenError:
+                    logger.warning(f"LLM call for agent {agent_id} rejected: circuit open")
+                    raise
+                except OverloadedError:
+                    logger.warning(f"LLM call for agent {agent_id} rejected: queue wait exceeded")
+                    raise
+                except DeadlineExceeded as e:
+                    logger.warning(f"LLM call for agent {agent_id} cancelled: {str(e)}")
+                    raise
+                except Exception as llm_error:
+                    logger.error(f"LLM processing failed: {str(llm_error)}")
+                    raise QueryProcessingError(f"LLM API error: {str(llm_error)}")
+                
+                # Update agent state in Membase with new interaction
+                agent_state = await self._update_agent_state_in_membase(
+                    agent_id=agent_id,
                     query=query,
-                    use_history=True,  # Use conversation history from Membase
-                    recent_n_messages=16,  # Include recent messages for context
-                    use_tool_call=True  # Allow tool usage if available
+                    response=response_text,
+                    user_context=user_context,
+                    previous_state=agent_state_before,
+                    deadline=deadline
+                )
+                
+                # Report the same ID the interaction carries in the history so
+                # downstream caches can key on it
+                agent_state, interaction_id, synced = self._with_interaction(
+                    agent_id, agent_state, query, response_text, user_context
                 )
+                # A turn the hub has not returned yet is recorded once a later read returns it
+                if synced:
+                    self._save_snapshot(agent_id, agent_state)
+                    self._sync_interaction_log(agent_id, agent_state)
+                    self._index_interactions(agent_id, agent_state.interactionHistory)
+                self._update_profile(agent_id, agent_state)
                 
-                logger.info(f"LLM generated response for agent: {agent_id}")
-                logger.info(f"Response length: {len(response_text)} characters")
+                # Cache against the state that now includes this turn, so the
+                # entry is reachable until the history or preferences change again
+                if self.response_cache is not None and synced:
+                    self.response_cache.put(
+                        agent_id,
+                        query,
+                        state_version(agent_state, user_context),
+                        response_text,
+                        interaction_id
+                    )
                 
-            except Exception as llm_error:
-                logger.error(f"LLM processing failed: {str(llm_error)}")
-                raise QueryProcessingError(f"LLM API error: {str(llm_error)}")
-            
-            # Update agent state in Membase with new interaction
-            agent_state = await self._update_agent_state_in_membase(
-                agent_id=agent_id,
-                query=query,
-                response=response_text,
-                interaction_id=interaction_id,
-                user_context=user_context,
-                previous_state=agent_state_before
-            )
-            
-            logger.info(f"Query processed successfully for agent: {agent_id}")
-            logger.info(f"Interaction ID: {interaction_id}")
-            logger.info(f"Agent state updated in Membase")
-            
-            return {
-                'response': response_text,
-                'agent_state': agent_state,
-                'interaction_id': interaction_id
-            }
-            
+                # Fold older turns into the summary in the background
+                if self.summarizer and synced:
+                    self.summarizer.schedule(agent_id, agent_state.interactionHistory)
+                
+                logger.info(f"Query processed successfully for agent: {agent_id}")
+                logger.info(f"Interaction ID: {interaction_id}")
+                logger.info(f"Agent state updated in Membase")
+                
+                return {
+                    'response': response_text,
+                    'agent_state': agent_state,
+                    'interaction_id': interaction_id,
+                    'cached': False,
+                    'intent': None
+                }
+        
         except ValueError:
             raise
+        except (OverloadedError, DeadlineExceeded, AgentOwnedElsewhere):
+            raise
         except QueryProcessingError:
             raise
         except Exception as e:
@@ -474,30 +1941,38 @@ class AIPAgentManager:
         """
         Get agent status and metadata.
         
+        While the chain RPC circuit breaker is open (or the lookup fails),
+        registration is reported from the last owner seen for the agent.
+        
         Args:
             agent_id: Unique agent identifier
-            
+        
         Returns:
             Dict containing agent status information
         """
         try:
-            # Check if agent is initialized
+            # Check if agent is initialized (live, or recorded for lazy rehydration)
             is_initialized = agent_id in self.agents
+            is_persisted = not is_initialized and (
+                (self.state_store is not None and self.state_store.get_agent(agent_id) is not None)
+                or self._in_directory(agent_id)
+            )
             
             if MEMBASE_AVAILABLE and not isinstance(self.membase_client, dict):
                 # Check if agent is registered on-chain
                 try:
-                    wallet_address = self.membase_client.get_agent(agent_id)
-                    is_registered = wallet_address is not None and wallet_address != '0x0000000000000000000000000000000000000000'
-                except Exception:
-                    is_registered = False
-                    wallet_address = None
+                    wallet_address = await self._chain_call(Deadline(), self.membase_client.get_agent, agent_id)
+                    self.chain_owners[agent_id] = wallet_address
+                except Exception as e:
+                    logger.warning(f"Serving last known registration for {agent_id}: {str(e)}")
+                    wallet_address = self.chain_owners.get(agent_id)
+                is_registered = wallet_address is not None and wallet_address != '0x0000000000000000000000000000000000000000'
             else:
                 # Mock implementation
                 is_registered = True
                 wallet_address = self.membase_account
             
-            status = 'active' if is_initialized else 'inactive'
+            status = 'active' if is_initialized or is_persisted else 'inactive'
             memory_hub_connected = is_initialized
             
             return {
@@ -507,7 +1982,7 @@ class AIPAgentManager:
                 'wallet_address': wallet_address or self.membase_account,
                 'memory_hub_connected': memory_hub_connected
             }
-            
+        
         except Exception as e:
             logger.error(f"Failed to get agent status: {str(e)}")
             raise
@@ -518,200 +1993,369 @@ class AIPAgentManager:
         
         Args:
             agent_id: Unique agent identifier
-            
+        
         Returns:
-            Dict containing agent state and last_updated timestamp
-            
+            Dict containing agent state (AgentState) and last_updated timestamp
+        
         Raises:
             ValueError: If agent not initialized
         """
         try:
+            # Serve the stored snapshot while the agent is not live, so memory
+            # reads after a restart are a local read rather than a hub handshake;
+            # likewise while the Memory Hub circuit is open
+            hub_down = self.breakers['memory_hub'].state != CLOSED
+            if (agent_id not in self.agents or hub_down) and self.state_store:
+                snapshot = self.state_store.load_state(agent_id)
+                if snapshot:
+                    logger.info(f"Serving memory for agent {agent_id} from state store")
+                    return {
+                        'agent_id': agent_id,
+                        'state': snapshot,
+                        'last_updated': datetime.fromtimestamp(snapshot.lastSyncTimestamp).isoformat()
+                    }
+            
             # Check if agent is initialized
-            agent = self.agents.get(agent_id)
+            agent = await self._get_agent(agent_id)
             if not agent:
                 raise ValueError(f"Agent {agent_id} has not been initialized")
             
             logger.info(f"Retrieving memory for agent: {agent_id}")
             
             # Retrieve agent state from Membase
-            state = await self._get_agent_state_from_membase(agent_id)
+            state = await self._read_state_or_fallback(agent_id, Deadline())
+            self._save_snapshot(agent_id, state)
+            self._sync_interaction_log(agent_id, state)
+            self._update_profile(agent_id, state)
             
             return {
                 'agent_id': agent_id,
                 'state': state,
                 'last_updated': datetime.now().isoformat()
             }
-            
+        
         except ValueError:
             raise
         except Exception as e:
             logger.error(f"Failed to get agent memory: {str(e)}")
             raise
     
-    async def _get_agent_state_from_membase(self, agent_id: str) -> Dict[str, Any]:
+    async def get_interaction_history(
+        self,
+        agent_id: str,
+        limit: int = 20,
+        before: Optional[int] = None
+    ) -> Dict[str, Any]:
         """
-        Retrieve agent state from Membase decentralized storage.
+        Page through an agent's interaction history, newest page first.
         
-        This method accesses the agent's MultiMemory instance to retrieve
-        the complete conversation history and state from Membase.
+        Served from the local interaction log when one exists for the agent;
+        otherwise from the Memory Hub's recent history window. The first
+        page reconciles the log with the hub before reading it (older pages
+        are served from the log as is); while the hub is unavailable, the
+        log is served without reconciling.
         
         Args:
             agent_id: Unique agent identifier
-            
+            limit: Maximum interactions to return
+            before: Return interactions with index below this cursor
+                (omit for the most recent page)
+        
         Returns:
-            Dict containing agent state with interaction history
+            Dict containing agent_id, interactions (oldest first), total,
+            and next_before (cursor for the previous page, or None)
+        
+        Raises:
+            ValueError: If agent not initialized
         """
         try:
-            agent = self.agents.get(agent_id)
-            if not agent:
-                raise ValueError(f"Agent {agent_id} not found")
-            
-            # Get the agent's memory instance
-            memory = agent._memory if hasattr(agent, '_memory') else None
-            
-            if memory:
-                # Get the default conversation memory
-                conversation_memory = memory.get_memory()
-                
-                # Retrieve all messages from memory
-                messages = conversation_memory.get(recent_n=100)  # Get up to 100 recent messages
-                
-                # Convert messages to interaction history format
-                interaction_history = []
-                for i in range(0, len(messages), 2):
-                    if i + 1 < len(messages):
-                        user_msg = messages[i]
-                        assistant_msg = messages[i + 1]
-                        
-                        if user_msg.role == "user" and assistant_msg.role == "assistant":
-                            interaction_history.append({
-                                'id': str(uuid.uuid4()),
-                                'userQuery': user_msg.content,
-                                'agentResponse': assistant_msg.content,
-                                'timestamp': int(user_msg.timestamp) if hasattr(user_msg, 'timestamp') else int(datetime.now().timestamp()),
-                                'context': user_msg.metadata if hasattr(user_msg, 'metadata') else {}
-                            })
-                
-                logger.info(f"Retrieved {len(interaction_history)} interactions from Membase")
-                
-                # Build agent state
-                state = {
-                    'version': 1,
-                    'createdAt': int(datetime.now().timestamp()),
-                    'updatedAt': int(datetime.now().timestamp()),
-                    'membaseId': agent_id,
-                    'walletAddress': self.membase_account,
-                    'registeredOnChain': True,
-                    'preferences': {},
-                    'interactionHistory': interaction_history,
-                    'goals': [],
-                    'learnedSummary': '',
-                    'memoryHubConnected': True,
-                    'lastSyncTimestamp': int(datetime.now().timestamp())
-                }
-                
-                return state
+            if self.interaction_logs and self.interaction_logs.exists(agent_id):
+                if before is None:
+                    await self._reconcile_interaction_log(agent_id)
+                log = self.interaction_logs.get(agent_id)
+                total = len(log)
+                stop = total if before is None else min(before, total)
+                start = max(0, stop - limit)
+                interactions = log.read_range(start, stop)
             else:
-                # Fallback if memory not available
-                logger.warning(f"Memory not available for agent {agent_id}, returning empty state")
-                return {
-                    'version': 1,
-                    'createdAt': int(datetime.now().timestamp()),
-                    'updatedAt': int(datetime.now().timestamp()),
-                    'membaseId': agent_id,
-                    'walletAddress': self.membase_account,
-                    'registeredOnChain': True,
-                    'preferences': {},
-                    'interactionHistory': [],
-                    'goals': [],
-                    'learnedSummary': '',
-                    'memoryHubConnected': True,
-                    'lastSyncTimestamp': int(datetime.now().timestamp())
-                }
+                agent = await self._get_agent(agent_id)
+                if not agent:
+                    raise ValueError(f"Agent {agent_id} has not been initialized")
                 
-        except Exception as e:
-            logger.error(f"Failed to retrieve agent state from Membase: {str(e)}")
-            # Return empty state on error rather than failing
+                state = await self._read_state_or_fallback(agent_id, Deadline())
+                self._sync_interaction_log(agent_id, state)
+                
+                total = len(state.interactionHistory)
+                stop = total if before is None else min(before, total)
+                start = max(0, stop - limit)
+                interactions = state.interactionHistory[start:stop]
+            
             return {
-                'version': 1,
-                'createdAt': int(datetime.now().timestamp()),
-                'updatedAt': int(datetime.now().timestamp()),
-                'membaseId': agent_id,
-                'walletAddress': self.membase_account,
-                'registeredOnChain': True,
-                'preferences': {},
-                'interactionHistory': [],
-                'goals': [],
-                'learnedSummary': '',
-                'memoryHubConnected': True,
-                'lastSyncTimestamp': int(datetime.now().timestamp())
+                'agent_id': agent_id,
+                'interactions': interactions,
+                'total': total,
+                'next_before': start if start > 0 else None
             }
+        
+        except ValueError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to get interaction history: {str(e)}")
+            raise
+    
+    async def _reconcile_interaction_log(self, agent_id: str) -> None:
+        """Append the hub's turns the agent's log is missing; hub failures are logged, not raised."""
+        try:
+            if await self._get_agent(agent_id):
+                self._sync_interaction_log(agent_id, await self._read_state(agent_id, Deadline()))
+        except AgentOwnedElsewhere:
+            raise
+        except Exception as e:
+            logger.warning(f"Serving interaction log for agent {agent_id} without reconciling: {str(e)}")
+    
+    def _build_agent_state(
+        self,
+        agent_id: str,
+        interaction_history: Optional[List[Interaction]] = None,
+        hub_connected: bool = True
+    ) -> AgentState:
+        """
+        Build an AgentState from trusted in-process data.
+        
+        Uses ``model_construct`` to skip validation here; the state is
+        validated once, when a response model embeds it.
+        
+        Args:
+            agent_id: Unique agent identifier
+            interaction_history: Interactions to include (empty if omitted)
+            hub_connected: False for a fallback state built without reading
+                the Memory Hub; it is served but not snapshotted or logged
+        
+        Returns:
+            AgentState for the agent
+        """
+        now = int(datetime.now().timestamp())
+        return AgentState.model_construct(
+            version=1,
+            createdAt=now,
+            updatedAt=now,
+            membaseId=agent_id,
+            walletAddress=self.membase_account,
+            registeredOnChain=True,
+            preferences={},
+            interactionHistory=interaction_history if interaction_history is not None else [],
+            goals=[],
+            learnedSummary=self._learned_summary(agent_id),
+            memoryHubConnected=hub_connected,
+            lastSyncTimestamp=now
+        )
+    
+    def _learned_summary(self, agent_id: str) -> str:
+        """Return the agent's background-maintained history summary, if any."""
+        if not self.summarizer:
+            return ''
+        record = self.summarizer.get(agent_id)
+        return record.summary if record else ''
+    
+    def _get_agent_state_from_membase(self, agent_id: str) -> AgentState:
+        """
+        Retrieve agent state from Membase decentralized storage.
+        
+        This method accesses the agent's MultiMemory instance to retrieve
+        the complete conversation history and state from Membase. The
+        reads block, so async callers go through ``_read_state``.
+        
+        Args:
+            agent_id: Unique agent identifier
+        
+        Returns:
+            AgentState with interaction history; a degraded empty state
+            if the agent has no memory to read
+        
+        Raises:
+            Exception: Whatever the Memory Hub read raised, so the breaker
+                around ``_read_state`` sees hub failures
+        """
+        agent = self.agents.get(agent_id)
+        if not agent:
+            logger.warning(f"Agent {agent_id} not found, returning empty state")
+            return self._build_agent_state(agent_id, hub_connected=False)
+        
+        # Get the agent's memory instance
+        memory = agent._memory if hasattr(agent, '_memory') else None
+        
+        if not memory:
+            # Fallback if memory not available
+            logger.warning(f"Memory not available for agent {agent_id}, returning empty state")
+            return self._build_agent_state(agent_id, hub_connected=False)
+        
+        # Get the default conversation memory
+        conversation_memory = memory.get_memory()
+        
+        # Retrieve all messages from memory
+        messages = conversation_memory.get(recent_n=100)  # Get up to 100 recent messages
+        
+        # Pair each user message with the assistant reply right after it. A
+        # user message without one (a turn cancelled after the SDK stored
+        # the query) is skipped rather than shifting every later pair.
+        pairs = []
+        position = 0
+        while position + 1 < len(messages):
+            if messages[position].role == "user" and messages[position + 1].role == "assistant":
+                pairs.append((messages[position], messages[position + 1]))
+                position += 2
+            else:
+                position += 1
+        
+        # Convert messages to interaction history format
+        interaction_history = []
+        seen_turns: Dict[tuple, int] = {}
+        for user_msg, assistant_msg in pairs:
+            timestamp = _message_timestamp(user_msg)
+            
+            # Prefer the ID persisted with the message; otherwise derive
+            # one from content so repeated reads return the same ID
+            turn_key = (timestamp, user_msg.content, assistant_msg.content)
+            occurrence = seen_turns.get(turn_key, 0)
+            seen_turns[turn_key] = occurrence + 1
+            interaction_id = getattr(user_msg, 'id', None) or derive_interaction_id(
+                agent_id,
+                user_msg.content,
+                assistant_msg.content,
+                timestamp,
+                occurrence
+            )
+            
+            # Hub messages are not validated here, so coerce
+            # them to the types the response validation expects
+            context = getattr(user_msg, 'metadata', None)
+            interaction_history.append(Interaction.model_construct(
+                id=str(interaction_id),
+                userQuery=str(user_msg.content),
+                agentResponse=str(assistant_msg.content),
+                timestamp=timestamp if timestamp is not None else int(datetime.now().timestamp()),
+                context=context if isinstance(context, dict) else {}
+            ))
+        
+        logger.info(f"Retrieved {len(interaction_history)} interactions from Membase")
+        
+        return self._build_agent_state(agent_id, interaction_history)
+    
+    def _with_interaction(
+        self,
+        agent_id: str,
+        state: AgentState,
+        query: str,
+        response: str,
+        user_context: Optional[Dict[str, Any]]
+    ) -> Tuple[AgentState, str, bool]:
+        """
+        Make sure a turn ends the state's history and return its interaction ID.
+        
+        The ID is the one the turn carries in the history. A turn the read
+        did not return yet (the hub sync lagging behind) is appended to the
+        state first, with an ID of its own that the hub's will not match,
+        so such a state is reported as unsynced: it must not be snapshotted,
+        logged, indexed or cached, or the turn would be recorded again under
+        the hub's ID once a later read returns it.
+        
+        Args:
+            agent_id: Unique agent identifier
+            state: Agent state read after the turn
+            query: User query
+            response: Agent response
+            user_context: Optional user context
+        
+        Returns:
+            Tuple of (state including the turn, interaction ID, whether the
+            turn came from the hub)
+        """
+        last = state.interactionHistory[-1] if state.interactionHistory else None
+        if last is not None and last.userQuery == query and last.agentResponse == response:
+            return state, last.id, True
+        state = self._append_interaction(agent_id, state, query, response, user_context)
+        return state, state.interactionHistory[-1].id, False
     
     async def _update_agent_state_in_membase(
         self,
         agent_id: str,
         query: str,
         response: str,
-        interaction_id: str,
         user_context: Optional[Dict[str, Any]],
-        previous_state: Dict[str, Any]
-    ) -> Dict[str, Any]:
+        previous_state: AgentState,
+        deadline: Optional[Deadline] = None
+    ) -> AgentState:
         """
         Update agent state in Membase with new interaction.
         
         The interaction is automatically stored in Membase by the agent's
         process_query method, so we just need to retrieve the updated state.
+        The sync wait and read are bounded by the deadline; once it passes,
+        the previous state is returned, since the response has already
+        been generated and stored.
         
         Args:
             agent_id: Unique agent identifier
             query: User query
             response: Agent response
-            interaction_id: Unique interaction identifier
             user_context: Optional user context
             previous_state: Previous agent state
-            
+            deadline: Request deadline bounding the sync
+        
         Returns:
-            Updated agent state dict
+            Updated AgentState
         """
+        deadline = deadline or Deadline()
         try:
             # The agent's process_query method already stores the interaction in Membase
             # via the memory.add() calls, so we just need to retrieve the updated state
             
             # Add a small delay to ensure Membase sync completes
-            import asyncio
-            await asyncio.sleep(0.5)
+            await asyncio.sleep(deadline.timeout_for(0.5))
             
             # Retrieve updated state from Membase
-            updated_state = await self._get_agent_state_from_membase(agent_id)
+            updated_state = await self._read_state(agent_id, deadline)
             
             # Update metadata
-            updated_state['updatedAt'] = int(datetime.now().timestamp())
-            updated_state['lastSyncTimestamp'] = int(datetime.now().timestamp())
+            updated_state.updatedAt = int(datetime.now().timestamp())
+            updated_state.lastSyncTimestamp = int(datetime.now().timestamp())
             
             # Merge user context into preferences if provided
             if user_context:
-                updated_state['preferences'].update(user_context)
+                updated_state.preferences.update(user_context)
             
             logger.info(f"Agent state updated in Membase for agent: {agent_id}")
             
             return updated_state
-            
+        
         except Exception as e:
             logger.error(f"Failed to update agent state in Membase: {str(e)}")
-            # Return previous state with new interaction appended
-            new_interaction = {
-                'id': interaction_id,
-                'userQuery': query,
-                'agentResponse': response,
-                'timestamp': int(datetime.now().timestamp()),
-                'context': user_context
-            }
-            
-            previous_state['interactionHistory'].append(new_interaction)
-            previous_state['updatedAt'] = int(datetime.now().timestamp())
-            previous_state['lastSyncTimestamp'] = int(datetime.now().timestamp())
-            
-            if user_context:
-                previous_state['preferences'].update(user_context)
-            
+            # The turn is appended to the previous state, unsynced, by _with_interaction
             return previous_state
+    
+    def _append_interaction(
+        self,
+        agent_id: str,
+        state: AgentState,
+        query: str,
+        response: str,
+        user_context: Optional[Dict[str, Any]]
+    ) -> AgentState:
+        """Append a turn to a state read before it, for when the hub cannot return it."""
+        timestamp = int(datetime.now().timestamp())
+        new_interaction = Interaction.model_construct(
+            id=derive_interaction_id(agent_id, query, response, timestamp),
+            userQuery=query,
+            agentResponse=response,
+            timestamp=timestamp,
+            context=user_context
+        )
+        
+        state.interactionHistory.append(new_interaction)
+        state.updatedAt = int(datetime.now().timestamp())
+        state.lastSyncTimestamp = int(datetime.now().timestamp())
+        
+        if user_context:
+            state.preferences.update(user_context)
+        
+        return state
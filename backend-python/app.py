@@ -10,8 +10,17 @@ import logging
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
+from pydantic import BaseModel, ValidationError
 
 from agent_manager import AIPAgentManager, BlockchainError
+from metrics import metrics
+from admission import OverloadedError
+from agent_mailbox import MailboxFullError
+from deadline import DEADLINE_HEADER, Deadline, DeadlineExceeded
+from circuit_breaker import CLOSED, CircuitOpenError
+from agent_directory import AgentOwnedElsewhere
+from rate_limit import RateLimiter, parse_limits
+from tools import ToolNotFoundError
 from models import (
     RegisterRequest,
     RegisterResponse,
@@ -21,7 +30,27 @@ from models import (
     QueryResponse,
     AgentStatus,
     AgentMemory,
-    ErrorResponse
+    InteractionHistoryResponse,
+    PropertySearchRequest,
+    PropertySearchResponse,
+    CriteriaCompileRequest,
+    CriteriaCompileResponse,
+    RecommendationRequest,
+    RecommendationResponse,
+    PropertyUpsertRequest,
+    StreamBalance,
+    StreamBalancesRequest,
+    StreamBalancesResponse,
+    StreamUpsertRequest,
+    YieldSimulationRequest,
+    YieldSimulationResponse,
+    WalletEventsRequest,
+    WalletEventsResponse,
+    PortfolioRequest,
+    PortfolioResponse,
+    RingView,
+    parse_request,
+    error_body
 )
 
 # Load environment variables
@@ -41,6 +70,88 @@ CORS(app)
 # Initialize agent manager
 agent_manager = None
 
+# Per-tenant rate limits by endpoint name (optional; disabled when
+# RATE_LIMITS is empty)
+rate_limiter = RateLimiter(parse_limits(os.getenv('RATE_LIMITS', '')))
+
+# Whether X-Wallet-Address identifies the caller. Clients can send any
+# value, so it is trusted only behind a gateway that authenticates the
+# wallet and sets the header itself
+TRUST_WALLET_HEADER = os.getenv('TRUST_WALLET_HEADER', '').lower() in ('1', 'true', 'yes')
+
+# Deadline applied when a request carries no X-Request-Timeout-Ms header
+# (unset for none)
+DEFAULT_REQUEST_TIMEOUT = float(os.getenv('REQUEST_TIMEOUT_SECONDS') or 0) or None
+
+# Set by dispatcher.py for the workers it starts; workers listen on
+# loopback only and take the caller's address from X-Forwarded-For
+WORKER_NAME = os.getenv('WORKER_NAME')
+
+
+def _json_response(model: BaseModel, status: int = 200):
+    """Serialize a response model straight to a JSON response."""
+    return app.response_class(model.model_dump_json(), status=status, mimetype='application/json')
+
+
+def _error_response(code: str, message: str, status: int, retryable: bool, details=None):
+    """Build an ErrorResponse envelope from the pre-serialized templates."""
+    return app.response_class(
+        error_body(code, message, retryable, details),
+        status=status,
+        mimetype='application/json'
+    )
+
+
+def _too_many_requests(code: str, message: str, retry_after: int):
+    """Retryable 429 carrying the caller's back-off in Retry-After."""
+    response = _error_response(code, message, 429, True, details={"retry_after": retry_after})
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+def _dependency_unavailable(e: CircuitOpenError):
+    """Retryable 503 for a call rejected by an open circuit breaker."""
+    response = _error_response(
+        "DEPENDENCY_UNAVAILABLE",
+        str(e),
+        503,
+        True,
+        details={"dependency": e.dependency, "retry_after": e.retry_after}
+    )
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
+
+def _redirect_to_owner(e: AgentOwnedElsewhere):
+    """307 to the same path on the replica holding the agent (method and body are kept)."""
+    location = e.owner_url.rstrip('/') + request.path
+    if request.query_string:
+        location += '?' + request.query_string.decode('latin-1')
+    response = _error_response(
+        "AGENT_ON_OTHER_REPLICA",
+        str(e),
+        307,
+        True,
+        details={"replica": e.owner, "location": location}
+    )
+    response.headers['Location'] = location
+    return response
+
+
+def _request_deadline() -> Deadline:
+    """Deadline from the caller's X-Request-Timeout-Ms header."""
+    return Deadline.from_header(request.headers.get(DEADLINE_HEADER), DEFAULT_REQUEST_TIMEOUT)
+
+
+def _deadline_exceeded(e: DeadlineExceeded):
+    """Retryable 504 naming the stage that ran out of time."""
+    return _error_response(e.code, str(e), 504, True, details={"stage": e.stage})
+
+
+# Envelopes with fixed content are serialized once at import
+NOT_FOUND_BODY = error_body("NOT_FOUND", "Endpoint not found", False)
+INTERNAL_ERROR_BODY = error_body("INTERNAL_ERROR", "Internal server error", True)
+
 
 class ConfigurationError(Exception):
     """Raised when environment variables are missing or invalid."""
@@ -129,6 +240,41 @@ def validate_config():
     logger.info(f"MEMBASE_SECRET_KEY: {'*' * 10} (masked)")
 
 
+def _tenant() -> str:
+    """Identify the caller: trusted wallet header, else the agent_id, else the client address."""
+    wallet = request.headers.get('X-Wallet-Address') if TRUST_WALLET_HEADER else None
+    if wallet:
+        return wallet.lower()
+    agent_id = (request.view_args or {}).get('agent_id')
+    if agent_id is None and request.method == 'POST':
+        body = request.get_json(silent=True)
+        if isinstance(body, dict) and isinstance(body.get('agent_id'), str):
+            agent_id = body['agent_id']
+    return agent_id or _client_address() or 'anonymous'
+
+
+def _client_address():
+    """The caller's address; behind the dispatcher, the one it appended to X-Forwarded-For."""
+    forwarded = request.headers.get('X-Forwarded-For')
+    if WORKER_NAME and forwarded:
+        return forwarded.rsplit(',', 1)[-1].strip()
+    return request.remote_addr
+
+
+@app.before_request
+def enforce_rate_limit():
+    """Reject over-limit tenants before any SDK work."""
+    if not rate_limiter.limits or request.endpoint not in rate_limiter.limits:
+        return None
+    retry_after = rate_limiter.check(request.endpoint, _tenant())
+    if retry_after is None:
+        return None
+    
+    metrics.increment('rate_limited')
+    logger.warning(f"Rate limit exceeded on {request.endpoint}")
+    return _too_many_requests("RATE_LIMITED", f"Rate limit exceeded for {request.path}", retry_after)
+
+
 @app.before_request
 def initialize_agent_manager():
     """Initialize agent manager on first request."""
@@ -140,30 +286,33 @@ def initialize_agent_manager():
             logger.info("Agent manager initialized successfully")
         except ConfigurationError as e:
             logger.error(f"Configuration error: {str(e)}")
-            return jsonify(ErrorResponse(
-                success=False,
-                error={
-                    "code": "CONFIG_MISSING",
-                    "message": str(e),
-                    "retryable": False
-                }
-            ).model_dump()), 500
+            return _error_response("CONFIG_MISSING", str(e), 500, False)
         except Exception as e:
             logger.error(f"Failed to initialize agent manager: {str(e)}")
-            return jsonify(ErrorResponse(
-                success=False,
-                error={
-                    "code": "INITIALIZATION_ERROR",
-                    "message": str(e),
-                    "retryable": False
-                }
-            ).model_dump()), 500
+            return _error_response("INITIALIZATION_ERROR", str(e), 500, False)
 
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Health check endpoint."""
-    return jsonify({"status": "healthy", "service": "aip-agent-microservice"}), 200
+    """
+    Health check endpoint.
+    
+    Reports "degraded" while any dependency's circuit breaker is not closed;
+    the service itself stays up and keeps serving routes that do not need it.
+    """
+    dependencies = agent_manager.dependency_health() if agent_manager else {}
+    degraded = any(dependency['state'] != CLOSED for dependency in dependencies.values())
+    return jsonify({
+        "status": "degraded" if degraded else "healthy",
+        "service": "aip-agent-microservice",
+        "dependencies": dependencies
+    }), 200
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Service metrics (counters, gauges and latency/size distributions)."""
+    return jsonify(metrics.snapshot()), 200
 
 
 def _run_async(coro):
@@ -198,16 +347,17 @@ def register_agent():
     - Agent already registered by another wallet (409 Conflict)
     - Insufficient funds for gas fees (402 Payment Required)
     - Blockchain transaction errors (503 Service Unavailable)
+    - Chain RPC calls outliving the request deadline (504 Gateway Timeout)
+    - Chain RPC circuit breaker open (503 Service Unavailable)
     - Invalid request data (400 Bad Request)
     """
     try:
-        data = request.get_json()
-        req = RegisterRequest(**data)
+        req = parse_request(RegisterRequest, request.get_data())
         
         logger.info(f"Registering agent: {req.agent_id}")
         
         # Run async function
-        result = _run_async(agent_manager.register_agent(req.agent_id))
+        result = _run_async(agent_manager.register_agent(req.agent_id, deadline=_request_deadline()))
         
         response = RegisterResponse(
             success=True,
@@ -217,73 +367,43 @@ def register_agent():
         )
         
         logger.info(f"Agent registered successfully: {result['transaction_hash']}")
-        return jsonify(response.model_dump()), 200
-        
+        return _json_response(response)
+    
     except ValueError as e:
         logger.error(f"Validation error: {str(e)}")
-        return jsonify(ErrorResponse(
-            success=False,
-            error={
-                "code": "INVALID_REQUEST",
-                "message": str(e),
-                "retryable": False
-            }
-        ).model_dump()), 400
+        return _error_response("INVALID_REQUEST", str(e), 400, False)
+    except DeadlineExceeded as e:
+        logger.error(f"Registration timed out: {str(e)}")
+        return _deadline_exceeded(e)
+    except CircuitOpenError as e:
+        logger.error(f"Registration rejected: {str(e)}")
+        return _dependency_unavailable(e)
     except BlockchainError as e:
         error_msg = str(e)
         
         # Handle "already registered" error
         if "already registered by another wallet" in error_msg:
             logger.error(f"Agent already registered: {error_msg}")
-            return jsonify(ErrorResponse(
-                success=False,
-                error={
-                    "code": "AGENT_ALREADY_REGISTERED",
-                    "message": error_msg,
-                    "retryable": False
-                }
-            ).model_dump()), 409
+            return _error_response("AGENT_ALREADY_REGISTERED", error_msg, 409, False)
         
         # Handle "insufficient funds" error
         if "insufficient" in error_msg.lower() and ("bnb" in error_msg.lower() or "funds" in error_msg.lower()):
             logger.error(f"Insufficient funds: {error_msg}")
-            return jsonify(ErrorResponse(
-                success=False,
-                error={
-                    "code": "INSUFFICIENT_FUNDS",
-                    "message": error_msg,
-                    "retryable": False
-                }
-            ).model_dump()), 402
+            return _error_response("INSUFFICIENT_FUNDS", error_msg, 402, False)
         
         # Generic blockchain error
         logger.error(f"Blockchain error: {error_msg}")
-        return jsonify(ErrorResponse(
-            success=False,
-            error={
-                "code": "BLOCKCHAIN_ERROR",
-                "message": error_msg,
-                "retryable": True
-            }
-        ).model_dump()), 503
+        return _error_response("BLOCKCHAIN_ERROR", error_msg, 503, True)
     except Exception as e:
         logger.error(f"Registration failed: {str(e)}")
-        return jsonify(ErrorResponse(
-            success=False,
-            error={
-                "code": "INTERNAL_ERROR",
-                "message": str(e),
-                "retryable": True
-            }
-        ).model_dump()), 500
+        return _error_response("INTERNAL_ERROR", str(e), 500, True)
 
 
 @app.route('/agent/initialize', methods=['POST'])
 def initialize_agent():
     """Initialize AIP agent with Memory Hub connection."""
     try:
-        data = request.get_json()
-        req = InitializeRequest(**data)
+        req = parse_request(InitializeRequest, request.get_data())
         
         logger.info(f"Initializing agent: {req.agent_id}")
         
@@ -301,36 +421,21 @@ def initialize_agent():
         )
         
         logger.info(f"Agent initialized successfully: {req.agent_id}")
-        return jsonify(response.model_dump()), 200
-        
+        return _json_response(response)
+    
     except ValueError as e:
         logger.error(f"Validation error: {str(e)}")
-        return jsonify(ErrorResponse(
-            success=False,
-            error={
-                "code": "INVALID_REQUEST",
-                "message": str(e),
-                "retryable": False
-            }
-        ).model_dump()), 400
+        return _error_response("INVALID_REQUEST", str(e), 400, False)
     except Exception as e:
         logger.error(f"Initialization failed: {str(e)}")
-        return jsonify(ErrorResponse(
-            success=False,
-            error={
-                "code": "AGENT_INITIALIZATION_ERROR",
-                "message": str(e),
-                "retryable": True
-            }
-        ).model_dump()), 503
+        return _error_response("AGENT_INITIALIZATION_ERROR", str(e), 503, True)
 
 
 @app.route('/agent/query', methods=['POST'])
 def query_agent():
     """Send query to agent and get response."""
     try:
-        data = request.get_json()
-        req = QueryRequest(**data)
+        req = parse_request(QueryRequest, request.get_data())
         
         logger.info(f"Processing query for agent: {req.agent_id}")
         
@@ -338,43 +443,58 @@ def query_agent():
         result = _run_async(agent_manager.query_agent(
             req.agent_id,
             req.query,
-            req.user_context
+            req.user_context,
+            bypass_cache=req.bypass_cache,
+            priority=req.priority,
+            tenant=_tenant(),
+            deadline=_request_deadline()
         ))
         
         response = QueryResponse(
             success=True,
             response=result['response'],
             agent_state=result['agent_state'],
-            interaction_id=result['interaction_id']
+            interaction_id=result['interaction_id'],
+            cached=result.get('cached', False),
+            intent=result.get('intent')
         )
         
         logger.info(f"Query processed successfully for agent: {req.agent_id}")
-        return jsonify(response.model_dump()), 200
-        
+        return _json_response(response)
+    
+    except ValidationError as e:
+        logger.error(f"Validation error: {str(e)}")
+        return _error_response("INVALID_REQUEST", str(e), 400, False)
+    except AgentOwnedElsewhere as e:
+        logger.info(f"Redirecting query: {str(e)}")
+        return _redirect_to_owner(e)
+    except CircuitOpenError as e:
+        logger.warning(f"Query rejected: {str(e)}")
+        return _dependency_unavailable(e)
+    except MailboxFullError as e:
+        logger.warning(f"Query rejected, agent busy: {str(e)}")
+        return _too_many_requests("AGENT_BUSY", str(e), e.retry_after)
+    except OverloadedError as e:
+        logger.warning(f"Query shed under load: {str(e)}")
+        return _too_many_requests("LLM_OVERLOADED", str(e), e.retry_after)
+    except DeadlineExceeded as e:
+        logger.warning(f"Query timed out for agent {req.agent_id}: {str(e)}")
+        return _deadline_exceeded(e)
     except ValueError as e:
         logger.error(f"Agent not found: {str(e)}")
-        return jsonify(ErrorResponse(
-            success=False,
-            error={
-                "code": "AGENT_NOT_FOUND",
-                "message": str(e),
-                "details": {
-                    "agent_id": req.agent_id,
-                    "suggestion": "Call POST /agent/initialize first"
-                },
-                "retryable": False
+        return _error_response(
+            "AGENT_NOT_FOUND",
+            str(e),
+            404,
+            False,
+            details={
+                "agent_id": req.agent_id,
+                "suggestion": "Call POST /agent/initialize first"
             }
-        ).model_dump()), 404
+        )
     except Exception as e:
         logger.error(f"Query processing failed: {str(e)}")
-        return jsonify(ErrorResponse(
-            success=False,
-            error={
-                "code": "QUERY_PROCESSING_ERROR",
-                "message": str(e),
-                "retryable": True
-            }
-        ).model_dump()), 503
+        return _error_response("QUERY_PROCESSING_ERROR", str(e), 503, True)
 
 
 @app.route('/agent/status/<agent_id>', methods=['GET'])
@@ -394,18 +514,11 @@ def get_agent_status(agent_id: str):
             memory_hub_connected=result['memory_hub_connected']
         )
         
-        return jsonify(response.model_dump()), 200
-        
+        return _json_response(response)
+    
     except Exception as e:
         logger.error(f"Failed to get agent status: {str(e)}")
-        return jsonify(ErrorResponse(
-            success=False,
-            error={
-                "code": "AGENT_NOT_FOUND",
-                "message": str(e),
-                "retryable": False
-            }
-        ).model_dump()), 404
+        return _error_response("AGENT_NOT_FOUND", str(e), 404, False)
 
 
 @app.route('/agent/memory/<agent_id>', methods=['GET'])
@@ -423,55 +536,310 @@ def get_agent_memory(agent_id: str):
             last_updated=result['last_updated']
         )
         
-        return jsonify(response.model_dump()), 200
-        
+        return _json_response(response)
+    
     except ValueError as e:
         logger.error(f"Agent not found: {str(e)}")
-        return jsonify(ErrorResponse(
-            success=False,
-            error={
-                "code": "AGENT_NOT_FOUND",
-                "message": str(e),
-                "retryable": False
-            }
-        ).model_dump()), 404
+        return _error_response("AGENT_NOT_FOUND", str(e), 404, False)
+    except AgentOwnedElsewhere as e:
+        logger.info(f"Redirecting memory read: {str(e)}")
+        return _redirect_to_owner(e)
+    except CircuitOpenError as e:
+        logger.warning(f"Memory read rejected: {str(e)}")
+        return _dependency_unavailable(e)
     except Exception as e:
         logger.error(f"Failed to get agent memory: {str(e)}")
-        return jsonify(ErrorResponse(
-            success=False,
-            error={
-                "code": "MEMORY_RETRIEVAL_ERROR",
-                "message": str(e),
-                "retryable": True
-            }
-        ).model_dump()), 503
+        return _error_response("MEMORY_RETRIEVAL_ERROR", str(e), 503, True)
+
+
+@app.route('/agent/history/<agent_id>', methods=['GET'])
+def get_interaction_history(agent_id: str):
+    """
+    Page through an agent's interaction history.
+    
+    Query parameters:
+    - limit: Page size (1-200, default 20)
+    - before: Cursor from a previous page's next_before
+    """
+    try:
+        limit = request.args.get('limit', default=20, type=int)
+        before = request.args.get('before', default=None, type=int)
+        if limit is None or not 1 <= limit <= 200:
+            return _error_response("INVALID_REQUEST", "limit must be an integer between 1 and 200", 400, False)
+        if before is not None and before < 0:
+            return _error_response("INVALID_REQUEST", "before must be a non-negative integer", 400, False)
+        
+        logger.info(f"Getting history for agent: {agent_id}")
+        
+        # Run async function
+        result = _run_async(agent_manager.get_interaction_history(agent_id, limit, before))
+        
+        response = InteractionHistoryResponse(
+            agent_id=result['agent_id'],
+            interactions=result['interactions'],
+            total=result['total'],
+            next_before=result['next_before']
+        )
+        
+        return _json_response(response)
+    
+    except ValueError as e:
+        logger.error(f"Agent not found: {str(e)}")
+        return _error_response("AGENT_NOT_FOUND", str(e), 404, False)
+    except AgentOwnedElsewhere as e:
+        logger.info(f"Redirecting memory read: {str(e)}")
+        return _redirect_to_owner(e)
+    except CircuitOpenError as e:
+        logger.warning(f"Memory read rejected: {str(e)}")
+        return _dependency_unavailable(e)
+    except Exception as e:
+        logger.error(f"Failed to get interaction history: {str(e)}")
+        return _error_response("MEMORY_RETRIEVAL_ERROR", str(e), 503, True)
+
+
+@app.route('/properties', methods=['PUT'])
+def upsert_properties():
+    """Add listings to the property catalog, replacing any with the same property_id."""
+    try:
+        req = parse_request(PropertyUpsertRequest, request.get_data())
+        indexed = agent_manager.properties.upsert(listing.model_dump() for listing in req.properties)
+        logger.info(f"Indexed {indexed} properties")
+        return jsonify({"success": True, "indexed": indexed, "total": len(agent_manager.properties)}), 200
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        return _error_response("INVALID_REQUEST", str(e), 400, False)
+
+
+@app.route('/properties/<property_id>', methods=['DELETE'])
+def remove_property(property_id: str):
+    """Remove a listing from the property catalog."""
+    if not agent_manager.properties.remove(property_id):
+        return _error_response("PROPERTY_NOT_FOUND", f"Property {property_id} is not in the catalog", 404, False)
+    return jsonify({"success": True, "property_id": property_id}), 200
+
+
+@app.route('/properties/search', methods=['POST'])
+def search_properties():
+    """
+    Search the property catalog with structured criteria.
+    
+    Filters combine with AND: any of the cities, all of the amenities,
+    inclusive price, bedroom and yield ranges, and a radius around a point
+    or a bounding box.
+    """
+    try:
+        req = parse_request(PropertySearchRequest, request.get_data())
+        result = agent_manager.search_properties(req)
+        return _json_response(PropertySearchResponse(success=True, **result))
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        return _error_response("INVALID_REQUEST", str(e), 400, False)
+
+
+@app.route('/properties/compile', methods=['POST'])
+def compile_property_request():
+    """
+    Compile a free-text property request into search criteria.
+    
+    Repeated and reworded requests are served from the criteria cache;
+    otherwise the LLM compiles the request. With "search": true the
+    criteria are also run against the catalog.
+    """
+    try:
+        req = parse_request(CriteriaCompileRequest, request.get_data())
+        result = _run_async(agent_manager.compile_search(req, _request_deadline()))
+        return _json_response(CriteriaCompileResponse(success=True, **result))
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        return _error_response("INVALID_REQUEST", str(e), 400, False)
+    except CircuitOpenError as e:
+        logger.warning(f"Compilation rejected: {str(e)}")
+        return _dependency_unavailable(e)
+    except OverloadedError as e:
+        logger.warning(f"Compilation shed under load: {str(e)}")
+        return _too_many_requests("LLM_OVERLOADED", str(e), e.retry_after)
+    except DeadlineExceeded as e:
+        logger.warning(f"Compilation timed out: {str(e)}")
+        return _deadline_exceeded(e)
+    except Exception as e:
+        logger.error(f"Compilation failed: {str(e)}")
+        return _error_response("QUERY_PROCESSING_ERROR", str(e), 503, True)
+
+
+@app.route('/properties/recommendations', methods=['POST'])
+def recommend_properties():
+    """
+    Recommend catalog listings for an agent.
+    
+    Listings are ranked by similarity to the agent's preferences and past
+    queries, optionally steered by a free-text query.
+    """
+    try:
+        req = parse_request(RecommendationRequest, request.get_data())
+        result = agent_manager.recommend_properties(req)
+        return _json_response(RecommendationResponse(success=True, **result))
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        return _error_response("INVALID_REQUEST", str(e), 400, False)
+
+
+@app.route('/streams', methods=['PUT'])
+def upsert_streams():
+    """Store StreamingProtocol streams, replacing any with the same stream_id."""
+    try:
+        req = parse_request(StreamUpsertRequest, request.get_data())
+        stored = agent_manager.streams.upsert(stream.model_dump() for stream in req.streams)
+        logger.info(f"Stored {stored} streams")
+        return jsonify({"success": True, "stored": stored, "total": len(agent_manager.streams)}), 200
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        return _error_response("INVALID_REQUEST", str(e), 400, False)
+
+
+@app.route('/streams/balances', methods=['POST'])
+def get_stream_balances():
+    """
+    Claimable, streamed and remaining balances of many streams at once.
+    
+    Mirrors StreamingProtocol.claimableBalance exactly (wei amounts as
+    decimal strings), computed for all selected streams in one pass.
+    """
+    try:
+        req = parse_request(StreamBalancesRequest, request.get_data())
+        result = agent_manager.stream_balances(req)
+        result['balances'] = [StreamBalance.model_construct(**row) for row in result['balances']]
+        return _json_response(StreamBalancesResponse.model_construct(success=True, **result))
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        return _error_response("INVALID_REQUEST", str(e), 400, False)
+
+
+@app.route('/streams/simulate', methods=['POST'])
+def simulate_stream_income():
+    """
+    Monte Carlo income simulation with vacancies and cancellations.
+    
+    Returns contracted and expected income and percentile bands over the
+    horizon for described and/or stored streams.
+    """
+    try:
+        req = parse_request(YieldSimulationRequest, request.get_data())
+        result = agent_manager.simulate_income(req)
+        return _json_response(YieldSimulationResponse(success=True, **result))
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        return _error_response("INVALID_REQUEST", str(e), 400, False)
+
+
+def _indexer_disabled():
+    return _error_response(
+        "EVENT_INDEXER_DISABLED",
+        "The on-chain event indexer is not enabled (set EVENT_INDEX_PATH)",
+        503,
+        False
+    )
+
+
+@app.route('/wallets/<wallet>/events', methods=['GET'])
+def get_wallet_events(wallet: str):
+    """
+    Indexed stream and property events of a wallet, newest first.
+    
+    Query parameters:
+    - event: Only this event type (repeatable)
+    - limit: Maximum number of events (1-500, default 50)
+    """
+    if agent_manager.event_indexer is None:
+        return _indexer_disabled()
+    try:
+        criteria = WalletEventsRequest(
+            wallet=wallet,
+            events=request.args.getlist('event') or None,
+            limit=request.args.get('limit', default=50, type=int)
+        )
+        result = agent_manager.wallet_events(criteria)
+        return _json_response(WalletEventsResponse(success=True, **result))
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        return _error_response("INVALID_REQUEST", str(e), 400, False)
+
+
+@app.route('/portfolio/<wallet>', methods=['GET'])
+def get_portfolio(wallet: str):
+    """
+    Income analytics of a wallet receiving rental streams.
+    
+    Query parameters:
+    - granularity: Income series bucket: day, week or month (default day)
+    - start, end: ISO dates bounding the series (default: first and last income)
+    """
+    if agent_manager.portfolio is None:
+        return _indexer_disabled()
+    try:
+        criteria = PortfolioRequest(
+            wallet=wallet,
+            granularity=request.args.get('granularity', 'day'),
+            start=request.args.get('start'),
+            end=request.args.get('end')
+        )
+        return _json_response(PortfolioResponse(success=True, **agent_manager.portfolio_report(criteria)))
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        return _error_response("INVALID_REQUEST", str(e), 400, False)
+
+
+@app.route('/indexer/status', methods=['GET'])
+def get_indexer_status():
+    """Checkpoint, chain head and health of the event indexer."""
+    if agent_manager.event_indexer is None:
+        return _indexer_disabled()
+    return jsonify({"success": True, **agent_manager.event_indexer.status()}), 200
+
+
+@app.route('/internal/ring', methods=['PUT'])
+def apply_ring():
+    """Evict agents a dispatcher ring change moved to other workers (dispatcher workers only)."""
+    if not WORKER_NAME:
+        return app.response_class(NOT_FOUND_BODY, status=404, mimetype='application/json')
+    try:
+        view = parse_request(RingView, request.get_data())
+        evicted = agent_manager.apply_ring(WORKER_NAME, view.version, view.nodes, view.vnodes)
+        return jsonify({"success": True, "evicted": len(evicted)}), 200
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        return _error_response("INVALID_REQUEST", str(e), 400, False)
+
+
+@app.route('/tools', methods=['GET'])
+def list_tools():
+    """Tools agents can call, as function-calling specs."""
+    return jsonify({"tools": agent_manager.tools.specs()}), 200
+
+
+@app.route('/tools/<name>', methods=['POST'])
+def invoke_tool(name: str):
+    """Call a tool with the JSON request body as its arguments."""
+    try:
+        result = agent_manager.tools.invoke(name, request.get_data())
+        return jsonify({"success": True, "tool": name, "result": result}), 200
+    except ToolNotFoundError:
+        return _error_response("TOOL_NOT_FOUND", f"No tool named {name}", 404, False)
+    except ValueError as e:
+        logger.error(f"Invalid arguments for tool {name}: {str(e)}")
+        return _error_response("INVALID_REQUEST", str(e), 400, False)
 
 
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors."""
-    return jsonify(ErrorResponse(
-        success=False,
-        error={
-            "code": "NOT_FOUND",
-            "message": "Endpoint not found",
-            "retryable": False
-        }
-    ).model_dump()), 404
+    return app.response_class(NOT_FOUND_BODY, status=404, mimetype='application/json')
 
 
 @app.errorhandler(500)
 def internal_error(error):
     """Handle 500 errors."""
     logger.error(f"Internal server error: {str(error)}")
-    return jsonify(ErrorResponse(
-        success=False,
-        error={
-            "code": "INTERNAL_ERROR",
-            "message": "Internal server error",
-            "retryable": True
-        }
-    ).model_dump()), 500
+    return app.response_class(INTERNAL_ERROR_BODY, status=500, mimetype='application/json')
 
 
 if __name__ == '__main__':
@@ -479,4 +847,4 @@ if __name__ == '__main__':
     debug = os.getenv('FLASK_ENV') == 'development'
     
     logger.info(f"Starting AIP Agent microservice on port {port}")
-    app.run(host='0.0.0.0', port=port, debug=debug)
+    app.run(host='127.0.0.1' if WORKER_NAME else '0.0.0.0', port=port, debug=debug)
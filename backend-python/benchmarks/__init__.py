@@ -0,0 +1,5 @@
+"""
+Micro-benchmarks for the AIP Agent microservice.
+
+Run individual modules directly, e.g. ``python -m benchmarks.bench_models``.
+"""
@@ -0,0 +1,61 @@
+"""
+Micro-benchmark for the search criteria cache.
+
+Fills a criteria cache with generated requests, then times the cached
+path of a request (normalization, signature and lookup) for an exact hit,
+a near-duplicate hit and a miss, and compiling with the rule parser, the
+fallback when no LLM is available.
+
+Usage:
+    python -m benchmarks.bench_criteria_cache [entries]
+"""
+
+import random
+import sys
+import timeit
+
+from criteria_compiler import CriteriaCompiler, canonical_request
+from intent_router import parse_search
+
+CITIES = ['dubai', 'lagos', 'lisbon', 'singapore', 'austin', 'nairobi', 'berlin', 'toronto']
+AMENITIES = ['pool', 'gym', 'parking', 'concierge', 'balcony', 'sea view']
+NOUNS = ['flats', 'apartments', 'homes', 'units', 'lofts', 'villas']
+
+
+def generate(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    return [
+        f"{rng.randint(1, 5)} bedroom {rng.choice(NOUNS)} in {rng.choice(CITIES)} "
+        f"with a {rng.choice(AMENITIES)} under ${rng.randrange(500, 8000, 50):,}"
+        for _ in range(count)
+    ]
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 4096
+    vocabulary = CITIES + AMENITIES
+    compiler = CriteriaCompiler(max_entries=count, similarity_threshold=0.9)
+    requests = generate(count)
+    for request in requests:
+        text = canonical_request(request)
+        compiler.put(text, parse_search(text, CITIES, AMENITIES), vocabulary)
+    
+    def lookup(request):
+        return compiler.get(canonical_request(request), vocabulary)
+    
+    exact = "Please show me " + requests[0].upper() + "?"
+    near = requests[1].replace(' with a ', ' with ')
+    miss = "3 bedroom lofts in berlin with a gym under $123"
+    assert lookup(exact) is not None and lookup(near) is not None and lookup(miss) is None
+    
+    for label, request in (('exact hit', exact), ('near-duplicate hit', near), ('miss', miss)):
+        us = min(timeit.repeat(lambda: lookup(request), number=1000, repeat=5)) / 1000 * 1e6
+        print(f"{label + ':':22}{us:8.1f}us")
+    rules_us = min(timeit.repeat(
+        lambda: parse_search(canonical_request(miss), CITIES, AMENITIES), number=1000, repeat=5
+    )) / 1000 * 1e6
+    print(f"{'rule parser:':22}{rules_us:8.1f}us")
+
+
+if __name__ == '__main__':
+    main()
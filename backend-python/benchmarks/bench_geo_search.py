@@ -0,0 +1,93 @@
+"""
+Micro-benchmark for location-based property search.
+
+Compares radius and bounding-box queries (alone and with attribute filters)
+on the geohash index against a vectorized full scan of every coordinate,
+and times single inserts and removals, over a generated catalog clustered
+around a few cities.
+
+Usage:
+    python -m benchmarks.bench_geo_search [listings]
+"""
+
+import random
+import sys
+import timeit
+
+import numpy as np
+
+from property_search import PropertyIndex, distance_km
+
+CITIES = {
+    'Dubai': (25.20, 55.27), 'Lagos': (6.52, 3.38), 'Lisbon': (38.72, -9.14), 'Singapore': (1.35, 103.82),
+    'Austin': (30.27, -97.74), 'Nairobi': (-1.29, 36.82), 'Berlin': (52.52, 13.40), 'Toronto': (43.65, -79.38)
+}
+AMENITIES = ['pool', 'gym', 'parking', 'concierge', 'balcony', 'pet friendly']
+
+QUERIES = {
+    'within 5 km of downtown Dubai': {'near': (25.20, 55.27, 5)},
+    '5 km + 2-bed under $2000': {
+        'near': (25.20, 55.27, 5), 'ranges': {'price': (None, 2000), 'bedrooms': (2, 2)}
+    },
+    '20 km, nearest first': {'near': (38.72, -9.14, 20), 'sort_by': 'distance'},
+    'Berlin-Mitte box + pool': {'box': (52.50, 13.37, 52.54, 13.43), 'amenities': ['pool']}
+}
+
+
+def generate(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    names = list(CITIES)
+    listings = []
+    for n in range(count):
+        city = rng.choice(names)
+        latitude, longitude = CITIES[city]
+        listings.append({
+            'property_id': f"prop_{n}",
+            'city': city,
+            'price': float(rng.randrange(400, 8000, 25)),
+            'bedrooms': rng.randint(0, 5),
+            'annual_yield': round(rng.uniform(2, 12), 2),
+            'amenities': rng.sample(AMENITIES, rng.randint(0, 3)),
+            'latitude': latitude + rng.gauss(0, 0.25),
+            'longitude': longitude + rng.gauss(0, 0.25)
+        })
+    return listings
+
+
+def scan(latitudes, longitudes, near=None, box=None, **_):
+    """The coordinate filter alone as a vectorized pass over every listing."""
+    if near is not None:
+        return np.flatnonzero(distance_km(latitudes, longitudes, near[0], near[1]) <= near[2])
+    south, west, north, east = box
+    return np.flatnonzero((latitudes >= south) & (latitudes <= north) & (longitudes >= west) & (longitudes <= east))
+
+
+def _per_call_ms(func, iterations: int) -> float:
+    best = min(timeit.repeat(func, number=iterations, repeat=3))
+    return best / iterations * 1e3
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    listings = generate(count)
+    latitudes = np.array([listing['latitude'] for listing in listings])
+    longitudes = np.array([listing['longitude'] for listing in listings])
+    index = PropertyIndex()
+    load_seconds = timeit.timeit(lambda: index.upsert(listings), number=1)
+    print(f"{count} listings indexed in {load_seconds:.2f}s")
+    
+    for name, criteria in QUERIES.items():
+        total, _ = index.search(**criteria)
+        scan_ms = _per_call_ms(lambda: scan(latitudes, longitudes, **criteria), 3)
+        index_ms = _per_call_ms(lambda: index.search(**criteria), 20)
+        print(f"{name:32s} matches={total:6d}  scan={scan_ms:8.2f}ms  index={index_ms:6.2f}ms  "
+              f"({scan_ms / index_ms:.0f}x)")
+    
+    extra = [dict(listing, property_id=f"extra_{n}") for n, listing in enumerate(generate(100, seed=7))]
+    insert_ms = timeit.timeit(lambda: [index.upsert([listing]) for listing in extra], number=1) / len(extra) * 1e3
+    remove_ms = timeit.timeit(lambda: [index.remove(listing['property_id']) for listing in extra], number=1)
+    print(f"single insert: {insert_ms:.2f}ms  single remove: {remove_ms / len(extra) * 1e3:.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
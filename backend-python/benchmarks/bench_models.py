@@ -0,0 +1,77 @@
+"""
+Micro-benchmark for the request/response model layer.
+
+Compares the original per-request path (``json.loads`` + ``Model(**data)``
+and ``ErrorResponse(...).model_dump()`` + ``json.dumps``) against the fast
+path used by the routes (cached ``TypeAdapter.validate_json`` and
+pre-serialized error envelopes).
+
+Usage:
+    python -m benchmarks.bench_models [iterations]
+"""
+
+import json
+import sys
+import timeit
+
+from models import QueryRequest, ErrorResponse, parse_request, error_body
+
+QUERY_BODY = json.dumps({
+    'agent_id': 'continuum_agent_001',
+    'query': 'Show me 2-bedroom apartments in Dubai under $2000 with a pool',
+    'user_context': {'wallet': '0x1234567890abcdef1234567890abcdef12345678', 'budget': 2000}
+}).encode()
+
+
+def baseline_request():
+    data = json.loads(QUERY_BODY)
+    return QueryRequest(**data)
+
+
+def fast_request():
+    return parse_request(QueryRequest, QUERY_BODY)
+
+
+def baseline_error():
+    return json.dumps(ErrorResponse(
+        success=False,
+        error={
+            "code": "AGENT_NOT_FOUND",
+            "message": "Agent continuum_agent_001 has not been initialized",
+            "details": {"agent_id": "continuum_agent_001", "suggestion": "Call POST /agent/initialize first"},
+            "retryable": False
+        }
+    ).model_dump())
+
+
+def fast_error():
+    return error_body(
+        "AGENT_NOT_FOUND",
+        "Agent continuum_agent_001 has not been initialized",
+        False,
+        {"agent_id": "continuum_agent_001", "suggestion": "Call POST /agent/initialize first"}
+    )
+
+
+def _per_call_us(func, iterations: int) -> float:
+    best = min(timeit.repeat(func, number=iterations, repeat=5))
+    return best / iterations * 1e6
+
+
+def main(iterations: int = 50000):
+    # Warm the adapter cache so we measure steady-state cost
+    fast_request()
+    
+    rows = [
+        ('request validation', baseline_request, fast_request),
+        ('error envelope', baseline_error, fast_error),
+    ]
+    print(f"{'path':<20} {'baseline us':>12} {'fast us':>10} {'speedup':>8} {'fast max RPS/core':>18}")
+    for name, baseline, fast in rows:
+        base_us = _per_call_us(baseline, iterations)
+        fast_us = _per_call_us(fast, iterations)
+        print(f"{name:<20} {base_us:>12.2f} {fast_us:>10.2f} {base_us / fast_us:>7.2f}x {1e6 / fast_us:>18,.0f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
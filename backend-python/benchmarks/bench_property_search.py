@@ -0,0 +1,87 @@
+"""
+Micro-benchmark for property search.
+
+Compares a full scan of the catalog against the indexed search for a few
+typical criteria over a generated catalog.
+
+Usage:
+    python -m benchmarks.bench_property_search [listings]
+"""
+
+import random
+import sys
+import timeit
+
+from property_search import PropertyIndex
+
+CITIES = ['Dubai', 'Lagos', 'Lisbon', 'Singapore', 'Austin', 'Nairobi', 'Berlin', 'Toronto',
+          'Mumbai', 'Mexico City', 'Istanbul', 'Bangkok', 'Cape Town', 'Sydney', 'Seoul', 'Miami']
+AMENITIES = ['pool', 'gym', 'parking', 'concierge', 'balcony', 'pet friendly', 'furnished', 'sea view']
+
+QUERIES = {
+    '2-bed in Dubai under $2000': {
+        'cities': ['Dubai'], 'ranges': {'price': (None, 2000), 'bedrooms': (2, 2)}
+    },
+    'pool + gym, yield >= 9%': {
+        'amenities': ['pool', 'gym'], 'ranges': {'annual_yield': (9, None)}
+    },
+    '$1000-1100, top yield': {
+        'ranges': {'price': (1000, 1100)}, 'sort_by': 'annual_yield', 'descending': True
+    }
+}
+
+
+def generate(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    return [
+        {
+            'property_id': f"prop_{n}",
+            'city': rng.choice(CITIES),
+            'price': float(rng.randrange(400, 8000, 25)),
+            'bedrooms': rng.randint(0, 5),
+            'annual_yield': round(rng.uniform(2, 12), 2),
+            'amenities': rng.sample(AMENITIES, rng.randint(0, 5))
+        }
+        for n in range(count)
+    ]
+
+
+def scan(listings, cities=None, amenities=None, ranges=None, sort_by=None, descending=False, limit=20):
+    cities = {city.lower() for city in cities or ()}
+    amenities = set(amenities or ())
+    matches = [
+        listing for listing in listings
+        if (not cities or listing['city'].lower() in cities)
+        and amenities <= set(listing['amenities'])
+        and all(
+            (low is None or listing[field] >= low) and (high is None or listing[field] <= high)
+            for field, (low, high) in (ranges or {}).items()
+        )
+    ]
+    if sort_by:
+        matches.sort(key=lambda listing: listing[sort_by], reverse=descending)
+    return len(matches), matches[:limit]
+
+
+def _per_call_ms(func, iterations: int) -> float:
+    best = min(timeit.repeat(func, number=iterations, repeat=3))
+    return best / iterations * 1e3
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    listings = generate(count)
+    index = PropertyIndex()
+    load_seconds = timeit.timeit(lambda: index.upsert(listings), number=1)
+    print(f"{count} listings indexed in {load_seconds:.2f}s")
+    
+    for name, criteria in QUERIES.items():
+        total, _ = index.search(**criteria)
+        scan_ms = _per_call_ms(lambda: scan(listings, **criteria), 3)
+        index_ms = _per_call_ms(lambda: index.search(**criteria), 20)
+        print(f"{name:30s} matches={total:6d}  scan={scan_ms:8.2f}ms  index={index_ms:6.2f}ms  "
+              f"({scan_ms / index_ms:.0f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Micro-benchmark for property recommendations.
+
+Times embedding a generated catalog cold and from the on-disk cache, a
+profile update, and ranking the top 20 listings for a profile, against
+scoring every listing one by one in Python.
+
+Usage:
+    python -m benchmarks.bench_recommender [listings]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import timeit
+
+from models import Interaction
+from recommender import EmbeddingCache, PropertyRecommender
+
+CITIES = ['Dubai', 'Lagos', 'Lisbon', 'Singapore', 'Austin', 'Nairobi', 'Berlin', 'Toronto',
+          'Mumbai', 'Mexico City', 'Istanbul', 'Bangkok', 'Cape Town', 'Sydney', 'Seoul', 'Miami']
+AMENITIES = ['pool', 'gym', 'parking', 'concierge', 'balcony', 'pet friendly', 'furnished', 'sea view']
+STYLES = ['loft', 'villa', 'studio', 'penthouse', 'townhouse', 'apartment', 'duplex', 'cottage']
+WORDS = ['bright', 'quiet', 'renovated', 'spacious', 'cosy', 'modern', 'central', 'leafy', 'waterfront']
+
+
+def generate(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    return [
+        {
+            'property_id': f"prop_{n}",
+            'city': rng.choice(CITIES),
+            'price': float(rng.randrange(400, 8000, 25)),
+            'bedrooms': rng.randint(0, 5),
+            'annual_yield': round(rng.uniform(2, 12), 2),
+            'amenities': rng.sample(AMENITIES, rng.randint(0, 4)),
+            'title': f"{' '.join(rng.sample(WORDS, 2))} {rng.choice(STYLES)}",
+            'description': f"Listing {n}, {rng.choice(WORDS)} street, close to {rng.choice(WORDS)} parks"
+        }
+        for n in range(count)
+    ]
+
+
+def per_listing(recommender, vector, count):
+    return sorted(
+        ((float(recommender._vectors[row] @ vector), row) for row in range(count)),
+        reverse=True
+    )[:20]
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    listings = generate(count)
+    history = [
+        Interaction(id=str(n), userQuery=query, agentResponse='', timestamp=n)
+        for n, query in enumerate(['quiet loft in Lisbon', 'Lisbon penthouse with sea view and a pool'])
+    ]
+    
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'embeddings.db')
+        cold = timeit.timeit(lambda: PropertyRecommender(cache=EmbeddingCache(path)).upsert(listings), number=1)
+        recommender = PropertyRecommender(cache=EmbeddingCache(path))
+        warm = timeit.timeit(lambda: recommender.upsert(listings), number=1)
+    print(f"{count} listings embedded in {cold:.2f}s cold, {warm:.2f}s from the cache")
+    
+    profile_ms = timeit.timeit(
+        lambda: recommender.update_profile('agent', {'city': 'Lisbon', 'pet_friendly': True}, history), number=1
+    ) * 1e3
+    vector = recommender._query_vector('agent', None)
+    loop_ms = min(timeit.repeat(lambda: per_listing(recommender, vector, count), number=1, repeat=3)) * 1e3
+    rank_ms = min(timeit.repeat(lambda: recommender.recommend('agent', 20), number=20, repeat=3)) / 20 * 1e3
+    print(f"profile update:         {profile_ms:8.2f}ms")
+    print(f"per-listing loop:       {loop_ms:8.2f}ms")
+    print(f"vectorized top 20:      {rank_ms:8.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Micro-benchmark for bulk stream balances.
+
+Compares computing claimable balances stream by stream in Python (the
+contract's formula, without the RPC round trip each call would cost)
+against StreamBook's vectorized pass.
+
+Usage:
+    python -m benchmarks.bench_stream_balances [streams]
+"""
+
+import random
+import sys
+import timeit
+
+from stream_balances import StreamBook
+
+NOW = 1_700_000_000
+
+
+def generate(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    streams = []
+    for stream_id in range(1, count + 1):
+        duration = rng.randint(86400, 365 * 86400)
+        total_amount = rng.randint(10 ** 20, 10 ** 24)
+        start_time = NOW - rng.randint(0, 400 * 86400)
+        streams.append({
+            'stream_id': stream_id,
+            'sender': '0x' + 'ab' * 20,
+            'recipient': '0x' + f"{rng.randrange(1000):040x}",
+            'total_amount': total_amount,
+            'flow_rate': total_amount // duration,
+            'start_time': start_time,
+            'stop_time': start_time + duration,
+            'amount_withdrawn': 0,
+            'is_active': True
+        })
+    return streams
+
+
+def per_stream(streams):
+    return [
+        (min(NOW, s['stop_time']) - s['start_time']) * s['flow_rate'] - s['amount_withdrawn']
+        for s in streams
+    ]
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    streams = generate(count)
+    book = StreamBook()
+    load_seconds = timeit.timeit(lambda: book.upsert(streams), number=1)
+    print(f"{count} streams stored in {load_seconds:.2f}s")
+    
+    loop_ms = min(timeit.repeat(lambda: per_stream(streams), number=1, repeat=3)) * 1e3
+    totals_ms = min(timeit.repeat(lambda: book.balances(NOW)[0].totals(), number=1, repeat=3)) * 1e3
+    rows_ms = min(timeit.repeat(lambda: book.balances(NOW)[0].rows(), number=1, repeat=3)) * 1e3
+    print(f"per-stream loop:        {loop_ms:8.2f}ms")
+    print(f"vectorized, totals:     {totals_ms:8.2f}ms")
+    print(f"vectorized, every row:  {rows_ms:8.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
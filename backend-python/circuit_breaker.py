@@ -0,0 +1,228 @@
+"""
+Circuit breakers for downstream dependencies.
+
+Each dependency (Memory Hub, chain RPC, LLM) gets a breaker that tracks
+the failure rate of its calls over a rolling window. Once the rate
+crosses the threshold the breaker opens and calls fail immediately with
+``CircuitOpenError`` instead of each waiting out its own timeout. After a
+cool-down one probe call is let through (half-open): its success closes
+the breaker, its failure re-opens it.
+
+Breaker state is shared by every request thread, so it is guarded by a
+threading lock; state changes are published as metrics gauges.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional
+
+from admission import OverloadedError
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Gauge value published for each state
+STATE_GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# Buckets the rolling window is divided into
+WINDOW_BUCKETS = 10
+
+
+class CircuitOpenError(OverloadedError):
+    """Raised when a call is rejected because its dependency's breaker is open."""
+    
+    def __init__(self, dependency: str, retry_after: int):
+        super().__init__(
+            f"{dependency.replace('_', ' ')} is unavailable (circuit open); retry in {retry_after}s",
+            retry_after
+        )
+        self.dependency = dependency
+
+
+class CircuitBreaker:
+    """Failure-rate circuit breaker with a single half-open probe."""
+    
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        min_calls: int = 5,
+        window_seconds: float = 30.0,
+        open_seconds: float = 15.0
+    ):
+        """
+        Args:
+            name: Dependency name, used in errors and metric names
+            failure_rate: Fraction of failed calls in the window that opens
+                the breaker (0 disables the breaker)
+            min_calls: Calls in the window before the rate is considered
+            window_seconds: Length of the rolling window
+            open_seconds: Time the breaker stays open before probing
+        """
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self._bucket_seconds = window_seconds / WINDOW_BUCKETS
+        # Rolling window of [start, calls, failures] buckets with running totals
+        self._buckets: Deque[List[float]] = deque()
+        self._calls = 0
+        self._failures = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        metrics.set_gauge(f'circuit_{name}_state', STATE_GAUGE[CLOSED])
+    
+    @property
+    def state(self) -> str:
+        """Current state: closed, open or half_open."""
+        with self._lock:
+            return self._current_state(time.monotonic())
+    
+    def _current_state(self, now: float) -> str:
+        """State after applying the open timeout; caller holds the lock."""
+        if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+            self._set_state(HALF_OPEN)
+        return self._state
+    
+    def _set_state(self, state: str) -> None:
+        """Caller holds the lock."""
+        if state != self._state:
+            logger.warning(f"Circuit {self.name}: {self._state} -> {state}")
+            self._state = state
+            metrics.set_gauge(f'circuit_{self.name}_state', STATE_GAUGE[state])
+    
+    def _open(self, now: float) -> None:
+        """Caller holds the lock."""
+        self._opened_at = now
+        self._buckets.clear()
+        self._calls = self._failures = 0
+        self._set_state(OPEN)
+        metrics.increment(f'circuit_{self.name}_opened')
+    
+    def _count(self, now: float, failed: bool) -> None:
+        """Add a call to the rolling window; caller holds the lock."""
+        while self._buckets and self._buckets[0][0] <= now - self.window_seconds:
+            _, calls, failures = self._buckets.popleft()
+            self._calls -= calls
+            self._failures -= failures
+        if not self._buckets or self._buckets[-1][0] + self._bucket_seconds <= now:
+            self._buckets.append([now, 0, 0])
+        bucket = self._buckets[-1]
+        bucket[1] += 1
+        self._calls += 1
+        if failed:
+            bucket[2] += 1
+            self._failures += 1
+    
+    def retry_after(self) -> int:
+        """Seconds until the breaker will let a probe through."""
+        with self._lock:
+            remaining = self.open_seconds - (time.monotonic() - self._opened_at)
+        return max(1, math.ceil(remaining))
+    
+    def allow(self) -> bool:
+        """
+        Admit a call or reject it.
+        
+        Returns:
+            Whether the call is the half-open probe (pass it back when
+            recording the outcome)
+        
+        Raises:
+            CircuitOpenError: If the breaker is open, or half-open with the
+                probe already in flight
+        """
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == CLOSED:
+                return False
+            if state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+        metrics.increment(f'circuit_{self.name}_rejected')
+        raise CircuitOpenError(self.name, self.retry_after())
+    
+    def record_success(self, probe: bool = False) -> None:
+        """Record a call that completed; a successful probe closes the breaker."""
+        with self._lock:
+            if probe:
+                self._probing = False
+                self._set_state(CLOSED)
+            elif self._state == CLOSED:
+                self._count(time.monotonic(), failed=False)
+    
+    def record_failure(self, probe: bool = False) -> None:
+        """Record a failed call; opens the breaker past the failure rate."""
+        now = time.monotonic()
+        with self._lock:
+            if probe:
+                self._probing = False
+                self._open(now)
+            elif self._state == CLOSED and self.failure_rate > 0:
+                self._count(now, failed=True)
+                if self._calls >= self.min_calls and self._failures >= self.failure_rate * self._calls:
+                    self._open(now)
+    
+    def release_probe(self, probe: bool) -> None:
+        """Give up a probe whose call ended without an outcome (e.g. cancelled)."""
+        if probe:
+            with self._lock:
+                self._probing = False
+    
+    @asynccontextmanager
+    async def guard(
+        self,
+        is_failure: Optional[Callable[[Exception], bool]] = None,
+        ignore: Optional[Callable[[Exception], bool]] = None
+    ) -> AsyncIterator[None]:
+        """
+        Run the block as one call through the breaker.
+        
+        Args:
+            is_failure: Decides whether an exception from the block counts
+                against the dependency (default: every exception does).
+                Errors the dependency reported deliberately, such as a
+                rejected transaction, show it is up.
+            ignore: Exceptions that say nothing about the dependency either
+                way, such as the caller's own deadline expiring; the call
+                is not counted, like a cancelled one
+        
+        Raises:
+            CircuitOpenError: If the call is rejected
+        """
+        probe = self.allow()
+        try:
+            yield
+        except Exception as e:
+            if ignore is not None and ignore(e):
+                self.release_probe(probe)
+            elif is_failure is None or is_failure(e):
+                self.record_failure(probe)
+            else:
+                self.record_success(probe)
+            raise
+        except BaseException:
+            self.release_probe(probe)
+            raise
+        else:
+            self.record_success(probe)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Current state and window counts, for the health endpoint."""
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            snapshot = {'state': state, 'calls': self._calls, 'failures': self._failures}
+        if state == OPEN:
+            snapshot['retry_after'] = self.retry_after()
+        return snapshot
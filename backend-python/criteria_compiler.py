@@ -0,0 +1,320 @@
+"""
+Free-text property requests compiled into search criteria.
+
+Matching "2-bed in Dubai under 2k with a pool" against the catalog needs
+structured criteria, and asking the LLM for them on every request costs a
+multi-second call even when the wording barely differs from an earlier
+one. ``CriteriaCompiler`` puts a cache in front of the LLM:
+
+- requests are normalized (case, spacing, "$2,000" and "2k" as "2000",
+  number words as digits, leading filler such as "please show me");
+- an exact hit is a dict lookup; a near-duplicate must state the same
+  numbers, operators ("under", "at least", ...) and catalog terms, and
+  be close enough in embedding space, so rewording reuses the criteria
+  while a different budget or city does not;
+- on a miss the LLM is asked for one JSON object restricted to the search
+  fields, validated against ``PropertySearchRequest``, then cached.
+
+Without an LLM, or when it fails, the rule parser of the intent router
+compiles the request (uncached, since it is cheap and can improve once the
+LLM is back).
+"""
+
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+from pydantic import ValidationError
+
+from embeddings import Embedder, HashingEmbedder
+from intent_router import parse_search, unsupported_search
+from models import PropertySearchRequest
+from response_cache import Signature, normalize_query, request_signature
+
+logger = logging.getLogger(__name__)
+
+# Fields the LLM may set; locations are left to explicit coordinates
+CRITERIA_FIELDS = (
+    'cities', 'amenities', 'min_price', 'max_price', 'min_bedrooms', 'max_bedrooms',
+    'min_yield', 'max_yield', 'sort_by', 'descending', 'limit'
+)
+
+_FIELD_TYPES = {
+    'cities': 'array of strings',
+    'amenities': 'array of strings',
+    'min_bedrooms': 'integer',
+    'max_bedrooms': 'integer',
+    'sort_by': '"price", "bedrooms" or "annual_yield"',
+    'descending': 'boolean',
+    'limit': 'integer, 1-100'
+}
+
+# Catalog terms listed in the prompt, per kind
+_VOCABULARY_LIMIT = 200
+
+_NUMBER_WORDS = {
+    'one': '1', 'two': '2', 'three': '3', 'four': '4', 'five': '5',
+    'six': '6', 'seven': '7', 'eight': '8', 'nine': '9', 'ten': '10'
+}
+_NUMBER_WORD = re.compile(rf"\b({'|'.join(_NUMBER_WORDS)})\b")
+_THOUSANDS_SEPARATOR = re.compile(r"(?<=\d),(?=\d{3}\b)")
+_THOUSANDS_SUFFIX = re.compile(r"\b(\d+(?:\.\d+)?)k\b")
+_FILLER = re.compile(
+    r"^(?:(?:please|hi|hey|can you|could you|i(?:'m| am) looking for|i want|i need|i'd like|"
+    r"show me|find me|get me|search for|look for)\s+)+"
+)
+# (system prompt, request) -> LLM reply
+CompleteFn = Callable[[str, str], Awaitable[str]]
+
+
+class CompileError(Exception):
+    """Raised when the LLM's reply is not valid criteria."""
+    pass
+
+
+def canonical_request(query: str) -> str:
+    """Normalize a request so rewordings of the same criteria compare equal where possible."""
+    text = normalize_query(query).replace('$', '').replace('-', ' ')
+    text = _THOUSANDS_SEPARATOR.sub('', text)
+    text = _THOUSANDS_SUFFIX.sub(lambda match: f"{float(match.group(1)) * 1000:f}".rstrip('0').rstrip('.'), text)
+    text = _NUMBER_WORD.sub(lambda match: _NUMBER_WORDS[match.group(1)], text)
+    return ' '.join(_FILLER.sub('', text).split())
+
+
+def system_prompt(cities: Iterable[str] = (), amenities: Iterable[str] = ()) -> str:
+    """Instructions constraining the LLM to a JSON object of search criteria."""
+    fields = '\n'.join(
+        f"- {name} ({_FIELD_TYPES.get(name, 'number')}): {PropertySearchRequest.model_fields[name].description}"
+        for name in CRITERIA_FIELDS
+    )
+    lines = [
+        "Convert the user's property search request into search criteria.",
+        "Reply with a single JSON object and nothing else. Use only these fields, "
+        "and leave out any the request does not state:",
+        fields,
+        "Prices are monthly rents in USD; yields are annual percentages."
+    ]
+    for kind, terms in (('cities', cities), ('amenities', amenities)):
+        terms = sorted(terms)[:_VOCABULARY_LIMIT]
+        if terms:
+            lines.append(f"Known {kind} (use these spellings): {', '.join(terms)}")
+    return '\n'.join(lines)
+
+
+def parse_criteria(reply: str) -> Dict[str, Any]:
+    """
+    Criteria from the LLM's reply.
+    
+    The first JSON object in the reply is read (models sometimes wrap it in
+    a code fence); fields outside ``CRITERIA_FIELDS`` and nulls are dropped.
+    
+    Raises:
+        CompileError: If there is no JSON object or it fails validation
+    """
+    match = re.search(r"\{.*\}", reply, re.DOTALL)
+    if match is None:
+        raise CompileError("LLM reply contains no JSON object")
+    try:
+        data = json.loads(match.group(0))
+    except json.JSONDecodeError as e:
+        raise CompileError(f"LLM reply is not valid JSON: {str(e)}")
+    if not isinstance(data, dict):
+        raise CompileError("LLM reply is not a JSON object")
+    
+    criteria = {key: value for key, value in data.items() if key in CRITERIA_FIELDS and value is not None}
+    if criteria.get('sort_by') == 'distance':
+        criteria.pop('sort_by')
+        criteria.pop('descending', None)
+    try:
+        validated = PropertySearchRequest(**criteria)
+    except ValidationError as e:
+        raise CompileError(f"LLM reply is not valid criteria: {str(e)}")
+    return validated.model_dump(include=set(criteria))
+
+
+def _copy(criteria: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy criteria, including their lists, so callers cannot change cached ones."""
+    return {key: list(value) if isinstance(value, list) else value for key, value in criteria.items()}
+
+
+@dataclass(frozen=True)
+class CompiledCriteria:
+    """Criteria for a request and where they came from ('cache', 'llm' or 'rules')."""
+    criteria: Dict[str, Any]
+    source: str
+
+
+@dataclass
+class _Entry:
+    criteria: Dict[str, Any]
+    signature: Signature
+    vector: Optional[np.ndarray]
+    created_at: float
+
+
+class CriteriaCompiler:
+    """
+    LRU/TTL cache of compiled criteria in front of the LLM.
+    
+    Entries are shared by all agents: criteria depend only on the request.
+    Near-duplicate lookups scan only the entries with the request's
+    signature, so they stay at tens of microseconds however full the cache is.
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = 4096,
+        ttl_seconds: float = 86400.0,
+        similarity_threshold: float = 0.0,
+        embedder: Optional[Embedder] = None
+    ):
+        """
+        Args:
+            max_entries: Maximum cached requests (0 disables the cache)
+            ttl_seconds: Lifetime of compiled criteria
+            similarity_threshold: Minimum cosine similarity for a
+                near-duplicate hit (0 disables near-duplicate lookup)
+            embedder: Request embedder (defaults to HashingEmbedder)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.embedder = (embedder or HashingEmbedder()) if similarity_threshold > 0 else None
+        self._entries: 'OrderedDict[str, _Entry]' = OrderedDict()
+        self._by_signature: Dict[Signature, List[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get(self, text: str, vocabulary: Iterable[str] = ()) -> Optional[Dict[str, Any]]:
+        """
+        Cached criteria for a canonical request, or a near-duplicate's.
+        
+        Args:
+            text: Canonical request
+            vocabulary: Catalog terms (lowercase) near-duplicates must share
+        
+        Returns:
+            A copy of the criteria, or None on a miss
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._live(text, now)
+            if entry is None and self.embedder is not None and self._by_signature:
+                signature = request_signature(text, vocabulary)
+                if signature in self._by_signature:
+                    entry = self._nearest(text, signature, now)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return _copy(entry.criteria)
+    
+    def _live(self, text: str, now: float) -> Optional[_Entry]:
+        """Return an unexpired entry and mark it recently used; caller holds the lock."""
+        entry = self._entries.get(text)
+        if entry is None:
+            return None
+        if now - entry.created_at > self.ttl_seconds:
+            self._remove(text)
+            return None
+        self._entries.move_to_end(text)
+        return entry
+    
+    def _nearest(self, text: str, signature: Signature, now: float) -> Optional[_Entry]:
+        """Most similar entry with the same signature; caller holds the lock."""
+        vector = self.embedder.embed([text])[0]
+        best, best_score = None, self.similarity_threshold
+        for key in list(self._by_signature[signature]):
+            entry = self._live(key, now)
+            if entry is None:
+                continue
+            score = float(entry.vector @ vector)
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+    
+    def put(self, text: str, criteria: Dict[str, Any], vocabulary: Iterable[str] = ()) -> None:
+        """Cache criteria for a canonical request."""
+        if self.max_entries <= 0:
+            return
+        signature = request_signature(text, vocabulary)
+        vector = self.embedder.embed([text])[0] if self.embedder is not None else None
+        entry = _Entry(_copy(criteria), signature, vector, time.monotonic())
+        with self._lock:
+            if text in self._entries:
+                self._remove(text)
+            self._entries[text] = entry
+            self._by_signature.setdefault(signature, []).append(text)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+    
+    def _remove(self, text: str) -> None:
+        """Drop an entry; caller holds the lock."""
+        entry = self._entries.pop(text)
+        keys = self._by_signature.get(entry.signature)
+        if keys is not None:
+            keys.remove(text)
+            if not keys:
+                del self._by_signature[entry.signature]
+    
+    async def compile(
+        self,
+        query: str,
+        complete: Optional[CompleteFn] = None,
+        cities: Iterable[str] = (),
+        amenities: Iterable[str] = (),
+        bypass_cache: bool = False
+    ) -> CompiledCriteria:
+        """
+        Compile a request into ``PropertySearchRequest`` keyword arguments.
+        
+        Args:
+            query: Free-text request
+            complete: LLM call; None compiles with the rules
+            cities: Known cities (lowercase), shown to the LLM and used by the rules
+            amenities: Known amenities (lowercase), likewise
+            bypass_cache: Skip the cache lookup (the result is still cached)
+        
+        Returns:
+            CompiledCriteria
+        
+        Raises:
+            ValueError: If there is no LLM call and the rules cannot
+                express the request (``unsupported_search``)
+            Exception: Whatever the LLM call raised (or CompileError for an
+                invalid reply) when the rules find no criteria either
+        """
+        cities, amenities = list(cities), list(amenities)
+        text = canonical_request(query)
+        if not bypass_cache:
+            cached = self.get(text, cities + amenities)
+            if cached is not None:
+                return CompiledCriteria(cached, 'cache')
+        
+        if complete is None:
+            # Criteria missing a negation, a place or a number would widen the search
+            reason = unsupported_search(text, cities, amenities)
+            if reason:
+                raise ValueError(f"The request needs the LLM compiler: {reason}")
+            return CompiledCriteria(parse_search(text, cities, amenities, default_limit=None), 'rules')
+        try:
+            criteria = parse_criteria(await complete(system_prompt(cities, amenities), query))
+        except Exception as e:
+            fallback = parse_search(text, cities, amenities, default_limit=None)
+            if not fallback:
+                raise
+            logger.warning(f"Compiling request with rules after LLM failure: {str(e)}")
+            return CompiledCriteria(fallback, 'rules')
+        
+        self.put(text, criteria, cities + amenities)
+        return CompiledCriteria(criteria, 'llm')
@@ -0,0 +1,152 @@
+"""
+Request deadlines propagated into every stage of a request.
+
+Clients send their remaining time budget in the ``X-Request-Timeout-Ms``
+header. The manager runs each stage (queue waits, Memory Hub reads, the
+LLM call, chain RPC) under whatever is left of that budget, optionally
+capped per stage, so work a client has already given up on is cancelled
+instead of running to completion while the client retries. Each stage
+reports its own error code when the deadline passes.
+"""
+
+import asyncio
+import sys
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncContextManager, AsyncIterator, Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar('T')
+
+DEADLINE_HEADER = 'X-Request-Timeout-Ms'
+
+# Error code reported when the deadline passes during each stage
+STAGE_ERROR_CODES = {
+    'queue': 'QUEUE_TIMEOUT',
+    'memory_hub': 'MEMORY_HUB_TIMEOUT',
+    'llm': 'LLM_TIMEOUT',
+    'chain_rpc': 'BLOCKCHAIN_TIMEOUT',
+}
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raised when a request's deadline passes during a stage.
+    
+    ``capped`` tells whether the stage's own limit ran out rather than the
+    caller's budget: only then does the timeout say something about the
+    dependency the stage was waiting on.
+    """
+    
+    def __init__(self, stage: str, capped: bool = False):
+        super().__init__(f"Request deadline exceeded during {stage.replace('_', ' ')}")
+        self.stage = stage
+        self.capped = capped
+    
+    @property
+    def code(self) -> str:
+        """Error code for the stage that timed out."""
+        return STAGE_ERROR_CODES.get(self.stage, 'DEADLINE_EXCEEDED')
+
+
+class Deadline:
+    """Point in (monotonic) time by which a request must finish."""
+    
+    def __init__(self, timeout_seconds: Optional[float] = None):
+        """
+        Args:
+            timeout_seconds: Budget from now (None for no deadline)
+        """
+        self.expires_at = time.monotonic() + timeout_seconds if timeout_seconds is not None else None
+    
+    @classmethod
+    def from_header(cls, value: Optional[str], default_seconds: Optional[float] = None) -> 'Deadline':
+        """
+        Build a deadline from the header value (milliseconds remaining).
+        
+        A missing or malformed header falls back to ``default_seconds``.
+        """
+        try:
+            milliseconds = float(value) if value else None
+        except ValueError:
+            milliseconds = None
+        if milliseconds is not None and milliseconds >= 0:
+            return cls(milliseconds / 1000.0)
+        return cls(default_seconds)
+    
+    def remaining(self) -> Optional[float]:
+        """Seconds left, or None if there is no deadline."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+    
+    def expired(self) -> bool:
+        """Whether the deadline has passed."""
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+    
+    def timeout_for(self, cap: Optional[float] = None) -> Optional[float]:
+        """Time a stage may take: the remaining budget, optionally capped."""
+        remaining = self.remaining()
+        if cap is None:
+            return remaining
+        return cap if remaining is None else min(cap, remaining)
+    
+    def check(self, stage: str) -> None:
+        """Raise if the deadline has already passed before starting a stage."""
+        if self.expired():
+            raise DeadlineExceeded(stage)
+    
+    async def run(self, stage: str, awaitable: Awaitable[T], cap: Optional[float] = None) -> T:
+        """
+        Await ``awaitable`` within the remaining budget.
+        
+        On timeout the awaitable is cancelled and ``DeadlineExceeded`` is
+        raised for ``stage``, marked ``capped`` when ``cap`` was the limit
+        that ran out.
+        
+        Args:
+            stage: Stage name (see ``STAGE_ERROR_CODES``)
+            awaitable: Work to run
+            cap: Optional per-stage limit in seconds
+        """
+        remaining = self.remaining()
+        capped = cap is not None and (remaining is None or cap <= remaining)
+        timeout = cap if capped else remaining
+        if timeout is not None and timeout <= 0:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            raise DeadlineExceeded(stage, capped)
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(stage, capped)
+    
+    async def call_blocking(
+        self,
+        stage: str,
+        fn: Callable[..., T],
+        *args: Any,
+        cap: Optional[float] = None
+    ) -> T:
+        """
+        Run a blocking call on a worker thread within the remaining budget.
+        
+        A thread cannot be interrupted, so on timeout the call is abandoned
+        (its result discarded) rather than stopped.
+        """
+        return await self.run(stage, asyncio.to_thread(fn, *args), cap)
+    
+    @asynccontextmanager
+    async def enter(self, stage: str, context: AsyncContextManager[T]) -> AsyncIterator[T]:
+        """
+        Enter an async context (e.g. a queue slot) within the remaining budget.
+        
+        Only entering is bounded; the body runs under its own stage limits.
+        """
+        value = await self.run(stage, context.__aenter__())
+        try:
+            yield value
+        except BaseException:
+            if not await context.__aexit__(*sys.exc_info()):
+                raise
+        else:
+            await context.__aexit__(None, None, None)
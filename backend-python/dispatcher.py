@@ -0,0 +1,510 @@
+"""
+Front dispatcher for multi-process mode.
+
+Starts ``WORKERS`` copies of the service (``app.py``) on consecutive ports
+behind a single listener and forwards each request to the worker that
+owns its agent_id on a consistent hash ring, so every agent lives in
+exactly one process and throughput scales with cores. Requests without an
+agent (the catalog, streams, health) take turns across the live workers.
+
+A supervisor thread health-checks the workers, restarting any that exit.
+Unhealthy workers are taken off the ring and re-added once they recover;
+only the agents on their arcs move, and they are rehydrated on the new
+owner from the shared state store (set ``STATE_STORE_PATH``). Every ring
+change is pushed to the workers, which evict the agents it moved away.
+
+Each worker holds its own property catalog and streams, so writes to them
+are applied on every worker, and replayed to workers rejoining the ring.
+
+Usage:
+    WORKERS=4 STATE_STORE_PATH=/data/agents.db python dispatcher.py
+"""
+
+import itertools
+import json
+import logging
+import os
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+from dotenv import load_dotenv
+from flask import Flask, Response, jsonify, request
+from urllib3.exceptions import ConnectTimeoutError
+
+from deadline import DEADLINE_HEADER
+from models import error_body
+from sharding import DEFAULT_VNODES, HashRing, routing_key
+
+logger = logging.getLogger(__name__)
+
+# Headers that apply to a single connection and are not forwarded
+HOP_BY_HOP_HEADERS = frozenset({
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+    'te', 'trailers', 'transfer-encoding', 'upgrade', 'host', 'content-length'
+})
+
+# Seconds to connect to a worker before treating it as down
+CONNECT_TIMEOUT = 2.0
+
+# Methods a worker may safely receive twice (RFC 9110 idempotent methods)
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+
+# Catalog and stream writes, applied on every worker
+BROADCAST_ROUTES = (
+    ('PUT', re.compile(r'^/properties$')),
+    ('DELETE', re.compile(r'^/properties/[^/]+$')),
+    ('PUT', re.compile(r'^/streams$')),
+)
+
+# Worker endpoint receiving ring changes; never forwarded from clients
+RING_PATH = '/internal/ring'
+
+
+def _never_sent(error: requests.exceptions.ConnectionError) -> bool:
+    """
+    Whether a connection error happened before the request was sent.
+    
+    Connect timeouts and refused connections (urllib3's
+    ``NewConnectionError`` is a ``ConnectTimeoutError``) fail while
+    connecting; anything else, such as the worker dropping the
+    connection, may come after the worker received the request.
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, ConnectTimeoutError)
+
+
+def _forwarded_headers(headers: Dict[str, str], client: Optional[str]) -> Dict[str, str]:
+    """End-to-end headers of a request, with the caller appended to X-Forwarded-For."""
+    forwarded = {name: value for name, value in headers.items() if name.lower() not in HOP_BY_HOP_HEADERS}
+    if client:
+        chain = next((value for name, value in forwarded.items() if name.lower() == 'x-forwarded-for'), None)
+        forwarded = {name: value for name, value in forwarded.items() if name.lower() != 'x-forwarded-for'}
+        forwarded['X-Forwarded-For'] = f"{chain}, {client}" if chain else client
+    return forwarded
+
+
+def _relay(response: requests.Response) -> Tuple[int, List[Tuple[str, str]], bytes]:
+    """Status, end-to-end headers and body of a worker's response."""
+    response_headers = [
+        (name, value) for name, value in response.headers.items()
+        if name.lower() not in HOP_BY_HOP_HEADERS and name.lower() != 'content-encoding'
+    ]
+    return response.status_code, response_headers, response.content
+
+
+_NO_WORKER = (503, [('Content-Type', 'application/json')], error_body(
+    "WORKER_UNAVAILABLE", "No worker process is available", True
+).encode('utf-8'))
+
+
+class WriteJournal:
+    """
+    Net effect of the catalog and stream writes applied so far.
+    
+    Kept per listing and stream rather than per request, so it stays the
+    size of the catalog. Replayed to workers rejoining the ring, which
+    missed writes while they were away (a restarted worker only has
+    ``PROPERTY_CATALOG_PATH`` loaded).
+    """
+    
+    def __init__(self):
+        # property_id -> listing, or None once deleted
+        self.properties: Dict[str, Optional[Dict[str, Any]]] = {}
+        self.streams: Dict[str, Dict[str, Any]] = {}
+    
+    def record(self, method: str, path: str, body: bytes) -> None:
+        """Record a write the workers accepted."""
+        if path == '/streams':
+            for stream in json.loads(body)['streams']:
+                self.streams[str(stream['stream_id'])] = stream
+        elif method == 'PUT':
+            for listing in json.loads(body)['properties']:
+                self.properties[str(listing['property_id'])] = listing
+        else:
+            self.properties[path.rsplit('/', 1)[1]] = None
+    
+    def requests(self) -> List[Tuple[str, str, bytes]]:
+        """(method, path, body) of the writes that bring a worker up to date."""
+        writes = [
+            ('DELETE', f"/properties/{property_id}", b'')
+            for property_id, listing in self.properties.items() if listing is None
+        ]
+        listings = [listing for listing in self.properties.values() if listing is not None]
+        if listings:
+            writes.append(('PUT', '/properties', json.dumps({'properties': listings}).encode('utf-8')))
+        if self.streams:
+            writes.append(('PUT', '/streams', json.dumps({'streams': list(self.streams.values())}).encode('utf-8')))
+        return writes
+
+
+class Worker:
+    """One service process and the URL it listens on."""
+    
+    def __init__(self, name: str, url: str, port: Optional[int] = None):
+        """
+        Args:
+            name: Node name on the hash ring
+            url: Base URL of the worker
+            port: Port to start the worker on (None for workers managed elsewhere)
+        """
+        self.name = name
+        self.url = url.rstrip('/')
+        self.port = port
+        self.process: Optional[subprocess.Popen] = None
+    
+    def start(self) -> None:
+        """Start (or restart) the worker process."""
+        env = dict(os.environ, PORT=str(self.port), FLASK_ENV='production', WORKER_NAME=self.name)
+        app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+        self.process = subprocess.Popen([sys.executable, app_path], env=env)
+        logger.info(f"Started worker {self.name} on port {self.port} (pid {self.process.pid})")
+    
+    def exited(self) -> bool:
+        """Whether a process started by this dispatcher has exited."""
+        return self.process is not None and self.process.poll() is not None
+    
+    def stop(self) -> None:
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+class Dispatcher:
+    """Routes requests to workers by consistent hashing of the agent_id."""
+    
+    def __init__(self, workers: List[Worker], vnodes: int = DEFAULT_VNODES):
+        """
+        Args:
+            workers: Worker processes; all start on the ring
+            vnodes: Virtual points per worker on the ring
+        """
+        self.workers: Dict[str, Worker] = {worker.name: worker for worker in workers}
+        self.ring = HashRing(self.workers, vnodes=vnodes)
+        self.vnodes = vnodes
+        self.journal = WriteJournal()
+        # Serializes broadcast writes with replays to rejoining workers
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._stopped = threading.Event()
+        # Turns for requests without an agent
+        self._keyless = itertools.count()
+    
+    @property
+    def session(self) -> requests.Session:
+        """Per-thread HTTP session, keeping connections to workers alive."""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+    
+    def add_worker(self, worker: Worker) -> None:
+        """Add a worker; it takes over its share of agents from the others."""
+        self.workers[worker.name] = worker
+        if self.ring.add(worker.name):
+            logger.info(f"Worker {worker.name} added to the ring ({len(self.ring)} workers)")
+            self.publish_ring()
+    
+    def remove_worker(self, name: str) -> None:
+        """Take a worker off the ring; its agents move to the remaining workers."""
+        if self.ring.remove(name):
+            logger.warning(f"Worker {name} removed from the ring ({len(self.ring)} workers)")
+            self.publish_ring()
+    
+    def publish_ring(self) -> None:
+        """
+        Send the current ring to every worker, so each evicts the agents it no longer owns.
+        
+        Workers that cannot be reached miss the update; the ring's version
+        tells them so when the next one arrives.
+        """
+        version, nodes = self.ring.view()
+        payload = {'version': version, 'nodes': nodes, 'vnodes': self.vnodes}
+        for worker in list(self.workers.values()):
+            try:
+                self.session.put(f"{worker.url}{RING_PATH}", json=payload, timeout=CONNECT_TIMEOUT)
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"Failed to send ring version {version} to worker {worker.name}: {str(e)}")
+    
+    def owner(self, key: Optional[str]) -> Optional[Worker]:
+        """Worker owning ``key``; requests without an agent (None) go to each live worker in turn."""
+        if key is None:
+            _, nodes = self.ring.view()
+            name = nodes[next(self._keyless) % len(nodes)] if nodes else None
+        else:
+            name = self.ring.owner(key)
+        return self.workers.get(name) if name else None
+    
+    def forward(
+        self,
+        method: str,
+        path: str,
+        query_string: bytes,
+        headers: Dict[str, str],
+        body: bytes,
+        client: Optional[str] = None
+    ) -> Tuple[int, List[Tuple[str, str]], bytes]:
+        """
+        Forward a request to the owning worker.
+        
+        A worker whose connection fails is taken off the ring. The request
+        is sent to the agent's new owner if it never reached the first
+        worker (the connection was refused or timed out) or if its method
+        is idempotent. A non-idempotent request whose connection dropped
+        after it was sent may have been processed, so it is not repeated.
+        Catalog and stream writes go to every worker (see ``broadcast``).
+        
+        Args:
+            client: Address of the caller, appended to X-Forwarded-For so
+                workers rate-limit callers rather than the dispatcher
+        
+        Returns:
+            Status, headers and body of the worker's response, a 502 error
+            envelope if a non-idempotent request's outcome is unknown, or
+            a 503 error envelope if no worker is reachable
+        """
+        if path.startswith('/internal/'):
+            return 404, [('Content-Type', 'application/json')], error_body(
+                "NOT_FOUND", "Endpoint not found", False
+            ).encode('utf-8')
+        forwarded = _forwarded_headers(headers, client)
+        read_timeout = None
+        if headers.get(DEADLINE_HEADER, '').isdigit():
+            # The worker gives up at the deadline; allow it time to answer
+            read_timeout = int(headers[DEADLINE_HEADER]) / 1000.0 + 1.0
+        if any(method.upper() == route_method and pattern.match(path) for route_method, pattern in BROADCAST_ROUTES):
+            return self.broadcast(method, path, query_string, forwarded, body, read_timeout)
+        
+        key = routing_key(path, body)
+        for _ in range(len(self.workers)):
+            worker = self.owner(key)
+            if worker is None:
+                break
+            try:
+                response = self._send(worker, method, path, query_string, forwarded, body, read_timeout)
+            except requests.exceptions.ConnectionError as e:
+                logger.error(f"Worker {worker.name} unreachable: {str(e)}")
+                self.remove_worker(worker.name)
+                if _never_sent(e) or method.upper() in IDEMPOTENT_METHODS:
+                    continue
+                return 502, [('Content-Type', 'application/json')], error_body(
+                    "WORKER_CONNECTION_LOST",
+                    "Connection to worker lost after the request was sent; it may have been processed",
+                    False
+                ).encode('utf-8')
+            return _relay(response)
+        
+        return _NO_WORKER
+    
+    def broadcast(
+        self,
+        method: str,
+        path: str,
+        query_string: bytes,
+        headers: Dict[str, str],
+        body: bytes,
+        read_timeout: Optional[float] = None
+    ) -> Tuple[int, List[Tuple[str, str]], bytes]:
+        """
+        Apply a catalog or stream write on every worker on the ring.
+        
+        Writes every worker accepted are journaled and replayed to workers
+        rejoining the ring; workers that cannot be reached are taken off
+        the ring and catch up from the journal when they rejoin.
+        
+        Returns:
+            A successful worker's response if there was one (else the
+            last response), or a 503 error envelope if no worker is
+            reachable
+        """
+        with self._write_lock:
+            result = None
+            for name in self.ring.nodes:
+                worker = self.workers[name]
+                try:
+                    response = self._send(worker, method, path, query_string, headers, body, read_timeout)
+                except requests.exceptions.ConnectionError as e:
+                    logger.error(f"Worker {worker.name} unreachable: {str(e)}")
+                    self.remove_worker(worker.name)
+                    continue
+                if result is None or (response.ok and not result.ok):
+                    result = response
+            if result is None:
+                return _NO_WORKER
+            if result.ok:
+                self.journal.record(method, path, body)
+            return _relay(result)
+    
+    def replay(self, worker: Worker) -> bool:
+        """
+        Bring a worker's catalog and streams up to date from the journal.
+        
+        Caller holds the write lock. Returns False if the worker could not
+        be reached.
+        """
+        for method, path, body in self.journal.requests():
+            try:
+                self._send(worker, method, path, b'', {'Content-Type': 'application/json'}, body, None)
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"Failed to replay catalog writes to worker {worker.name}: {str(e)}")
+                return False
+        return True
+    
+    def _send(
+        self,
+        worker: Worker,
+        method: str,
+        path: str,
+        query_string: bytes,
+        headers: Dict[str, str],
+        body: bytes,
+        read_timeout: Optional[float]
+    ) -> requests.Response:
+        url = worker.url + path + (f"?{query_string.decode('latin-1')}" if query_string else '')
+        return self.session.request(
+            method,
+            url,
+            headers=headers,
+            data=body,
+            timeout=(CONNECT_TIMEOUT, read_timeout),
+            allow_redirects=False
+        )
+    
+    def check_workers(self) -> None:
+        """Restart exited workers and sync ring membership with worker health."""
+        for worker in list(self.workers.values()):
+            if worker.exited():
+                logger.error(f"Worker {worker.name} exited with code {worker.process.returncode}; restarting")
+                self.remove_worker(worker.name)
+                worker.start()
+                continue
+            try:
+                healthy = self.session.get(f"{worker.url}/health", timeout=CONNECT_TIMEOUT).ok
+            except requests.exceptions.RequestException:
+                healthy = False
+            if not healthy:
+                self.remove_worker(worker.name)
+            elif worker.name not in self.ring:
+                # Catch up on the writes missed while off the ring before
+                # taking traffic again
+                with self._write_lock:
+                    if self.replay(worker):
+                        self.add_worker(worker)
+    
+    def collect(self, path: str) -> Dict[str, Any]:
+        """GET ``path`` from every worker, keyed by worker name."""
+        results = {}
+        for name, worker in self.workers.items():
+            try:
+                results[name] = self.session.get(f"{worker.url}{path}", timeout=CONNECT_TIMEOUT).json()
+            except (requests.exceptions.RequestException, ValueError) as e:
+                results[name] = {'status': 'unreachable', 'error': str(e)}
+        return results
+    
+    def supervise(self, interval_seconds: float) -> threading.Thread:
+        """Run ``check_workers`` every ``interval_seconds`` on a daemon thread."""
+        def loop():
+            while not self._stopped.wait(interval_seconds):
+                try:
+                    self.check_workers()
+                except Exception as e:
+                    logger.error(f"Worker health check failed: {str(e)}")
+        
+        thread = threading.Thread(target=loop, name='worker-supervisor', daemon=True)
+        thread.start()
+        return thread
+    
+    def stop(self) -> None:
+        """Stop supervising and terminate the worker processes."""
+        self._stopped.set()
+        for worker in self.workers.values():
+            worker.stop()
+
+
+def create_app(dispatcher: Dispatcher) -> Flask:
+    """Flask app forwarding every request through ``dispatcher``."""
+    app = Flask(__name__)
+    
+    @app.route('/health', methods=['GET'])
+    def health_check():
+        """Dispatcher health with each worker's own health report."""
+        workers = dispatcher.collect('/health')
+        for name, report in workers.items():
+            report['on_ring'] = name in dispatcher.ring
+        degraded = any(report.get('status') != 'healthy' for report in workers.values())
+        return jsonify({
+            "status": "degraded" if degraded else "healthy",
+            "service": "aip-agent-dispatcher",
+            "workers": workers
+        }), 200 if len(dispatcher.ring) else 503
+    
+    @app.route('/metrics', methods=['GET'])
+    def get_metrics():
+        """Metrics of every worker, keyed by worker name."""
+        return jsonify({"workers": dispatcher.collect('/metrics')}), 200
+    
+    @app.route('/', defaults={'path': ''}, methods=['GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'])
+    @app.route('/<path:path>', methods=['GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'])
+    def forward(path: str):
+        status, headers, content = dispatcher.forward(
+            request.method,
+            request.path,
+            request.query_string,
+            dict(request.headers),
+            request.get_data(),
+            request.remote_addr
+        )
+        return Response(content, status=status, headers=headers)
+    
+    return app
+
+
+def spawn_workers(count: int, base_port: int) -> List[Worker]:
+    """Start ``count`` worker processes on consecutive ports from ``base_port``."""
+    workers = []
+    for index in range(count):
+        port = base_port + index
+        worker = Worker(f"worker-{index}", f"http://127.0.0.1:{port}", port)
+        worker.start()
+        workers.append(worker)
+    return workers
+
+
+if __name__ == '__main__':
+    load_dotenv()
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    
+    port = int(os.getenv('PORT', 5000))
+    worker_count = int(os.getenv('WORKERS') or os.cpu_count() or 1)
+    base_port = int(os.getenv('WORKER_BASE_PORT') or port + 1)
+    if not os.getenv('STATE_STORE_PATH'):
+        logger.warning("STATE_STORE_PATH is not set; agents moved between workers must be re-initialized")
+    
+    dispatcher = Dispatcher(spawn_workers(worker_count, base_port))
+    # Stop the workers along with the dispatcher (e.g. on docker stop)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    # Wait for the workers to come up before accepting traffic
+    started = time.monotonic()
+    dispatcher.check_workers()
+    while len(dispatcher.ring) < worker_count and time.monotonic() - started < 30:
+        time.sleep(0.5)
+        dispatcher.check_workers()
+    dispatcher.supervise(float(os.getenv('WORKER_HEALTH_INTERVAL_SECONDS', '5')))
+    try:
+        logger.info(f"Dispatching to {worker_count} workers on port {port}")
+        create_app(dispatcher).run(host='0.0.0.0', port=port, threaded=True)
+    finally:
+        dispatcher.stop()
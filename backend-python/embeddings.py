@@ -0,0 +1,86 @@
+"""
+Local text embeddings for retrieval and similarity features.
+
+Provides a dependency-free feature-hashing embedder: tokens and token
+bigrams are hashed into a fixed number of signed buckets with sublinear
+term-frequency weighting, then L2-normalized so cosine similarity is a
+dot product. It needs no model download and embeds thousands of short
+texts per second, which is enough to rank past turns or listings by
+lexical overlap. A model-backed embedder can be swapped in wherever an
+``Embedder`` is accepted.
+"""
+
+import re
+import zlib
+from typing import Iterable, List, Protocol, Sequence
+
+import numpy as np
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# Very common words carry no signal for similarity
+_STOPWORDS = frozenset("""
+a an and are as at be by can could do does for from has have how i in is it
+its me my of on or our please show tell that the their them there these this
+to us was we what when where which who why will with you your
+""".split())
+
+
+class Embedder(Protocol):
+    """Anything that maps texts to an (n, dim) float32 matrix of unit vectors."""
+    
+    dim: int
+    
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        ...
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with stopwords removed."""
+    return [token for token in _TOKEN.findall(text.lower()) if token not in _STOPWORDS]
+
+
+class HashingEmbedder:
+    """
+    Feature-hashing text embedder.
+    
+    Deterministic across processes (uses CRC32 rather than Python's
+    randomized ``hash``), so embeddings can be cached on disk.
+    """
+    
+    def __init__(self, dim: int = 256):
+        """
+        Args:
+            dim: Embedding dimension (number of hash buckets)
+        """
+        self.dim = dim
+    
+    def _features(self, text: str) -> Iterable[str]:
+        tokens = tokenize(text)
+        yield from tokens
+        for first, second in zip(tokens, tokens[1:]):
+            yield f"{first} {second}"
+    
+    def embed_one(self, text: str) -> np.ndarray:
+        """Embed a single text as a unit float32 vector (zero vector if no tokens)."""
+        counts = {}
+        for feature in self._features(text):
+            counts[feature] = counts.get(feature, 0) + 1
+        
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, count in counts.items():
+            digest = zlib.crc32(feature.encode('utf-8'))
+            sign = 1.0 if digest & 0x80000000 else -1.0
+            vector[digest % self.dim] += sign * (1.0 + np.log(count))
+        
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+    
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed texts as an (n, dim) float32 matrix of unit rows."""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            matrix[row] = self.embed_one(text)
+        return matrix
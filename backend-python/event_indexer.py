@@ -0,0 +1,768 @@
+"""
+Incremental indexer of StreamingProtocol and PropertyRegistry events.
+
+A background thread pulls ``StreamCreated``, ``ClaimedFromStream``,
+``StreamCanceled`` and ``PropertyRegistered`` logs from a JSON-RPC node
+with ``eth_getLogs`` and writes them, decoded, to a local SQLite store, so
+questions like "how much have I earned?" become local lookups instead of
+ad-hoc RPC scans.
+
+- Block ranges adapt: a range the node refuses (too many results or too
+  wide) is halved and the working size becomes the ceiling; the range
+  doubles after each success up to that ceiling, which is lifted to
+  ``max_range`` again after a run of successful ranges.
+- The last processed block and its hash are checkpointed with every range,
+  in the same transaction as the range's events, so a restart resumes
+  where it stopped.
+- Reorgs are detected by comparing the checkpoint's block hash with the
+  node's. The indexer then walks back through the hashes it recorded for
+  the last ``reorg_depth`` blocks to the newest one still on the chain,
+  drops the events after it and re-indexes from there.
+
+Listeners registered with ``EventIndexer.subscribe`` see every committed
+range and every rewind. Several processes can share one store: the one
+holding its ``IndexerLock`` runs the indexer, and ``StoreFollower`` replays
+what it commits (and the rewinds it records) to in-memory views such as
+``portfolio.Portfolio`` in every process.
+"""
+
+import fcntl
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# topic0 (keccak256 of the event signature) -> event name
+EVENT_TOPICS = {
+    # StreamCreated(uint256 indexed streamId, address indexed sender, address indexed recipient, uint256 totalAmount)
+    '0x4396d7c3edc1447dac8dd2b7143af95840c926a210524a0d3198012c7fdf37c7': 'StreamCreated',
+    # ClaimedFromStream(uint256 indexed streamId, address indexed recipient, uint256 amount)
+    '0xe4f96cb1d81bdd10a00c916e49be6714a178c7d47d2d27b7a6afbcb2ddfca20a': 'ClaimedFromStream',
+    # StreamCanceled(uint256 indexed streamId, address indexed sender, uint256 senderBalance, uint256 recipientBalance)
+    '0xb2b1fb9138dcac018a1af86098a9e241821b52dfd853933beda7b5b3ec807f39': 'StreamCanceled',
+    # PropertyRegistered(uint256 indexed tokenId, uint64 streamId, address owner, string unibaseId)
+    '0xc88918b2fce3f51c85980cf21d20a34457554cebbe67c4f4e46b3d1c40ce9e95': 'PropertyRegistered'
+}
+
+# Successful ranges after which a refused range size is tried again
+_CEILING_RESET_RANGES = 32
+
+# Phrases nodes use when an eth_getLogs range returns too many logs or spans
+# too many blocks
+_RANGE_ERRORS = ('more than', 'too many', 'range', 'exceed')
+
+
+class RpcError(Exception):
+    """Raised when the JSON-RPC node returns an error."""
+    pass
+
+
+class RangeTooLargeError(RpcError):
+    """Raised when the node refuses an eth_getLogs block range as too large."""
+    pass
+
+
+def _words(data: str) -> List[int]:
+    """ABI-encoded data as 32-byte words."""
+    raw = bytes.fromhex(data[2:] if data.startswith('0x') else data)
+    return [int.from_bytes(raw[offset:offset + 32], 'big') for offset in range(0, len(raw), 32)]
+
+
+def _address(word: int) -> str:
+    return '0x' + f"{word & ((1 << 160) - 1):040x}"
+
+
+def _string(data: str, offset: int) -> str:
+    """Dynamic ABI string whose head word holds ``offset``."""
+    raw = bytes.fromhex(data[2:] if data.startswith('0x') else data)
+    length = int.from_bytes(raw[offset:offset + 32], 'big')
+    return raw[offset + 32:offset + 32 + length].decode('utf-8', errors='replace')
+
+
+def decode_log(log: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Decode a raw ``eth_getLogs`` entry into an event row.
+    
+    Rows carry the stream's parties as ``sender`` and ``recipient`` where
+    the event names them; ``args`` holds every argument, uint256 values as
+    decimal strings. ``timestamp`` is the block time when the node includes
+    ``blockTimestamp`` in logs, else None until the indexer fills it in.
+    
+    Returns:
+        Event row, or None for logs of other events
+    """
+    topics = log.get('topics') or []
+    event = EVENT_TOPICS.get(topics[0].lower()) if topics else None
+    if event is None:
+        return None
+    indexed = [int(topic, 16) for topic in topics[1:]]
+    words = _words(log.get('data') or '0x')
+    
+    sender = recipient = None
+    if event == 'StreamCreated':
+        stream_id, sender, recipient = indexed[0], _address(indexed[1]), _address(indexed[2])
+        args = {'total_amount': str(words[0])}
+    elif event == 'ClaimedFromStream':
+        stream_id, recipient = indexed[0], _address(indexed[1])
+        args = {'amount': str(words[0])}
+    elif event == 'StreamCanceled':
+        stream_id, sender = indexed[0], _address(indexed[1])
+        args = {'sender_balance': str(words[0]), 'recipient_balance': str(words[1])}
+    else:
+        # The property owner is the recipient of the property's stream
+        stream_id, recipient = words[0], _address(words[1])
+        args = {'token_id': str(indexed[0]), 'unibase_id': _string(log['data'], words[2])}
+    
+    return {
+        'block_number': int(log['blockNumber'], 16),
+        'log_index': int(log['logIndex'], 16),
+        'block_hash': log['blockHash'],
+        'timestamp': int(log['blockTimestamp'], 16) if log.get('blockTimestamp') else None,
+        'tx_hash': log.get('transactionHash'),
+        'contract': log['address'].lower(),
+        'event': event,
+        'stream_id': str(stream_id),
+        'sender': sender,
+        'recipient': recipient,
+        'args': args
+    }
+
+
+class JsonRpcLogSource:
+    """The ``eth_*`` calls the indexer needs, over HTTP JSON-RPC."""
+    
+    def __init__(self, url: str, timeout: float = 10.0, session: Any = None):
+        """
+        Args:
+            url: JSON-RPC endpoint
+            timeout: Seconds to wait per call
+            session: HTTP session (a new ``requests.Session`` by default)
+        """
+        import requests
+        self.url = url
+        self.timeout = timeout
+        self._session = session or requests.Session()
+        self._next_id = 0
+    
+    def _call(self, method: str, params: List[Any]) -> Any:
+        self._next_id += 1
+        response = self._session.post(
+            self.url,
+            json={'jsonrpc': '2.0', 'id': self._next_id, 'method': method, 'params': params},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        body = response.json()
+        error = body.get('error')
+        if error:
+            message = f"{method}: {error.get('message', error)}"
+            if method == 'eth_getLogs' and (
+                error.get('code') == -32005 or any(phrase in message.lower() for phrase in _RANGE_ERRORS)
+            ):
+                raise RangeTooLargeError(message)
+            raise RpcError(message)
+        return body.get('result')
+    
+    def block_number(self) -> int:
+        """Number of the chain head."""
+        return int(self._call('eth_blockNumber', []), 16)
+    
+    def block_hash(self, number: int) -> Optional[str]:
+        """Hash of the canonical block at ``number`` (None if not yet mined)."""
+        block = self._call('eth_getBlockByNumber', [hex(number), False])
+        return block['hash'] if block else None
+    
+    def block_timestamp(self, number: int) -> Optional[int]:
+        """Unix time of the canonical block at ``number`` (None if not yet mined)."""
+        block = self._call('eth_getBlockByNumber', [hex(number), False])
+        return int(block['timestamp'], 16) if block else None
+    
+    def get_logs(
+        self,
+        from_block: int,
+        to_block: int,
+        addresses: Sequence[str],
+        topics: Sequence[str]
+    ) -> List[Dict[str, Any]]:
+        """Logs of ``addresses`` matching any of ``topics`` in an inclusive block range."""
+        return self._call('eth_getLogs', [{
+            'fromBlock': hex(from_block),
+            'toBlock': hex(to_block),
+            'address': list(addresses),
+            'topics': [list(topics)]
+        }])
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    block_hash TEXT NOT NULL,
+    timestamp INTEGER,
+    tx_hash TEXT,
+    contract TEXT NOT NULL,
+    event TEXT NOT NULL,
+    stream_id TEXT,
+    sender TEXT,
+    recipient TEXT,
+    args_json TEXT NOT NULL,
+    PRIMARY KEY (block_number, log_index)
+);
+CREATE INDEX IF NOT EXISTS events_stream ON events (stream_id);
+CREATE INDEX IF NOT EXISTS events_sender ON events (sender);
+CREATE INDEX IF NOT EXISTS events_recipient ON events (recipient);
+CREATE TABLE IF NOT EXISTS blocks (
+    number INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS checkpoint (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    block_number INTEGER NOT NULL,
+    block_hash TEXT,
+    updated_at INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rewinds (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    block_number INTEGER NOT NULL
+);
+"""
+
+_EVENT_COLUMNS = (
+    'block_number, log_index, block_hash, timestamp, tx_hash, contract, event, stream_id, sender, recipient, args_json'
+)
+
+# Called with the stored rows of each committed range
+CommitListener = Callable[[List[Dict[str, Any]]], None]
+# Called with the block a rewind went back to
+RewindListener = Callable[[int], None]
+
+
+class EventStore:
+    """
+    SQLite store of decoded events, recent block hashes and the checkpoint.
+    
+    Like ``AgentStateStore``, one connection is shared by the indexer
+    thread and request threads and serialized with a lock, in WAL mode.
+    """
+    
+    def __init__(self, path: str):
+        """
+        Open (or create) the store.
+        
+        Args:
+            path: SQLite database file path (``:memory:`` for tests)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(events)")}
+        if 'timestamp' not in columns:
+            # Stores created before block times were recorded
+            self._conn.execute("ALTER TABLE events ADD COLUMN timestamp INTEGER")
+    
+    def checkpoint(self) -> Optional[Tuple[int, Optional[str]]]:
+        """(last processed block, its hash), or None before the first range."""
+        with self._lock:
+            row = self._conn.execute("SELECT block_number, block_hash FROM checkpoint WHERE id = 1").fetchone()
+        return (row[0], row[1]) if row else None
+    
+    def recent_blocks(self) -> List[Tuple[int, str]]:
+        """Recorded (number, hash) pairs, newest first."""
+        with self._lock:
+            return self._conn.execute("SELECT number, hash FROM blocks ORDER BY number DESC").fetchall()
+    
+    def commit_range(
+        self,
+        events: Sequence[Dict[str, Any]],
+        to_block: int,
+        to_hash: Optional[str],
+        keep_blocks: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Store a range's events and advance the checkpoint to ``to_block``, atomically.
+        
+        Claims and cancels of streams whose ``StreamCreated`` is known get
+        the stream's missing sender or recipient filled in, so wallet
+        lookups find them. Block hashes older than ``keep_blocks`` below
+        ``to_block`` are pruned.
+        
+        Returns:
+            The rows as stored
+        """
+        stored = []
+        hashes = {event['block_number']: event['block_hash'] for event in events}
+        if to_hash:
+            hashes[to_block] = to_hash
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                parties = {
+                    event['stream_id']: (event['sender'], event['recipient'])
+                    for event in events if event['event'] == 'StreamCreated'
+                }
+                for event in events:
+                    if event['event'] in ('ClaimedFromStream', 'StreamCanceled'):
+                        sender, recipient = parties.get(event['stream_id']) or self._parties(event['stream_id'])
+                        event = dict(event, sender=event['sender'] or sender, recipient=event['recipient'] or recipient)
+                    self._conn.execute(
+                        f"INSERT OR REPLACE INTO events ({_EVENT_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (event['block_number'], event['log_index'], event['block_hash'], event['timestamp'],
+                         event['tx_hash'], event['contract'], event['event'], event['stream_id'],
+                         event['sender'], event['recipient'], json.dumps(event['args']))
+                    )
+                    stored.append(event)
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO blocks (number, hash) VALUES (?, ?)",
+                    hashes.items()
+                )
+                self._conn.execute("DELETE FROM blocks WHERE number < ?", (to_block - keep_blocks,))
+                self._set_checkpoint(to_block, to_hash)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return stored
+    
+    def rewind(self, block_number: int) -> int:
+        """
+        Drop everything after ``block_number`` and move the checkpoint back to it.
+        
+        Returns:
+            Number of events removed
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                removed = self._conn.execute(
+                    "DELETE FROM events WHERE block_number > ?", (block_number,)
+                ).rowcount
+                self._conn.execute("DELETE FROM blocks WHERE number > ?", (block_number,))
+                row = self._conn.execute("SELECT hash FROM blocks WHERE number = ?", (block_number,)).fetchone()
+                self._set_checkpoint(block_number, row[0] if row else None)
+                self._conn.execute("INSERT INTO rewinds (block_number) VALUES (?)", (block_number,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return removed
+    
+    def rewinds_since(self, rewind_id: int) -> Tuple[int, Optional[int]]:
+        """
+        Rewinds recorded after the one numbered ``rewind_id``.
+        
+        Returns:
+            (number of the latest rewind, lowest block those rewinds went
+            back to, or None if there were none)
+        """
+        with self._lock:
+            latest, lowest = self._conn.execute(
+                "SELECT MAX(id), MIN(block_number) FROM rewinds WHERE id > ?", (rewind_id,)
+            ).fetchone()
+        return (latest if latest is not None else rewind_id), lowest
+    
+    def _parties(self, stream_id: str) -> Tuple[Optional[str], Optional[str]]:
+        row = self._conn.execute(
+            "SELECT sender, recipient FROM events WHERE stream_id = ? AND event = 'StreamCreated'",
+            (stream_id,)
+        ).fetchone()
+        return (row[0], row[1]) if row else (None, None)
+    
+    def _set_checkpoint(self, block_number: int, block_hash: Optional[str]) -> None:
+        self._conn.execute(
+            """
+            INSERT INTO checkpoint (id, block_number, block_hash, updated_at) VALUES (1, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                block_number = excluded.block_number,
+                block_hash = excluded.block_hash,
+                updated_at = excluded.updated_at
+            """,
+            (block_number, block_hash, int(time.time()))
+        )
+    
+    def wallet_events(
+        self,
+        wallet: str,
+        events: Optional[Iterable[str]] = None,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """Events of streams (and properties) the wallet sends or receives, newest first."""
+        wallet = wallet.lower()
+        query = f"SELECT {_EVENT_COLUMNS} FROM events WHERE (sender = ? OR recipient = ?)"
+        params: List[Any] = [wallet, wallet]
+        events = list(events or ())
+        if events:
+            query += f" AND event IN ({', '.join('?' * len(events))})"
+            params.extend(events)
+        query += " ORDER BY block_number DESC, log_index DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._row(row) for row in rows]
+    
+    def stream_events(self, stream_id: int) -> List[Dict[str, Any]]:
+        """Events of one stream, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_EVENT_COLUMNS} FROM events WHERE stream_id = ? ORDER BY block_number, log_index",
+                (str(stream_id),)
+            ).fetchall()
+        return [self._row(row) for row in rows]
+    
+    def iter_events(
+        self,
+        batch_size: int = 10000,
+        after: Tuple[int, int] = (-1, -1)
+    ) -> Iterator[Dict[str, Any]]:
+        """Every stored event after the (block number, log index) ``after``, oldest first, read in batches."""
+        position = after
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"""
+                    SELECT {_EVENT_COLUMNS} FROM events
+                    WHERE (block_number, log_index) > (?, ?)
+                    ORDER BY block_number, log_index LIMIT ?
+                    """,
+                    (*position, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            yield from (self._row(row) for row in rows)
+            position = rows[-1][:2]
+    
+    def earned(self, wallet: str) -> int:
+        """Wei paid out to the wallet as a stream recipient: claims plus balances paid on cancel."""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT event, args_json FROM events
+                WHERE recipient = ? AND event IN ('ClaimedFromStream', 'StreamCanceled')
+                """,
+                (wallet.lower(),)
+            ).fetchall()
+        # uint256 amounts are summed in Python; SQLite integers are 64-bit
+        return sum(
+            int(json.loads(args)['amount' if event == 'ClaimedFromStream' else 'recipient_balance'])
+            for event, args in rows
+        )
+    
+    @staticmethod
+    def _row(row: Tuple[Any, ...]) -> Dict[str, Any]:
+        names = [name.strip() for name in _EVENT_COLUMNS.split(',')]
+        event = dict(zip(names, row))
+        event['args'] = json.loads(event.pop('args_json'))
+        return event
+    
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class IndexerLock:
+    """
+    Elects the one process that indexes a store shared by several processes.
+    
+    ``acquire`` takes an exclusive, non-blocking ``flock`` on a file next
+    to the store and keeps it until ``release`` or process exit, so when
+    the indexing process dies, the next ``acquire`` elsewhere takes over.
+    An in-memory store is private to its process and always acquired.
+    """
+    
+    def __init__(self, path: str):
+        """
+        Args:
+            path: SQLite database file path of the store
+        """
+        self.path = None if path == ':memory:' else f"{path}.lock"
+        self._file = None
+    
+    @property
+    def held(self) -> bool:
+        """Whether this process holds the lock."""
+        return self.path is None or self._file is not None
+    
+    def acquire(self) -> bool:
+        """Take the lock if no other process holds it; True if this process holds it."""
+        if self.held:
+            return True
+        lock_file = open(self.path, 'a')
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._file = lock_file
+        return True
+    
+    def release(self) -> None:
+        """Give up the lock."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class StoreFollower:
+    """
+    Replays an ``EventStore`` to listeners, in step with whichever process indexes it.
+    
+    Each ``poll_once`` first hands ``on_rewind`` the lowest block any
+    rewind recorded since the last poll went back to, then hands
+    ``on_commit`` every event stored after the last one it saw. Events
+    after a rewound block are replayed again, so listeners end up with
+    exactly the store's events however far they lagged.
+    """
+    
+    def __init__(
+        self,
+        store: EventStore,
+        on_commit: CommitListener,
+        on_rewind: RewindListener,
+        batch_size: int = 10000
+    ):
+        """
+        Args:
+            store: Store to follow
+            on_commit: Called with batches of events, oldest first
+            on_rewind: Called with the block a rewind went back to
+            batch_size: Most events per ``on_commit`` call
+        """
+        self.store = store
+        self.on_commit = on_commit
+        self.on_rewind = on_rewind
+        self.batch_size = batch_size
+        # (block number, log index) of the last event replayed
+        self.position = (-1, -1)
+        # Rewinds before the first poll are already reflected in the store
+        self._rewind_id = store.rewinds_since(0)[0]
+        self._lock = threading.Lock()
+    
+    def poll_once(self) -> int:
+        """
+        Replay what changed in the store since the last poll.
+        
+        Returns:
+            Number of events handed to ``on_commit``
+        """
+        with self._lock:
+            self._rewind_id, rewound_to = self.store.rewinds_since(self._rewind_id)
+            if rewound_to is not None:
+                self.on_rewind(rewound_to)
+                # Log index -1 sorts before every event of the next block
+                self.position = min(self.position, (rewound_to + 1, -1))
+            
+            replayed, batch = 0, []
+            for event in self.store.iter_events(self.batch_size, self.position):
+                batch.append(event)
+                if len(batch) >= self.batch_size:
+                    replayed += self._replay(batch)
+                    batch = []
+            return replayed + self._replay(batch)
+    
+    def _replay(self, batch: List[Dict[str, Any]]) -> int:
+        if batch:
+            self.on_commit(batch)
+            self.position = (batch[-1]['block_number'], batch[-1]['log_index'])
+        return len(batch)
+
+
+class EventIndexer:
+    """
+    Pulls contract events into an ``EventStore``, resuming from its checkpoint.
+    
+    ``sync_once`` catches up to the current head; ``start`` runs it every
+    ``poll_seconds`` on a daemon thread, backing off after failures.
+    """
+    
+    def __init__(
+        self,
+        source: Any,
+        store: EventStore,
+        addresses: Sequence[str],
+        start_block: Optional[int] = None,
+        reorg_depth: int = 12,
+        initial_range: int = 500,
+        max_range: int = 5000,
+        poll_seconds: float = 5.0
+    ):
+        """
+        Args:
+            source: Log source with ``block_number``, ``block_hash`` and
+                ``get_logs`` (``JsonRpcLogSource`` or a test double)
+            store: Where events and the checkpoint are written
+            addresses: Contract addresses to index
+            start_block: First block to index when there is no checkpoint
+                (default: the head at the first sync)
+            reorg_depth: Number of recent blocks whose hashes are kept for
+                reorg detection; deeper reorgs rewind by this many blocks
+            initial_range: Blocks per eth_getLogs call to start with
+            max_range: Upper bound on blocks per call
+            poll_seconds: Interval between syncs on the background thread
+        """
+        self.source = source
+        self.store = store
+        self.addresses = [address.lower() for address in addresses]
+        self.start_block = start_block
+        self.reorg_depth = reorg_depth
+        self.max_range = max_range
+        self.block_range = min(initial_range, max_range)
+        self._range_ceiling = max_range
+        self._successes = 0
+        self.poll_seconds = poll_seconds
+        self.head: Optional[int] = None
+        self.reorgs = 0
+        self.last_error: Optional[str] = None
+        self._commit_listeners: List[CommitListener] = []
+        self._rewind_listeners: List[RewindListener] = []
+        self._sync_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def subscribe(
+        self,
+        on_commit: Optional[CommitListener] = None,
+        on_rewind: Optional[RewindListener] = None
+    ) -> None:
+        """Register callbacks run (on the syncing thread) after each committed range or rewind."""
+        if on_commit:
+            self._commit_listeners.append(on_commit)
+        if on_rewind:
+            self._rewind_listeners.append(on_rewind)
+    
+    def sync_once(self) -> int:
+        """
+        Index every block up to the current head.
+        
+        Returns:
+            Number of events stored
+        
+        Raises:
+            RpcError: If the node fails, or refuses even a one-block range
+        """
+        with self._sync_lock:
+            head = self.source.block_number()
+            self.head = head
+            checkpoint = self.store.checkpoint()
+            if checkpoint is None:
+                start = self.start_block if self.start_block is not None else head
+                self.store.rewind(start - 1)
+                checkpoint = (start - 1, None)
+            elif checkpoint[1] and self.source.block_hash(checkpoint[0]) != checkpoint[1]:
+                checkpoint = self._recover_from_reorg(checkpoint[0])
+            
+            stored = 0
+            next_block = checkpoint[0] + 1
+            while next_block <= head:
+                to_block = min(head, next_block + self.block_range - 1)
+                # Hash before logs: if the chain reorgs in between, the
+                # checkpoint hash goes stale and the next sync rewinds
+                to_hash = self.source.block_hash(to_block)
+                try:
+                    logs = self.source.get_logs(next_block, to_block, self.addresses, list(EVENT_TOPICS))
+                except RangeTooLargeError:
+                    if to_block == next_block:
+                        raise
+                    self.block_range = self._range_ceiling = max(1, (to_block - next_block + 1) // 2)
+                    self._successes = 0
+                    metrics.increment('event_indexer_range_splits')
+                    continue
+                
+                events = [event for event in map(decode_log, logs) if event is not None]
+                self._fill_timestamps(events)
+                rows = self.store.commit_range(events, to_block, to_hash, self.reorg_depth)
+                for listener in self._commit_listeners:
+                    listener(rows)
+                stored += len(events)
+                next_block = to_block + 1
+                self._successes += 1
+                if self._successes >= _CEILING_RESET_RANGES:
+                    self._range_ceiling, self._successes = self.max_range, 0
+                self.block_range = min(self._range_ceiling, self.block_range * 2)
+            
+            metrics.increment('event_indexer_events', stored)
+            metrics.set_gauge('event_indexer_block', next_block - 1)
+            self.last_error = None
+            return stored
+    
+    def _fill_timestamps(self, events: List[Dict[str, Any]]) -> None:
+        """Look up block times the node did not include in the logs, once per block."""
+        timestamps: Dict[int, Optional[int]] = {}
+        for event in events:
+            if event['timestamp'] is None:
+                number = event['block_number']
+                if number not in timestamps:
+                    timestamps[number] = self.source.block_timestamp(number)
+                event['timestamp'] = timestamps[number]
+    
+    def _recover_from_reorg(self, checkpoint_block: int) -> Tuple[int, Optional[str]]:
+        """Rewind to the newest recorded block still on the canonical chain."""
+        fork_point = checkpoint_block - self.reorg_depth
+        fork_hash = None
+        for number, block_hash in self.store.recent_blocks():
+            if number < checkpoint_block - self.reorg_depth:
+                break
+            if self.source.block_hash(number) == block_hash:
+                fork_point, fork_hash = number, block_hash
+                break
+        else:
+            logger.warning(f"Reorg deeper than {self.reorg_depth} blocks at block {checkpoint_block}")
+        
+        removed = self.store.rewind(fork_point)
+        for listener in self._rewind_listeners:
+            listener(fork_point)
+        self.reorgs += 1
+        metrics.increment('event_indexer_reorgs')
+        logger.warning(f"Chain reorg: rewound from block {checkpoint_block} to {fork_point}, dropped {removed} events")
+        return fork_point, fork_hash
+    
+    def status(self) -> Dict[str, Any]:
+        """Checkpoint, head and health of the indexer."""
+        checkpoint = self.store.checkpoint()
+        indexed_through = checkpoint[0] if checkpoint else None
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'indexed_through': indexed_through,
+            'head': self.head,
+            'lag_blocks': self.head - indexed_through if self.head is not None and checkpoint else None,
+            'block_range': self.block_range,
+            'reorgs': self.reorgs,
+            'last_error': self.last_error
+        }
+    
+    def start(self) -> None:
+        """Sync on a daemon thread until ``stop`` is called."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='event-indexer', daemon=True)
+        self._thread.start()
+    
+    def _run(self) -> None:
+        failures = 0
+        while not self._stop.is_set():
+            try:
+                self.sync_once()
+                failures = 0
+            except Exception as e:
+                failures += 1
+                self.last_error = str(e)
+                metrics.increment('event_indexer_errors')
+                logger.error(f"Event indexer sync failed: {str(e)}")
+            # Back off exponentially while the node keeps failing
+            self._stop.wait(min(300.0, self.poll_seconds * 2 ** min(failures, 6)))
+    
+    def stop(self) -> None:
+        """Stop the background thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
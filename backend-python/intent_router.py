@@ -0,0 +1,413 @@
+"""
+Recognize queries that are lookups and can be answered without the LLM.
+
+"Status of my agent" or "list 2-bedroom units in Dubai under $2000" have
+one right answer in the service's own data, so sending them through a
+multi-second LLM call only adds latency and cost. ``IntentRouter`` picks
+out such queries:
+
+- rules (regular expressions) catch unambiguous phrasings;
+- a small local model, a nearest-example classifier over hashed
+  embeddings of labelled utterances, catches paraphrases, and is trusted
+  only above a confidence and margin over the "other" class;
+- open-ended requests ("why", "should I", "compare", ...), negations
+  ("without a pool", "my agent is not working"), actions ("cancel my
+  stream"), questions about change or the future ("how can I increase
+  my income") and tax questions are never routed, and a property search
+  is routed only when criteria could be parsed from the query, every
+  place it names is a known city and no number or criterion-like word
+  ("furnished", "sqm", "2 bathrooms") is left unparsed.
+
+Anything not recognized returns None and goes to the LLM as before.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from embeddings import Embedder, HashingEmbedder
+
+AGENT_STATUS = 'agent_status'
+PROPERTY_SEARCH = 'property_search'
+PORTFOLIO = 'portfolio'
+OTHER = 'other'
+
+# Labelled utterances the model is fit on
+EXAMPLES: Dict[str, Tuple[str, ...]] = {
+    AGENT_STATUS: (
+        "what is the status of my agent",
+        "is my agent registered on chain",
+        "is my agent online",
+        "agent status",
+        "check my agent's registration",
+        "is the memory hub connected",
+        "are you registered",
+        "is my agent active",
+    ),
+    PROPERTY_SEARCH: (
+        "list 2 bedroom apartments in dubai",
+        "show me properties in lisbon under 2000",
+        "find listings with a pool",
+        "any studios in lagos",
+        "search for 3 bedroom units with parking",
+        "which properties are available in singapore",
+        "show listings with yield above 8%",
+        "find apartments under $1500 a month",
+        "houses in austin with a gym",
+        "3 bedrooms in austin",
+        "anything in dubai under 2k",
+    ),
+    PORTFOLIO: (
+        "how much have i earned",
+        "show my rental income",
+        "what is my total income from my streams",
+        "portfolio summary",
+        "how much rent did i receive this month",
+        "my earnings so far",
+        "when did i last claim",
+        "show my portfolio",
+    ),
+    OTHER: (
+        "should i invest in dubai or lisbon",
+        "explain how streaming payments work",
+        "write a message to my tenant about the late payment",
+        "what do you think about this neighborhood",
+        "compare these two properties for me",
+        "why did my income drop",
+        "help me negotiate the rent",
+        "what are the risks of buying in lagos",
+        "tell me a joke",
+        "hello",
+        "thanks",
+        "how do i register a property",
+        "what can you do",
+        "summarize our conversation",
+    ),
+}
+
+_OPEN_ENDED = re.compile(
+    r"\b(why|explain|should|would|could you|compare|versus|vs|recommend|suggest|advice|advise|opinion|"
+    r"think|best|worth|risk|risks|predict|forecast|help me|write|draft|negotiate)\b"
+    # How to change something, what will happen, and what changed
+    r"|\bhow\b.*\b(will|would|can|could|might|increase|improve|grow|boost|raise|maximi[sz]e|change|affect|look)\b"
+    r"|\bwhat\b.*\b(happened|affects?|affected|caused|changed|if)\b"
+    r"|\b(dropped|fell|declined|decreased|rose|increased|going to)\b"
+)
+
+# Phrasings the rules and criteria would misread: negations (a price bound
+# such as "no more than" is not one), actions to take, and tax questions
+_COMPARATORS = re.compile(r"\b(?:no|not) (?:more|less|fewer|greater|higher|lower) than\b")
+_NEGATION = re.compile(r"\b(without|except|excluding|other than|apart from|no|not|non|nor|never)\b|n't\b")
+_ACTION = re.compile(
+    r"\b(cancel|stop|pause|resume|register|deregister|unregister|deactivate|delete|remove|withdraw|transfer|"
+    r"send|pay|buy|sell)\b"
+)
+_TAX = re.compile(r"\b(tax(es|ed|able|ation)?|deduct(ion|ions|ible)?)\b")
+
+# A place a search names ("in rome", "near lisbon"); checked against the
+# known cities
+_PLACE = re.compile(r"\b(?:in|near|around)\s+([a-z][a-z'-]*)")
+# Words after "in", "near" or "around" that do not name a place
+_NOT_PLACES = frozenset((
+    'a', 'an', 'the', 'my', 'our', 'your', 'their', 'this', 'that', 'these', 'those', 'it', 'there', 'here',
+    'any', 'some', 'all', 'each', 'every', 'total', 'rent', 'usd', 'dollars', 'eur', 'euros', 'budget',
+    'range', 'town'
+))
+
+_RULES: Tuple[Tuple[str, re.Pattern], ...] = (
+    (AGENT_STATUS, re.compile(
+        r"\b(status|state|health)\b.*\bagent\b|\bagent\b.*\b(status|registered|registration|online|active|initiali[sz]ed)\b"
+        r"|\bare you (registered|online|active)\b"
+    )),
+    (PORTFOLIO, re.compile(
+        r"\bhow much\b.*\b(i|we)\b.*\b(earn|earned|receive|received|make|made|collect|collected)\b"
+        r"|^(please )?(show|list|get|give|display|what is|what's|what are)( me)? (my|our) (total |rental |current )*"
+        r"(income|earnings|portfolio|payouts|rent received|rent collected)\b"
+        r"|^(my|our) (total |rental )*(income|earnings|portfolio|payouts)( so far| summary)?\??$"
+        r"|\bwhen did (i|we) last claim\b"
+    )),
+    (PROPERTY_SEARCH, re.compile(
+        r"^(please )?(list|show|find|search|get|are there|any|anything|which|top \d+|(the )?(cheapest|priciest|"
+        r"most expensive|largest|biggest|highest[- ]yield(ing)?))\b.*"
+        r"\b(propert(y|ies)|listings?|units?|apartments?|flats?|homes?|houses?|villas?|studios?|lofts?|condos?|"
+        r"bed(room)?s?|rentals?)\b"
+    )),
+)
+
+_NUMBER_WORDS = {'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6}
+_COUNT = r"(\d+|one|two|three|four|five|six)"
+_BEDROOMS = r"\s*-?\s*(?:bed(?:room)?s?|br|bd)\b"
+_AMOUNT = r"\$?\s*(\d[\d,]*(?:\.\d+)?)\s*(k)?\b(?!\s*(?:%|-?\s*bed|br\b|bd\b|bath|km|mi\b|year|month|day|week|sq|m2|m\b|ft\b|feet|met(?:er|re)|square))"
+# Rent is monthly, so saying so is not a criterion
+_PER_MONTH = re.compile(r"\b(?:a|per|each|every) month\b|/\s*(?:month|mo)\b|\bmonthly\b")
+# What may not be left over once criteria are parsed: a number or a word
+# naming a criterion the rules do not know
+_UNPARSED = re.compile(
+    r"\d[\d,.]*|\b(furnished|unfurnished|pets?|bath(room)?s?|sq|sqm|sqft|square|m2|ft|feet|met(er|re)s?|km|"
+    r"kilomet(er|re)s?|miles?|within|walk(ing)?|minutes?|mins?|floors?|storeys?|months?|weeks?|nights?|lease|"
+    r"parking|balcon(y|ies)|garden|terrace|views?)\b"
+)
+
+_SORTS = (
+    (re.compile(r"\b(cheapest|lowest (price|rent)|least expensive)\b"), ('price', False)),
+    (re.compile(r"\b(most expensive|priciest|highest (price|rent))\b"), ('price', True)),
+    (re.compile(r"\b(highest|best|top) (annual )?yield(ing)?\b|\bhighest[- ]yielding\b"), ('annual_yield', True)),
+    (re.compile(r"\b(largest|biggest|most bedrooms)\b"), ('bedrooms', True)),
+)
+
+DEFAULT_LIMIT = 5
+
+
+@dataclass(frozen=True)
+class Intent:
+    """A recognized intent and what was parsed for it."""
+    name: str
+    confidence: float
+    source: str
+    slots: Dict[str, Any] = field(default_factory=dict)
+
+
+def _count(text: str) -> int:
+    return _NUMBER_WORDS.get(text) or int(text)
+
+
+def _amount(number: str, thousands: Optional[str]) -> float:
+    value = float(number.replace(',', ''))
+    return value * 1000 if thousands else value
+
+
+def _blank(text: str, match: re.Match) -> str:
+    """``text`` with a match replaced by spaces, keeping the other offsets."""
+    start, end = match.span()
+    return text[:start] + ' ' * (end - start) + text[end:]
+
+
+def _unsupported(text: str, cities: List[str]) -> Optional[str]:
+    """Why a normalized query negates a criterion or names an unknown place, if it does."""
+    if _NEGATION.search(_COMPARATORS.sub(' ', text)):
+        return "the request negates a criterion"
+    # Known cities are blanked out, leaving a mark so "in" does not reach the next word
+    for city in sorted(cities, key=len, reverse=True):
+        text = re.sub(rf"\b{re.escape(city)}\b", '_', text)
+    for match in _PLACE.finditer(text):
+        if match.group(1) not in _NOT_PLACES:
+            return f"'{match.group(1)}' is not a known city"
+    return None
+
+
+def _parse(text: str, cities: List[str], amenities: Iterable[str]) -> Tuple[Dict[str, Any], str]:
+    """
+    Criteria in a normalized query, and the query with what was parsed
+    blanked out.
+    """
+    criteria: Dict[str, Any] = {}
+    remaining = text
+    found_cities = []
+    for city in sorted(cities, key=len, reverse=True):
+        pattern = re.compile(rf"\b{re.escape(city)}\b")
+        if pattern.search(remaining):
+            found_cities.append(city)
+            remaining = pattern.sub(lambda match: ' ' * len(match.group(0)), remaining)
+    if found_cities:
+        criteria['cities'] = found_cities
+    found_amenities = []
+    for amenity in sorted(amenities):
+        matches = list(re.finditer(rf"\b{re.escape(amenity)}s?\b", text))
+        if matches:
+            found_amenities.append(amenity)
+        for match in matches:
+            remaining = _blank(remaining, match)
+    if found_amenities:
+        criteria['amenities'] = found_amenities
+    
+    if match := re.search(r"\bstudios?\b", text):
+        criteria['min_bedrooms'] = criteria['max_bedrooms'] = 0
+    elif match := re.search(rf"\b(?:at least|min(?:imum)?|over) {_COUNT}{_BEDROOMS}|\b{_COUNT}\s*\+{_BEDROOMS}", text):
+        criteria['min_bedrooms'] = _count(match.group(1) or match.group(2))
+    elif match := re.search(rf"\b(?:up to|at most|max(?:imum)?) {_COUNT}{_BEDROOMS}", text):
+        criteria['max_bedrooms'] = _count(match.group(1))
+    elif match := re.search(rf"\b{_COUNT}{_BEDROOMS}", text):
+        criteria['min_bedrooms'] = criteria['max_bedrooms'] = _count(match.group(1))
+    if match:
+        remaining = _blank(remaining, match)
+    
+    if match := re.search(rf"\bbetween {_AMOUNT} and {_AMOUNT}", text):
+        criteria['min_price'] = _amount(match.group(1), match.group(2))
+        criteria['max_price'] = _amount(match.group(3), match.group(4))
+        remaining = _blank(remaining, match)
+    elif match := re.search(rf"\$\s*(\d[\d,]*)\s*(k)?\s*(?:-|to)\s*{_AMOUNT}", text):
+        criteria['min_price'] = _amount(match.group(1), match.group(2))
+        criteria['max_price'] = _amount(match.group(3), match.group(4))
+        remaining = _blank(remaining, match)
+    else:
+        if match := re.search(
+            rf"\b(?:under|below|(?<!no )(?<!not )less than|cheaper than|max(?:imum)?|up to|at most|"
+            rf"no more than|not more than|budget(?: of)?) {_AMOUNT}",
+            text
+        ):
+            criteria['max_price'] = _amount(match.group(1), match.group(2))
+            remaining = _blank(remaining, match)
+        if match := re.search(
+            rf"\b(?:over|above|(?<!no )(?<!not )more than|no less than|not less than|at least|min(?:imum)?|"
+            rf"from) {_AMOUNT}",
+            text
+        ):
+            criteria['min_price'] = _amount(match.group(1), match.group(2))
+            remaining = _blank(remaining, match)
+    for match in _PER_MONTH.finditer(text):
+        remaining = _blank(remaining, match)
+    
+    yield_pattern = (
+        r"\byields?\s*(?:of\s*)?(?:over|above|at least|more than|>=?|min(?:imum)?)?\s*(\d+(?:\.\d+)?)\s*%"
+        r"|(\d+(?:\.\d+)?)\s*%\s*(?:\+|or more)?\s*(?:annual\s*)?yield"
+    )
+    if match := re.search(yield_pattern, text):
+        criteria['min_yield'] = float(match.group(1) or match.group(2))
+        remaining = _blank(remaining, match)
+    
+    for pattern, (sort_by, descending) in _SORTS:
+        if match := pattern.search(text):
+            criteria['sort_by'] = sort_by
+            criteria['descending'] = descending
+            remaining = _blank(remaining, match)
+            break
+    if match := re.search(r"\b(?:top|first) (\d+)\b", text):
+        criteria['limit'] = min(max(int(match.group(1)), 1), 100)
+        remaining = _blank(remaining, match)
+    return criteria, remaining
+
+
+def unsupported_search(query: str, cities: Iterable[str] = (), amenities: Iterable[str] = ()) -> Optional[str]:
+    """
+    Why ``parse_search`` cannot express a query's criteria, if it cannot.
+    
+    Negated criteria ("without a pool", "not in dubai") would be read as
+    required, while a place that is not one of ``cities`` (lowercase), a
+    number the rules do not read ("over 100 sqm", "2 bathrooms") or a
+    criterion they do not know ("furnished") would be dropped, widening
+    the search.
+    
+    Returns:
+        A short reason, or None if the rules can parse the query
+    """
+    text = ' '.join(query.lower().split())
+    cities = list(cities)
+    reason = _unsupported(text, cities)
+    if reason is None:
+        _, remaining = _parse(text, cities, amenities)
+        if match := _UNPARSED.search(remaining):
+            reason = f"'{match.group(0)}' is not a criterion the rules read"
+    return reason
+
+
+def parse_search(
+    query: str,
+    cities: Iterable[str] = (),
+    amenities: Iterable[str] = (),
+    default_limit: Optional[int] = DEFAULT_LIMIT
+) -> Dict[str, Any]:
+    """
+    Property search criteria stated in a query.
+    
+    Cities and amenities are matched against the given vocabularies
+    (lowercase, as the catalog knows them). Returns keyword arguments of
+    ``PropertySearchRequest``; empty if no criterion was found or the
+    query is ``unsupported_search``. ``limit`` is ``default_limit`` unless
+    the query asks for a number of results (left out when None).
+    """
+    text = ' '.join(query.lower().split())
+    cities = list(cities)
+    if _unsupported(text, cities):
+        return {}
+    criteria, remaining = _parse(text, cities, amenities)
+    if _UNPARSED.search(remaining):
+        return {}
+    if not criteria.keys() - {'limit'}:
+        return {}
+    if 'limit' not in criteria and default_limit is not None:
+        criteria['limit'] = default_limit
+    return criteria
+
+
+class IntentRouter:
+    """Rules plus a nearest-example classifier over labelled utterances."""
+    
+    def __init__(
+        self,
+        embedder: Optional[Embedder] = None,
+        use_model: bool = True,
+        min_confidence: float = 0.5,
+        min_margin: float = 0.1
+    ):
+        """
+        Args:
+            embedder: Text embedder for the model (defaults to HashingEmbedder)
+            use_model: Consult the model when no rule matches
+            min_confidence: Lowest similarity to an example the model acts on
+            min_margin: Lowest lead over the closest example of another intent
+        """
+        self.embedder = embedder or HashingEmbedder()
+        self.use_model = use_model
+        self.min_confidence = min_confidence
+        self.min_margin = min_margin
+        labels: List[str] = []
+        texts: List[str] = []
+        for label, examples in EXAMPLES.items():
+            labels.extend([label] * len(examples))
+            texts.extend(examples)
+        self._labels = np.array(labels)
+        self._examples = self.embedder.embed(texts)
+    
+    def predict(self, query: str) -> Tuple[str, float, float]:
+        """The model's (label, similarity to its closest example, margin over the next label)."""
+        scores = self._examples @ self.embedder.embed([query])[0]
+        best = {label: float(scores[self._labels == label].max()) for label in EXAMPLES}
+        ranked = sorted(best.items(), key=lambda item: -item[1])
+        (label, score), (_, runner_up) = ranked[0], ranked[1]
+        return label, score, score - runner_up
+    
+    def classify(
+        self,
+        query: str,
+        cities: Iterable[str] = (),
+        amenities: Iterable[str] = ()
+    ) -> Optional[Intent]:
+        """
+        The intent of a query that can be answered deterministically, if any.
+        
+        Args:
+            query: User query
+            cities: Known cities, for parsing search criteria
+            amenities: Known amenities, for parsing search criteria
+        
+        Returns:
+            Intent with parsed slots, or None to send the query to the LLM
+        """
+        text = ' '.join(query.lower().split())
+        if not text or _OPEN_ENDED.search(text) or _ACTION.search(text) or _TAX.search(text):
+            return None
+        if _NEGATION.search(_COMPARATORS.sub(' ', text)):
+            return None
+        
+        name, confidence, source = None, 1.0, 'rule'
+        for label, pattern in _RULES:
+            if pattern.search(text):
+                name = label
+                break
+        if name is None and self.use_model:
+            label, confidence, margin = self.predict(text)
+            if label != OTHER and confidence >= self.min_confidence and margin >= self.min_margin:
+                name, source = label, 'model'
+        if name is None:
+            return None
+        
+        slots: Dict[str, Any] = {}
+        if name == PROPERTY_SEARCH:
+            slots = parse_search(text, cities, amenities)
+            if not slots:
+                return None
+        elif name == PORTFOLIO:
+            slots = {'granularity': 'week' if re.search(r"\b(this|last) week\b|\bweekly\b", text) else 'month'}
+        return Intent(name, round(confidence, 3), source, slots)
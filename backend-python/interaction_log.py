@@ -0,0 +1,348 @@
+"""
+Append-only, memory-mapped interaction log per agent.
+
+Each agent's interactions are stored locally as length-prefixed JSON
+records so recent context and history pagination can be served from disk
+without re-fetching everything from the Memory Hub. The hub remains the
+source of truth: the log is reconciled against the hub's history whenever
+the manager reads it.
+
+File layout::
+
+    MAGIC (8 bytes) | len (uint32 LE) | Interaction JSON | len | JSON | ...
+"""
+
+import fcntl
+import hashlib
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from models import Interaction
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'CILOG\x00\x01\n'
+_LENGTH = struct.Struct('<I')
+
+
+class InteractionLog:
+    """
+    Append-only log of one agent's interactions.
+    
+    Record offsets are indexed in memory when the log is opened, so appends
+    are O(1) and reading the last N records touches only those records
+    through the memory map.
+    
+    Several processes may share a log. Writers hold an exclusive ``flock``
+    on the file, and every operation first picks up what other processes
+    did since: records they appended (the file grew) are indexed, and a
+    compaction (the path names a new file) reopens the log.
+    """
+    
+    def __init__(self, path: str):
+        """
+        Open (or create) a log file.
+        
+        A torn record left by a crash mid-append is truncated away.
+        
+        Args:
+            path: Log file path
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._offsets: List[int] = []
+        self._mmap: Optional[mmap.mmap] = None
+        self._mapped_size = 0
+        self._end = 0
+        self._file = None
+        
+        with self._lock:
+            self._reopen()
+            with self._writing(refresh=False):
+                if os.fstat(self._file.fileno()).st_size == 0:
+                    self._file.write(MAGIC)
+                    self._file.flush()
+                self._index(0, repair=True)
+    
+    def _reopen(self) -> None:
+        """Open the file the path currently names, unindexed; caller holds the lock."""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+            self._mapped_size = 0
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self.path, 'a+b')
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        self._offsets = []
+        self._end = 0
+    
+    def _refresh(self) -> None:
+        """Pick up appends and compactions made by other processes; caller holds the lock."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if stat.st_ino != self._inode:
+            self._reopen()
+            self._index(0)
+        elif stat.st_size != self._end:
+            self._index(self._end if stat.st_size > self._end else 0)
+    
+    @contextmanager
+    def _writing(self, refresh: bool = True) -> Iterator[None]:
+        """
+        Hold the file's exclusive lock against writers in other processes.
+        
+        A compaction elsewhere may replace the file while this waits for
+        the lock, so the lock is only kept once the path still names the
+        open file. Caller holds the thread lock.
+        """
+        while True:
+            if refresh:
+                self._refresh()
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            if os.stat(self.path).st_ino == self._inode:
+                break
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            refresh = True
+        try:
+            if refresh:
+                self._refresh()
+            yield
+        finally:
+            # After a compaction this is the new file; closing the old one released its lock
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+    
+    def _index(self, position: int, repair: bool = False) -> None:
+        """
+        Index the complete records from ``position`` on (0 for the whole file).
+        
+        An incomplete trailing record is truncated away with ``repair``,
+        which needs the file lock (without it, the record may be another
+        process's append in progress, and is indexed by a later refresh).
+        Caller holds the lock.
+        """
+        size = os.fstat(self._file.fileno()).st_size
+        if size != self._mapped_size:
+            self._remap(size)
+        if position == 0:
+            if self._mmap[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"Not an interaction log: {self.path}")
+            self._offsets = []
+            position = len(MAGIC)
+        
+        while position + _LENGTH.size <= size:
+            (length,) = _LENGTH.unpack_from(self._mmap, position)
+            if position + _LENGTH.size + length > size:
+                break
+            self._offsets.append(position)
+            position += _LENGTH.size + length
+        
+        if position != size and repair:
+            logger.warning(f"Truncating torn record at offset {position} in {self.path}")
+            self._file.truncate(position)
+            self._remap(position)
+        self._end = position
+    
+    def _remap(self, size: int) -> None:
+        """Map the first ``size`` bytes of the file."""
+        if self._mmap is not None:
+            self._mmap.close()
+        self._mmap = mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ)
+        self._mapped_size = size
+    
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._offsets)
+    
+    def append(self, interaction: Interaction) -> int:
+        """
+        Append an interaction.
+        
+        Returns:
+            Index of the new record
+        """
+        payload = interaction.model_dump_json().encode('utf-8')
+        with self._lock, self._writing():
+            return self._append(payload)
+    
+    def _append(self, payload: bytes) -> int:
+        """Write one record at the end; caller holds the lock and the file lock."""
+        self._file.write(_LENGTH.pack(len(payload)) + payload)
+        self._file.flush()
+        self._index(self._end)
+        return len(self._offsets) - 1
+    
+    def _read(self, index: int) -> Interaction:
+        """Decode record ``index``; caller holds the lock."""
+        start = self._offsets[index] + _LENGTH.size
+        (length,) = _LENGTH.unpack_from(self._mmap, self._offsets[index])
+        return Interaction.model_validate_json(self._mmap[start:start + length])
+    
+    def _range(self, start: int, stop: int) -> List[Interaction]:
+        """Records ``[start, stop)``, bounds clamped; caller holds the lock."""
+        start = max(0, start)
+        stop = min(stop, len(self._offsets))
+        return [self._read(i) for i in range(start, stop)]
+    
+    def read_range(self, start: int, stop: int) -> List[Interaction]:
+        """Return records ``[start, stop)`` in append order (bounds are clamped)."""
+        with self._lock:
+            self._refresh()
+            return self._range(start, stop)
+    
+    def tail(self, n: int) -> List[Interaction]:
+        """Return the last ``n`` records in append order."""
+        with self._lock:
+            self._refresh()
+            total = len(self._offsets)
+            return self._range(total - n, total) if n > 0 else []
+    
+    def last_id(self) -> Optional[str]:
+        """Return the ID of the most recent record, or None if the log is empty."""
+        records = self.tail(1)
+        return records[0].id if records else None
+    
+    def sync(self, history: Sequence[Interaction]) -> int:
+        """
+        Append the interactions from the hub's history not yet in the log.
+        
+        ``history`` is the hub's recent window in chronological order. Records
+        after the log's last known ID are appended; if that ID is not in the
+        window, everything not already in the log's tail is appended. The
+        comparison and the appends hold the file lock, so processes syncing
+        the same window do not both append it.
+        
+        Returns:
+            Number of records appended
+        """
+        if not history:
+            return 0
+        
+        with self._lock, self._writing():
+            total = len(self._offsets)
+            last_id = self._read(total - 1).id if total else None
+            ids = [interaction.id for interaction in history]
+            if last_id in ids:
+                new = history[ids.index(last_id) + 1:]
+            else:
+                known = {interaction.id for interaction in self._range(total - len(history), total)}
+                new = [interaction for interaction in history if interaction.id not in known]
+            
+            for interaction in new:
+                self._append(interaction.model_dump_json().encode('utf-8'))
+            return len(new)
+    
+    def compact(self, keep_last: int) -> int:
+        """
+        Rewrite the log keeping only the newest ``keep_last`` records.
+        
+        The compacted file is written beside the log and atomically renamed
+        over it, so a crash mid-compaction leaves the original intact.
+        Other processes reopen the log when they next use it.
+        
+        Returns:
+            Number of records dropped
+        """
+        with self._lock, self._writing():
+            total = len(self._offsets)
+            if total <= keep_last:
+                return 0
+            
+            first = self._offsets[total - keep_last] if keep_last > 0 else self._end
+            tmp_path = self.path + '.compact'
+            with open(tmp_path, 'wb') as tmp:
+                tmp.write(MAGIC)
+                tmp.write(self._mmap[first:self._end])
+                tmp.flush()
+                os.fsync(tmp.fileno())
+            
+            os.replace(tmp_path, self.path)
+            self._reopen()
+            self._index(0)
+            return total - len(self._offsets)
+    
+    def close(self) -> None:
+        """Close the memory map and file."""
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+            self._file.close()
+
+
+class InteractionLogStore:
+    """
+    Directory of per-agent interaction logs.
+    
+    Logs are opened on first use and compacted once they grow to twice
+    ``max_records``, which keeps the amortized cost of compaction per
+    append constant.
+    """
+    
+    def __init__(self, directory: str, max_records: int = 10000):
+        """
+        Args:
+            directory: Directory holding one log file per agent
+            max_records: Records retained per agent after compaction
+        """
+        self.directory = directory
+        self.max_records = max_records
+        self._logs: Dict[str, InteractionLog] = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        
+        logger.info(f"Interaction log store opened: {directory}")
+    
+    def _path(self, agent_id: str) -> str:
+        """Filesystem-safe, collision-free log path for an agent."""
+        safe = re.sub(r'[^A-Za-z0-9_.-]', '_', agent_id)[:64]
+        digest = hashlib.sha1(agent_id.encode('utf-8')).hexdigest()[:12]
+        return os.path.join(self.directory, f"{safe}-{digest}.log")
+    
+    def exists(self, agent_id: str) -> bool:
+        """Whether a log has been written for the agent."""
+        return agent_id in self._logs or os.path.exists(self._path(agent_id))
+    
+    def get(self, agent_id: str) -> InteractionLog:
+        """Return the agent's log, opening or creating it."""
+        with self._lock:
+            log = self._logs.get(agent_id)
+            if log is None:
+                log = InteractionLog(self._path(agent_id))
+                self._logs[agent_id] = log
+            return log
+    
+    def append(self, agent_id: str, interaction: Interaction) -> None:
+        """Append an interaction, compacting the log if it has grown too large."""
+        log = self.get(agent_id)
+        log.append(interaction)
+        self._maybe_compact(agent_id, log)
+    
+    def sync(self, agent_id: str, history: Sequence[Interaction]) -> int:
+        """Reconcile the agent's log with the hub's history window."""
+        log = self.get(agent_id)
+        appended = log.sync(history)
+        if appended:
+            self._maybe_compact(agent_id, log)
+        return appended
+    
+    def _maybe_compact(self, agent_id: str, log: InteractionLog) -> None:
+        if len(log) >= 2 * self.max_records:
+            dropped = log.compact(self.max_records)
+            logger.info(f"Compacted interaction log for agent {agent_id}: dropped {dropped} records")
+    
+    def close(self) -> None:
+        """Close every open log."""
+        with self._lock:
+            for log in self._logs.values():
+                log.close()
+            self._logs.clear()
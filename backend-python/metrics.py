@@ -0,0 +1,95 @@
+"""
+In-process service metrics.
+
+A small thread-safe registry of counters, gauges and distributions,
+exposed as JSON by ``GET /metrics``. Distributions keep exact count, sum
+and max plus a bounded window of recent samples for percentiles, so
+recording is O(1) and memory stays constant under load.
+"""
+
+import threading
+from collections import deque
+from typing import Any, Deque, Dict
+
+import numpy as np
+
+# Samples kept per distribution for percentile estimates
+WINDOW_SIZE = 1024
+
+
+class _Distribution:
+    __slots__ = ('count', 'total', 'maximum', 'window')
+    
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.maximum = float('-inf')
+        self.window: Deque[float] = deque(maxlen=WINDOW_SIZE)
+    
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.maximum = max(self.maximum, value)
+        self.window.append(value)
+    
+    def summary(self) -> Dict[str, float]:
+        p50, p95, p99 = np.percentile(np.fromiter(self.window, dtype=float), [50, 95, 99])
+        return {
+            'count': self.count,
+            'mean': self.total / self.count,
+            'max': self.maximum,
+            'p50': float(p50),
+            'p95': float(p95),
+            'p99': float(p99)
+        }
+
+
+class MetricsRegistry:
+    """Named counters, gauges and distributions."""
+    
+    def __init__(self):
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._distributions: Dict[str, _Distribution] = {}
+        self._lock = threading.Lock()
+    
+    def increment(self, name: str, value: float = 1) -> None:
+        """Add ``value`` to a counter."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+    
+    def set_gauge(self, name: str, value: float) -> None:
+        """Set a gauge to its current value."""
+        with self._lock:
+            self._gauges[name] = value
+    
+    def observe(self, name: str, value: float) -> None:
+        """Record one sample of a distribution."""
+        with self._lock:
+            distribution = self._distributions.get(name)
+            if distribution is None:
+                distribution = self._distributions[name] = _Distribution()
+            distribution.add(value)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Current values of every metric, for serialization."""
+        with self._lock:
+            return {
+                'counters': dict(self._counters),
+                'gauges': dict(self._gauges),
+                'distributions': {
+                    name: distribution.summary()
+                    for name, distribution in self._distributions.items()
+                }
+            }
+    
+    def reset(self) -> None:
+        """Clear every metric."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._distributions.clear()
+
+
+# Process-wide registry shared by the manager and the Flask app
+metrics = MetricsRegistry()
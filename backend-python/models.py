@@ -5,8 +5,49 @@ These models define the structure of API requests and responses,
 providing automatic validation and serialization.
 """
 
-from typing import Optional, Dict, List, Any
-from pydantic import BaseModel, Field
+import json
+from datetime import date
+from functools import lru_cache
+from typing import Optional, Dict, List, Any, Literal, Type, TypeVar
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
+
+ModelT = TypeVar('ModelT', bound=BaseModel)
+
+
+# Agent state models are defined first so the response models below can
+# embed them. AIPAgentManager builds them with ``model_construct``, skipping
+# validation on its internal paths; ``revalidate_instances`` validates them
+# once, when a response model embeds them on the HTTP boundary.
+class Interaction(BaseModel):
+    """Interaction record structure."""
+    model_config = ConfigDict(revalidate_instances='always')
+    
+    id: str = Field(..., description="Unique interaction identifier")
+    userQuery: str = Field(..., description="User query text")
+    agentResponse: str = Field(..., description="Agent response text")
+    timestamp: int = Field(..., description="Interaction timestamp (Unix)")
+    context: Optional[Dict[str, Any]] = Field(default=None, description="Interaction context")
+
+
+class AgentState(BaseModel):
+    """Agent state structure stored in Membase."""
+    model_config = ConfigDict(revalidate_instances='always')
+    
+    version: int = Field(..., description="State version number")
+    createdAt: int = Field(..., description="Creation timestamp (Unix)")
+    updatedAt: int = Field(..., description="Last update timestamp (Unix)")
+    membaseId: str = Field(..., description="Unique agent identifier")
+    walletAddress: str = Field(..., description="BNB Chain wallet address")
+    registeredOnChain: bool = Field(..., description="Whether registered on-chain")
+    preferences: Dict[str, Any] = Field(default_factory=dict, description="User preferences")
+    interactionHistory: List[Interaction] = Field(
+        default_factory=list,
+        description="Interaction history"
+    )
+    goals: List[str] = Field(default_factory=list, description="Agent goals")
+    learnedSummary: str = Field(default="", description="Learned knowledge summary")
+    memoryHubConnected: bool = Field(..., description="Memory Hub connection status")
+    lastSyncTimestamp: int = Field(..., description="Last sync timestamp (Unix)")
 
 
 class RegisterRequest(BaseModel):
@@ -47,14 +88,27 @@ class QueryRequest(BaseModel):
         default=None,
         description="Optional context data"
     )
+    bypass_cache: bool = Field(
+        default=False,
+        description="Skip the response cache and always call the LLM"
+    )
+    priority: Literal['interactive', 'batch'] = Field(
+        default='interactive',
+        description="Scheduling priority when LLM calls are queued"
+    )
 
 
 class QueryResponse(BaseModel):
     """Response model for agent query."""
     success: bool = Field(..., description="Whether query succeeded")
     response: str = Field(..., description="Agent response text")
-    agent_state: Dict[str, Any] = Field(..., description="Updated agent state")
+    agent_state: AgentState = Field(..., description="Updated agent state")
     interaction_id: str = Field(..., description="Unique interaction identifier")
+    cached: bool = Field(default=False, description="Whether the response was served from the cache")
+    intent: Optional[str] = Field(
+        default=None,
+        description="Intent answered without the LLM (agent_status, property_search, portfolio), if any"
+    )
 
 
 class AgentStatus(BaseModel):
@@ -69,10 +123,327 @@ class AgentStatus(BaseModel):
 class AgentMemory(BaseModel):
     """Response model for agent memory."""
     agent_id: str = Field(..., description="Agent identifier")
-    state: Dict[str, Any] = Field(..., description="Agent state data")
+    state: AgentState = Field(..., description="Agent state data")
     last_updated: str = Field(..., description="Last update timestamp (ISO format)")
 
 
+class InteractionHistoryResponse(BaseModel):
+    """Response model for a page of interaction history."""
+    agent_id: str = Field(..., description="Agent identifier")
+    interactions: List[Interaction] = Field(..., description="Interactions, oldest first")
+    total: int = Field(..., description="Total interactions available")
+    next_before: Optional[int] = Field(
+        default=None,
+        description="Cursor for the previous page (pass as 'before'), or null on the first page"
+    )
+
+
+class PropertyListing(BaseModel):
+    """A property in the searchable catalog; extra fields are kept and returned."""
+    model_config = ConfigDict(extra='allow')
+    
+    property_id: str = Field(..., description="Unique property identifier (e.g. the Unibase ID)")
+    city: str = Field(..., description="City the property is in")
+    price: float = Field(..., ge=0, description="Monthly rent in USD")
+    bedrooms: int = Field(..., ge=0, description="Number of bedrooms")
+    annual_yield: float = Field(default=0.0, description="Annual rental yield in percent")
+    amenities: List[str] = Field(default_factory=list, description="Amenities, e.g. 'pool', 'gym'")
+    latitude: Optional[float] = Field(default=None, ge=-90, le=90, description="Latitude in degrees")
+    longitude: Optional[float] = Field(default=None, ge=-180, le=180, description="Longitude in degrees")
+
+
+class PropertyUpsertRequest(BaseModel):
+    """Request model for adding or replacing catalog listings."""
+    properties: List[PropertyListing] = Field(..., description="Listings to index")
+
+
+class BoundingBox(BaseModel):
+    """An area between two parallels and two meridians (west > east crosses the antimeridian)."""
+    south: float = Field(..., ge=-90, le=90, description="Southern latitude in degrees")
+    west: float = Field(..., ge=-180, le=180, description="Western longitude in degrees")
+    north: float = Field(..., ge=-90, le=90, description="Northern latitude in degrees")
+    east: float = Field(..., ge=-180, le=180, description="Eastern longitude in degrees")
+
+
+class PropertySearchRequest(BaseModel):
+    """Structured property search criteria."""
+    cities: Optional[List[str]] = Field(default=None, description="Match any of these cities")
+    amenities: Optional[List[str]] = Field(default=None, description="Require all of these amenities")
+    min_price: Optional[float] = Field(default=None, description="Minimum monthly rent in USD")
+    max_price: Optional[float] = Field(default=None, description="Maximum monthly rent in USD")
+    min_bedrooms: Optional[int] = Field(default=None, description="Minimum number of bedrooms")
+    max_bedrooms: Optional[int] = Field(default=None, description="Maximum number of bedrooms")
+    min_yield: Optional[float] = Field(default=None, description="Minimum annual yield in percent")
+    max_yield: Optional[float] = Field(default=None, description="Maximum annual yield in percent")
+    latitude: Optional[float] = Field(default=None, ge=-90, le=90, description="Latitude to search around")
+    longitude: Optional[float] = Field(default=None, ge=-180, le=180, description="Longitude to search around")
+    radius_km: Optional[float] = Field(
+        default=None,
+        gt=0,
+        description="Only listings within this distance of latitude/longitude"
+    )
+    bounding_box: Optional[BoundingBox] = Field(default=None, description="Only listings inside this area")
+    sort_by: Optional[Literal['price', 'bedrooms', 'annual_yield', 'distance']] = Field(
+        default=None,
+        description="Field to order results by ('distance' needs latitude/longitude)"
+    )
+    descending: bool = Field(default=False, description="Order from the highest value")
+    limit: int = Field(default=20, ge=1, le=100, description="Maximum number of results")
+    offset: int = Field(default=0, ge=0, description="Number of matching results to skip")
+
+
+class PropertySearchResponse(BaseModel):
+    """Response model for a property search."""
+    success: bool = Field(..., description="Whether the search succeeded")
+    total: int = Field(..., description="Total listings matching the criteria")
+    properties: List[Dict[str, Any]] = Field(..., description="Page of matching listings")
+    took_ms: float = Field(..., description="Search time in milliseconds")
+
+
+class CriteriaCompileRequest(BaseModel):
+    """Request model for compiling a free-text property request into search criteria."""
+    query: str = Field(..., min_length=1, max_length=2000, description="Free-text property request")
+    search: bool = Field(default=False, description="Also run the search and return its results")
+    bypass_cache: bool = Field(default=False, description="Compile again instead of reusing cached criteria")
+
+
+class CriteriaCompileResponse(BaseModel):
+    """Response model for compiled search criteria."""
+    success: bool = Field(..., description="Whether the request was compiled")
+    criteria: Dict[str, Any] = Field(..., description="PropertySearchRequest fields stated by the request")
+    source: Literal['cache', 'llm', 'rules'] = Field(
+        ...,
+        description="Where the criteria came from: the cache, the LLM, or the rule parser (without an LLM)"
+    )
+    took_ms: float = Field(..., description="Compilation time in milliseconds")
+    total: Optional[int] = Field(default=None, description="Total matching listings, when searched")
+    properties: Optional[List[Dict[str, Any]]] = Field(default=None, description="Page of matching listings, when searched")
+
+
+class RecommendationRequest(BaseModel):
+    """Request model for property recommendations."""
+    agent_id: str = Field(..., description="Agent whose preferences and history are matched")
+    query: Optional[str] = Field(default=None, description="Free-text wishes blended into the profile")
+    exclude: Optional[List[str]] = Field(default=None, description="Property IDs to leave out (e.g. already shown)")
+    limit: int = Field(default=20, ge=1, le=100, description="Maximum number of results")
+
+
+class RecommendationResponse(BaseModel):
+    """Response model for property recommendations."""
+    success: bool = Field(..., description="Whether the ranking succeeded")
+    agent_id: str = Field(..., description="Agent the listings were ranked for")
+    properties: List[Dict[str, Any]] = Field(
+        ...,
+        description="Listings, best first, each with its cosine similarity 'score'"
+    )
+    took_ms: float = Field(..., description="Ranking time in milliseconds")
+
+
+class StreamRecord(BaseModel):
+    """A StreamingProtocol stream as stored on-chain (amounts in wei)."""
+    stream_id: int = Field(..., ge=0, lt=2**63, description="On-chain stream ID")
+    sender: str = Field(..., description="Address funding the stream")
+    recipient: str = Field(..., description="Address receiving the stream")
+    total_amount: int = Field(..., ge=0, lt=2**256, description="Deposited amount in wei")
+    flow_rate: int = Field(..., ge=0, lt=2**256, description="Wei streamed per second")
+    start_time: int = Field(..., ge=0, lt=2**62, description="Start timestamp (Unix)")
+    stop_time: int = Field(..., ge=0, lt=2**62, description="Stop timestamp (Unix)")
+    amount_withdrawn: int = Field(default=0, ge=0, lt=2**256, description="Wei already claimed")
+    is_active: bool = Field(default=True, description="False once the stream was canceled")
+
+
+class StreamUpsertRequest(BaseModel):
+    """Request model for adding or replacing streams."""
+    streams: List[StreamRecord] = Field(..., description="Streams to store")
+
+
+class RingView(BaseModel):
+    """The dispatcher's hash ring, pushed to workers on every change."""
+    version: int = Field(..., ge=1, description="Ring version; increases with every change")
+    nodes: List[str] = Field(..., description="Worker names on the ring")
+    vnodes: int = Field(..., ge=1, description="Virtual points per worker")
+
+
+class StreamBalancesRequest(BaseModel):
+    """Bulk stream balance query."""
+    timestamp: Optional[int] = Field(
+        default=None,
+        ge=0,
+        lt=2**62,
+        description="Unix time to compute balances at (default: now)"
+    )
+    stream_ids: Optional[List[int]] = Field(default=None, description="Streams to include (default: all)")
+    recipient: Optional[str] = Field(default=None, description="Only streams paying this address")
+    include_streams: bool = Field(default=True, description="Return per-stream balances, not only totals")
+
+
+class StreamBalance(BaseModel):
+    """Balances of one stream; wei amounts are decimal strings."""
+    stream_id: int = Field(..., description="On-chain stream ID")
+    claimable: str = Field(..., description="Wei the recipient can claim now")
+    streamed: str = Field(..., description="Wei streamed to the recipient since the start")
+    remaining: str = Field(..., description="Wei refunded to the sender if canceled now")
+
+
+class StreamBalancesResponse(BaseModel):
+    """Response model for a bulk stream balance query."""
+    success: bool = Field(..., description="Whether the query succeeded")
+    timestamp: int = Field(..., description="Unix time the balances are computed at")
+    count: int = Field(..., description="Number of streams included")
+    balances: List[StreamBalance] = Field(default_factory=list, description="Per-stream balances")
+    totals: Dict[str, str] = Field(..., description="Summed claimable, streamed, remaining and current flow_rate in wei")
+    missing: List[int] = Field(default_factory=list, description="Requested stream IDs that are not stored")
+
+
+class SimulatedStream(BaseModel):
+    """A stream described directly, for what-if simulations."""
+    flow_rate: int = Field(..., ge=0, lt=2**256, description="Wei streamed per second")
+    remaining_seconds: int = Field(..., ge=0, description="Seconds of flow left")
+    delay_seconds: int = Field(default=0, ge=0, description="Seconds until the flow starts")
+    occupancy: Optional[float] = Field(default=None, ge=0, le=1, description="Probability a period is paid")
+    cancel_probability: Optional[float] = Field(
+        default=None,
+        ge=0,
+        le=1,
+        description="Probability the stream is canceled within a year"
+    )
+
+
+class YieldSimulationRequest(BaseModel):
+    """Monte Carlo income simulation over stored and/or described streams."""
+    streams: Optional[List[SimulatedStream]] = Field(default=None, description="Streams described directly")
+    stream_ids: Optional[List[int]] = Field(default=None, description="Stored streams to include")
+    recipient: Optional[str] = Field(default=None, description="Include the stored streams paying this address")
+    occupancy: float = Field(default=1.0, ge=0, le=1, description="Default probability a period is paid")
+    cancel_probability: float = Field(
+        default=0.0,
+        ge=0,
+        le=1,
+        description="Default probability a stream is canceled within a year"
+    )
+    horizon_days: int = Field(default=365, ge=1, le=3650, description="Days to simulate")
+    period_days: int = Field(default=30, ge=1, le=365, description="Days per vacancy period and band point")
+    scenarios: int = Field(default=10000, ge=100, le=100000, description="Number of scenarios")
+    seed: Optional[int] = Field(default=None, ge=0, description="Random seed for reproducible results")
+
+
+class IncomeBand(BaseModel):
+    """Cumulative income percentiles at the end of a period (wei, decimal strings)."""
+    day: int = Field(..., description="Days from now")
+    p5: str
+    p25: str
+    p50: str
+    p75: str
+    p95: str
+
+
+class YieldSimulationResponse(BaseModel):
+    """Response model for an income simulation."""
+    success: bool = Field(..., description="Whether the simulation succeeded")
+    streams: int = Field(..., description="Number of streams simulated")
+    missing: List[int] = Field(default_factory=list, description="Requested stream IDs that are not stored")
+    scenarios: int = Field(..., description="Number of scenarios")
+    horizon_days: int = Field(..., description="Days simulated")
+    contracted: str = Field(..., description="Wei paid over the horizon with full occupancy and no cancellations")
+    expected: str = Field(..., description="Mean simulated income in wei")
+    percentiles: Dict[str, str] = Field(..., description="Income percentiles over the horizon (p5 ... p95) in wei")
+    bands: List[IncomeBand] = Field(..., description="Cumulative income percentiles per period")
+    took_ms: float = Field(..., description="Simulation time in milliseconds")
+
+
+ChainEventName = Literal['StreamCreated', 'ClaimedFromStream', 'StreamCanceled', 'PropertyRegistered']
+
+
+class WalletEventsRequest(BaseModel):
+    """Query for the indexed on-chain events of a wallet."""
+    wallet: str = Field(..., description="Wallet address (stream sender, recipient or property owner)")
+    events: Optional[List[ChainEventName]] = Field(default=None, description="Only these event types")
+    limit: int = Field(default=50, ge=1, le=500, description="Maximum number of events")
+
+
+class ChainEvent(BaseModel):
+    """A decoded StreamingProtocol or PropertyRegistry event."""
+    block_number: int = Field(..., description="Block the event was emitted in")
+    log_index: int = Field(..., description="Position of the log in the block")
+    block_hash: str = Field(..., description="Hash of the block")
+    tx_hash: Optional[str] = Field(default=None, description="Transaction hash")
+    contract: str = Field(..., description="Emitting contract address")
+    event: str = Field(..., description="Event name")
+    stream_id: Optional[str] = Field(default=None, description="Stream the event belongs to")
+    sender: Optional[str] = Field(default=None, description="Address funding the stream")
+    recipient: Optional[str] = Field(default=None, description="Address receiving the stream (property owner)")
+    args: Dict[str, Any] = Field(..., description="Event arguments; uint256 values as decimal strings")
+
+
+class WalletEventsResponse(BaseModel):
+    """Response model for a wallet's indexed events."""
+    success: bool = Field(..., description="Whether the query succeeded")
+    wallet: str = Field(..., description="Wallet address (lowercase)")
+    events: List[ChainEvent] = Field(..., description="Events, newest first")
+    earned: str = Field(..., description="Wei paid to the wallet as a stream recipient (claims and cancels)")
+    indexed_through: Optional[int] = Field(default=None, description="Last block the indexer has processed")
+
+
+class PortfolioRequest(BaseModel):
+    """Query for a wallet's income analytics."""
+    wallet: str = Field(..., description="Wallet address receiving rental streams")
+    granularity: Literal['day', 'week', 'month'] = Field(default='day', description="Income series bucket size")
+    start: Optional[date] = Field(default=None, description="First day of the series (default: first income)")
+    end: Optional[date] = Field(default=None, description="Last day of the series (default: last income)")
+
+
+class IncomePoint(BaseModel):
+    """Income in one period; wei amounts are decimal strings."""
+    period: str = Field(..., description="First day of the period (ISO date)")
+    income: str = Field(..., description="Wei received in the period")
+    cumulative: str = Field(..., description="Wei received up to the end of the period")
+
+
+class PropertyPerformance(BaseModel):
+    """Income from one stream and the property registered with it."""
+    stream_id: str = Field(..., description="On-chain stream ID")
+    token_id: Optional[str] = Field(default=None, description="Property NFT token ID")
+    unibase_id: Optional[str] = Field(default=None, description="Unibase Memory ID of the property")
+    status: Literal['active', 'canceled'] = Field(..., description="Stream status")
+    total_amount: Optional[str] = Field(default=None, description="Wei deposited into the stream")
+    received: str = Field(..., description="Wei received from the stream")
+    received_ratio: Optional[float] = Field(default=None, description="Share of the deposit received")
+    claims: int = Field(..., description="Number of claims")
+    created_at: Optional[int] = Field(default=None, description="Stream creation time (Unix)")
+    last_income_at: Optional[int] = Field(default=None, description="Time of the last claim or cancel payout (Unix)")
+    annualized_income: Optional[str] = Field(
+        default=None,
+        description="Wei received per year since creation (until cancel or now)"
+    )
+    annualized_yield: Optional[float] = Field(
+        default=None,
+        description="Annualized income as a share of the deposit (0.08 is 8% a year)"
+    )
+
+
+class ClaimCadence(BaseModel):
+    """How often a wallet claims its streams."""
+    claims: int = Field(..., description="Number of claims")
+    first_claim_at: Optional[int] = Field(default=None, description="Time of the first claim (Unix)")
+    last_claim_at: Optional[int] = Field(default=None, description="Time of the last claim (Unix)")
+    mean_interval_days: Optional[float] = Field(default=None, description="Mean days between claims")
+    median_interval_days: Optional[float] = Field(default=None, description="Median days between claims")
+    days_since_last_claim: Optional[float] = Field(default=None, description="Days since the last claim")
+
+
+class PortfolioResponse(BaseModel):
+    """Response model for a wallet's income analytics."""
+    success: bool = Field(..., description="Whether the query succeeded")
+    wallet: str = Field(..., description="Wallet address (lowercase)")
+    granularity: str = Field(..., description="Income series bucket size")
+    total_income: str = Field(..., description="Wei received over the wallet's lifetime")
+    income: List[IncomePoint] = Field(..., description="Income per period, oldest first")
+    properties: List[PropertyPerformance] = Field(..., description="Income per stream and property")
+    claim_cadence: ClaimCadence = Field(..., description="Claim frequency")
+    indexed_through: Optional[int] = Field(default=None, description="Last block the indexer has processed")
+    took_ms: float = Field(..., description="Computation time in milliseconds")
+
+
 class ErrorDetail(BaseModel):
     """Error detail structure."""
     code: str = Field(..., description="Error code")
@@ -87,29 +458,54 @@ class ErrorResponse(BaseModel):
     error: Dict[str, Any] = Field(..., description="Error information")
 
 
-class AgentState(BaseModel):
-    """Agent state structure stored in Membase."""
-    version: int = Field(..., description="State version number")
-    createdAt: int = Field(..., description="Creation timestamp (Unix)")
-    updatedAt: int = Field(..., description="Last update timestamp (Unix)")
-    membaseId: str = Field(..., description="Unique agent identifier")
-    walletAddress: str = Field(..., description="BNB Chain wallet address")
-    registeredOnChain: bool = Field(..., description="Whether registered on-chain")
-    preferences: Dict[str, Any] = Field(default_factory=dict, description="User preferences")
-    interactionHistory: List[Dict[str, Any]] = Field(
-        default_factory=list,
-        description="Interaction history"
-    )
-    goals: List[str] = Field(default_factory=list, description="Agent goals")
-    learnedSummary: str = Field(default="", description="Learned knowledge summary")
-    memoryHubConnected: bool = Field(..., description="Memory Hub connection status")
-    lastSyncTimestamp: int = Field(..., description="Last sync timestamp (Unix)")
+@lru_cache(maxsize=None)
+def request_adapter(model: Type[ModelT]) -> TypeAdapter:
+    """
+    Return the cached TypeAdapter for a request model.
+    
+    The adapter's validator is compiled once per model; routes validate the
+    raw request body with ``validate_json`` instead of parsing to a dict and
+    re-walking it with ``Model(**data)``.
+    """
+    return TypeAdapter(model)
 
 
-class Interaction(BaseModel):
-    """Interaction record structure."""
-    id: str = Field(..., description="Unique interaction identifier")
-    userQuery: str = Field(..., description="User query text")
-    agentResponse: str = Field(..., description="Agent response text")
-    timestamp: int = Field(..., description="Interaction timestamp (Unix)")
-    context: Optional[Dict[str, Any]] = Field(default=None, description="Interaction context")
+def parse_request(model: Type[ModelT], body: bytes) -> ModelT:
+    """
+    Validate a raw JSON request body against a request model.
+    
+    Raises:
+        pydantic.ValidationError: If the body is not valid JSON or does not
+            match the model (a ValueError subclass)
+    """
+    return request_adapter(model).validate_json(body or b'null')
+
+
+@lru_cache(maxsize=128)
+def _error_prefix(code: str) -> str:
+    """Serialized start of an error envelope, up to the message value."""
+    return '{"success":false,"error":{"code":%s,"message":' % json.dumps(code)
+
+
+_RETRYABLE_SUFFIX = {
+    True: ',"retryable":true}}',
+    False: ',"retryable":false}}'
+}
+
+
+def error_body(
+    code: str,
+    message: str,
+    retryable: bool,
+    details: Optional[Dict[str, Any]] = None
+) -> str:
+    """
+    Serialize an ErrorResponse envelope from pre-built templates.
+    
+    Produces the same JSON as ``ErrorResponse(...).model_dump()`` without
+    constructing a model per error.
+    """
+    body = _error_prefix(code) + json.dumps(message)
+    if details is not None:
+        body += ',"details":' + json.dumps(details, default=str)
+    return body + _RETRYABLE_SUFFIX[bool(retryable)]
@@ -0,0 +1,316 @@
+"""
+Portfolio analytics over indexed stream events.
+
+``Portfolio`` follows the event indexer and keeps recipients' income (claims
+and the balances paid out when a stream is canceled) in columnar NumPy
+arrays, plus per-wallet, per-day income rollups maintained as events
+arrive. A wallet's cumulative income series at day, week or month
+granularity is a bucketed cumulative sum over its rollup days, and the
+per-property yield and claim cadence are vectorized over the wallet's rows,
+so portfolio questions never walk raw history.
+
+Amounts are uint256 wei, so amount arrays have object dtype holding Python
+ints and sums stay exact.
+"""
+
+import threading
+import time
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+SECONDS_PER_DAY = 86400
+SECONDS_PER_YEAR = 365 * SECONDS_PER_DAY
+GRANULARITIES = ('day', 'week', 'month')
+
+# Day number of 1970-01-05, the first Monday after the epoch; weeks start on Mondays
+_FIRST_MONDAY = 4
+
+_INCOME_FIELDS = ('wallet', 'stream_id', 'block_number', 'timestamp', 'is_claim', 'amount')
+_INCOME_DTYPES = {
+    'wallet': np.int32,
+    'stream_id': np.int64,
+    'block_number': np.int64,
+    'timestamp': np.int64,
+    'is_claim': bool,
+    'amount': object
+}
+
+
+def _day_number(value: date) -> int:
+    return (value - date(1970, 1, 1)).days
+
+
+def _period_starts(days: np.ndarray, granularity: str) -> np.ndarray:
+    """Day number of the day, week (Monday) or month each day falls in."""
+    if granularity == 'day':
+        return days
+    if granularity == 'week':
+        return days - (days - _FIRST_MONDAY) % 7
+    return days.astype('datetime64[D]').astype('datetime64[M]').astype('datetime64[D]').astype(np.int64)
+
+
+def _period_range(first: int, last: int, granularity: str) -> np.ndarray:
+    """Start days of every period from the one containing ``first`` to the one containing ``last``."""
+    first, last = _period_starts(np.array([first, last], dtype=np.int64), granularity)
+    if granularity == 'month':
+        months = np.arange(
+            np.datetime64(int(first), 'D').astype('datetime64[M]'),
+            np.datetime64(int(last), 'D').astype('datetime64[M]') + 1
+        )
+        return months.astype('datetime64[D]').astype(np.int64)
+    return np.arange(first, last + 1, 7 if granularity == 'week' else 1, dtype=np.int64)
+
+
+class Portfolio:
+    """
+    In-memory income store with per-day rollups, fed by ``EventIndexer``.
+    
+    ``apply`` takes committed event rows and ``rewind`` drops everything
+    after a block, matching ``EventIndexer.subscribe``. Thread-safe.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wallets: Dict[str, int] = {}
+        # stream_id -> parties, deposit, lifecycle times and registered property
+        self._streams: Dict[int, Dict[str, Any]] = {}
+        self._columns: Dict[str, np.ndarray] = {
+            field: np.empty(0, dtype=dtype) for field, dtype in _INCOME_DTYPES.items()
+        }
+        # Rows appended since the columns were last rebuilt
+        self._pending: List[Tuple[Any, ...]] = []
+        # wallet code -> {day number: income}, and its sorted array form
+        self._daily: Dict[int, Dict[int, int]] = {}
+        self._rollups: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+    
+    def load(self, events: Iterable[Dict[str, Any]], batch_size: int = 10000) -> None:
+        """Apply stored events (oldest first), e.g. from ``EventStore.iter_events``."""
+        batch = []
+        for event in events:
+            batch.append(event)
+            if len(batch) >= batch_size:
+                self.apply(batch)
+                batch = []
+        self.apply(batch)
+    
+    def apply(self, events: Iterable[Dict[str, Any]]) -> None:
+        """Record event rows of a committed range."""
+        with self._lock:
+            for event in events:
+                self._apply(event)
+    
+    def _apply(self, event: Dict[str, Any]) -> None:
+        stream_id = int(event['stream_id'])
+        stream = self._streams.setdefault(stream_id, {'stream_id': stream_id})
+        args = event['args']
+        kind = event['event']
+        if kind == 'StreamCreated':
+            stream.update(
+                sender=event['sender'],
+                recipient=event['recipient'],
+                total_amount=int(args['total_amount']),
+                created_at=event['timestamp'],
+                created_block=event['block_number']
+            )
+            return
+        if kind == 'PropertyRegistered':
+            stream.update(
+                token_id=args['token_id'],
+                unibase_id=args['unibase_id'],
+                registered_block=event['block_number']
+            )
+            return
+        if kind == 'StreamCanceled':
+            stream.update(canceled_at=event['timestamp'], canceled_block=event['block_number'])
+            amount = int(args['recipient_balance'])
+        else:
+            amount = int(args['amount'])
+        
+        recipient = event['recipient'] or stream.get('recipient')
+        if not recipient or event['timestamp'] is None or amount == 0:
+            return
+        wallet = self._wallets.setdefault(recipient.lower(), len(self._wallets))
+        self._pending.append(
+            (wallet, stream_id, event['block_number'], event['timestamp'], kind == 'ClaimedFromStream', amount)
+        )
+        daily = self._daily.setdefault(wallet, {})
+        day = event['timestamp'] // SECONDS_PER_DAY
+        daily[day] = daily.get(day, 0) + amount
+        self._rollups.pop(wallet, None)
+    
+    def rewind(self, block_number: int) -> None:
+        """Drop everything recorded after ``block_number`` (after a chain reorg)."""
+        with self._lock:
+            self._flush()
+            kept = self._columns['block_number'] <= block_number
+            self._columns = {field: column[kept] for field, column in self._columns.items()}
+            
+            for stream_id, stream in list(self._streams.items()):
+                if stream.get('created_block', -1) > block_number:
+                    del self._streams[stream_id]
+                    continue
+                if stream.get('canceled_block', -1) > block_number:
+                    for key in ('canceled_at', 'canceled_block'):
+                        stream.pop(key)
+                if stream.get('registered_block', -1) > block_number:
+                    for key in ('token_id', 'unibase_id', 'registered_block'):
+                        stream.pop(key)
+            
+            # Rebuild the rollups from the rows that remain
+            self._daily, self._rollups = {}, {}
+            days = self._columns['timestamp'] // SECONDS_PER_DAY
+            for wallet, day, amount in zip(self._columns['wallet'].tolist(), days.tolist(), self._columns['amount']):
+                daily = self._daily.setdefault(wallet, {})
+                daily[day] = daily.get(day, 0) + amount
+    
+    def _flush(self) -> None:
+        """Merge pending rows into the columns."""
+        if not self._pending:
+            return
+        batch = list(zip(*self._pending))
+        self._columns = {
+            field: np.concatenate([self._columns[field], np.array(values, dtype=_INCOME_DTYPES[field])])
+            for field, values in zip(_INCOME_FIELDS, batch)
+        }
+        self._pending = []
+    
+    def _rollup(self, wallet: int) -> Tuple[np.ndarray, np.ndarray]:
+        """The wallet's daily income as (sorted day numbers, amounts)."""
+        if wallet not in self._rollups:
+            daily = self._daily.get(wallet, {})
+            days = np.array(sorted(daily), dtype=np.int64)
+            amounts = np.array([daily[day] for day in days.tolist()], dtype=object)
+            self._rollups[wallet] = (days, amounts)
+        return self._rollups[wallet]
+    
+    def report(
+        self,
+        wallet: str,
+        granularity: str = 'day',
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        now: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Income analytics of a wallet as a stream recipient.
+        
+        Args:
+            wallet: Recipient address
+            granularity: Series bucket: ``day``, ``week`` (from Monday) or ``month``
+            start: First day of the series (default: the first income)
+            end: Last day of the series (default: the last income)
+            now: Unix time for "days since" and annualized figures (default: now)
+        
+        Returns:
+            Dict with ``total_income``, the ``income`` series (one point per
+            period with the period's income and the lifetime cumulative
+            income at its end), per-property ``properties`` and
+            ``claim_cadence``; wei amounts are Python ints
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+        now = time.time() if now is None else now
+        with self._lock:
+            self._flush()
+            code = self._wallets.get(wallet.lower())
+            if code is None:
+                days, amounts = np.empty(0, dtype=np.int64), np.empty(0, dtype=object)
+                rows = {field: column[:0] for field, column in self._columns.items()}
+            else:
+                days, amounts = self._rollup(code)
+                selected = np.flatnonzero(self._columns['wallet'] == code)
+                rows = {field: column[selected] for field, column in self._columns.items()}
+            streams = [
+                dict(stream) for stream in self._streams.values()
+                if (stream.get('recipient') or '').lower() == wallet.lower()
+            ]
+        
+        return {
+            'total_income': int(amounts.sum()) if len(amounts) else 0,
+            'income': self._series(days, amounts, granularity, start, end),
+            'properties': self._properties(streams, rows, now),
+            'claim_cadence': self._cadence(rows, now)
+        }
+    
+    @staticmethod
+    def _series(
+        days: np.ndarray,
+        amounts: np.ndarray,
+        granularity: str,
+        start: Optional[date],
+        end: Optional[date]
+    ) -> List[Dict[str, Any]]:
+        first = _day_number(start) if start else (int(days[0]) if len(days) else None)
+        last = _day_number(end) if end else (int(days[-1]) if len(days) else None)
+        if first is None or last is None or first > last:
+            return []
+        
+        lo, hi = np.searchsorted(days, first), np.searchsorted(days, last, side='right')
+        periods = _period_range(first, last, granularity)
+        income = np.zeros(len(periods), dtype=object)
+        if hi > lo:
+            keys = _period_starts(days[lo:hi], granularity)
+            boundaries = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+            income[np.searchsorted(periods, keys[boundaries])] = np.add.reduceat(amounts[lo:hi], boundaries)
+        cumulative = np.cumsum(income) + (amounts[:lo].sum() if lo else 0)
+        
+        labels = periods.astype('datetime64[D]').astype(str).tolist()
+        return [
+            {'period': label, 'income': int(value), 'cumulative': int(total)}
+            for label, value, total in zip(labels, income.tolist(), cumulative.tolist())
+        ]
+    
+    @staticmethod
+    def _properties(streams: List[Dict[str, Any]], rows: Dict[str, np.ndarray], now: float) -> List[Dict[str, Any]]:
+        """Received income, claims and annualized realized income and yield per stream (and its property)."""
+        order = np.argsort(rows['stream_id'], kind='stable')
+        stream_ids = rows['stream_id'][order]
+        boundaries = np.flatnonzero(np.r_[True, stream_ids[1:] != stream_ids[:-1]]) if len(order) else order
+        received = np.add.reduceat(rows['amount'][order], boundaries) if len(order) else []
+        claims = np.add.reduceat(rows['is_claim'][order].astype(np.int64), boundaries) if len(order) else []
+        last_income = np.maximum.reduceat(rows['timestamp'][order], boundaries) if len(order) else []
+        per_stream = {
+            int(stream_id): (int(total), int(count), int(last))
+            for stream_id, total, count, last in zip(stream_ids[boundaries].tolist(), received, claims, last_income)
+        }
+        
+        properties = []
+        for stream in sorted(streams, key=lambda stream: stream['stream_id']):
+            total_received, claim_count, last_income_at = per_stream.get(stream['stream_id'], (0, 0, None))
+            total_amount = stream.get('total_amount')
+            created_at = stream.get('created_at')
+            held_until = stream.get('canceled_at') or now
+            annualized = None
+            if created_at is not None and held_until > created_at:
+                annualized = total_received * SECONDS_PER_YEAR // int(held_until - created_at)
+            properties.append({
+                'stream_id': str(stream['stream_id']),
+                'token_id': stream.get('token_id'),
+                'unibase_id': stream.get('unibase_id'),
+                'status': 'canceled' if stream.get('canceled_at') is not None else 'active',
+                'total_amount': total_amount,
+                'received': total_received,
+                'received_ratio': total_received / total_amount if total_amount else None,
+                'claims': claim_count,
+                'created_at': created_at,
+                'last_income_at': last_income_at,
+                'annualized_income': annualized,
+                'annualized_yield': annualized / total_amount if annualized is not None and total_amount else None
+            })
+        return properties
+    
+    @staticmethod
+    def _cadence(rows: Dict[str, np.ndarray], now: float) -> Dict[str, Any]:
+        """How often the wallet claims: count, first/last claim and intervals in days."""
+        claimed_at = np.sort(rows['timestamp'][rows['is_claim']])
+        intervals = np.diff(claimed_at) / SECONDS_PER_DAY
+        return {
+            'claims': len(claimed_at),
+            'first_claim_at': int(claimed_at[0]) if len(claimed_at) else None,
+            'last_claim_at': int(claimed_at[-1]) if len(claimed_at) else None,
+            'mean_interval_days': round(float(intervals.mean()), 3) if len(intervals) else None,
+            'median_interval_days': round(float(np.median(intervals)), 3) if len(intervals) else None,
+            'days_since_last_claim': round(float(now - claimed_at[-1]) / SECONDS_PER_DAY, 3) if len(claimed_at) else None
+        }
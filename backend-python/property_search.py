@@ -0,0 +1,551 @@
+"""
+In-memory search over the property catalog.
+
+Agents matching "2-bedroom apartment in Dubai under $2000" turn the request
+into structured criteria; this module answers them without scanning the
+catalog or pasting listings into the prompt.
+
+Listings are stored column-wise (numpy arrays) under integer document ids,
+with:
+
+- inverted indexes for city and amenities: per-term document counts and
+  sorted posting arrays, built on first use and dropped when the term
+  changes
+- sorted range indexes (value-ordered doc ids) for price, bedrooms and
+  annual yield
+- a geohash index for listings with coordinates: 52-bit geohashes
+  (interleaved latitude and longitude bits) in a range index, so a
+  bounding box or radius is covered by a few geohash ranges
+
+A query starts from whichever predicate matches the fewest documents (posting
+sizes and range widths are known without materializing them) and checks
+the remaining predicates against the columns with vectorized gathers, so
+its cost follows the most selective filter rather than the catalog size.
+"""
+
+import json
+import logging
+import math
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Range-indexed listing fields
+RANGE_FIELDS = ('price', 'bedrooms', 'annual_yield')
+
+# Above this many listings per upsert the range indexes are rebuilt with one
+# sort instead of an insertion per listing
+_REBUILD_THRESHOLD = 1000
+
+_INITIAL_CAPACITY = 1024
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Bits per axis in a geohash; cells are about 0.3 m
+GEOHASH_BITS = 26
+
+# A box is covered by geohash cells of the finest level at which it spans
+# fewer than this many cells per axis
+_COVER_CELLS = 8
+
+# Called (outside the index lock) with the listings of each upsert, or the
+# ID of each removed listing, and the change's version. Versions increase
+# in the order changes were applied to the index; listeners may run out of
+# that order, so they use the version to ignore superseded changes.
+UpsertListener = Callable[[List[Dict[str, Any]], int], Any]
+RemoveListener = Callable[[str, int], Any]
+
+# A bounding box as (south, west, north, east) in degrees; west > east
+# crosses the antimeridian
+Box = Tuple[float, float, float, float]
+
+
+def _term(value: str) -> str:
+    return value.strip().lower()
+
+
+def _spread(cells: np.ndarray) -> np.ndarray:
+    """Move bit i of each value to bit 2i."""
+    cells = cells.astype(np.int64)
+    cells = (cells | (cells << 16)) & 0x0000FFFF0000FFFF
+    cells = (cells | (cells << 8)) & 0x00FF00FF00FF00FF
+    cells = (cells | (cells << 4)) & 0x0F0F0F0F0F0F0F0F
+    cells = (cells | (cells << 2)) & 0x3333333333333333
+    return (cells | (cells << 1)) & 0x5555555555555555
+
+
+def _cells(values, low: float, span: float) -> np.ndarray:
+    scaled = (np.asarray(values, dtype=np.float64) - low) / span * (1 << GEOHASH_BITS)
+    return np.clip(scaled.astype(np.int64), 0, (1 << GEOHASH_BITS) - 1)
+
+
+def geohash(latitude, longitude) -> np.ndarray:
+    """52-bit geohashes (longitude bit first, as in base-32 geohashes) of coordinates."""
+    return (_spread(_cells(longitude, -180.0, 360.0)) << 1) | _spread(_cells(latitude, -90.0, 180.0))
+
+
+def _split(box: Box) -> List[Box]:
+    """A box as boxes that do not cross the antimeridian."""
+    south, west, north, east = box
+    if west <= east:
+        return [box]
+    return [(south, west, north, 180.0), (south, -180.0, north, east)]
+
+
+def cover(box: Box) -> List[Tuple[int, int]]:
+    """
+    Inclusive geohash ranges covering a box.
+    
+    The box is covered by the cells of the finest level at which it spans
+    fewer than ``_COVER_CELLS`` cells per axis; adjacent cells are merged.
+    """
+    ranges = []
+    for south, west, north, east in _split(box):
+        lat_low, lat_high = _cells([south, north], -90.0, 180.0).tolist()
+        lon_low, lon_high = _cells([west, east], -180.0, 360.0).tolist()
+        shift = 0
+        while (lat_high >> shift) - (lat_low >> shift) >= _COVER_CELLS or \
+                (lon_high >> shift) - (lon_low >> shift) >= _COVER_CELLS:
+            shift += 1
+        lats = np.arange(lat_low >> shift, (lat_high >> shift) + 1)
+        lons = np.arange(lon_low >> shift, (lon_high >> shift) + 1)
+        prefixes = np.sort(((_spread(lons)[:, None] << 1) | _spread(lats)[None, :]).ravel())
+        starts, ends = prefixes << (2 * shift), (prefixes + 1) << (2 * shift)
+        breaks = np.flatnonzero(starts[1:] != ends[:-1]) + 1
+        starts = starts[np.concatenate(([0], breaks))]
+        ends = ends[np.concatenate((breaks - 1, [len(ends) - 1]))]
+        ranges.extend(zip(starts.tolist(), (ends - 1).tolist()))
+    return ranges
+
+
+def radius_box(latitude: float, longitude: float, radius_km: float) -> Box:
+    """Smallest box containing a circle on the sphere."""
+    angle = radius_km / EARTH_RADIUS_KM
+    south = latitude - math.degrees(angle)
+    north = latitude + math.degrees(angle)
+    if south <= -90 or north >= 90 or math.sin(angle) >= math.cos(math.radians(latitude)):
+        return max(south, -90.0), -180.0, min(north, 90.0), 180.0
+    spread = math.degrees(math.asin(math.sin(angle) / math.cos(math.radians(latitude))))
+    west = longitude - spread
+    east = longitude + spread
+    return south, west + 360 if west < -180 else west, north, east - 360 if east > 180 else east
+
+
+def distance_km(latitude: np.ndarray, longitude: np.ndarray, origin_latitude: float, origin_longitude: float) -> np.ndarray:
+    """Great-circle (haversine) distances from an origin."""
+    lat, lon = np.radians(latitude), np.radians(longitude)
+    lat0, lon0 = math.radians(origin_latitude), math.radians(origin_longitude)
+    a = np.sin((lat - lat0) / 2) ** 2 + math.cos(lat0) * np.cos(lat) * np.sin((lon - lon0) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _in_box(latitude: np.ndarray, longitude: np.ndarray, box: Box) -> np.ndarray:
+    south, west, north, east = box
+    inside = (latitude >= south) & (latitude <= north)
+    if west <= east:
+        return inside & (longitude >= west) & (longitude <= east)
+    return inside & ((longitude >= west) | (longitude <= east))
+
+
+class RangeIndex:
+    """Doc ids ordered by a numeric field, for inclusive range lookups."""
+    
+    def __init__(self):
+        self.values = np.empty(0, dtype=np.float64)
+        self.docs = np.empty(0, dtype=np.int64)
+    
+    def add(self, value: float, doc: int) -> None:
+        position = int(np.searchsorted(self.values, value, side='right'))
+        self.values = np.insert(self.values, position, value)
+        self.docs = np.insert(self.docs, position, doc)
+    
+    def remove(self, value: float, doc: int) -> None:
+        start = int(np.searchsorted(self.values, value, side='left'))
+        end = int(np.searchsorted(self.values, value, side='right'))
+        position = start + int(np.flatnonzero(self.docs[start:end] == doc)[0])
+        self.values = np.delete(self.values, position)
+        self.docs = np.delete(self.docs, position)
+    
+    def rebuild(self, column: np.ndarray, docs: np.ndarray) -> None:
+        order = np.argsort(column[docs], kind='stable')
+        self.docs = docs[order]
+        self.values = column[self.docs]
+    
+    def span(self, low: Optional[float], high: Optional[float]) -> Tuple[int, int]:
+        """Positions ``[start, end)`` of the values within ``[low, high]``."""
+        start = 0 if low is None else int(np.searchsorted(self.values, low, side='left'))
+        end = len(self.values) if high is None else int(np.searchsorted(self.values, high, side='right'))
+        return start, max(start, end)
+
+
+class _Postings:
+    """Document count of one term and its posting array, cached until the term changes."""
+    
+    __slots__ = ('count', 'docs')
+    
+    def __init__(self):
+        self.count = 0
+        self.docs: Optional[np.ndarray] = None
+
+
+def _first(keys: np.ndarray, docs: np.ndarray, count: int) -> np.ndarray:
+    """
+    The ``count`` docs with the smallest keys, ties in doc order.
+    
+    Only the docs at or below the count-th smallest key are sorted, and
+    ties at that boundary are all kept until the final sort, so pages
+    taken with different offsets agree.
+    """
+    if count < len(keys):
+        threshold = np.partition(keys, count - 1)[count - 1]
+        selected = keys <= threshold
+        keys, docs = keys[selected], docs[selected]
+    return docs[np.lexsort((docs, keys))][:count]
+
+
+class PropertyIndex:
+    """
+    Searchable property catalog.
+    
+    Listings are dicts with ``property_id``, ``city``, ``price``,
+    ``bedrooms``, ``annual_yield``, ``amenities`` and optionally
+    ``latitude`` and ``longitude``; any other keys are kept and returned
+    with results. Thread-safe: searches and updates are
+    serialized by a lock, and a search takes milliseconds.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._size = 0
+        self._capacity = _INITIAL_CAPACITY
+        # Columns by doc id; removed docs keep their slot with alive=False
+        self._listings: List[Optional[Dict[str, Any]]] = []
+        self._alive = np.zeros(self._capacity, dtype=bool)
+        self._columns = {field: np.zeros(self._capacity, dtype=np.float64) for field in RANGE_FIELDS}
+        self._city_codes = np.full(self._capacity, -1, dtype=np.int32)
+        self._amenity_columns: Dict[str, np.ndarray] = {}
+        # Coordinates are NaN for listings without them
+        self._latitudes = np.full(self._capacity, np.nan)
+        self._longitudes = np.full(self._capacity, np.nan)
+        self._geohashes = np.zeros(self._capacity, dtype=np.float64)
+        self._doc_ids: Dict[str, int] = {}
+        # Inverted indexes
+        self._city_ids: Dict[str, int] = {}
+        self._city_postings: Dict[int, _Postings] = {}
+        self._amenity_postings: Dict[str, _Postings] = {}
+        self._ranges = {field: RangeIndex() for field in RANGE_FIELDS}
+        # Geohashes are below 2**53, so float64 range indexes hold them exactly
+        self._geo = RangeIndex()
+        self._upsert_listeners: List[UpsertListener] = []
+        self._remove_listeners: List[RemoveListener] = []
+        # Version of the last upsert or removal
+        self._version = 0
+    
+    def __len__(self) -> int:
+        return len(self._doc_ids)
+    
+    def cities(self) -> List[str]:
+        """Cities (lowercase) with at least one listing."""
+        with self._lock:
+            return [city for city, code in self._city_ids.items() if self._city_postings[code].count > 0]
+    
+    def amenities(self) -> List[str]:
+        """Amenities (lowercase) of at least one listing."""
+        with self._lock:
+            return [amenity for amenity, postings in self._amenity_postings.items() if postings.count > 0]
+    
+    def subscribe(
+        self,
+        on_upsert: Optional[UpsertListener] = None,
+        on_remove: Optional[RemoveListener] = None
+    ) -> None:
+        """Register callbacks run after each upsert or removal, e.g. to keep a derived index in step."""
+        if on_upsert:
+            self._upsert_listeners.append(on_upsert)
+        if on_remove:
+            self._remove_listeners.append(on_remove)
+    
+    def upsert(self, listings: Iterable[Dict[str, Any]]) -> int:
+        """
+        Add listings, replacing any with the same ``property_id``.
+        
+        Returns:
+            Number of listings indexed
+        """
+        listings = list(listings)
+        rebuild = len(listings) > _REBUILD_THRESHOLD
+        with self._lock:
+            self._reserve(self._size + len(listings))
+            for listing in listings:
+                existing = self._doc_ids.get(listing['property_id'])
+                if existing is not None:
+                    self._unindex(existing, update_ranges=not rebuild)
+                self._index(listing, update_ranges=not rebuild)
+            if rebuild:
+                live = np.flatnonzero(self._alive[:self._size])
+                for field in RANGE_FIELDS:
+                    self._ranges[field].rebuild(self._columns[field], live)
+                located = live[~np.isnan(self._latitudes[live])]
+                self._geohashes[located] = geohash(self._latitudes[located], self._longitudes[located])
+                self._geo.rebuild(self._geohashes, located)
+            self._version += 1
+            version = self._version
+        for listener in self._upsert_listeners:
+            listener(listings, version)
+        return len(listings)
+    
+    def remove(self, property_id: str) -> bool:
+        """Remove a listing; returns False if it was not indexed."""
+        with self._lock:
+            doc = self._doc_ids.get(property_id)
+            if doc is None:
+                return False
+            self._unindex(doc, update_ranges=True)
+            self._version += 1
+            version = self._version
+        for listener in self._remove_listeners:
+            listener(property_id, version)
+        return True
+    
+    def load_file(self, path: str) -> int:
+        """Index listings from a JSON array or JSON Lines file."""
+        with open(path, encoding='utf-8') as handle:
+            text = handle.read()
+        if text.lstrip().startswith('['):
+            listings = json.loads(text)
+        else:
+            listings = [json.loads(line) for line in text.splitlines() if line.strip()]
+        count = self.upsert(listings)
+        logger.info(f"Indexed {count} properties from {path}")
+        return count
+    
+    def _reserve(self, size: int) -> None:
+        """Grow the columns to hold ``size`` docs. Caller holds the lock."""
+        if size <= self._capacity:
+            return
+        capacity = self._capacity
+        while capacity < size:
+            capacity *= 2
+        
+        def grow(column: np.ndarray, fill) -> np.ndarray:
+            grown = np.full(capacity, fill, dtype=column.dtype)
+            grown[:self._capacity] = column
+            return grown
+        
+        self._alive = grow(self._alive, False)
+        self._columns = {field: grow(column, 0) for field, column in self._columns.items()}
+        self._city_codes = grow(self._city_codes, -1)
+        self._latitudes = grow(self._latitudes, np.nan)
+        self._longitudes = grow(self._longitudes, np.nan)
+        self._geohashes = grow(self._geohashes, 0)
+        self._amenity_columns = {
+            amenity: grow(column, False) for amenity, column in self._amenity_columns.items()
+        }
+        self._capacity = capacity
+    
+    def _index(self, listing: Dict[str, Any], update_ranges: bool) -> None:
+        """Caller holds the lock and has reserved a slot."""
+        doc = self._size
+        self._size += 1
+        self._listings.append(listing)
+        self._doc_ids[listing['property_id']] = doc
+        self._alive[doc] = True
+        
+        city = _term(listing['city'])
+        code = self._city_ids.setdefault(city, len(self._city_ids))
+        self._city_codes[doc] = code
+        self._touch(self._city_postings.setdefault(code, _Postings()), 1)
+        
+        for amenity in {_term(amenity) for amenity in listing.get('amenities') or ()}:
+            column = self._amenity_columns.get(amenity)
+            if column is None:
+                column = self._amenity_columns[amenity] = np.zeros(self._capacity, dtype=bool)
+            column[doc] = True
+            self._touch(self._amenity_postings.setdefault(amenity, _Postings()), 1)
+        
+        for field in RANGE_FIELDS:
+            value = float(listing[field])
+            self._columns[field][doc] = value
+            if update_ranges:
+                self._ranges[field].add(value, doc)
+        
+        if listing.get('latitude') is not None and listing.get('longitude') is not None:
+            self._latitudes[doc] = float(listing['latitude'])
+            self._longitudes[doc] = float(listing['longitude'])
+            if update_ranges:
+                self._geohashes[doc] = float(geohash(self._latitudes[doc], self._longitudes[doc]))
+                self._geo.add(self._geohashes[doc], doc)
+    
+    def _unindex(self, doc: int, update_ranges: bool) -> None:
+        """Caller holds the lock."""
+        del self._doc_ids[self._listings[doc]['property_id']]
+        self._listings[doc] = None
+        self._alive[doc] = False
+        
+        self._touch(self._city_postings[int(self._city_codes[doc])], -1)
+        self._city_codes[doc] = -1
+        for amenity, column in self._amenity_columns.items():
+            if column[doc]:
+                column[doc] = False
+                self._touch(self._amenity_postings[amenity], -1)
+        
+        if update_ranges:
+            for field in RANGE_FIELDS:
+                self._ranges[field].remove(self._columns[field][doc], doc)
+            if not np.isnan(self._latitudes[doc]):
+                self._geo.remove(self._geohashes[doc], doc)
+        self._latitudes[doc] = np.nan
+        self._longitudes[doc] = np.nan
+    
+    @staticmethod
+    def _touch(postings: _Postings, delta: int) -> None:
+        postings.count += delta
+        postings.docs = None
+    
+    def _city_docs(self, code: int) -> np.ndarray:
+        """Caller holds the lock."""
+        postings = self._city_postings[code]
+        if postings.docs is None:
+            postings.docs = np.flatnonzero(self._city_codes[:self._size] == code)
+        return postings.docs
+    
+    def _amenity_docs(self, amenity: str) -> np.ndarray:
+        """Caller holds the lock."""
+        postings = self._amenity_postings[amenity]
+        if postings.docs is None:
+            postings.docs = np.flatnonzero(self._amenity_columns[amenity][:self._size])
+        return postings.docs
+    
+    def search(
+        self,
+        cities: Optional[List[str]] = None,
+        amenities: Optional[List[str]] = None,
+        ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+        near: Optional[Tuple[float, float, float]] = None,
+        box: Optional[Box] = None,
+        sort_by: Optional[str] = None,
+        descending: bool = False,
+        limit: int = 20,
+        offset: int = 0
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Find listings matching every given filter.
+        
+        Args:
+            cities: Match any of these cities (case-insensitive)
+            amenities: Require all of these amenities (case-insensitive)
+            ranges: Inclusive ``(low, high)`` bounds by field in RANGE_FIELDS;
+                either bound may be None
+            near: ``(latitude, longitude, radius_km)``: only listings within
+                the radius, returned with their ``distance_km``
+            box: ``(south, west, north, east)`` in degrees: only listings
+                inside the box (west > east crosses the antimeridian)
+            sort_by: Field in RANGE_FIELDS, or ``distance`` with ``near``,
+                to order results by (None keeps catalog order)
+            descending: Order from the highest value
+            limit: Maximum number of listings returned
+            offset: Number of matching listings skipped
+        
+        Returns:
+            Tuple of (total matching listings, page of listings)
+        
+        Raises:
+            ValueError: If sorting by distance without ``near``
+        """
+        if sort_by == 'distance' and near is None:
+            raise ValueError("sorting by distance needs a location to measure from")
+        amenity_terms = {_term(amenity) for amenity in amenities or ()}
+        bounds = {
+            field: bound for field, bound in (ranges or {}).items()
+            if bound[0] is not None or bound[1] is not None
+        }
+        areas = {}
+        if near is not None:
+            areas['near'] = radius_box(*near)
+        if box is not None:
+            areas['box'] = box
+        
+        with self._lock:
+            city_codes = None
+            if cities:
+                terms = {_term(city) for city in cities}
+                city_codes = [self._city_ids[term] for term in terms if term in self._city_ids]
+                if not city_codes:
+                    return 0, []
+            if any(amenity not in self._amenity_postings for amenity in amenity_terms):
+                return 0, []
+            
+            # Candidate sources by size: the smallest one drives the query
+            # and the others become vectorized checks
+            sources = []
+            if city_codes is not None:
+                count = sum(self._city_postings[code].count for code in city_codes)
+                sources.append((count, 'city', None))
+            for amenity in amenity_terms:
+                sources.append((self._amenity_postings[amenity].count, 'amenity', amenity))
+            for field, (low, high) in bounds.items():
+                start, end = self._ranges[field].span(low, high)
+                sources.append((end - start, 'range', (field, start, end)))
+            for area in areas.values():
+                spans = [self._geo.span(low, high) for low, high in cover(area)]
+                sources.append((sum(end - start for start, end in spans), 'geo', spans))
+            
+            if sources:
+                _, kind, key = min(sources, key=lambda source: source[0])
+                if kind == 'city':
+                    docs = np.concatenate([self._city_docs(code) for code in city_codes])
+                    city_codes = None
+                elif kind == 'amenity':
+                    docs = self._amenity_docs(key)
+                    amenity_terms.discard(key)
+                elif kind == 'geo':
+                    # The cover is a superset, so the areas are still checked below
+                    docs = np.concatenate([self._geo.docs[start:end] for start, end in key])
+                else:
+                    field, start, end = key
+                    docs = self._ranges[field].docs[start:end]
+                    del bounds[field]
+            else:
+                docs = np.flatnonzero(self._alive[:self._size])
+            
+            if city_codes is not None:
+                docs = docs[np.isin(self._city_codes[docs], city_codes)]
+            for amenity in amenity_terms:
+                docs = docs[self._amenity_columns[amenity][docs]]
+            for field, (low, high) in bounds.items():
+                values = self._columns[field][docs]
+                if low is not None:
+                    docs, values = docs[values >= low], values[values >= low]
+                if high is not None:
+                    docs = docs[values <= high]
+            if 'box' in areas:
+                docs = docs[_in_box(self._latitudes[docs], self._longitudes[docs], areas['box'])]
+            distances = None
+            if near is not None:
+                distances = distance_km(self._latitudes[docs], self._longitudes[docs], near[0], near[1])
+                inside = distances <= near[2]
+                docs, distances = docs[inside], distances[inside]
+            
+            total = len(docs)
+            wanted = min(offset + limit, total)
+            if wanted <= offset:
+                return total, []
+            if sort_by is not None:
+                keys = distances if sort_by == 'distance' else self._columns[sort_by][docs]
+                docs = _first(-keys if descending else keys, docs, wanted)
+            else:
+                docs = _first(docs, docs, wanted)
+            docs = docs[offset:]
+            if near is None:
+                page = [self._listings[doc] for doc in docs.tolist()]
+            else:
+                page_distances = distance_km(self._latitudes[docs], self._longitudes[docs], near[0], near[1])
+                page = [
+                    dict(self._listings[doc], distance_km=round(distance, 3))
+                    for doc, distance in zip(docs.tolist(), page_distances.tolist())
+                ]
+        
+        return total, page
@@ -0,0 +1,121 @@
+"""
+Per-tenant token-bucket rate limiting.
+
+Each (route, tenant) pair gets a token bucket refilled at the route's
+sustained rate and capped at its burst size. Requests are checked before
+any SDK work, so an over-limit tenant is turned away for the cost of a
+dict lookup. The tenant is the caller's wallet address when the
+``X-Wallet-Address`` header is sent, otherwise the agent_id.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RouteLimit:
+    """Sustained rate and burst size for one route."""
+    rate_per_second: float
+    burst: float
+
+
+def parse_limits(spec: str) -> Dict[str, RouteLimit]:
+    """
+    Parse a rate limit specification.
+
+    Format: comma-separated ``route=count/seconds`` entries with an optional
+    ``:burst`` suffix, e.g. ``register_agent=5/60,get_agent_status=600/60:50``.
+    The burst defaults to ``count``.
+
+    Raises:
+        ValueError: If an entry is malformed
+    """
+    limits = {}
+    for entry in filter(None, (part.strip() for part in spec.split(','))):
+        try:
+            route, value = entry.split('=', 1)
+            value, _, burst = value.partition(':')
+            count, seconds = value.split('/', 1)
+            limits[route.strip()] = RouteLimit(
+                rate_per_second=float(count) / float(seconds),
+                burst=float(burst) if burst else float(count)
+            )
+        except ValueError:
+            raise ValueError(f"Invalid rate limit entry '{entry}' (expected route=count/seconds[:burst])")
+    return limits
+
+
+class TokenBucket:
+    """Classic token bucket; not thread-safe on its own."""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, limit: RouteLimit, now: float):
+        self.rate = limit.rate_per_second
+        self.capacity = limit.burst
+        self.tokens = limit.burst
+        self.updated = now
+
+    def take(self, now: float, cost: float = 1.0) -> float:
+        """
+        Take ``cost`` tokens if available.
+
+        Returns:
+            0 if the tokens were taken, otherwise seconds until they will be
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate if self.rate > 0 else math.inf
+
+
+class RateLimiter:
+    """Token buckets per (route, tenant) with bounded memory."""
+
+    def __init__(self, limits: Dict[str, RouteLimit], max_buckets: int = 100000):
+        """
+        Args:
+            limits: Limits by route name; unlisted routes are not limited
+            max_buckets: Buckets kept before the least recently used are dropped
+        """
+        self.limits = limits
+        self.max_buckets = max_buckets
+        self._buckets: 'OrderedDict[Tuple[str, str], TokenBucket]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, route: str, tenant: str, cost: float = 1.0) -> Optional[int]:
+        """
+        Charge a request against the tenant's bucket for the route.
+
+        Returns:
+            None if allowed, otherwise whole seconds to wait before retrying
+        """
+        limit = self.limits.get(route)
+        if limit is None:
+            return None
+
+        key = (route, tenant)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(limit, now)
+                # A dropped bucket was idle longest; it refills to full anyway
+                while len(self._buckets) > self.max_buckets:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            wait = bucket.take(now, cost)
+
+        if wait == 0:
+            return None
+        return max(1, math.ceil(min(wait, 86400)))
@@ -0,0 +1,366 @@
+"""
+Property recommendations from an agent's preferences and history.
+
+Listings are embedded once from their descriptive text (title,
+description, city, bedrooms, amenities, ...) into a float32 matrix that
+follows the catalog. Vectors are cached on disk under a digest of the
+embedder and the text, so a restart or a re-sent unchanged listing embeds
+nothing. Each agent has a profile: the embedding of its preferences,
+blended with an exponentially decayed sum of its queries' embeddings that
+is updated as turns arrive. A recommendation is one matrix-vector product
+over the catalog (rows are unit vectors, so it yields cosine similarities)
+and a partial sort for the top k.
+"""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from embeddings import Embedder, HashingEmbedder
+from models import Interaction
+
+logger = logging.getLogger(__name__)
+
+# Listing fields embedded, in order, besides bedrooms and amenities
+TEXT_FIELDS = ('title', 'description', 'property_type', 'neighborhood', 'city')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key BLOB PRIMARY KEY,
+    vector BLOB NOT NULL
+);
+"""
+
+# SQLite's default limit on bound parameters is 999
+_SQL_BATCH = 900
+
+_INITIAL_CAPACITY = 1024
+
+
+def listing_text(listing: Dict[str, Any]) -> str:
+    """Text embedded for a listing."""
+    parts = [str(listing[field]) for field in TEXT_FIELDS if listing.get(field)]
+    if listing.get('bedrooms') is not None:
+        parts.append(f"{listing['bedrooms']} bedroom")
+    parts.extend(str(amenity) for amenity in listing.get('amenities') or ())
+    return '\n'.join(parts)
+
+
+def preferences_text(preferences: Dict[str, Any]) -> str:
+    """
+    Text embedded for an agent's preferences.
+    
+    Values are what listings mention ("Lisbon", "pool"), so they are
+    embedded without their keys; a flag set to True contributes its key
+    ("pet_friendly" as "pet friendly"). Nested dicts are skipped.
+    """
+    parts = []
+    for key, value in sorted(preferences.items()):
+        for item in value if isinstance(value, (list, tuple, set)) else [value]:
+            if item is True:
+                parts.append(key.replace('_', ' '))
+            elif item is not None and item is not False and not isinstance(item, dict):
+                parts.append(str(item))
+    return '\n'.join(parts)
+
+
+class EmbeddingCache:
+    """
+    SQLite cache of embeddings by key.
+    
+    Like ``EventStore``, one connection is shared by all threads and
+    serialized with a lock, in WAL mode.
+    """
+    
+    def __init__(self, path: str):
+        """
+        Open (or create) the cache.
+        
+        Args:
+            path: SQLite database file path (``:memory:`` for tests)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+    
+    def get_many(self, keys: Sequence[bytes]) -> Dict[bytes, np.ndarray]:
+        """Cached vectors of the keys that have one."""
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), _SQL_BATCH):
+                batch = list(keys[start:start + _SQL_BATCH])
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                )
+                for key, vector in rows:
+                    found[bytes(key)] = np.frombuffer(vector, dtype=np.float32)
+        return found
+    
+    def put_many(self, vectors: Dict[bytes, np.ndarray]) -> None:
+        """Store vectors by key in one transaction."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in vectors.items()]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+class _Profile:
+    """An agent's preference embedding and decayed sum of query embeddings."""
+    
+    __slots__ = ('preferences_text', 'preferences', 'history', 'seen')
+    
+    def __init__(self, dim: int):
+        self.preferences_text = ''
+        self.preferences = np.zeros(dim, dtype=np.float32)
+        self.history = np.zeros(dim, dtype=np.float32)
+        self.seen: Set[str] = set()
+
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class PropertyRecommender:
+    """
+    Ranks catalog listings against agent profiles.
+    
+    Thread-safe: updates and rankings are serialized by a lock; embedding
+    happens outside it. Updates following a catalog carry its change
+    versions, so an upsert that finishes embedding after a later upsert
+    or removal of the same listing is dropped instead of reviving it.
+    """
+    
+    def __init__(
+        self,
+        embedder: Optional[Embedder] = None,
+        cache: Optional[EmbeddingCache] = None,
+        history_decay: float = 0.9,
+        preference_weight: float = 0.5
+    ):
+        """
+        Args:
+            embedder: Text embedder (defaults to HashingEmbedder)
+            cache: Listing embedding cache (None embeds every listing it is given)
+            history_decay: Weight kept by earlier queries each time a new one is added
+            preference_weight: Share of the profile taken by preferences
+                when the agent has both preferences and queries
+        """
+        self.embedder = embedder or HashingEmbedder()
+        self.cache = cache
+        self.history_decay = history_decay
+        self.preference_weight = preference_weight
+        self._lock = threading.Lock()
+        self._vectors = np.zeros((_INITIAL_CAPACITY, self.embedder.dim), dtype=np.float32)
+        self._alive = np.zeros(_INITIAL_CAPACITY, dtype=bool)
+        self._listings: List[Optional[Dict[str, Any]]] = []
+        self._rows: Dict[str, int] = {}
+        self._free: List[int] = []
+        # property_id -> version of the last upsert or removal applied
+        self._versions: Dict[str, int] = {}
+        self._profiles: Dict[str, _Profile] = {}
+        self._cache_prefix = f"{type(self.embedder).__name__}:{self.embedder.dim}\n".encode('utf-8')
+    
+    def __len__(self) -> int:
+        return len(self._rows)
+    
+    def _embed_listings(self, texts: List[str]) -> np.ndarray:
+        """Embed texts, reading and filling the cache."""
+        if self.cache is None:
+            return self.embedder.embed(texts)
+        keys = [hashlib.sha1(self._cache_prefix + text.encode('utf-8')).digest() for text in texts]
+        vectors = self.cache.get_many(list(set(keys)))
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if missing:
+            embedded = dict(zip(missing, self.embedder.embed(list(missing.values()))))
+            self.cache.put_many(embedded)
+            vectors.update(embedded)
+        logger.info(f"Embedded {len(missing)} listings ({len(texts) - len(missing)} cached)")
+        matrix = np.zeros((len(texts), self.embedder.dim), dtype=np.float32)
+        for row, key in enumerate(keys):
+            matrix[row] = vectors[key]
+        return matrix
+    
+    def _superseded(self, property_id: str, version: Optional[int]) -> bool:
+        """Whether a change at ``version`` predates the last one applied; records it if not. Caller holds the lock."""
+        if version is None:
+            return False
+        if self._versions.get(property_id, -1) > version:
+            return True
+        self._versions[property_id] = version
+        return False
+    
+    def upsert(self, listings: Iterable[Dict[str, Any]], version: Optional[int] = None) -> int:
+        """
+        Embed and add listings, replacing any with the same ``property_id``.
+        
+        Args:
+            listings: Listings to add
+            version: Catalog change version (``PropertyIndex`` listeners);
+                listings changed or removed by a later version are skipped
+        
+        Returns:
+            Number of listings added or replaced
+        """
+        listings = list(listings)
+        if not listings:
+            return 0
+        vectors = self._embed_listings([listing_text(listing) for listing in listings])
+        applied = 0
+        with self._lock:
+            for listing, vector in zip(listings, vectors):
+                if self._superseded(listing['property_id'], version):
+                    continue
+                applied += 1
+                row = self._rows.get(listing['property_id'])
+                if row is None:
+                    row = self._free.pop() if self._free else self._append()
+                    self._rows[listing['property_id']] = row
+                self._vectors[row] = vector
+                self._alive[row] = True
+                self._listings[row] = listing
+        return applied
+    
+    def _append(self) -> int:
+        """A new row at the end, growing the matrix when full. Caller holds the lock."""
+        row = len(self._listings)
+        if row == len(self._vectors):
+            vectors = np.zeros((2 * row, self.embedder.dim), dtype=np.float32)
+            vectors[:row] = self._vectors
+            alive = np.zeros(2 * row, dtype=bool)
+            alive[:row] = self._alive
+            self._vectors, self._alive = vectors, alive
+        self._listings.append(None)
+        return row
+    
+    def remove(self, property_id: str, version: Optional[int] = None) -> bool:
+        """Remove a listing, unless re-added by a later ``version``; returns False if it was not added."""
+        with self._lock:
+            if self._superseded(property_id, version):
+                return False
+            row = self._rows.pop(property_id, None)
+            if row is None:
+                return False
+            self._alive[row] = False
+            self._listings[row] = None
+            self._free.append(row)
+            return True
+    
+    def has_profile(self, agent_id: str) -> bool:
+        """Whether the agent's preferences or history have been seen."""
+        return agent_id in self._profiles
+    
+    def drop_profile(self, agent_id: str) -> bool:
+        """Discard the agent's profile; False if it had none."""
+        with self._lock:
+            return self._profiles.pop(agent_id, None) is not None
+    
+    def update_profile(self, agent_id: str, preferences: Dict[str, Any], history: Sequence[Interaction]) -> int:
+        """
+        Fold the agent's current preferences and any queries not seen yet into its profile.
+        
+        Preferences are re-embedded only when they change, and only new
+        turns are embedded, in history order.
+        
+        Returns:
+            Number of queries added
+        """
+        text = preferences_text(preferences)
+        with self._lock:
+            profile = self._profiles.get(agent_id)
+            if profile is None:
+                profile = self._profiles[agent_id] = _Profile(self.embedder.dim)
+            new = [interaction for interaction in history if interaction.id not in profile.seen]
+            stale = text != profile.preferences_text
+        
+        preference_vector = self.embedder.embed([text])[0] if stale else None
+        query_vectors = self.embedder.embed([interaction.userQuery for interaction in new]) if new else None
+        
+        with self._lock:
+            if preference_vector is not None:
+                profile.preferences_text = text
+                profile.preferences = preference_vector
+            if query_vectors is not None:
+                # The newest query keeps weight 1, each earlier one decays once per later turn
+                weights = self.history_decay ** np.arange(len(new) - 1, -1, -1, dtype=np.float32)
+                profile.history = profile.history * self.history_decay ** len(new) + weights @ query_vectors
+                profile.seen.update(interaction.id for interaction in new)
+        return len(new)
+    
+    def _query_vector(self, agent_id: str, query: Optional[str]) -> Optional[np.ndarray]:
+        """The agent's profile blended with the query, or None without either."""
+        profile = self._profiles.get(agent_id)
+        vector = np.zeros(self.embedder.dim, dtype=np.float32)
+        if profile is not None:
+            preferences = _unit(profile.preferences)
+            history = _unit(profile.history)
+            if preferences.any() and history.any():
+                vector = _unit(self.preference_weight * preferences + (1 - self.preference_weight) * history)
+            else:
+                vector = preferences if preferences.any() else history
+        if query:
+            vector = _unit(vector + self.embedder.embed([query])[0])
+        return vector if vector.any() else None
+    
+    def recommend(
+        self,
+        agent_id: str,
+        k: int = 20,
+        query: Optional[str] = None,
+        exclude: Optional[Sequence[str]] = None
+    ) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        The listings most similar to the agent's profile.
+        
+        Args:
+            agent_id: Unique agent identifier
+            k: Maximum listings returned
+            query: Free text blended into the profile with equal weight
+            exclude: Property IDs to leave out
+        
+        Returns:
+            List of (cosine similarity, listing) pairs, best first; only
+            listings with a positive similarity are returned
+        
+        Raises:
+            ValueError: If the agent has no preferences or history and no
+                query is given
+        """
+        vector = self._query_vector(agent_id, query)
+        if vector is None:
+            raise ValueError(f"Agent {agent_id} has no preferences or history to recommend from; pass a query")
+        
+        with self._lock:
+            count = len(self._listings)
+            scores = self._vectors[:count] @ vector
+            scores[~self._alive[:count]] = -np.inf
+            for property_id in exclude or ():
+                row = self._rows.get(property_id)
+                if row is not None:
+                    scores[row] = -np.inf
+            
+            take = min(k, count)
+            if take == 0:
+                return []
+            top = np.argpartition(-scores, take - 1)[:take]
+            top = top[np.argsort(-scores[top], kind='stable')]
+            return [(float(scores[row]), self._listings[row]) for row in top.tolist() if scores[row] > 0]
@@ -0,0 +1,231 @@
+"""
+Per-agent cache of query responses.
+
+Agents are asked the same handful of questions repeatedly; a cached
+response skips both the LLM call and the Memory Hub sync. Entries are
+keyed on agent, normalized query and a fingerprint of the agent state the
+answer depended on, so any change to the agent's preferences or history
+makes older entries unreachable. Optionally, a query whose embedding is
+close enough to a cached query for the same agent state is also served
+from the cache, provided both state the same numbers and criteria and
+negation words ("2 bedroom" is not "3 bedroom", "safe" is not "not safe").
+"""
+
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from embeddings import Embedder, HashingEmbedder
+from models import AgentState
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r'\s+')
+_TRAILING_PUNCTUATION = re.compile(r'[\s?!.]+$')
+_TOKEN = re.compile(r"\d+(?:\.\d+)?|%|[a-z]+")
+
+# Words that change a request's meaning, grouped by meaning; near-duplicates must agree on them
+_MARKERS = {
+    **dict.fromkeys(('under', 'below', 'less', 'cheaper', 'max', 'maximum', 'budget', 'within'), 'max'),
+    **dict.fromkeys(('over', 'above', 'more', 'least', 'min', 'minimum', 'from'), 'min'),
+    **dict.fromkeys(('between', 'to'), 'range'),
+    **dict.fromkeys((
+        'no', 'not', 'without', 'except', 'excluding', 'never', 'nor', 'cannot',
+        'isn', 'aren', 'don', 'doesn', 'didn', 'won', 'wasn', 'weren', 'shouldn'
+    ), 'not'),
+    **dict.fromkeys(('cheapest', 'lowest'), 'ascending'),
+    **dict.fromkeys(('highest', 'priciest', 'largest', 'biggest', 'top', 'best', 'most'), 'descending'),
+    **dict.fromkeys(('studio', 'studios'), 'studio'),
+    **dict.fromkeys(('bed', 'beds', 'bedroom', 'bedrooms', 'br', 'bd'), 'bedrooms'),
+    **dict.fromkeys(('bath', 'baths', 'bathroom', 'bathrooms'), 'bathrooms'),
+    **dict.fromkeys(('yield', 'yields', '%', 'return', 'returns', 'roi'), 'yield'),
+    **dict.fromkeys(('near', 'km', 'mile', 'miles'), 'distance')
+}
+
+Signature = Tuple[Tuple[str, ...], FrozenSet[str], FrozenSet[str]]
+
+
+def normalize_query(query: str) -> str:
+    """Case-fold, collapse whitespace and drop trailing punctuation."""
+    return _TRAILING_PUNCTUATION.sub('', _WHITESPACE.sub(' ', query.strip().lower()))
+
+
+def request_signature(text: str, vocabulary: Iterable[str] = ()) -> Signature:
+    """Numbers, criteria and negation markers and catalog terms (singular or plural) of a normalized request."""
+    tokens = _TOKEN.findall(text)
+    numbers = tuple(token for token in tokens if token[0].isdigit())
+    markers = frozenset(_MARKERS[token] for token in tokens if token in _MARKERS)
+    padded = f" {' '.join(tokens)} "
+    terms = frozenset(
+        term for term in vocabulary
+        if f" {term} " in padded or f" {term}s " in padded
+    )
+    return numbers, markers, terms
+
+
+def state_version(state: AgentState, user_context: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Fingerprint of the parts of an agent's state a response depends on.
+    
+    Covers the preferences (with the request's user context merged in, as
+    the query path does) and the most recent interaction, so the version
+    changes whenever preferences change or a turn is added to the history.
+    """
+    preferences = dict(state.preferences)
+    if user_context:
+        preferences.update(user_context)
+    last_id = state.interactionHistory[-1].id if state.interactionHistory else ''
+    payload = json.dumps([preferences, last_id], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+@dataclass
+class CachedResponse:
+    """A cached answer and the interaction that produced it."""
+    response: str
+    interaction_id: str
+    created_at: float
+
+
+CacheKey = Tuple[str, str, str]
+
+
+class ResponseCache:
+    """
+    LRU cache of responses with a TTL and optional near-duplicate lookup.
+    
+    Exact lookups are a dict hit. With ``similarity_threshold`` set, a miss
+    falls back to comparing the query embedding with the other queries
+    cached for the same agent, state version and ``request_signature``, so
+    only a handful of vectors are scanned.
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 300.0,
+        similarity_threshold: float = 0.0,
+        embedder: Optional[Embedder] = None
+    ):
+        """
+        Args:
+            max_entries: Maximum cached responses across all agents
+            ttl_seconds: Lifetime of a cached response
+            similarity_threshold: Minimum cosine similarity for a
+                near-duplicate hit (0 disables near-duplicate lookup)
+            embedder: Query embedder (defaults to HashingEmbedder)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.embedder = (embedder or HashingEmbedder()) if similarity_threshold > 0 else None
+        self._entries: 'OrderedDict[CacheKey, Tuple[CachedResponse, Optional[np.ndarray], Signature]]' = \
+            OrderedDict()
+        # (agent_id, version, signature) -> keys cached for that state, for near-duplicate scans
+        self._by_state: Dict[Tuple[str, str, Signature], List[CacheKey]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get(self, agent_id: str, query: str, version: str) -> Optional[CachedResponse]:
+        """
+        Look up a response for the query against the given state version.
+        
+        Returns:
+            The cached response, or None on a miss
+        """
+        normalized = normalize_query(query)
+        key = (agent_id, version, normalized)
+        now = time.monotonic()
+        
+        with self._lock:
+            entry = self._live(key, now)
+            if entry is None and self.embedder is not None:
+                entry = self._nearest(agent_id, version, normalized, now)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry
+    
+    def _live(self, key: CacheKey, now: float) -> Optional[CachedResponse]:
+        """Return an unexpired entry and mark it recently used; caller holds the lock."""
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        if now - item[0].created_at > self.ttl_seconds:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return item[0]
+    
+    def _nearest(
+        self,
+        agent_id: str,
+        version: str,
+        normalized: str,
+        now: float
+    ) -> Optional[CachedResponse]:
+        """Best near-duplicate for the same agent state and signature; caller holds the lock."""
+        keys = self._by_state.get((agent_id, version, request_signature(normalized)))
+        if not keys:
+            return None
+        
+        query_vector = self.embedder.embed([normalized])[0]
+        best_key, best_score = None, self.similarity_threshold
+        for key in list(keys):
+            entry = self._live(key, now)
+            if entry is None:
+                continue
+            score = float(self._entries[key][1] @ query_vector)
+            if score >= best_score:
+                best_key, best_score = key, score
+        
+        if best_key is None:
+            return None
+        self._entries.move_to_end(best_key)
+        return self._entries[best_key][0]
+    
+    def put(
+        self,
+        agent_id: str,
+        query: str,
+        version: str,
+        response: str,
+        interaction_id: str
+    ) -> None:
+        """Cache a response for the query against the given state version."""
+        normalized = normalize_query(query)
+        key = (agent_id, version, normalized)
+        vector = self.embedder.embed([normalized])[0] if self.embedder is not None else None
+        signature = request_signature(normalized)
+        entry = CachedResponse(response=response, interaction_id=interaction_id, created_at=time.monotonic())
+        
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (entry, vector, signature)
+            self._by_state.setdefault((agent_id, version, signature), []).append(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+    
+    def _remove(self, key: CacheKey) -> None:
+        """Drop an entry; caller holds the lock."""
+        _, _, signature = self._entries.pop(key)
+        state_key = (key[0], key[1], signature)
+        keys = self._by_state.get(state_key)
+        if keys is not None:
+            keys.remove(key)
+            if not keys:
+                del self._by_state[state_key]
@@ -0,0 +1,254 @@
+"""
+Semantic retrieval over each agent's interaction history.
+
+``VectorIndex`` is a NumPy-backed nearest-neighbour index over unit
+vectors: exact brute-force search while it is small, and an inverted-file
+(IVF) approximate search once it grows past a threshold. ``SemanticMemory``
+keeps one index per agent, embeds turns incrementally as they are appended,
+and returns the past turns most relevant to a new query.
+"""
+
+import logging
+import threading
+from typing import Dict, Generic, List, Optional, Sequence, Set, Tuple, TypeVar
+
+import numpy as np
+
+from embeddings import Embedder, HashingEmbedder
+from models import Interaction
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class VectorIndex(Generic[T]):
+    """
+    Growable index of unit vectors with attached items.
+    
+    Vectors live in one preallocated float32 matrix that doubles when
+    full, so appends are amortized O(dim). Below ``brute_force_limit``
+    rows every search is exact; above it a coarse k-means quantizer is
+    trained and only the ``nprobe`` closest cells are scanned. The
+    quantizer is retrained whenever the index has doubled since the last
+    training, and new rows are assigned to their nearest cell on insert.
+    """
+    
+    def __init__(self, dim: int, brute_force_limit: int = 5000, nprobe: int = 8):
+        """
+        Args:
+            dim: Vector dimension
+            brute_force_limit: Row count above which search becomes approximate
+            nprobe: Cells scanned per approximate search
+        """
+        self.dim = dim
+        self.brute_force_limit = brute_force_limit
+        self.nprobe = nprobe
+        self._vectors = np.zeros((64, dim), dtype=np.float32)
+        self._cells = np.zeros(64, dtype=np.int32)
+        self._items: List[T] = []
+        self._centroids: Optional[np.ndarray] = None
+        self._trained_size = 0
+    
+    def __len__(self) -> int:
+        return len(self._items)
+    
+    @property
+    def vectors(self) -> np.ndarray:
+        """View of the stored vectors (rows in insertion order)."""
+        return self._vectors[:len(self._items)]
+    
+    @property
+    def items(self) -> List[T]:
+        return self._items
+    
+    def add(self, vectors: np.ndarray, items: Sequence[T]) -> None:
+        """Append unit vectors (one row per item)."""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        count = len(self._items)
+        needed = count + len(vectors)
+        if needed > len(self._vectors):
+            capacity = max(needed, 2 * len(self._vectors))
+            grown = np.zeros((capacity, self.dim), dtype=np.float32)
+            grown[:count] = self._vectors[:count]
+            self._vectors = grown
+            cells = np.zeros(capacity, dtype=np.int32)
+            cells[:count] = self._cells[:count]
+            self._cells = cells
+        
+        self._vectors[count:needed] = vectors
+        self._items.extend(items)
+        
+        if needed > self.brute_force_limit and needed >= 2 * self._trained_size:
+            self._train()
+        elif self._centroids is not None:
+            self._cells[count:needed] = np.argmax(vectors @ self._centroids.T, axis=1)
+    
+    def _train(self, iterations: int = 8, sample_size: int = 20000) -> None:
+        """Train the coarse quantizer (spherical k-means) and reassign every row."""
+        data = self.vectors
+        n_cells = min(int(np.clip(np.sqrt(len(data)), 8, 1024)), len(data))
+        rng = np.random.default_rng(0)
+        sample = data[rng.choice(len(data), size=min(sample_size, len(data)), replace=False)]
+        
+        centroids = sample[rng.choice(len(sample), size=n_cells, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            filled = norms[:, 0] > 0
+            centroids[filled] = sums[filled] / norms[filled]
+        
+        self._centroids = centroids
+        self._cells[:len(data)] = np.argmax(data @ centroids.T, axis=1)
+        self._trained_size = len(data)
+        logger.info(f"Trained vector index quantizer: {len(data)} rows, {n_cells} cells")
+    
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        exclude: Optional[Set[int]] = None
+    ) -> List[Tuple[float, int]]:
+        """
+        Find the rows most similar to ``query``.
+        
+        Args:
+            query: Unit query vector
+            k: Number of results
+            exclude: Row numbers to skip
+        
+        Returns:
+            List of (cosine similarity, row) pairs, best first
+        """
+        count = len(self._items)
+        if count == 0 or k <= 0:
+            return []
+        
+        query = np.asarray(query, dtype=np.float32).reshape(self.dim)
+        if self._centroids is None or count <= self.brute_force_limit:
+            rows = None
+            scores = self._vectors[:count] @ query
+        else:
+            probes = np.argsort(self._centroids @ query)[-self.nprobe:]
+            rows = np.flatnonzero(np.isin(self._cells[:count], probes))
+            scores = self._vectors[rows] @ query
+        
+        if exclude:
+            excluded = np.fromiter(exclude, dtype=np.int64)
+            if rows is None:
+                scores[excluded[excluded < count]] = -np.inf
+            else:
+                scores[np.isin(rows, excluded)] = -np.inf
+        
+        take = min(k, len(scores))
+        if take == 0:
+            return []
+        top = np.argpartition(-scores, take - 1)[:take]
+        top = top[np.argsort(-scores[top])]
+        results = []
+        for position in top:
+            score = float(scores[position])
+            if score == -np.inf:
+                break
+            results.append((score, int(position if rows is None else rows[position])))
+        return results
+
+
+def interaction_text(interaction: Interaction) -> str:
+    """Text embedded for an interaction."""
+    return f"{interaction.userQuery}\n{interaction.agentResponse}"
+
+
+class SemanticMemory:
+    """Per-agent semantic indexes over past interactions."""
+    
+    def __init__(
+        self,
+        embedder: Optional[Embedder] = None,
+        brute_force_limit: int = 5000,
+        min_score: float = 0.2
+    ):
+        """
+        Args:
+            embedder: Text embedder (defaults to HashingEmbedder)
+            brute_force_limit: Interactions per agent searched exactly
+            min_score: Minimum cosine similarity for a retrieved turn
+        """
+        self.embedder = embedder or HashingEmbedder()
+        self.brute_force_limit = brute_force_limit
+        self.min_score = min_score
+        self._indexes: Dict[str, VectorIndex[Interaction]] = {}
+        self._known_ids: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+    
+    def has_agent(self, agent_id: str) -> bool:
+        """Whether an index exists for the agent."""
+        return agent_id in self._indexes
+    
+    def size(self, agent_id: str) -> int:
+        """Number of interactions indexed for the agent."""
+        index = self._indexes.get(agent_id)
+        return len(index) if index else 0
+    
+    def drop(self, agent_id: str) -> bool:
+        """Discard the agent's index; False if it had none."""
+        with self._lock:
+            self._known_ids.pop(agent_id, None)
+            return self._indexes.pop(agent_id, None) is not None
+    
+    def add(self, agent_id: str, interactions: Sequence[Interaction]) -> int:
+        """
+        Embed and index interactions not yet indexed for the agent.
+        
+        Returns:
+            Number of interactions added
+        """
+        with self._lock:
+            index = self._indexes.get(agent_id)
+            if index is None:
+                index = VectorIndex(self.embedder.dim, brute_force_limit=self.brute_force_limit)
+                self._indexes[agent_id] = index
+                self._known_ids[agent_id] = {}
+            known = self._known_ids[agent_id]
+            
+            new = []
+            for interaction in interactions:
+                if interaction.id not in known:
+                    known[interaction.id] = len(index) + len(new)
+                    new.append(interaction)
+            if not new:
+                return 0
+            
+            index.add(self.embedder.embed([interaction_text(i) for i in new]), new)
+            return len(new)
+    
+    def search(
+        self,
+        agent_id: str,
+        query: str,
+        k: int,
+        exclude_ids: Optional[Set[str]] = None
+    ) -> List[Tuple[float, Interaction]]:
+        """
+        Return the agent's past interactions most relevant to ``query``.
+        
+        Args:
+            agent_id: Unique agent identifier
+            query: New user query
+            k: Maximum interactions to return
+            exclude_ids: Interaction IDs to skip (e.g. the recent window)
+        
+        Returns:
+            List of (similarity, interaction) pairs, best first
+        """
+        with self._lock:
+            index = self._indexes.get(agent_id)
+            if index is None or len(index) == 0:
+                return []
+            known = self._known_ids[agent_id]
+            exclude = {known[i] for i in (exclude_ids or ()) if i in known}
+            query_vector = self.embedder.embed([query])[0]
+            hits = index.search(query_vector, k, exclude)
+            return [(score, index.items[row]) for score, row in hits if score >= self.min_score]
@@ -0,0 +1,119 @@
+"""
+Consistent hashing of agents onto worker processes.
+
+Live agents are held in each process's memory, so in multi-process mode
+every request for an agent must reach the same worker. Agent IDs are
+placed on a hash ring with many virtual points per worker; adding or
+removing a worker only moves the agents on the arcs it gains or loses
+(about 1/N of them), and those are rehydrated from the shared state store
+on their new worker.
+"""
+
+import bisect
+import hashlib
+import json
+import re
+import threading
+from typing import Iterable, List, Optional, Tuple
+
+# Virtual points per worker; more points spread agents more evenly
+DEFAULT_VNODES = 160
+
+# Paths that carry the agent_id in the URL
+_AGENT_PATH = re.compile(r'^/agent/(?:status|memory|history)/([^/]+)')
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """
+    Consistent hash ring mapping keys to node names.
+    
+    Lookups read an immutable snapshot of the ring and take no lock;
+    membership changes rebuild the snapshot under a lock. Each change
+    bumps the ring's version, so views of it handed to others can be
+    ordered.
+    """
+    
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = DEFAULT_VNODES):
+        """
+        Args:
+            nodes: Initial node names
+            vnodes: Virtual points per node
+        """
+        self.vnodes = vnodes
+        self._lock = threading.Lock()
+        # (sorted points, owner of each point, node names, version)
+        self._ring: Tuple[List[int], List[str], frozenset, int] = ([], [], frozenset(), 0)
+        for node in nodes:
+            self.add(node)
+    
+    @property
+    def nodes(self) -> List[str]:
+        """Node names on the ring."""
+        return sorted(self._ring[2])
+    
+    def view(self) -> Tuple[int, List[str]]:
+        """The ring's version and node names, read together."""
+        _, _, nodes, version = self._ring
+        return version, sorted(nodes)
+    
+    def __contains__(self, node: str) -> bool:
+        return node in self._ring[2]
+    
+    def __len__(self) -> int:
+        return len(self._ring[2])
+    
+    def _rebuild(self, nodes: frozenset) -> None:
+        """Caller holds the lock."""
+        points = sorted(
+            (_hash(f"{node}#{index}"), node)
+            for node in nodes
+            for index in range(self.vnodes)
+        )
+        self._ring = ([point for point, _ in points], [node for _, node in points], nodes, self._ring[3] + 1)
+    
+    def add(self, node: str) -> bool:
+        """Add a node; returns False if it was already on the ring."""
+        with self._lock:
+            if node in self._ring[2]:
+                return False
+            self._rebuild(self._ring[2] | {node})
+            return True
+    
+    def remove(self, node: str) -> bool:
+        """Remove a node; returns False if it was not on the ring."""
+        with self._lock:
+            if node not in self._ring[2]:
+                return False
+            self._rebuild(self._ring[2] - {node})
+            return True
+    
+    def owner(self, key: str) -> Optional[str]:
+        """Node owning ``key``, or None if the ring is empty."""
+        points, owners, _, _ = self._ring
+        if not points:
+            return None
+        return owners[bisect.bisect(points, _hash(key)) % len(points)]
+
+
+def routing_key(path: str, body: bytes) -> Optional[str]:
+    """
+    The agent_id a request is about, from its path or JSON body.
+    
+    Returns:
+        The agent_id, or None for requests not tied to an agent
+    """
+    match = _AGENT_PATH.match(path)
+    if match:
+        return match.group(1)
+    if not body:
+        return None
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return None
+    agent_id = payload.get('agent_id') if isinstance(payload, dict) else None
+    return agent_id if isinstance(agent_id, str) else None
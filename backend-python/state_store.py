@@ -0,0 +1,180 @@
+"""
+Durable local state store for the AIP Agent microservice.
+
+Records initialized agents (id, description, Memory Hub address) and their
+latest materialized AgentState in an embedded SQLite database running in
+WAL mode, so a restarted worker can rehydrate agents from a local read
+instead of waiting for clients to re-initialize them.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+from models import AgentState
+
+logger = logging.getLogger(__name__)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS agents (
+    agent_id TEXT PRIMARY KEY,
+    description TEXT NOT NULL,
+    memory_hub_address TEXT NOT NULL,
+    created_at INTEGER NOT NULL,
+    updated_at INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS agent_states (
+    agent_id TEXT PRIMARY KEY,
+    state_json TEXT NOT NULL,
+    updated_at INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS agent_summaries (
+    agent_id TEXT PRIMARY KEY,
+    summary TEXT NOT NULL,
+    summarized_through TEXT,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class AgentStateStore:
+    """
+    SQLite-backed registry of initialized agents and state snapshots.
+    
+    A single connection is shared by all request threads and serialized
+    with a lock; WAL mode keeps readers from blocking on the writer and
+    lets several worker processes share the same database file.
+    """
+    
+    def __init__(self, path: str):
+        """
+        Open (or create) the store.
+        
+        Args:
+            path: SQLite database file path (``:memory:`` for tests)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+        
+        logger.info(f"Agent state store opened: {path}")
+    
+    def save_agent(self, agent_id: str, description: str, memory_hub_address: str) -> None:
+        """Record an initialized agent (upsert)."""
+        now = int(time.time())
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO agents (agent_id, description, memory_hub_address, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(agent_id) DO UPDATE SET
+                    description = excluded.description,
+                    memory_hub_address = excluded.memory_hub_address,
+                    updated_at = excluded.updated_at
+                """,
+                (agent_id, description, memory_hub_address, now, now)
+            )
+    
+    def get_agent(self, agent_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up an initialized agent.
+        
+        Returns:
+            Dict with agent_id, description and memory_hub_address, or None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT agent_id, description, memory_hub_address FROM agents WHERE agent_id = ?",
+                (agent_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'agent_id': row[0], 'description': row[1], 'memory_hub_address': row[2]}
+    
+    def list_agents(self) -> List[str]:
+        """Return the IDs of all recorded agents."""
+        with self._lock:
+            rows = self._conn.execute("SELECT agent_id FROM agents ORDER BY agent_id").fetchall()
+        return [row[0] for row in rows]
+    
+    def save_state(self, agent_id: str, state: AgentState) -> None:
+        """Store the latest materialized state for an agent (upsert)."""
+        state_json = state.model_dump_json()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO agent_states (agent_id, state_json, updated_at)
+                VALUES (?, ?, ?)
+                ON CONFLICT(agent_id) DO UPDATE SET
+                    state_json = excluded.state_json,
+                    updated_at = excluded.updated_at
+                """,
+                (agent_id, state_json, int(time.time()))
+            )
+    
+    def load_state(self, agent_id: str) -> Optional[AgentState]:
+        """Return the latest stored state for an agent, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state_json FROM agent_states WHERE agent_id = ?",
+                (agent_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return AgentState.model_validate_json(row[0])
+    
+    def save_summary(
+        self,
+        agent_id: str,
+        summary: str,
+        summarized_through: Optional[str],
+        updated_at: float
+    ) -> None:
+        """Store an agent's history summary and the last interaction it covers (upsert)."""
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO agent_summaries (agent_id, summary, summarized_through, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(agent_id) DO UPDATE SET
+                    summary = excluded.summary,
+                    summarized_through = excluded.summarized_through,
+                    updated_at = excluded.updated_at
+                """,
+                (agent_id, summary, summarized_through, updated_at)
+            )
+    
+    def load_summary(self, agent_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Return an agent's stored history summary.
+        
+        Returns:
+            Dict with summary, summarized_through and updated_at, or None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, summarized_through, updated_at FROM agent_summaries WHERE agent_id = ?",
+                (agent_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'summary': row[0], 'summarized_through': row[1], 'updated_at': row[2]}
+    
+    def delete_agent(self, agent_id: str) -> None:
+        """Remove an agent, its state snapshot and its summary."""
+        with self._lock:
+            self._conn.execute("DELETE FROM agents WHERE agent_id = ?", (agent_id,))
+            self._conn.execute("DELETE FROM agent_states WHERE agent_id = ?", (agent_id,))
+            self._conn.execute("DELETE FROM agent_summaries WHERE agent_id = ?", (agent_id,))
+    
+    def close(self) -> None:
+        """Close the underlying connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,219 @@
+"""
+Background summarization of agent interaction history.
+
+Older interactions are rolled into an incrementally updated per-agent
+summary (surfaced as ``AgentState.learnedSummary``) so queries can send
+the summary plus a short window of recent turns instead of a long raw
+history. Summaries are computed off the request path on a bounded
+worker pool.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+
+from models import Interaction
+
+logger = logging.getLogger(__name__)
+
+# (previous summary, newly summarized interactions) -> updated summary
+SummarizeFn = Callable[[str, Sequence[Interaction]], str]
+
+# Maximum summary length
+SUMMARY_MAX_CHARS = 2000
+
+# System prompt for summaries written by an LLM (the turns are sent as the
+# request, see summary_request)
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a user's conversation with a property "
+    "assistant. Update the previous summary with the new turns. Keep the user's "
+    "goals, preferences and constraints (cities, budget, bedrooms, amenities, "
+    "yield), decisions, and open questions; drop greetings and small talk. "
+    f"Reply with the updated summary only, as short bullet points, at most {SUMMARY_MAX_CHARS} characters."
+)
+
+
+def _clip(text: str, limit: int) -> str:
+    text = ' '.join(text.split())
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + '...'
+
+
+def format_turn(interaction: Interaction, query_chars: int = 120, response_chars: int = 160) -> str:
+    """One-line "Q / A" rendering of an interaction, clipped for prompts."""
+    return f"- Q: {_clip(interaction.userQuery, query_chars)} | A: {_clip(interaction.agentResponse, response_chars)}"
+
+
+def extractive_summary(
+    previous_summary: str,
+    interactions: Sequence[Interaction],
+    max_chars: int = SUMMARY_MAX_CHARS
+) -> str:
+    """
+    Fold interactions into a digest without calling an LLM.
+    
+    Nothing is condensed: each interaction becomes one clipped "Q / A"
+    line appended to the previous digest, and the oldest lines are dropped
+    once it exceeds ``max_chars``, so it only reaches back as far as that
+    budget allows. Used when no LLM summarizer is configured or one fails.
+    
+    Args:
+        previous_summary: Summary produced by the previous run
+        interactions: Interactions not yet covered by the summary
+        max_chars: Maximum summary length
+    
+    Returns:
+        Updated summary
+    """
+    lines = [line for line in previous_summary.splitlines() if line.strip()]
+    for interaction in interactions:
+        lines.append(format_turn(interaction))
+    
+    while lines and sum(len(line) + 1 for line in lines) > max_chars:
+        lines.pop(0)
+    return '\n'.join(lines)
+
+
+def summary_request(previous_summary: str, interactions: Sequence[Interaction]) -> str:
+    """The request asking an LLM (prompted with SUMMARY_PROMPT) to fold turns into a summary."""
+    turns = '\n'.join(format_turn(interaction, 500, 800) for interaction in interactions)
+    return f"Previous summary:\n{previous_summary or '(none)'}\n\nNew turns:\n{turns}"
+
+
+@dataclass
+class SummaryRecord:
+    """Summary of an agent's history up to a watermark interaction."""
+    summary: str
+    summarized_through: Optional[str]
+    updated_at: float
+
+
+class HistorySummarizer:
+    """
+    Maintains per-agent history summaries on a background worker pool.
+    
+    ``schedule`` is called after each query with the agent's current
+    history. A job is submitted only if the agent was not re-summarized
+    within ``interval_seconds`` and has interactions older than the recent
+    window that the summary does not yet cover; at most one job per agent
+    runs at a time.
+    """
+    
+    def __init__(
+        self,
+        workers: int = 1,
+        interval_seconds: float = 300.0,
+        recent_turns: int = 4,
+        summarize_fn: Optional[SummarizeFn] = None,
+        store=None
+    ):
+        """
+        Args:
+            workers: Maximum concurrent summarization jobs
+            interval_seconds: Minimum time between runs for one agent
+            recent_turns: Turns kept raw (not summarized) at the end of history
+            summarize_fn: Summary function (defaults to extractive_summary)
+            store: Optional AgentStateStore used to persist summaries
+        """
+        self.interval_seconds = interval_seconds
+        self.recent_turns = recent_turns
+        self.summarize_fn = summarize_fn or extractive_summary
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='summarizer')
+        self._records: Dict[str, SummaryRecord] = {}
+        self._last_scheduled: Dict[str, float] = {}
+        self._in_flight: set = set()
+        self._lock = threading.Lock()
+    
+    def get(self, agent_id: str) -> Optional[SummaryRecord]:
+        """Return the agent's current summary, loading it from the store if needed."""
+        with self._lock:
+            record = self._records.get(agent_id)
+        if record is None and self.store is not None:
+            stored = self.store.load_summary(agent_id)
+            if stored:
+                record = SummaryRecord(**stored)
+                with self._lock:
+                    record = self._records.setdefault(agent_id, record)
+        return record
+    
+    def _pending(self, agent_id: str, history: Sequence[Interaction]) -> List[Interaction]:
+        """Interactions older than the recent window not yet covered by the summary."""
+        older = list(history[:-self.recent_turns]) if self.recent_turns else list(history)
+        record = self.get(agent_id)
+        if record is None or record.summarized_through is None:
+            return older
+        
+        ids = [interaction.id for interaction in older]
+        if record.summarized_through in ids:
+            return older[ids.index(record.summarized_through) + 1:]
+        
+        # The watermark is in the window's recent part: nothing new to fold in
+        if any(interaction.id == record.summarized_through for interaction in history):
+            return []
+        
+        # The watermark slid out of the window: everything in it is newer
+        return older
+    
+    def schedule(self, agent_id: str, history: Sequence[Interaction]) -> bool:
+        """
+        Submit a summarization job for the agent if one is due.
+        
+        Returns:
+            Whether a job was submitted
+        """
+        now = time.monotonic()
+        with self._lock:
+            if agent_id in self._in_flight:
+                return False
+            last = self._last_scheduled.get(agent_id)
+            if last is not None and now - last < self.interval_seconds:
+                return False
+        
+        pending = self._pending(agent_id, history)
+        if not pending:
+            return False
+        
+        with self._lock:
+            if agent_id in self._in_flight:
+                return False
+            self._in_flight.add(agent_id)
+            self._last_scheduled[agent_id] = now
+        
+        self._executor.submit(self._run, agent_id, pending)
+        return True
+    
+    def _run(self, agent_id: str, pending: List[Interaction]) -> None:
+        try:
+            record = self.get(agent_id)
+            previous = record.summary if record else ''
+            summary = self.summarize_fn(previous, pending)
+            
+            new_record = SummaryRecord(
+                summary=summary,
+                summarized_through=pending[-1].id,
+                updated_at=time.time()
+            )
+            with self._lock:
+                self._records[agent_id] = new_record
+            
+            if self.store is not None:
+                self.store.save_summary(
+                    agent_id,
+                    new_record.summary,
+                    new_record.summarized_through,
+                    new_record.updated_at
+                )
+            
+            logger.info(f"Summarized {len(pending)} interactions for agent {agent_id}")
+        except Exception as e:
+            logger.error(f"History summarization failed for agent {agent_id}: {str(e)}")
+        finally:
+            with self._lock:
+                self._in_flight.discard(agent_id)
+    
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting jobs and optionally wait for running ones."""
+        self._executor.shutdown(wait=wait)
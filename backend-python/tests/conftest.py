@@ -0,0 +1,65 @@
+"""
+Shared test doubles.
+"""
+
+import asyncio
+
+
+class MemoryAgent:
+    """
+    Agent double that stores turns in its memory like the SDK.
+    
+    The query is stored before the LLM call (``delay`` seconds, which a
+    deadline may cancel) and the answer after it. Each call's keyword
+    arguments are kept in ``requests``.
+    """
+    
+    def __init__(self, delay=0, response=None, error=None, remember=True, history=()):
+        """
+        Args:
+            delay: Seconds the LLM call takes
+            response: Fixed answer (default "Answer to: <query>")
+            error: Exception every LLM call raises
+            remember: Whether the agent has memory (False for none)
+            history: Interactions already in memory
+        """
+        self.delay = delay
+        self.response = response
+        self.error = error
+        self.calls = 0
+        self.requests = []
+        self.cancelled = False
+        self.messages = []
+        self._memory = self if remember else None
+        for interaction in history:
+            self._add('user', interaction.userQuery, interaction.timestamp)
+            self._add('assistant', interaction.agentResponse, interaction.timestamp)
+    
+    def get_memory(self):
+        return self._memory
+    
+    def get(self, recent_n=None):
+        return self.messages[-recent_n:] if recent_n else list(self.messages)
+    
+    def _add(self, role, content, timestamp=None):
+        message = type('Message', (), {})()
+        message.role, message.content, message.metadata = role, content, {}
+        message.timestamp = 1700000000 + len(self.messages) if timestamp is None else timestamp
+        self.messages.append(message)
+    
+    async def process_query(self, query, **kwargs):
+        self.calls += 1
+        self.requests.append(kwargs)
+        if self.error is not None:
+            raise self.error
+        if self._memory is not None:
+            self._add('user', query)
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        response = self.response if self.response is not None else f"Answer to: {query}"
+        if self._memory is not None:
+            self._add('assistant', response)
+        return response
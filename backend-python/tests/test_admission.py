@@ -0,0 +1,193 @@
+"""
+Unit tests for LLM admission control.
+
+Tests cover the concurrency cap, priority ordering, queue wait limits,
+slot hand-off across threads, and the 429 response on overload.
+"""
+
+import asyncio
+import json
+import os
+import threading
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+# Set test environment variables before importing app
+os.environ['MEMBASE_ACCOUNT'] = '0x1234567890abcdef1234567890abcdef12345678'
+os.environ['MEMBASE_SECRET_KEY'] = 'test_secret_key'
+os.environ['MEMBASE_ID'] = 'test_agent_001'
+os.environ['MEMORY_HUB_ADDRESS'] = '54.169.29.193:8081'
+
+# Mock MEMBASE_AVAILABLE to prevent real blockchain connections
+import agent_manager as am_module
+am_module.MEMBASE_AVAILABLE = False
+
+import app as app_module
+from admission import AdmissionController, OverloadedError
+from agent_manager import AIPAgentManager
+
+
+class TestAdmissionController:
+    """Test suite for AdmissionController."""
+    
+    @pytest.mark.asyncio
+    async def test_concurrency_cap(self):
+        """Test no more than max_concurrent calls run at once."""
+        controller = AdmissionController(max_concurrent=2)
+        running, peak = 0, 0
+        
+        async def call():
+            nonlocal running, peak
+            async with controller.slot():
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+        
+        await asyncio.gather(*(call() for _ in range(10)))
+        
+        assert peak == 2
+        assert controller.active == 0 and controller.queued == 0
+    
+    @pytest.mark.asyncio
+    async def test_interactive_served_before_batch(self):
+        """Test queued interactive calls overtake earlier batch calls."""
+        controller = AdmissionController(max_concurrent=1)
+        await controller.acquire()
+        order = []
+        
+        async def call(name, priority):
+            async with controller.slot(priority):
+                order.append(name)
+        
+        tasks = [asyncio.create_task(call('batch-1', 'batch'))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(call('chat-1', 'interactive')))
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(call('chat-2', 'interactive')))
+        await asyncio.sleep(0)
+        
+        assert controller.queued == 3
+        controller.release()
+        await asyncio.gather(*tasks)
+        
+        assert order == ['chat-1', 'chat-2', 'batch-1']
+    
+    @pytest.mark.asyncio
+    async def test_fair_queuing_across_tenants(self):
+        """Test a tenant with a deep backlog cannot starve others, and weights apply."""
+        controller = AdmissionController(max_concurrent=1, weights={'premium': 2.0})
+        await controller.acquire()
+        order = []
+        
+        async def call(tenant):
+            async with controller.slot('interactive', tenant):
+                order.append(tenant)
+        
+        tasks = []
+        for tenant in ['noisy'] * 4 + ['quiet'] + ['premium'] * 2:
+            tasks.append(asyncio.create_task(call(tenant)))
+            await asyncio.sleep(0)
+        
+        controller.release()
+        await asyncio.gather(*tasks)
+        
+        assert order.index('quiet') <= 2
+        assert order[:4].count('premium') == 2
+        assert order[-1] == 'noisy'
+    
+    @pytest.mark.asyncio
+    async def test_wait_limit_rejects_without_leaking_slots(self):
+        """Test a call waiting too long is rejected and leaves the queue clean."""
+        controller = AdmissionController(max_concurrent=1, max_wait_seconds=0.05)
+        await controller.acquire()
+        
+        with pytest.raises(OverloadedError) as exc_info:
+            await controller.acquire()
+        assert exc_info.value.retry_after >= 1
+        assert controller.queued == 0
+        
+        controller.release()
+        assert controller.active == 0
+        await controller.acquire()
+        assert controller.active == 1
+    
+    @pytest.mark.asyncio
+    async def test_full_queue_rejects_immediately(self):
+        """Test max_queue sheds load without waiting."""
+        controller = AdmissionController(max_concurrent=1, max_wait_seconds=30, max_queue=1)
+        await controller.acquire()
+        waiting = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        
+        with pytest.raises(OverloadedError):
+            await controller.acquire()
+        
+        controller.release()
+        await waiting
+        assert controller.active == 1
+    
+    def test_slots_handed_across_event_loops(self):
+        """Test waiters on other threads' event loops are woken by release."""
+        controller = AdmissionController(max_concurrent=1, max_wait_seconds=5)
+        finished = []
+        
+        async def call(name):
+            async with controller.slot():
+                await asyncio.sleep(0.02)
+                finished.append(name)
+        
+        threads = [threading.Thread(target=asyncio.run, args=(call(n),)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+        
+        assert sorted(finished) == [0, 1, 2, 3]
+        assert controller.active == 0
+
+
+class SlowAgent:
+    async def process_query(self, query, **kwargs):
+        return f"Answer to: {query}"
+
+
+class TestOverloadResponse:
+    """Test suite for the 429 response when the LLM queue is saturated."""
+    
+    @pytest.mark.asyncio
+    async def test_manager_raises_overloaded_unwrapped(self):
+        """Test query_agent surfaces OverloadedError rather than a processing error."""
+        with patch.dict(os.environ, {'LLM_MAX_CONCURRENCY': '1', 'LLM_MAX_QUEUE_WAIT_SECONDS': '0.05'}):
+            manager = AIPAgentManager()
+        manager.agents['busy_agent'] = SlowAgent()
+        await manager.admission.acquire()
+        
+        with pytest.raises(OverloadedError):
+            await manager.query_agent('busy_agent', 'Hello')
+        
+        manager.admission.release()
+        result = await manager.query_agent('busy_agent', 'Hello')
+        assert result['response'] == 'Answer to: Hello'
+    
+    def test_query_returns_429_with_retry_after(self):
+        """Test an overloaded query maps to a retryable 429 with Retry-After."""
+        manager = AIPAgentManager()
+        manager.query_agent = AsyncMock(side_effect=OverloadedError("LLM capacity exhausted", 7))
+        app_module.app.config['TESTING'] = True
+        
+        with patch.object(app_module, 'agent_manager', manager):
+            with app_module.app.test_client() as client:
+                response = client.post('/agent/query', json={
+                    'agent_id': 'busy_agent',
+                    'query': 'Hello',
+                    'priority': 'batch'
+                })
+        
+        assert response.status_code == 429
+        assert response.headers['Retry-After'] == '7'
+        data = json.loads(response.data)
+        assert data['error']['code'] == 'LLM_OVERLOADED'
+        assert data['error']['retryable'] is True
+        assert manager.query_agent.call_args.kwargs['priority'] == 'batch'
@@ -0,0 +1,272 @@
+"""
+Unit tests for the shared agent directory.
+
+Tests cover the SQLite directory and its service/client pair, adoption
+of agents initialized on another replica, and redirects to a live owner.
+"""
+
+import json
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+
+# Set test environment variables before importing agent_manager
+os.environ['MEMBASE_ACCOUNT'] = '0x1234567890abcdef1234567890abcdef12345678'
+os.environ['MEMBASE_SECRET_KEY'] = 'test_secret_key'
+os.environ['MEMBASE_ID'] = 'test_agent_001'
+os.environ['MEMORY_HUB_ADDRESS'] = '54.169.29.193:8081'
+
+# Mock MEMBASE_AVAILABLE to prevent real blockchain connections in tests
+import agent_manager as am_module
+am_module.MEMBASE_AVAILABLE = False
+
+import app as app_module
+from agent_directory import (
+    AgentOwnedElsewhere,
+    RemoteAgentDirectory,
+    SQLiteAgentDirectory,
+    create_directory_app,
+    open_directory
+)
+from agent_manager import AIPAgentManager
+
+
+class MockAgent:
+    """Agent double recording its creation parameters."""
+    
+    def __init__(self, agent_id, description, hub_address):
+        self.agent_id = agent_id
+        self.description = description
+        self.hub_address = hub_address
+    
+    async def process_query(self, query, **kwargs):
+        return f"Mock response to: {query}"
+
+
+async def _mock_create_agent(self, agent_id, description, hub_address):
+    return MockAgent(agent_id, description, hub_address)
+
+
+def _replica(path, replica_id, mode='adopt', lease='60'):
+    env = {
+        'AGENT_DIRECTORY': path,
+        'AGENT_DIRECTORY_MODE': mode,
+        'AGENT_LEASE_SECONDS': lease,
+        'REPLICA_ID': replica_id,
+        'REPLICA_URL': f"http://{replica_id}:5000"
+    }
+    with patch.dict(os.environ, env):
+        return AIPAgentManager()
+
+
+class TestSQLiteAgentDirectory:
+    """Test suite for SQLiteAgentDirectory."""
+    
+    def test_register_and_lookup(self, tmp_path):
+        """Test entries carry metadata, owner and owner liveness."""
+        directory = SQLiteAgentDirectory(str(tmp_path / 'directory.db'), lease_seconds=60)
+        directory.register('agent_a', 'Property matcher', 'hub:8081', 'replica-1')
+        
+        entry = directory.lookup('agent_a')
+        assert (entry.description, entry.memory_hub_address, entry.owner) == \
+            ('Property matcher', 'hub:8081', 'replica-1')
+        assert entry.owner_alive is False
+        
+        directory.heartbeat('replica-1', 'http://replica-1:5000')
+        entry = directory.lookup('agent_a')
+        assert entry.owner_alive is True
+        assert entry.owner_url == 'http://replica-1:5000'
+        assert directory.lookup('missing') is None
+    
+    def test_claim_and_lease_expiry(self, tmp_path):
+        """Test claims move ownership and stale heartbeats end the lease."""
+        directory = SQLiteAgentDirectory(str(tmp_path / 'directory.db'), lease_seconds=0)
+        directory.register('agent_a', 'desc', 'hub:8081', 'replica-1')
+        directory.heartbeat('replica-1', 'http://replica-1:5000')
+        assert directory.lookup('agent_a').owner_alive is False
+        
+        assert directory.claim('agent_a', 'replica-2', None) is True
+        assert directory.lookup('agent_a').owner == 'replica-2'
+    
+    def test_claim_is_compare_and_set(self, tmp_path):
+        """Test a claim against a live owner only succeeds if that owner is the one expected."""
+        directory = SQLiteAgentDirectory(str(tmp_path / 'directory.db'), lease_seconds=60)
+        directory.register('agent_a', 'desc', 'hub:8081', 'replica-1')
+        directory.heartbeat('replica-1', 'http://replica-1:5000')
+        
+        assert directory.claim('agent_a', 'replica-2', 'replica-1') is True
+        directory.heartbeat('replica-2', 'http://replica-2:5000')
+        assert directory.claim('agent_a', 'replica-3', 'replica-1') is False
+        assert directory.claim('agent_a', 'replica-2', 'replica-1') is True
+        assert directory.lookup('agent_a').owner == 'replica-2'
+        assert directory.claim('missing', 'replica-2', None) is False
+        
+        directory.register('agent_b', 'desc', 'hub:8081', 'replica-1')
+        assert directory.owned_elsewhere('replica-2', ['agent_a', 'agent_b', 'missing']) == ['agent_b']
+    
+    def test_remote_client_against_service(self, tmp_path):
+        """Test the remote client round-trips through the directory service, with any ID, given the token."""
+        directory = SQLiteAgentDirectory(str(tmp_path / 'directory.db'))
+        client = create_directory_app(directory, 'secret').test_client()
+        
+        class Response:
+            def __init__(self, test_response):
+                self.status_code = test_response.status_code
+                self._body = test_response.get_json()
+            
+            def json(self):
+                return self._body
+            
+            def raise_for_status(self):
+                if self.status_code >= 400:
+                    raise RuntimeError(self.status_code)
+        
+        class Session:
+            def request(self, method, url, json=None, headers=None, timeout=None):
+                return Response(
+                    client.open(url.replace('http://directory', ''), method=method, json=json, headers=headers)
+                )
+        
+        remote = RemoteAgentDirectory('http://directory', 'secret', session=Session())
+        remote.register('agent_a', 'desc', 'hub:8081', 'replica-1')
+        remote.heartbeat('replica-1', 'http://replica-1:5000')
+        assert remote.claim('agent_a', 'replica-1', 'replica-1') is True
+        assert remote.claim('agent_a', 'replica-2', None) is False
+        
+        entry = remote.lookup('agent_a')
+        assert entry.owner == 'replica-1'
+        assert entry.owner_alive is True
+        assert remote.lookup('missing') is None
+        assert remote.owned_elsewhere('replica-2', ['agent_a']) == ['agent_a']
+        
+        remote.register('team/agent?b#1', 'desc', 'hub:8081', 'host/a:5000')
+        assert remote.lookup('team/agent?b#1').owner == 'host/a:5000'
+        assert remote.claim('team/agent?b#1', 'host/a:5000', 'host/a:5000') is True
+        assert remote.lookup('team') is None
+        
+        with pytest.raises(RuntimeError, match='401'):
+            RemoteAgentDirectory('http://directory', 'wrong', session=Session()).lookup('agent_a')
+        with pytest.raises(ValueError):
+            open_directory('http://directory')
+
+
+class TestReplicaAdoption:
+    """Test suite for agents moving between replicas through the directory."""
+    
+    @pytest.mark.asyncio
+    async def test_agent_adopted_by_other_replica(self, tmp_path):
+        """Test a replica adopts an agent initialized elsewhere and takes ownership."""
+        path = str(tmp_path / 'directory.db')
+        with patch.object(AIPAgentManager, '_create_agent', _mock_create_agent):
+            first = _replica(path, 'replica-1')
+            await first.initialize_agent('agent_x', 'Property matcher', 'hub:9000')
+            
+            second = _replica(path, 'replica-2')
+            status = await second.get_agent_status('agent_x')
+            assert status['status'] == 'active'
+            
+            result = await second.query_agent('agent_x', 'hello')
+        
+        assert result['response'] == 'Mock response to: hello'
+        adopted = second.agents['agent_x']
+        assert (adopted.description, adopted.hub_address) == ('Property matcher', 'hub:9000')
+        assert second.directory.lookup('agent_x').owner == 'replica-2'
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_adoption_has_one_winner(self, tmp_path):
+        """Test a replica whose claim loses to another adopter redirects instead of serving."""
+        path = str(tmp_path / 'directory.db')
+        with patch.object(AIPAgentManager, '_create_agent', _mock_create_agent):
+            first = _replica(path, 'replica-1')
+            await first.initialize_agent('agent_x', 'desc', 'hub:9000')
+            third = _replica(path, 'replica-3')
+        
+        async def create_while_other_claims(self, agent_id, description, hub_address):
+            await third._get_agent(agent_id)
+            return MockAgent(agent_id, description, hub_address)
+        
+        second = _replica(path, 'replica-2')
+        with patch.object(AIPAgentManager, '_create_agent', _mock_create_agent):
+            with patch.object(second, '_create_agent', create_while_other_claims.__get__(second)):
+                with pytest.raises(AgentOwnedElsewhere) as exc_info:
+                    await second.query_agent('agent_x', 'hello')
+        
+        assert exc_info.value.owner == 'replica-3'
+        assert 'agent_x' not in second.agents
+        assert second.directory.lookup('agent_x').owner == 'replica-3'
+    
+    @pytest.mark.asyncio
+    async def test_lost_agents_dropped(self, tmp_path):
+        """Test a replica stops serving agents another replica has claimed."""
+        path = str(tmp_path / 'directory.db')
+        with patch.object(AIPAgentManager, '_create_agent', _mock_create_agent):
+            first = _replica(path, 'replica-1')
+            await first.initialize_agent('agent_x', 'desc', 'hub:9000')
+            await first.initialize_agent('agent_y', 'desc', 'hub:9000')
+            
+            second = _replica(path, 'replica-2')
+            await second.query_agent('agent_x', 'hello')
+        
+        assert first._drop_lost_agents() == ['agent_x']
+        assert set(first.agents) == {'agent_y'}
+    
+    def test_heartbeat_runs_without_traffic(self, tmp_path):
+        """Test a replica renews its lease on a timer, not only when serving requests."""
+        manager = _replica(str(tmp_path / 'directory.db'), 'replica-1')
+        manager.directory.register('agent_x', 'desc', 'hub:9000', 'replica-1')
+        
+        for _ in range(50):
+            if manager.directory.lookup('agent_x').owner_alive:
+                break
+            time.sleep(0.05)
+        assert manager.directory.lookup('agent_x').owner_alive is True
+    
+    @pytest.mark.asyncio
+    async def test_redirect_to_live_owner(self, tmp_path):
+        """Test redirect mode points at a live owner instead of adopting."""
+        path = str(tmp_path / 'directory.db')
+        with patch.object(AIPAgentManager, '_create_agent', _mock_create_agent):
+            first = _replica(path, 'replica-1')
+            await first.initialize_agent('agent_x', 'desc', 'hub:9000')
+            
+            second = _replica(path, 'replica-2', mode='redirect')
+            with pytest.raises(AgentOwnedElsewhere) as exc_info:
+                await second.query_agent('agent_x', 'hello')
+        
+        assert exc_info.value.owner_url == 'http://replica-1:5000'
+        assert 'agent_x' not in second.agents
+    
+    @pytest.mark.asyncio
+    async def test_redirect_mode_adopts_when_owner_gone(self, tmp_path):
+        """Test an agent whose owner's lease expired is adopted even in redirect mode."""
+        path = str(tmp_path / 'directory.db')
+        with patch.object(AIPAgentManager, '_create_agent', _mock_create_agent):
+            first = _replica(path, 'replica-1', lease='0')
+            await first.initialize_agent('agent_x', 'desc', 'hub:9000')
+            
+            second = _replica(path, 'replica-2', mode='redirect', lease='0')
+            result = await second.query_agent('agent_x', 'hello')
+        
+        assert result['response'] == 'Mock response to: hello'
+    
+    def test_query_endpoint_redirects(self, tmp_path):
+        """Test the API answers 307 with the owner's URL for the same path."""
+        manager = _replica(str(tmp_path / 'directory.db'), 'replica-2', mode='redirect')
+        app_module.app.config['TESTING'] = True
+        
+        async def owned_elsewhere(*args, **kwargs):
+            raise AgentOwnedElsewhere('agent_x', 'replica-1', 'http://replica-1:5000')
+        
+        with patch.object(app_module, 'agent_manager', manager), \
+                patch.object(manager, 'query_agent', owned_elsewhere):
+            response = app_module.app.test_client().post(
+                '/agent/query',
+                data=json.dumps({'agent_id': 'agent_x', 'query': 'hello'}),
+                content_type='application/json'
+            )
+        
+        assert response.status_code == 307
+        assert response.headers['Location'] == 'http://replica-1:5000/agent/query'
+        assert json.loads(response.data)['error']['code'] == 'AGENT_ON_OTHER_REPLICA'
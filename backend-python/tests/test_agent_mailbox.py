@@ -0,0 +1,144 @@
+"""
+Unit tests for per-agent mailboxes.
+
+Tests cover in-order serialization per agent, parallelism across agents,
+the queue depth bound, cancellation, and correctly paired history under
+concurrent queries.
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+# Set test environment variables before importing agent_manager
+os.environ['MEMBASE_ACCOUNT'] = '0x1234567890abcdef1234567890abcdef12345678'
+os.environ['MEMBASE_SECRET_KEY'] = 'test_secret_key'
+os.environ['MEMBASE_ID'] = 'test_agent_001'
+os.environ['MEMORY_HUB_ADDRESS'] = '54.169.29.193:8081'
+
+# Mock MEMBASE_AVAILABLE to prevent real blockchain connections in tests
+import agent_manager as am_module
+am_module.MEMBASE_AVAILABLE = False
+
+from agent_mailbox import AgentMailboxes, MailboxFullError
+from agent_manager import AIPAgentManager
+from tests.conftest import MemoryAgent
+
+
+class TestAgentMailboxes:
+    """Test suite for AgentMailboxes."""
+    
+    @pytest.mark.asyncio
+    async def test_turns_for_one_agent_run_in_order(self):
+        """Test turns for the same agent never overlap and keep arrival order."""
+        mailboxes = AgentMailboxes()
+        log = []
+        
+        async def turn(n):
+            async with mailboxes.turn('agent'):
+                log.append(('start', n))
+                await asyncio.sleep(0.01)
+                log.append(('end', n))
+        
+        await asyncio.gather(*(turn(n) for n in range(4)))
+        
+        assert log == [(event, n) for n in range(4) for event in ('start', 'end')]
+        assert mailboxes.depth('agent') == 0
+    
+    @pytest.mark.asyncio
+    async def test_agents_run_in_parallel(self):
+        """Test turns for different agents overlap."""
+        mailboxes = AgentMailboxes()
+        
+        async def turn(agent_id):
+            async with mailboxes.turn(agent_id):
+                await asyncio.sleep(0.1)
+        
+        started = time.monotonic()
+        await asyncio.gather(*(turn(f'agent_{n}') for n in range(5)))
+        
+        assert time.monotonic() - started < 0.3
+    
+    @pytest.mark.asyncio
+    async def test_depth_bound(self):
+        """Test a full mailbox rejects new turns with a retry hint."""
+        mailboxes = AgentMailboxes(max_depth=2, retry_after_seconds=3)
+        await mailboxes.acquire('agent')
+        waiting = asyncio.create_task(mailboxes.acquire('agent'))
+        await asyncio.sleep(0)
+        
+        with pytest.raises(MailboxFullError) as exc_info:
+            await mailboxes.acquire('agent')
+        assert exc_info.value.retry_after == 3
+        
+        await mailboxes.acquire('other_agent')
+        mailboxes.release('agent')
+        await waiting
+        assert mailboxes.depth('agent') == 1
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_queue(self):
+        """Test a cancelled turn is removed and the next one still runs."""
+        mailboxes = AgentMailboxes()
+        await mailboxes.acquire('agent')
+        cancelled = asyncio.create_task(mailboxes.acquire('agent'))
+        queued = asyncio.create_task(mailboxes.acquire('agent'))
+        await asyncio.sleep(0)
+        
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        assert mailboxes.depth('agent') == 2
+        
+        mailboxes.release('agent')
+        await asyncio.wait_for(queued, 1)
+        mailboxes.release('agent')
+        assert mailboxes.depth('agent') == 0
+    
+    def test_turns_serialized_across_threads(self):
+        """Test turns on separate threads' event loops are serialized."""
+        mailboxes = AgentMailboxes()
+        active, peak = 0, 0
+        lock = threading.Lock()
+        
+        async def turn():
+            nonlocal active, peak
+            async with mailboxes.turn('agent'):
+                with lock:
+                    active += 1
+                    peak = max(peak, active)
+                await asyncio.sleep(0.01)
+                with lock:
+                    active -= 1
+        
+        threads = [threading.Thread(target=asyncio.run, args=(turn(),)) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+        
+        assert peak == 1
+
+
+class TestConcurrentQueries:
+    """Test suite for concurrent queries to one agent."""
+    
+    @pytest.mark.asyncio
+    async def test_history_pairs_stay_matched(self):
+        """Test concurrent queries produce correctly paired interactions."""
+        manager = AIPAgentManager()
+        # Memory writes straddle the LLM call's await, like the SDK's
+        manager.agents['busy_agent'] = MemoryAgent(delay=0.05)
+        
+        results = await asyncio.gather(
+            manager.query_agent('busy_agent', 'first'),
+            manager.query_agent('busy_agent', 'second')
+        )
+        
+        history = results[-1]['agent_state'].interactionHistory
+        assert [(i.userQuery, i.agentResponse) for i in history] == [
+            ('first', 'Answer to: first'),
+            ('second', 'Answer to: second')
+        ]
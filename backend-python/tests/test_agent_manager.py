@@ -120,7 +120,7 @@ class TestAIPAgentManager:
         assert 'response' in result
         assert 'agent_state' in result
         assert 'interaction_id' in result
-        assert result['agent_state']['membaseId'] == 'test_agent_003'
+        assert result['agent_state'].membaseId == 'test_agent_003'
     
     @pytest.mark.asyncio
     async def test_query_agent_not_initialized(self):
@@ -166,7 +166,7 @@ class TestAIPAgentManager:
         assert result['agent_id'] == 'test_agent_005'
         assert 'state' in result
         assert 'last_updated' in result
-        assert result['state']['membaseId'] == 'test_agent_005'
+        assert result['state'].membaseId == 'test_agent_005'
     
     @pytest.mark.asyncio
     async def test_get_agent_memory_not_initialized(self):
@@ -176,6 +176,203 @@ class TestAIPAgentManager:
         assert "has not been initialized" in str(exc_info.value)
 
 
+class FakeMessage:
+    """Minimal stand-in for a Membase message."""
+    
+    def __init__(self, role, content, timestamp=None):
+        self.role = role
+        self.content = content
+        self.metadata = {}
+        if timestamp is not None:
+            self.timestamp = timestamp
+
+
+class FakeConversation:
+    """In-memory conversation that mimics the Membase memory API."""
+    
+    def __init__(self):
+        self.messages = []
+    
+    def get(self, recent_n=None):
+        return self.messages[-recent_n:] if recent_n else list(self.messages)
+
+
+class FakeMemory:
+    def __init__(self):
+        self.conversation = FakeConversation()
+    
+    def get_memory(self):
+        return self.conversation
+
+
+class FakeAgent:
+    """Agent double that stores each turn in its memory like the SDK does."""
+    
+    def __init__(self, timestamps=True):
+        self._memory = FakeMemory()
+        self.timestamps = timestamps
+        self.clock = 1700000000
+    
+    async def process_query(self, query, **kwargs):
+        response = f"Answer to: {query}"
+        self.clock += 1
+        timestamp = self.clock if self.timestamps else None
+        self._memory.conversation.messages.append(FakeMessage('user', query, timestamp))
+        self._memory.conversation.messages.append(FakeMessage('assistant', response, timestamp))
+        return response
+
+
+class TestInteractionIds:
+    """Test suite for stable interaction identifiers."""
+    
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.manager = AIPAgentManager()
+    
+    @pytest.mark.asyncio
+    async def test_history_ids_stable_across_reads(self):
+        """Test repeated reads return the same interaction IDs."""
+        agent = FakeAgent()
+        self.manager.agents['stable_agent'] = agent
+        await agent.process_query('first')
+        await agent.process_query('second')
+        
+        first_read = self.manager._get_agent_state_from_membase('stable_agent')
+        second_read = self.manager._get_agent_state_from_membase('stable_agent')
+        
+        first_ids = [i.id for i in first_read.interactionHistory]
+        second_ids = [i.id for i in second_read.interactionHistory]
+        assert len(first_ids) == 2
+        assert first_ids == second_ids
+        assert len(set(first_ids)) == 2
+    
+    @pytest.mark.asyncio
+    async def test_identical_turns_without_timestamps_get_distinct_ids(self):
+        """Test repeated identical turns are not collapsed into one ID."""
+        agent = FakeAgent(timestamps=False)
+        self.manager.agents['repeat_agent'] = agent
+        await agent.process_query('same question')
+        await agent.process_query('same question')
+        
+        state = self.manager._get_agent_state_from_membase('repeat_agent')
+        ids = [i.id for i in state.interactionHistory]
+        
+        assert len(set(ids)) == 2
+        reread = self.manager._get_agent_state_from_membase('repeat_agent')
+        assert ids == [i.id for i in reread.interactionHistory]
+    
+    @pytest.mark.asyncio
+    async def test_query_interaction_id_matches_history(self):
+        """Test the returned interaction_id is the one seen in the history."""
+        self.manager.agents['query_agent'] = FakeAgent()
+        
+        result = await self.manager.query_agent('query_agent', 'What is my yield?')
+        history = result['agent_state'].interactionHistory
+        
+        assert history[-1].id == result['interaction_id']
+        
+        memory = await self.manager.get_agent_memory('query_agent')
+        assert memory['state'].interactionHistory[-1].id == result['interaction_id']
+    
+    @pytest.mark.asyncio
+    async def test_unsynced_turn_id_matches_appended_interaction(self):
+        """Test a turn missing from the hub read is appended with the ID returned."""
+        agent = FakeAgent()
+        await agent.process_query('What is my yield?')
+        
+        async def unsynced(query, **kwargs):
+            return "Not stored yet"
+        agent.process_query = unsynced
+        self.manager.agents['lagging_agent'] = agent
+        
+        result = await self.manager.query_agent('lagging_agent', 'What is my yield?')
+        history = result['agent_state'].interactionHistory
+        
+        assert (history[-1].agentResponse, history[-1].id) == ("Not stored yet", result['interaction_id'])
+        assert history[0].id != result['interaction_id']
+    
+    @pytest.mark.asyncio
+    async def test_state_serializes_at_http_boundary(self):
+        """Test the typed state dumps to the camelCase wire format."""
+        from models import AgentState, QueryResponse
+        
+        self.manager.agents['typed_agent'] = FakeAgent()
+        result = await self.manager.query_agent('typed_agent', 'Hello')
+        
+        assert isinstance(result['agent_state'], AgentState)
+        payload = QueryResponse(
+            success=True,
+            response=result['response'],
+            agent_state=result['agent_state'],
+            interaction_id=result['interaction_id']
+        ).model_dump()
+        
+        history = payload['agent_state']['interactionHistory']
+        assert payload['agent_state']['membaseId'] == 'typed_agent'
+        assert history[-1]['id'] == result['interaction_id']
+        assert history[-1]['userQuery'] == 'Hello'
+    
+    def test_constructed_state_validated_at_http_boundary(self):
+        """Test a state built without validation is validated when a response embeds it."""
+        from pydantic import ValidationError
+        from models import AgentMemory
+        
+        state = self.manager._build_agent_state('typed_agent')
+        AgentMemory(agent_id='typed_agent', state=state, last_updated='now')
+        
+        state.interactionHistory.append(am_module.Interaction.model_construct(id='1', userQuery=None))
+        with pytest.raises(ValidationError):
+            AgentMemory(agent_id='typed_agent', state=state, last_updated='now')
+
+
+class TestRingEviction:
+    """Test suite for evicting agents a dispatcher ring change moved away."""
+    
+    def setup_method(self):
+        from sharding import HashRing
+        self.manager = AIPAgentManager()
+        self.agent_ids = [f"agent_{n}" for n in range(40)]
+        for agent_id in self.agent_ids:
+            self.manager.agents[agent_id] = Mock()
+        self.ring = HashRing(['worker-0', 'worker-1'], vnodes=16)
+    
+    def test_moved_agents_evicted(self):
+        """Test only agents the new ring places on another worker are evicted."""
+        evicted = self.manager.apply_ring('worker-0', 1, ['worker-0', 'worker-1'], 16)
+        
+        assert set(evicted) == {a for a in self.agent_ids if self.ring.owner(a) != 'worker-0'}
+        assert set(self.manager.agents) == {a for a in self.agent_ids if self.ring.owner(a) == 'worker-0'}
+    
+    def test_stale_and_missed_views(self):
+        """Test older views are ignored and a version gap evicts every live agent."""
+        self.manager.apply_ring('worker-0', 1, ['worker-0'], 16)
+        assert len(self.manager.agents) == 40
+        
+        assert self.manager.apply_ring('worker-0', 1, ['worker-1'], 16) == []
+        assert len(self.manager.agents) == 40
+        
+        self.manager.apply_ring('worker-0', 3, ['worker-0'], 16)
+        assert self.manager.agents == {}
+    
+    def test_eviction_drops_index_and_profile(self):
+        """Test an evicted agent's semantic index and recommender profile are discarded."""
+        from semantic_index import SemanticMemory
+        self.manager.semantic_memory = SemanticMemory()
+        turn = am_module.Interaction.model_construct(
+            id='t1', userQuery='pool in dubai', agentResponse='ok', timestamp=0
+        )
+        for agent_id in ('agent_0', 'agent_1'):
+            self.manager.semantic_memory.add(agent_id, [turn])
+            self.manager.recommender.update_profile(agent_id, {'city': 'Dubai'}, [turn])
+        
+        self.manager._evict_agent('agent_0')
+        
+        assert not self.manager.semantic_memory.has_agent('agent_0')
+        assert not self.manager.recommender.has_profile('agent_0')
+        assert self.manager.semantic_memory.has_agent('agent_1')
+        assert self.manager.recommender.has_profile('agent_1')
+
+
 class TestConfigurationValidation:
     """Test suite for configuration validation."""
     
@@ -0,0 +1,259 @@
+"""
+Unit tests for dependency circuit breakers.
+
+Tests cover opening on the failure rate, fast rejection, the half-open
+probe, failure classification, and how the manager and API behave while
+a dependency's circuit is open.
+"""
+
+import asyncio
+import json
+import os
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+# Set test environment variables before importing agent_manager
+os.environ['MEMBASE_ACCOUNT'] = '0x1234567890abcdef1234567890abcdef12345678'
+os.environ['MEMBASE_SECRET_KEY'] = 'test_secret_key'
+os.environ['MEMBASE_ID'] = 'test_agent_001'
+os.environ['MEMORY_HUB_ADDRESS'] = '54.169.29.193:8081'
+
+# Mock MEMBASE_AVAILABLE to prevent real blockchain connections in tests
+import agent_manager as am_module
+am_module.MEMBASE_AVAILABLE = False
+
+import app as app_module
+from agent_manager import AIPAgentManager
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from deadline import Deadline, DeadlineExceeded
+from tests.conftest import MemoryAgent
+
+
+async def _fail(breaker, error=RuntimeError('down'), is_failure=None):
+    with pytest.raises(type(error)):
+        async with breaker.guard(is_failure):
+            raise error
+
+
+async def _succeed(breaker):
+    async with breaker.guard():
+        pass
+
+
+class TestCircuitBreaker:
+    """Test suite for CircuitBreaker."""
+    
+    @pytest.mark.asyncio
+    async def test_opens_on_failure_rate(self):
+        """Test the breaker opens once enough calls fail, then rejects fast."""
+        breaker = CircuitBreaker('hub', failure_rate=0.5, min_calls=4)
+        await _succeed(breaker)
+        await _fail(breaker)
+        await _succeed(breaker)
+        assert breaker.state == CLOSED
+        
+        await _fail(breaker)
+        assert breaker.state == OPEN
+        
+        with pytest.raises(CircuitOpenError) as exc_info:
+            await _succeed(breaker)
+        assert exc_info.value.dependency == 'hub'
+        assert exc_info.value.retry_after >= 1
+    
+    @pytest.mark.asyncio
+    async def test_needs_min_calls(self):
+        """Test a few failures below min_calls do not open the breaker."""
+        breaker = CircuitBreaker('hub', failure_rate=0.5, min_calls=5)
+        for _ in range(4):
+            await _fail(breaker)
+        assert breaker.state == CLOSED
+    
+    @pytest.mark.asyncio
+    async def test_old_failures_leave_window(self):
+        """Test failures outside the rolling window are forgotten."""
+        breaker = CircuitBreaker('hub', failure_rate=0.5, min_calls=3, window_seconds=0.1)
+        await _fail(breaker)
+        await _fail(breaker)
+        await asyncio.sleep(0.15)
+        await _fail(breaker)
+        assert breaker.state == CLOSED
+        assert breaker.snapshot()['failures'] == 1
+    
+    @pytest.mark.asyncio
+    async def test_half_open_probe(self):
+        """Test one probe is let through after the cool-down and decides the state."""
+        breaker = CircuitBreaker('hub', min_calls=1, open_seconds=0.05)
+        await _fail(breaker)
+        await asyncio.sleep(0.06)
+        assert breaker.state == HALF_OPEN
+        
+        probe = breaker.allow()
+        assert probe is True
+        with pytest.raises(CircuitOpenError):
+            breaker.allow()
+        breaker.record_failure(probe)
+        assert breaker.state == OPEN
+        
+        await asyncio.sleep(0.06)
+        await _succeed(breaker)
+        assert breaker.state == CLOSED
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_probe_is_released(self):
+        """Test a cancelled probe lets the next call probe instead."""
+        breaker = CircuitBreaker('hub', min_calls=1, open_seconds=0.01)
+        await _fail(breaker)
+        await asyncio.sleep(0.02)
+        
+        async def hang():
+            async with breaker.guard():
+                await asyncio.sleep(10)
+        
+        task = asyncio.create_task(hang())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        
+        await _succeed(breaker)
+        assert breaker.state == CLOSED
+    
+    @pytest.mark.asyncio
+    async def test_is_failure_classifies_errors(self):
+        """Test errors the dependency reported deliberately do not count."""
+        breaker = CircuitBreaker('chain', min_calls=1)
+        await _fail(breaker, ValueError('execution reverted'), is_failure=lambda e: False)
+        assert breaker.state == CLOSED
+    
+    def test_zero_rate_disables(self):
+        """Test a failure rate of 0 never opens the breaker."""
+        breaker = CircuitBreaker('hub', failure_rate=0, min_calls=1)
+        for _ in range(10):
+            breaker.record_failure()
+        assert breaker.state == CLOSED
+
+
+class TestManagerBreakers:
+    """Test suite for circuit breakers in AIPAgentManager."""
+    
+    @pytest.mark.asyncio
+    async def test_llm_breaker_fails_fast(self):
+        """Test queries stop reaching a failing LLM once its circuit opens."""
+        manager = AIPAgentManager()
+        manager.breakers['llm'] = CircuitBreaker('llm', min_calls=3)
+        agent = MemoryAgent(error=RuntimeError('LLM provider returned 502'), remember=False)
+        manager.agents['agent'] = agent
+        
+        for _ in range(3):
+            with pytest.raises(am_module.QueryProcessingError):
+                await manager.query_agent('agent', 'hello')
+        
+        with pytest.raises(CircuitOpenError) as exc_info:
+            await manager.query_agent('agent', 'hello')
+        assert exc_info.value.dependency == 'llm'
+        assert agent.calls == 3
+        assert manager.dependency_health()['llm']['state'] == OPEN
+    
+    @pytest.mark.asyncio
+    async def test_failed_hub_reads_open_breaker(self):
+        """Test Memory Hub read errors count against its breaker instead of being swallowed."""
+        manager = AIPAgentManager()
+        manager.breakers['memory_hub'] = CircuitBreaker('memory_hub', min_calls=3)
+        agent = MemoryAgent(error=RuntimeError('LLM provider returned 502'), remember=False)
+        agent._memory = MagicMock()
+        agent._memory.get_memory.return_value.get.side_effect = ConnectionError('hub unreachable')
+        manager.agents['agent'] = agent
+        
+        for _ in range(3):
+            result = await manager.get_agent_memory('agent')
+            assert result['state'].memoryHubConnected is False
+        
+        with pytest.raises(CircuitOpenError) as exc_info:
+            await manager.get_agent_memory('agent')
+        assert exc_info.value.dependency == 'memory_hub'
+        assert agent._memory.get_memory.return_value.get.call_count == 3
+    
+    @pytest.mark.asyncio
+    async def test_caller_budget_does_not_open_breaker(self):
+        """Test short request deadlines leave the LLM breaker closed; LLM_TIMEOUT expiries open it."""
+        manager = AIPAgentManager()
+        manager.breakers['llm'] = CircuitBreaker('llm', min_calls=3)
+        manager.agents['agent'] = MemoryAgent(delay=1, response='late', remember=False)
+        
+        for _ in range(3):
+            with pytest.raises(DeadlineExceeded):
+                await manager.query_agent('agent', 'hello', deadline=Deadline(0.05))
+        assert manager.dependency_health()['llm']['state'] == CLOSED
+        
+        manager.llm_timeout = 0.05
+        for _ in range(3):
+            with pytest.raises(DeadlineExceeded):
+                await manager.query_agent('agent', 'hello')
+        assert manager.dependency_health()['llm']['state'] == OPEN
+    
+    @pytest.mark.asyncio
+    async def test_status_served_while_chain_down(self):
+        """Test status checks report the last known owner while the chain circuit is open."""
+        manager = AIPAgentManager()
+        manager.membase_client = MagicMock()
+        owner = '0x1234567890abcdef1234567890abcdef12345678'
+        manager.membase_client.get_agent.return_value = owner
+        
+        with patch.object(am_module, 'MEMBASE_AVAILABLE', True):
+            await manager.get_agent_status('agent')
+            manager.breakers['chain_rpc'].record_failure(probe=True)
+            manager.membase_client.get_agent.reset_mock()
+            
+            started = time.monotonic()
+            status = await manager.get_agent_status('agent')
+        
+        assert time.monotonic() - started < 0.5
+        assert status['registered'] is True
+        assert status['wallet_address'] == owner
+        manager.membase_client.get_agent.assert_not_called()
+
+
+class TestBreakerEndpoints:
+    """Test suite for circuit breaker state in the Flask app."""
+    
+    @pytest.fixture
+    def client(self):
+        app_module.app.config['TESTING'] = True
+        with app_module.app.test_client() as client:
+            yield client
+    
+    def test_health_reports_breakers(self, client):
+        """Test /health lists each dependency and turns degraded when one is open."""
+        manager = AIPAgentManager()
+        with patch.object(app_module, 'agent_manager', manager):
+            data = json.loads(client.get('/health').data)
+            assert data['status'] == 'healthy'
+            assert set(data['dependencies']) == {'memory_hub', 'chain_rpc', 'llm'}
+            
+            manager.breakers['memory_hub'].record_failure(probe=True)
+            data = json.loads(client.get('/health').data)
+        
+        assert data['status'] == 'degraded'
+        assert data['dependencies']['memory_hub']['state'] == OPEN
+    
+    def test_open_circuit_returns_503(self, client):
+        """Test a rejected query is a retryable 503 with Retry-After."""
+        manager = AIPAgentManager()
+        manager.agents['agent'] = MemoryAgent(error=RuntimeError('LLM provider returned 502'), remember=False)
+        manager.breakers['llm'].record_failure(probe=True)
+        
+        with patch.object(app_module, 'agent_manager', manager):
+            response = client.post(
+                '/agent/query',
+                data=json.dumps({'agent_id': 'agent', 'query': 'hello'}),
+                content_type='application/json'
+            )
+        
+        assert response.status_code == 503
+        assert int(response.headers['Retry-After']) >= 1
+        error = json.loads(response.data)['error']
+        assert error['code'] == 'DEPENDENCY_UNAVAILABLE'
+        assert error['retryable'] is True
+        assert error['details']['dependency'] == 'llm'
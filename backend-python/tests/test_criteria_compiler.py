@@ -0,0 +1,241 @@
+"""
+Unit tests for the search criteria compiler.
+
+Tests cover request normalization, reply validation, exact and
+near-duplicate cache hits, the rule fallback, and the compile endpoint.
+"""
+
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+# Set test environment variables before importing agent_manager
+os.environ['MEMBASE_ACCOUNT'] = '0x1234567890abcdef1234567890abcdef12345678'
+os.environ['MEMBASE_SECRET_KEY'] = 'test_secret_key'
+os.environ['MEMBASE_ID'] = 'test_agent_001'
+os.environ['MEMORY_HUB_ADDRESS'] = '54.169.29.193:8081'
+
+# Mock MEMBASE_AVAILABLE to prevent real blockchain connections in tests
+import agent_manager as am_module
+am_module.MEMBASE_AVAILABLE = False
+
+import app as app_module
+from agent_manager import AIPAgentManager
+from criteria_compiler import (
+    CompileError,
+    CriteriaCompiler,
+    canonical_request,
+    parse_criteria,
+    request_signature
+)
+from tests.test_intent_router import LISTINGS
+
+CITIES = ['dubai', 'lisbon']
+AMENITIES = ['pool', 'gym']
+
+
+class FakeLLM:
+    """LLM call returning fixed criteria and counting calls."""
+    
+    def __init__(self, reply='{"cities": ["dubai"], "max_bedrooms": 2, "min_bedrooms": 2, "max_price": 2000}'):
+        self.reply = reply
+        self.calls = []
+    
+    async def __call__(self, system_prompt, text):
+        self.calls.append((system_prompt, text))
+        if isinstance(self.reply, Exception):
+            raise self.reply
+        return self.reply
+
+
+class TestNormalization:
+    """Test suite for request normalization and signatures."""
+    
+    def test_canonical_request(self):
+        """Test amounts, number words, hyphens and filler are normalized."""
+        assert canonical_request("Please show me two-bedroom flats in Dubai under $2,000!") == \
+            canonical_request("2 bedroom flats in dubai under 2k") == "2 bedroom flats in dubai under 2000"
+        assert canonical_request("villas over 1.5k") == "villas over 1500"
+    
+    def test_signature_separates_different_criteria(self):
+        """Test rewordings share a signature while other numbers, operators or cities do not."""
+        def signature(query):
+            return request_signature(canonical_request(query), CITIES + AMENITIES)
+        
+        base = signature("2 bedroom flats in dubai under 2000")
+        assert signature("2 bedroom apartments in dubai under 2000") == base
+        assert signature("2 bedroom flats in dubai under 3000") != base
+        assert signature("2 bedroom flats in lisbon under 2000") != base
+        assert signature("2 bedroom flats in dubai over 2000") != base
+
+
+class TestParseCriteria:
+    """Test suite for parse_criteria."""
+    
+    def test_fenced_reply(self):
+        """Test a fenced object is read, keeping only search fields that are set."""
+        reply = '```json\n{"cities": ["Dubai"], "max_price": "2000", "latitude": 25.2, ' \
+            '"min_yield": null, "sort_by": "distance", "descending": true}\n```'
+        assert parse_criteria(reply) == {'cities': ['Dubai'], 'max_price': 2000.0}
+    
+    @pytest.mark.parametrize('reply', [
+        "Sorry, I can't help with that",
+        '{"cities": ',
+        '["dubai"]',
+        '{"limit": 500}',
+        '{"sort_by": "rating"}'
+    ])
+    def test_invalid_reply(self, reply):
+        """Test replies without valid criteria are rejected."""
+        with pytest.raises(CompileError):
+            parse_criteria(reply)
+
+
+class TestCriteriaCompiler:
+    """Test suite for CriteriaCompiler."""
+    
+    @pytest.mark.asyncio
+    async def test_exact_and_near_duplicate_hits(self):
+        """Test only the first of several rewordings calls the LLM."""
+        compiler = CriteriaCompiler(similarity_threshold=0.5)
+        llm = FakeLLM()
+        
+        first = await compiler.compile("2 bedroom flats in Dubai under $2000", llm, CITIES, AMENITIES)
+        exact = await compiler.compile("  2-bedroom flats in dubai under 2k? ", llm, CITIES, AMENITIES)
+        near = await compiler.compile("please show me 2 bedroom apartments in dubai under 2000", llm, CITIES, AMENITIES)
+        
+        assert [first.source, exact.source, near.source] == ['llm', 'cache', 'cache']
+        assert first.criteria == exact.criteria == near.criteria
+        assert len(llm.calls) == 1
+        assert 'dubai' in llm.calls[0][0] and llm.calls[0][1] == "2 bedroom flats in Dubai under $2000"
+    
+    @pytest.mark.asyncio
+    async def test_different_criteria_miss(self):
+        """Test a different budget is compiled again despite similar wording."""
+        compiler = CriteriaCompiler(similarity_threshold=0.5)
+        llm = FakeLLM()
+        
+        await compiler.compile("2 bedroom flats in dubai under 2000", llm, CITIES)
+        result = await compiler.compile("2 bedroom flats in dubai under 2500", llm, CITIES)
+        
+        assert result.source == 'llm'
+        assert len(llm.calls) == 2
+    
+    @pytest.mark.asyncio
+    async def test_expiry_and_eviction(self):
+        """Test entries expire after the TTL and the least recently used is evicted."""
+        llm = FakeLLM()
+        expired = CriteriaCompiler(ttl_seconds=0)
+        await expired.compile("flats in dubai", llm)
+        assert (await expired.compile("flats in dubai", llm)).source == 'llm'
+        
+        compiler = CriteriaCompiler(max_entries=2)
+        for query in ("flats in dubai", "villas in dubai", "flats in dubai", "lofts in dubai"):
+            await compiler.compile(query, llm)
+        assert len(compiler) == 2
+        assert (await compiler.compile("flats in dubai", llm)).source == 'cache'
+        assert (await compiler.compile("villas in dubai", llm)).source == 'llm'
+    
+    @pytest.mark.asyncio
+    async def test_cached_criteria_are_copies(self):
+        """Test changing returned criteria does not change the cache."""
+        compiler = CriteriaCompiler()
+        first = await compiler.compile("flats in dubai", FakeLLM())
+        first.criteria['cities'].append('lisbon')
+        
+        assert (await compiler.compile("flats in dubai", FakeLLM())).criteria['cities'] == ['dubai']
+    
+    @pytest.mark.asyncio
+    async def test_rules_without_or_after_llm(self):
+        """Test the rules compile without an LLM or after it fails, uncached."""
+        compiler = CriteriaCompiler()
+        
+        result = await compiler.compile("studios in lisbon with a gym", None, CITIES, AMENITIES)
+        assert result.source == 'rules'
+        assert result.criteria == {'cities': ['lisbon'], 'amenities': ['gym'], 'min_bedrooms': 0, 'max_bedrooms': 0}
+        
+        with pytest.raises(ValueError, match='rome'):
+            await compiler.compile("studios in rome", None, CITIES, AMENITIES)
+        with pytest.raises(ValueError, match='negates'):
+            await compiler.compile("studios in lisbon without a gym", None, CITIES, AMENITIES)
+        with pytest.raises(ValueError, match='furnished'):
+            await compiler.compile("furnished studios in lisbon", None, CITIES, AMENITIES)
+        
+        failing = FakeLLM('no criteria here')
+        assert (await compiler.compile("studios in lisbon", failing, CITIES)).source == 'rules'
+        assert len(compiler) == 0
+        
+        with pytest.raises(CompileError):
+            await compiler.compile("somewhere nice", failing, CITIES)
+        with pytest.raises(CompileError):
+            await compiler.compile("studios in lisbon without a gym", failing, CITIES, AMENITIES)
+        with pytest.raises(CompileError):
+            await compiler.compile("studios in rome", failing, CITIES)
+
+
+class CompilerAgent:
+    """Agent double whose LLM replies with fixed criteria."""
+    
+    def __init__(self):
+        self.calls = []
+    
+    async def process_query(self, query, system_prompt=None, **kwargs):
+        self.calls.append((query, system_prompt, kwargs))
+        return '{"cities": ["Dubai"], "max_price": 2000, "sort_by": "price"}'
+
+
+@pytest.fixture
+def manager():
+    with patch.dict(os.environ, {'CRITERIA_COMPILER_AGENT': 'compiler'}):
+        manager = AIPAgentManager()
+    manager.properties.upsert(LISTINGS)
+    manager.agents['compiler'] = CompilerAgent()
+    return manager
+
+
+class TestCompileEndpoint:
+    """Test suite for the compile endpoint."""
+    
+    def _post(self, manager, body):
+        app_module.app.config['TESTING'] = True
+        with patch.object(app_module, 'agent_manager', manager):
+            response = app_module.app.test_client().post(
+                '/properties/compile',
+                data=json.dumps(body),
+                content_type='application/json'
+            )
+        return response.status_code, json.loads(response.data)
+    
+    def test_compile_and_search(self, manager):
+        """Test the agent's LLM compiles once, without history or tools, and repeats hit the cache."""
+        status, first = self._post(manager, {'query': 'Apartments in Dubai under $2,000', 'search': True})
+        _, repeat = self._post(manager, {'query': 'apartments in dubai under 2k'})
+        
+        assert status == 200
+        assert (first['source'], repeat['source']) == ('llm', 'cache')
+        assert first['criteria'] == repeat['criteria'] == {'cities': ['Dubai'], 'max_price': 2000.0, 'sort_by': 'price'}
+        assert [listing['property_id'] for listing in first['properties']] == ['p1']
+        assert repeat['properties'] is None
+        
+        ((query, system_prompt, kwargs),) = manager.agents['compiler'].calls
+        assert query == 'Apartments in Dubai under $2,000' and 'JSON' in system_prompt
+        assert kwargs == {'use_history': False, 'recent_n_messages': 0, 'use_tool_call': False}
+    
+    def test_rules_without_compiler_agent(self, manager):
+        """Test requests are compiled by the rules when the agent is not initialized."""
+        del manager.agents['compiler']
+        status, data = self._post(manager, {'query': 'cheapest flats in lisbon'})
+        
+        assert status == 200
+        assert data['source'] == 'rules'
+        assert data['criteria'] == {'cities': ['lisbon'], 'sort_by': 'price', 'descending': False}
+        
+        status, data = self._post(manager, {'query': 'cheapest flats in rome'})
+        assert status == 400 and data['error']['code'] == 'INVALID_REQUEST'
+    
+    def test_empty_query(self, manager):
+        """Test an empty request is a 400."""
+        status, data = self._post(manager, {'query': ''})
+        assert status == 400 and data['error']['code'] == 'INVALID_REQUEST'
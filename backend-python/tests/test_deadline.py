@@ -0,0 +1,245 @@
+"""
+Unit tests for request deadlines.
+
+Tests cover header parsing, per-stage timeout codes, cancellation of the
+running stage, the post-query sync fallback, and the 504 responses.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+# Set test environment variables before importing agent_manager
+os.environ['MEMBASE_ACCOUNT'] = '0x1234567890abcdef1234567890abcdef12345678'
+os.environ['MEMBASE_SECRET_KEY'] = 'test_secret_key'
+os.environ['MEMBASE_ID'] = 'test_agent_001'
+os.environ['MEMORY_HUB_ADDRESS'] = '54.169.29.193:8081'
+
+# Mock MEMBASE_AVAILABLE to prevent real blockchain connections in tests
+import agent_manager as am_module
+am_module.MEMBASE_AVAILABLE = False
+
+from agent_manager import AIPAgentManager
+from app import app
+from deadline import DEADLINE_HEADER, Deadline, DeadlineExceeded
+from tests.conftest import MemoryAgent
+
+
+class TestDeadline:
+    """Test suite for Deadline."""
+    
+    def test_from_header(self):
+        """Test the header is read as milliseconds, with a fallback default."""
+        assert Deadline.from_header('1500').remaining() == pytest.approx(1.5, abs=0.05)
+        assert Deadline.from_header(None).remaining() is None
+        assert Deadline.from_header('soon', 2).remaining() == pytest.approx(2, abs=0.05)
+        assert Deadline.from_header('-5', None).remaining() is None
+    
+    def test_timeout_for_applies_cap(self):
+        """Test a stage gets the smaller of its cap and the remaining budget."""
+        assert Deadline().timeout_for(3) == 3
+        assert Deadline(1).timeout_for(3) == pytest.approx(1, abs=0.05)
+        assert Deadline(10).timeout_for(3) == 3
+    
+    @pytest.mark.asyncio
+    async def test_run_reports_stage(self):
+        """Test a stage outliving the deadline raises with its error code."""
+        with pytest.raises(DeadlineExceeded) as exc_info:
+            await Deadline(0.05).run('llm', asyncio.sleep(1))
+        assert exc_info.value.code == 'LLM_TIMEOUT'
+        assert DeadlineExceeded('memory_sync').code == 'DEADLINE_EXCEEDED'
+    
+    @pytest.mark.asyncio
+    async def test_run_reports_which_limit_expired(self):
+        """Test an expiry is marked capped only when the stage cap ran out first."""
+        with pytest.raises(DeadlineExceeded) as exc_info:
+            await Deadline(0.05).run('llm', asyncio.sleep(1), cap=5)
+        assert exc_info.value.capped is False
+        with pytest.raises(DeadlineExceeded) as exc_info:
+            await Deadline(5).run('llm', asyncio.sleep(1), cap=0.05)
+        assert exc_info.value.capped is True
+        with pytest.raises(DeadlineExceeded) as exc_info:
+            await Deadline().run('llm', asyncio.sleep(1), cap=0.05)
+        assert exc_info.value.capped is True
+    
+    @pytest.mark.asyncio
+    async def test_run_with_spent_budget_skips_work(self):
+        """Test nothing is started once the deadline has passed."""
+        started = []
+        
+        async def work():
+            started.append(True)
+        
+        with pytest.raises(DeadlineExceeded):
+            await Deadline(0).run('memory_hub', work())
+        assert started == []
+    
+    @pytest.mark.asyncio
+    async def test_call_blocking(self):
+        """Test a blocking call is abandoned when the deadline passes."""
+        deadline = Deadline(0.05)
+        with pytest.raises(DeadlineExceeded) as exc_info:
+            await deadline.call_blocking('chain_rpc', time.sleep, 0.3)
+        assert exc_info.value.code == 'BLOCKCHAIN_TIMEOUT'
+        assert await Deadline(1).call_blocking('chain_rpc', sum, [1, 2]) == 3
+
+
+class TestQueryDeadlines:
+    """Test suite for deadlines in AIPAgentManager.query_agent."""
+    
+    @pytest.mark.asyncio
+    async def test_llm_call_cancelled(self):
+        """Test a slow LLM call is cancelled and reported as LLM_TIMEOUT."""
+        manager = AIPAgentManager()
+        agent = MemoryAgent(delay=5, remember=False)
+        manager.agents['slow_agent'] = agent
+        
+        started = time.monotonic()
+        with pytest.raises(DeadlineExceeded) as exc_info:
+            await manager.query_agent('slow_agent', 'hello', deadline=Deadline(0.2))
+        
+        assert exc_info.value.code == 'LLM_TIMEOUT'
+        assert agent.cancelled
+        assert time.monotonic() - started < 1
+        assert manager.mailboxes.depth('slow_agent') == 0
+    
+    @pytest.mark.asyncio
+    async def test_llm_timeout_cap(self):
+        """Test LLM_TIMEOUT bounds the call even without a request deadline."""
+        manager = AIPAgentManager()
+        manager.llm_timeout = 0.1
+        manager.agents['slow_agent'] = MemoryAgent(delay=5, remember=False)
+        
+        with pytest.raises(DeadlineExceeded) as exc_info:
+            await manager.query_agent('slow_agent', 'hello')
+        assert exc_info.value.code == 'LLM_TIMEOUT'
+    
+    @pytest.mark.asyncio
+    async def test_turns_after_cancelled_turn_are_read(self):
+        """Test a query left without a reply by a cancelled LLM call does not hide later turns."""
+        manager = AIPAgentManager()
+        agent = MemoryAgent()
+        manager.agents['agent'] = agent
+        await manager.query_agent('agent', 'first')
+        
+        agent.delay = 5
+        with pytest.raises(DeadlineExceeded):
+            await manager.query_agent('agent', 'lost', deadline=Deadline(0.1))
+        agent.delay = 0
+        await manager.query_agent('agent', 'second')
+        result = await manager.query_agent('agent', 'third')
+        
+        assert [i.userQuery for i in result['agent_state'].interactionHistory] == ['first', 'second', 'third']
+    
+    @pytest.mark.asyncio
+    async def test_queue_wait_times_out(self):
+        """Test waiting behind another turn past the deadline is QUEUE_TIMEOUT."""
+        manager = AIPAgentManager()
+        manager.agents['busy_agent'] = MemoryAgent(delay=0.5, remember=False)
+        
+        first = asyncio.create_task(manager.query_agent('busy_agent', 'first'))
+        await asyncio.sleep(0.05)
+        with pytest.raises(DeadlineExceeded) as exc_info:
+            await manager.query_agent('busy_agent', 'second', deadline=Deadline(0.1))
+        
+        assert exc_info.value.code == 'QUEUE_TIMEOUT'
+        result = await first
+        assert result['response'] == 'Answer to: first'
+        assert manager.mailboxes.depth('busy_agent') == 0
+    
+    @pytest.mark.asyncio
+    async def test_sync_wait_cut_short(self):
+        """Test a response generated in time is returned even if the sync is cut short."""
+        manager = AIPAgentManager()
+        manager.agents['quick_agent'] = MemoryAgent(delay=0.1, remember=False)
+        
+        started = time.monotonic()
+        result = await manager.query_agent('quick_agent', 'hello', deadline=Deadline(0.2))
+        
+        assert result['response'] == 'Answer to: hello'
+        assert result['agent_state'].interactionHistory[-1].userQuery == 'hello'
+        assert time.monotonic() - started < 0.5
+    
+    @pytest.mark.asyncio
+    async def test_hung_hub_read_times_out(self):
+        """Test a blocking Memory Hub read is abandoned at the deadline as MEMORY_HUB_TIMEOUT."""
+        manager = AIPAgentManager()
+        release = threading.Event()
+        memory = MagicMock()
+        memory.get_memory.return_value.get.side_effect = lambda recent_n: release.wait(5) and []
+        agent = MemoryAgent(delay=0, remember=False)
+        agent._memory = memory
+        manager.agents['hung_agent'] = agent
+        
+        started = time.monotonic()
+        with pytest.raises(DeadlineExceeded) as exc_info:
+            await manager.query_agent('hung_agent', 'hello', deadline=Deadline(0.2))
+        release.set()
+        
+        assert exc_info.value.code == 'MEMORY_HUB_TIMEOUT'
+        assert time.monotonic() - started < 1
+    
+    @pytest.mark.asyncio
+    async def test_register_rpc_times_out(self):
+        """Test a hung chain RPC call is reported as BLOCKCHAIN_TIMEOUT."""
+        manager = AIPAgentManager()
+        manager.membase_client = MagicMock()
+        release = threading.Event()
+        manager.membase_client.get_agent.side_effect = lambda agent_id: release.wait(5)
+        
+        with patch.object(am_module, 'MEMBASE_AVAILABLE', True):
+            with pytest.raises(DeadlineExceeded) as exc_info:
+                await manager.register_agent('stuck_agent', deadline=Deadline(0.1))
+        release.set()
+        
+        assert exc_info.value.code == 'BLOCKCHAIN_TIMEOUT'
+        manager.membase_client.register.assert_not_called()
+
+
+class TestDeadlineEndpoints:
+    """Test suite for deadline handling in the Flask app."""
+    
+    @pytest.fixture
+    def client(self):
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            yield client
+    
+    def test_header_passed_to_manager(self, client):
+        """Test the header becomes the deadline given to the manager."""
+        with patch('app.agent_manager') as mock_manager:
+            mock_manager.query_agent = AsyncMock(side_effect=DeadlineExceeded('llm'))
+            
+            response = client.post(
+                '/agent/query',
+                data=json.dumps({'agent_id': 'agent', 'query': 'hello'}),
+                content_type='application/json',
+                headers={DEADLINE_HEADER: '2000'}
+            )
+        
+        deadline = mock_manager.query_agent.call_args.kwargs['deadline']
+        assert 0 < deadline.remaining() <= 2
+        assert response.status_code == 504
+        data = json.loads(response.data)
+        assert data['error']['code'] == 'LLM_TIMEOUT'
+        assert data['error']['retryable'] is True
+        assert data['error']['details'] == {'stage': 'llm'}
+    
+    def test_register_timeout(self, client):
+        """Test a registration RPC timeout returns 504 BLOCKCHAIN_TIMEOUT."""
+        with patch('app.agent_manager') as mock_manager:
+            mock_manager.register_agent = AsyncMock(side_effect=DeadlineExceeded('chain_rpc'))
+            
+            response = client.post(
+                '/agent/register',
+                data=json.dumps({'agent_id': 'agent'}),
+                content_type='application/json'
+            )
+        
+        assert response.status_code == 504
+        assert json.loads(response.data)['error']['code'] == 'BLOCKCHAIN_TIMEOUT'
@@ -0,0 +1,296 @@
+"""
+Unit tests for the on-chain event indexer.
+
+The indexer runs against a fake JSON-RPC node that serves blocks and logs,
+caps eth_getLogs ranges like public nodes do, and can reorg its chain.
+"""
+
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+# Set test environment variables before importing agent_manager
+os.environ['MEMBASE_ACCOUNT'] = '0x1234567890abcdef1234567890abcdef12345678'
+os.environ['MEMBASE_SECRET_KEY'] = 'test_secret_key'
+os.environ['MEMBASE_ID'] = 'test_agent_001'
+os.environ['MEMORY_HUB_ADDRESS'] = '54.169.29.193:8081'
+
+# Mock MEMBASE_AVAILABLE to prevent real blockchain connections in tests
+import agent_manager as am_module
+am_module.MEMBASE_AVAILABLE = False
+
+import app as app_module
+from agent_manager import AIPAgentManager
+from event_indexer import (
+    EVENT_TOPICS,
+    EventIndexer,
+    EventStore,
+    JsonRpcLogSource,
+    RangeTooLargeError,
+    decode_log
+)
+
+STREAMING = '0x' + '5' * 40
+REGISTRY = '0x' + '6' * 40
+LANDLORD = '0x' + 'a1' * 20
+TENANT = '0x' + 'b2' * 20
+TOPICS = {name: topic for topic, name in EVENT_TOPICS.items()}
+GENESIS = 1_700_000_000
+
+
+def _word(value):
+    return f"{value:064x}"
+
+
+def _log(event, indexed, data_words, address=STREAMING, tail=''):
+    return {
+        'address': address,
+        'topics': [TOPICS[event]] + ['0x' + _word(value) for value in indexed],
+        'data': '0x' + ''.join(_word(value) for value in data_words) + tail
+    }
+
+
+def created(stream_id, sender, recipient, total):
+    return _log('StreamCreated', [stream_id, int(sender, 16), int(recipient, 16)], [total])
+
+
+def claimed(stream_id, recipient, amount):
+    return _log('ClaimedFromStream', [stream_id, int(recipient, 16)], [amount])
+
+
+def canceled(stream_id, sender, sender_balance, recipient_balance):
+    return _log('StreamCanceled', [stream_id, int(sender, 16)], [sender_balance, recipient_balance])
+
+
+def registered(token_id, stream_id, owner, unibase_id):
+    text = unibase_id.encode()
+    tail = _word(len(text)) + text.hex().ljust(64 * ((len(text) + 31) // 32), '0')
+    return _log('PropertyRegistered', [token_id], [stream_id, int(owner, 16), 96], REGISTRY, tail)
+
+
+class _Response:
+    def __init__(self, body):
+        self._body = body
+        self.status_code = 200
+    
+    def raise_for_status(self):
+        pass
+    
+    def json(self):
+        return self._body
+
+
+class FakeNode:
+    """JSON-RPC node double: a list of blocks, each a hash and its logs."""
+    
+    def __init__(self, blocks=100, max_range=None):
+        self.blocks = [{'hash': self._hash(number, 'a'), 'logs': []} for number in range(blocks)]
+        self.max_range = max_range
+        self.log_requests = []
+    
+    @staticmethod
+    def _hash(number, fork):
+        return '0x' + f"{fork}{number:063x}"[-64:]
+    
+    def emit(self, number, *logs):
+        self.blocks[number]['logs'].extend(logs)
+    
+    def mine(self, count):
+        start = len(self.blocks)
+        self.blocks.extend({'hash': self._hash(number, 'a'), 'logs': []} for number in range(start, start + count))
+    
+    def reorg(self, from_block, fork='b'):
+        """Replace every block from ``from_block`` with empty blocks of another fork."""
+        for number in range(from_block, len(self.blocks)):
+            self.blocks[number] = {'hash': self._hash(number, fork), 'logs': []}
+    
+    def post(self, url, json, timeout):
+        method, params = json['method'], json['params']
+        if method == 'eth_blockNumber':
+            return _Response({'result': hex(len(self.blocks) - 1)})
+        if method == 'eth_getBlockByNumber':
+            number = int(params[0], 16)
+            block = self.blocks[number] if number < len(self.blocks) else None
+            return _Response({'result': {'hash': block['hash'], 'timestamp': hex(GENESIS + 3 * number)} if block else None})
+        
+        query = params[0]
+        from_block, to_block = int(query['fromBlock'], 16), int(query['toBlock'], 16)
+        self.log_requests.append((from_block, to_block))
+        if self.max_range and to_block - from_block + 1 > self.max_range:
+            return _Response({'error': {'code': -32000, 'message': 'block range is too wide'}})
+        logs = []
+        for number in range(from_block, to_block + 1):
+            for index, log in enumerate(self.blocks[number]['logs']):
+                if log['address'] in query['address'] and log['topics'][0] in query['topics'][0]:
+                    logs.append(dict(
+                        log,
+                        blockNumber=hex(number),
+                        blockHash=self.blocks[number]['hash'],
+                        logIndex=hex(index),
+                        transactionHash='0x' + _word(number * 1000 + index)
+                    ))
+        return _Response({'result': logs})
+
+
+def _indexer(node, store=None, **kwargs):
+    return EventIndexer(
+        JsonRpcLogSource('http://node', session=node),
+        store or EventStore(':memory:'),
+        [STREAMING, REGISTRY],
+        **{'start_block': 0, **kwargs}
+    )
+
+
+def _populated_node(**kwargs):
+    node = FakeNode(**kwargs)
+    node.emit(10, created(1, TENANT, LANDLORD, 10 ** 24))
+    node.emit(11, registered(7, 1, LANDLORD, 'unibase-prop-7'))
+    node.emit(40, claimed(1, LANDLORD, 3 * 10 ** 20))
+    node.emit(60, created(2, TENANT, '0x' + 'c3' * 20, 5 * 10 ** 18))
+    node.emit(90, canceled(1, TENANT, 10 ** 23, 2 ** 70))
+    return node
+
+
+class TestDecoding:
+    """Test suite for log decoding."""
+    
+    def test_decodes_every_event(self):
+        """Test indexed and data arguments, including the unibase_id string."""
+        node = _populated_node()
+        source = JsonRpcLogSource('http://node', session=node)
+        logs = source.get_logs(0, 99, [STREAMING, REGISTRY], list(EVENT_TOPICS))
+        events = [decode_log(log) for log in logs]
+        
+        assert [event['event'] for event in events] == [
+            'StreamCreated', 'PropertyRegistered', 'ClaimedFromStream', 'StreamCreated', 'StreamCanceled'
+        ]
+        assert (events[0]['sender'], events[0]['recipient'], events[0]['args']) == \
+            (TENANT, LANDLORD, {'total_amount': str(10 ** 24)})
+        assert events[1]['stream_id'] == '1' and events[1]['recipient'] == LANDLORD
+        assert events[1]['args'] == {'token_id': '7', 'unibase_id': 'unibase-prop-7'}
+        assert events[4]['args'] == {'sender_balance': str(10 ** 23), 'recipient_balance': str(2 ** 70)}
+        assert decode_log({'topics': ['0x' + '0' * 64], 'data': '0x'}) is None
+
+
+class TestEventIndexer:
+    """Test suite for EventIndexer."""
+    
+    def test_indexes_wallet_history(self):
+        """Test wallet history and earnings are local lookups after a sync."""
+        indexer = _indexer(_populated_node())
+        
+        assert indexer.sync_once() == 5
+        
+        history = indexer.store.wallet_events(LANDLORD.upper().replace('0X', '0x'))
+        assert [event['event'] for event in history] == \
+            ['StreamCanceled', 'ClaimedFromStream', 'PropertyRegistered', 'StreamCreated']
+        # The cancel names only the sender; the recipient comes from StreamCreated
+        assert history[0]['recipient'] == LANDLORD
+        assert indexer.store.earned(LANDLORD) == 3 * 10 ** 20 + 2 ** 70
+        assert len(indexer.store.wallet_events(TENANT, events=['StreamCreated'])) == 2
+        assert [event['event'] for event in indexer.store.stream_events(1)][0] == 'StreamCreated'
+        assert indexer.status()['indexed_through'] == 99
+    
+    def test_adapts_block_range(self):
+        """Test ranges the node refuses are halved and later ranges stay within the accepted size."""
+        node = _populated_node(blocks=1000, max_range=100)
+        indexer = _indexer(node, initial_range=400, max_range=2000)
+        
+        assert indexer.sync_once() == 5
+        
+        assert all(to_block - from_block < 100 for from_block, to_block in node.log_requests[2:])
+        covered = sorted({block for start, end in node.log_requests for block in range(start, end + 1)})
+        assert covered == list(range(1000))
+        assert indexer.store.checkpoint()[0] == 999
+    
+    def test_one_block_refused_raises(self):
+        """Test a single block the node refuses surfaces as an error."""
+        node = FakeNode(blocks=10, max_range=-1)
+        with pytest.raises(RangeTooLargeError):
+            _indexer(node, initial_range=1).sync_once()
+    
+    def test_resumes_from_checkpoint(self, tmp_path):
+        """Test a restarted indexer only fetches blocks after its checkpoint."""
+        path = str(tmp_path / 'events.db')
+        node = _populated_node()
+        _indexer(node, EventStore(path)).sync_once()
+        
+        node.mine(20)
+        node.emit(110, claimed(1, LANDLORD, 10 ** 18))
+        node.log_requests.clear()
+        restarted = _indexer(node, EventStore(path))
+        
+        assert restarted.sync_once() == 1
+        assert min(start for start, _ in node.log_requests) == 100
+        assert restarted.store.earned(LANDLORD) == 3 * 10 ** 20 + 2 ** 70 + 10 ** 18
+    
+    def test_rolls_back_reorged_blocks(self):
+        """Test events from orphaned blocks are dropped and the new fork is indexed."""
+        node = _populated_node()
+        indexer = _indexer(node, reorg_depth=20)
+        indexer.sync_once()
+        
+        node.reorg(85)
+        node.emit(95, claimed(1, LANDLORD, 42))
+        
+        assert indexer.sync_once() == 1
+        assert indexer.reorgs == 1
+        events = [event['event'] for event in indexer.store.wallet_events(LANDLORD)]
+        assert 'StreamCanceled' not in events
+        assert indexer.store.earned(LANDLORD) == 3 * 10 ** 20 + 42
+        assert indexer.store.checkpoint() == (99, node.blocks[99]['hash'])
+
+
+@pytest.fixture
+def manager(tmp_path):
+    node = _populated_node()
+    env = {
+        'EVENT_INDEX_PATH': str(tmp_path / 'events.db'),
+        'STREAMING_PROTOCOL_ADDRESS': STREAMING,
+        'PROPERTY_REGISTRY_ADDRESS': REGISTRY,
+        'EVENT_INDEXER_START_BLOCK': '0',
+        'EVENT_INDEXER_POLL_SECONDS': '60'
+    }
+    with patch.dict(os.environ, env), \
+            patch.object(am_module, 'JsonRpcLogSource', lambda url, timeout: JsonRpcLogSource(url, timeout, node)):
+        manager = AIPAgentManager()
+    manager.event_indexer.sync_once()
+    yield manager
+    manager.event_indexer.stop()
+
+
+class TestWalletEndpoints:
+    """Test suite for the wallet history endpoints."""
+    
+    def test_wallet_events(self, manager):
+        """Test wallet history, event filters and the agent tool."""
+        app_module.app.config['TESTING'] = True
+        with patch.object(app_module, 'agent_manager', manager):
+            client = app_module.app.test_client()
+            
+            data = json.loads(client.get(f'/wallets/{LANDLORD}/events').data)
+            assert len(data['events']) == 4
+            assert data['earned'] == str(3 * 10 ** 20 + 2 ** 70)
+            assert data['indexed_through'] == 99
+            
+            data = json.loads(client.get(f'/wallets/{LANDLORD}/events?event=ClaimedFromStream').data)
+            assert [event['args']['amount'] for event in data['events']] == [str(3 * 10 ** 20)]
+            
+            response = client.get(f'/wallets/{LANDLORD}/events?event=Transfer')
+            assert response.status_code == 400
+            
+            response = client.post('/tools/get_wallet_stream_history', json={'wallet': TENANT, 'limit': 1})
+            assert json.loads(response.data)['result']['events'][0]['event'] == 'StreamCanceled'
+            
+            status = json.loads(client.get('/indexer/status').data)
+            assert status['indexed_through'] == 99 and status['running'] is True
+    
+    def test_disabled(self):
+        """Test the endpoints report the indexer as disabled when unconfigured."""
+        app_module.app.config['TESTING'] = True
+        with patch.object(app_module, 'agent_manager', AIPAgentManager()):
+            response = app_module.app.test_client().get(f'/wallets/{LANDLORD}/events')
+        assert response.status_code == 503
+        assert json.loads(response.data)['error']['code'] == 'EVENT_INDEXER_DISABLED'
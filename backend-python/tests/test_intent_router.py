@@ -0,0 +1,270 @@
+"""
+Unit tests for intent routing.
+
+Tests cover the rules and the local classifier, search criteria parsing,
+and lookup queries answered and recorded without the LLM.
+"""
+
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+# Set test environment variables before importing agent_manager
+os.environ['MEMBASE_ACCOUNT'] = '0x1234567890abcdef1234567890abcdef12345678'
+os.environ['MEMBASE_SECRET_KEY'] = 'test_secret_key'
+os.environ['MEMBASE_ID'] = 'test_agent_001'
+os.environ['MEMORY_HUB_ADDRESS'] = '54.169.29.193:8081'
+
+# Mock MEMBASE_AVAILABLE to prevent real blockchain connections in tests
+import agent_manager as am_module
+am_module.MEMBASE_AVAILABLE = False
+
+import app as app_module
+from agent_manager import AIPAgentManager
+from intent_router import AGENT_STATUS, PORTFOLIO, PROPERTY_SEARCH, IntentRouter, parse_search, unsupported_search
+from event_indexer import JsonRpcLogSource
+from tests.test_agent_manager import FakeAgent, FakeMessage
+from tests.test_event_indexer import LANDLORD, REGISTRY, STREAMING, TENANT, FakeNode, claimed, created
+
+CITIES = ['dubai', 'lisbon', 'new york']
+AMENITIES = ['pool', 'gym', 'sea view']
+
+LISTINGS = [
+    {'property_id': 'p1', 'title': 'Marina loft', 'city': 'Dubai', 'price': 1800.0, 'bedrooms': 2,
+     'annual_yield': 7.5, 'amenities': ['pool']},
+    {'property_id': 'p2', 'title': 'Creek tower', 'city': 'Dubai', 'price': 2600.0, 'bedrooms': 2,
+     'annual_yield': 6.0, 'amenities': ['gym']},
+    {'property_id': 'p3', 'title': 'Alfama flat', 'city': 'Lisbon', 'price': 1200.0, 'bedrooms': 1,
+     'annual_yield': 5.0, 'amenities': []}
+]
+
+
+@pytest.fixture(scope='module')
+def router():
+    return IntentRouter()
+
+
+class TestIntentRouter:
+    """Test suite for IntentRouter."""
+    
+    @pytest.mark.parametrize('query, name', [
+        ("What's the status of my agent?", AGENT_STATUS),
+        ("Is my agent registered?", AGENT_STATUS),
+        ("How much have I earned?", PORTFOLIO),
+        ("show my rental income", PORTFOLIO),
+        ("my earnings so far", PORTFOLIO),
+        ("List 2-bedroom units in Dubai under $2000", PROPERTY_SEARCH),
+        ("top 3 highest yield properties in Lisbon", PROPERTY_SEARCH)
+    ])
+    def test_rules(self, router, query, name):
+        """Test unambiguous phrasings are routed by the rules."""
+        intent = router.classify(query, CITIES, AMENITIES)
+        assert intent.name == name and intent.source == 'rule'
+    
+    @pytest.mark.parametrize('query', [
+        "Should I invest in Dubai or Lisbon?",
+        "Explain how streaming payments work",
+        "Compare 2 bedroom flats in Dubai",
+        "hello",
+        "write a note to my tenant",
+        "show me properties",
+        "list 2 bedroom flats in Dubai without a pool",
+        "list apartments in Rome under $2000",
+        "what is the tax on my rental income",
+        "cancel my stream and tell me how much I earned",
+        "my agent is not working, what is the status of my payment",
+        "how can I increase my income",
+        "what affects my rental income",
+        "my income dropped last month, what happened?",
+        "how will my portfolio look in 5 years",
+        "find apartments in dubai within 5 km of the marina",
+        "find apartments in dubai with 2 bathrooms",
+        "any furnished apartments in dubai",
+        "list pet friendly units in dubai",
+        "find apartments in dubai over 100 sqm",
+        "find apartments in dubai for at most 3 months"
+    ])
+    def test_open_ended_or_unparsed_go_to_llm(self, router, query):
+        """Test open-ended, negated, action and tax queries, and searches the rules cannot parse, are not routed."""
+        assert router.classify(query, CITIES, AMENITIES) is None
+    
+    def test_model_catches_paraphrases(self, router):
+        """Test the classifier routes paraphrases the rules miss, unless disabled."""
+        query = "anything in dubai with a gym under 2k"
+        intent = router.classify(query, CITIES, AMENITIES)
+        
+        assert (intent.name, intent.source) == (PROPERTY_SEARCH, 'model')
+        assert intent.slots['max_price'] == 2000
+        assert IntentRouter(use_model=False).classify(query, CITIES, AMENITIES) is None
+    
+    def test_portfolio_granularity(self, router):
+        """Test weekly questions ask for a weekly series."""
+        assert router.classify("how much did I earn this week", CITIES).slots == {'granularity': 'week'}
+
+
+class TestParseSearch:
+    """Test suite for parse_search."""
+    
+    @pytest.mark.parametrize('query, expected', [
+        ("two bedroom flats in lisbon under $2,000 with a pool",
+         {'cities': ['lisbon'], 'amenities': ['pool'], 'min_bedrooms': 2, 'max_bedrooms': 2, 'max_price': 2000}),
+        ("studios in new york", {'cities': ['new york'], 'min_bedrooms': 0, 'max_bedrooms': 0}),
+        ("at least 3 bedrooms between $1k and $2.5k", {'min_bedrooms': 3, 'min_price': 1000, 'max_price': 2500}),
+        ("units with yield above 8%", {'min_yield': 8}),
+        ("3 bed homes over 1500", {'min_bedrooms': 3, 'max_bedrooms': 3, 'min_price': 1500})
+    ])
+    def test_criteria(self, query, expected):
+        """Test criteria are parsed, without mistaking counts or yields for prices."""
+        criteria = parse_search(query, CITIES, AMENITIES)
+        assert criteria.pop('limit') == 5
+        assert criteria == expected
+    
+    def test_sort_and_limit(self):
+        """Test sort order and result count."""
+        criteria = parse_search("top 3 cheapest listings in dubai", CITIES)
+        assert (criteria['sort_by'], criteria['descending'], criteria['limit']) == ('price', False, 3)
+    
+    def test_no_criteria(self):
+        """Test a query without criteria parses to nothing."""
+        assert parse_search("show me some listings", CITIES, AMENITIES) == {}
+    
+    def test_unsupported_queries_parse_to_nothing(self):
+        """Test negated criteria and unknown places are not half-parsed, while price bounds are read."""
+        assert unsupported_search("flats in dubai without a pool", CITIES) == "the request negates a criterion"
+        assert parse_search("flats in dubai without a pool", CITIES, AMENITIES) == {}
+        assert parse_search("2 bed flats not in dubai", CITIES, AMENITIES) == {}
+        assert unsupported_search("flats in rome under 2000", CITIES) == "'rome' is not a known city"
+        assert parse_search("flats in rome under 2000", CITIES, AMENITIES) == {}
+        
+        criteria = parse_search("flats in the centre of dubai for no more than 2000", CITIES, AMENITIES)
+        assert (criteria['cities'], criteria['max_price'], 'min_price' in criteria) == (['dubai'], 2000, False)
+        assert parse_search("flats in new york for no less than 900", CITIES)['min_price'] == 900
+    
+    def test_unparsed_criteria_parse_to_nothing(self):
+        """Test a number or criterion left over is not dropped, while a monthly rent is read."""
+        assert unsupported_search("flats in dubai over 100 sqm", CITIES) == "'100' is not a criterion the rules read"
+        assert parse_search("flats in dubai over 100 sqm", CITIES, AMENITIES) == {}
+        assert parse_search("flats in dubai for at most 3 months", CITIES, AMENITIES) == {}
+        assert parse_search("flats in dubai with 2 bathrooms", CITIES, AMENITIES) == {}
+        assert unsupported_search("furnished flats in dubai", CITIES) == "'furnished' is not a criterion the rules read"
+        
+        criteria = parse_search("flats with a sea view in dubai under $1500 a month", CITIES, AMENITIES)
+        assert (criteria['amenities'], criteria['max_price']) == (['sea view'], 1500)
+
+
+class CountingAgent(FakeAgent):
+    """FakeAgent that counts LLM calls and whose memory accepts messages."""
+    
+    def __init__(self):
+        super().__init__()
+        self.llm_calls = 0
+        self._memory.conversation.add = self._memory.conversation.messages.append
+    
+    async def process_query(self, query, **kwargs):
+        self.llm_calls += 1
+        return await super().process_query(query, **kwargs)
+
+
+def _message(name, content, role):
+    return FakeMessage(role, content, 1700000100)
+
+
+@pytest.fixture
+def manager():
+    with patch.dict(os.environ, {'INTENT_ROUTING': 'model'}):
+        manager = AIPAgentManager()
+    manager.properties.upsert(LISTINGS)
+    manager.agents['router_agent'] = CountingAgent()
+    return manager
+
+
+class TestRoutedQueries:
+    """Test suite for queries answered without the LLM."""
+    
+    @pytest.mark.asyncio
+    async def test_search_answered_and_recorded(self, manager):
+        """Test a search is answered from the catalog and recorded in memory."""
+        agent = manager.agents['router_agent']
+        query = "List 2-bedroom units in Dubai under $2000"
+        
+        with patch.object(am_module, 'Message', _message):
+            result = await manager.query_agent('router_agent', query)
+        
+        assert agent.llm_calls == 0
+        assert result['intent'] == PROPERTY_SEARCH
+        assert 'Marina loft' in result['response'] and 'Creek tower' not in result['response']
+        assert [m.role for m in agent._memory.conversation.messages] == ['user', 'assistant']
+        last = result['agent_state'].interactionHistory[-1]
+        assert (last.userQuery, last.id) == (query, result['interaction_id'])
+    
+    @pytest.mark.asyncio
+    async def test_recorded_locally_without_memory_api(self, manager):
+        """Test the turn is appended to the state when messages cannot be added to memory."""
+        result = await manager.query_agent('router_agent', "is my agent registered?")
+        
+        assert result['intent'] == AGENT_STATUS
+        assert 'registered on-chain' in result['response']
+        assert result['agent_state'].interactionHistory[-1].agentResponse == result['response']
+        assert manager.agents['router_agent'].llm_calls == 0
+    
+    @pytest.mark.asyncio
+    async def test_unanswerable_falls_back_to_llm(self, manager):
+        """Test open-ended queries, and portfolio questions without an indexer, use the LLM."""
+        agent = manager.agents['router_agent']
+        
+        for query in ("Should I buy in Dubai?", "How much have I earned?"):
+            result = await manager.query_agent('router_agent', query)
+            assert result['intent'] is None
+            assert result['response'] == f"Answer to: {query}"
+        assert agent.llm_calls == 2
+    
+    @pytest.mark.asyncio
+    async def test_portfolio_from_indexer(self, tmp_path):
+        """Test income questions are answered from the indexed events for the user's wallet."""
+        node = FakeNode(blocks=30)
+        node.emit(5, created(1, TENANT, LANDLORD, 10 ** 24))
+        node.emit(20, claimed(1, LANDLORD, 15 * 10 ** 17))
+        env = {
+            'INTENT_ROUTING': 'rules',
+            'EVENT_INDEX_PATH': str(tmp_path / 'events.db'),
+            'STREAMING_PROTOCOL_ADDRESS': STREAMING,
+            'PROPERTY_REGISTRY_ADDRESS': REGISTRY,
+            'EVENT_INDEXER_START_BLOCK': '0',
+            'EVENT_INDEXER_POLL_SECONDS': '60'
+        }
+        with patch.dict(os.environ, env), \
+                patch.object(am_module, 'JsonRpcLogSource', lambda url, timeout: JsonRpcLogSource(url, timeout, node)):
+            manager = AIPAgentManager()
+        manager.event_indexer.sync_once()
+        manager.agents['router_agent'] = CountingAgent()
+        
+        try:
+            result = await manager.query_agent('router_agent', "How much have I earned?", {'wallet': LANDLORD})
+        finally:
+            manager.event_indexer.stop()
+        
+        assert result['intent'] == PORTFOLIO
+        assert 'has received 1.5 tokens from 1 streams (1 active)' in result['response']
+        assert manager.agents['router_agent'].llm_calls == 0
+    
+    @pytest.mark.asyncio
+    async def test_disabled_by_default(self):
+        """Test routing is off unless INTENT_ROUTING is set."""
+        manager = AIPAgentManager()
+        assert manager.intent_router is None
+    
+    def test_endpoint_reports_intent(self, manager):
+        """Test the query endpoint reports the routed intent."""
+        app_module.app.config['TESTING'] = True
+        with patch.object(app_module, 'agent_manager', manager):
+            response = app_module.app.test_client().post(
+                '/agent/query',
+                data=json.dumps({'agent_id': 'router_agent', 'query': 'cheapest listings in lisbon'}),
+                content_type='application/json'
+            )
+        
+        data = json.loads(response.data)
+        assert data['intent'] == PROPERTY_SEARCH
+        assert 'Alfama flat' in data['response']
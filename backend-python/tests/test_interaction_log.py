@@ -0,0 +1,265 @@
+"""
+Unit tests for the append-only interaction log.
+
+Tests cover record framing, tail reads, crash recovery, hub
+reconciliation, compaction, and history pagination in AIPAgentManager.
+"""
+
+import os
+import pytest
+from unittest.mock import patch
+
+# Set test environment variables before importing agent_manager
+os.environ['MEMBASE_ACCOUNT'] = '0x1234567890abcdef1234567890abcdef12345678'
+os.environ['MEMBASE_SECRET_KEY'] = 'test_secret_key'
+os.environ['MEMBASE_ID'] = 'test_agent_001'
+os.environ['MEMORY_HUB_ADDRESS'] = '54.169.29.193:8081'
+
+# Mock MEMBASE_AVAILABLE to prevent real blockchain connections in tests
+import agent_manager as am_module
+am_module.MEMBASE_AVAILABLE = False
+
+from agent_manager import AIPAgentManager
+from interaction_log import InteractionLog, InteractionLogStore
+from models import Interaction
+
+
+def _interaction(n):
+    return Interaction(
+        id=f'id-{n}',
+        userQuery=f'question {n}',
+        agentResponse=f'answer {n} ✓',
+        timestamp=1700000000 + n
+    )
+
+
+class TestInteractionLog:
+    """Test suite for a single agent's InteractionLog."""
+    
+    def test_append_and_tail(self, tmp_path):
+        """Test appended records are read back in order from the tail."""
+        log = InteractionLog(str(tmp_path / 'a.log'))
+        for n in range(10):
+            assert log.append(_interaction(n)) == n
+        
+        assert len(log) == 10
+        assert [i.id for i in log.tail(3)] == ['id-7', 'id-8', 'id-9']
+        assert log.tail(0) == []
+        assert len(log.tail(50)) == 10
+        assert log.read_range(2, 4) == [_interaction(2), _interaction(3)]
+        log.close()
+    
+    def test_reopen_preserves_records(self, tmp_path):
+        """Test records survive closing and reopening the log."""
+        path = str(tmp_path / 'a.log')
+        log = InteractionLog(path)
+        for n in range(5):
+            log.append(_interaction(n))
+        log.close()
+        
+        reopened = InteractionLog(path)
+        assert len(reopened) == 5
+        assert reopened.last_id() == 'id-4'
+        reopened.close()
+    
+    def test_torn_record_is_truncated(self, tmp_path):
+        """Test a partially written trailing record is dropped on open."""
+        path = str(tmp_path / 'a.log')
+        log = InteractionLog(path)
+        log.append(_interaction(0))
+        log.append(_interaction(1))
+        log.close()
+        
+        with open(path, 'ab') as f:
+            f.write(b'\x40\x00\x00\x00{"id": "partial')
+        
+        reopened = InteractionLog(path)
+        assert len(reopened) == 2
+        reopened.append(_interaction(2))
+        assert [i.id for i in reopened.tail(3)] == ['id-0', 'id-1', 'id-2']
+        reopened.close()
+    
+    def test_sync_appends_only_new_interactions(self, tmp_path):
+        """Test reconciliation with the hub's sliding history window."""
+        log = InteractionLog(str(tmp_path / 'a.log'))
+        
+        assert log.sync([_interaction(n) for n in range(3)]) == 3
+        assert log.sync([_interaction(n) for n in range(1, 5)]) == 2
+        assert log.sync([_interaction(n) for n in range(1, 5)]) == 0
+        assert [i.id for i in log.tail(10)] == [f'id-{n}' for n in range(5)]
+        log.close()
+    
+    def test_compact_keeps_newest(self, tmp_path):
+        """Test compaction keeps only the newest records and stays appendable."""
+        log = InteractionLog(str(tmp_path / 'a.log'))
+        for n in range(20):
+            log.append(_interaction(n))
+        
+        assert log.compact(5) == 15
+        assert [i.id for i in log.tail(10)] == [f'id-{n}' for n in range(15, 20)]
+        
+        log.append(_interaction(20))
+        assert log.last_id() == 'id-20'
+        log.close()
+    
+    def test_shared_with_another_process(self, tmp_path):
+        """Test appends and compactions through another handle are picked up."""
+        path = str(tmp_path / 'a.log')
+        log = InteractionLog(path)
+        other = InteractionLog(path)
+        for n in range(4):
+            log.append(_interaction(n))
+        
+        assert len(other) == 4
+        assert other.last_id() == 'id-3'
+        assert other.sync([_interaction(3), _interaction(4)]) == 1
+        
+        assert log.compact(2) == 3
+        assert other.append(_interaction(5)) == 2
+        assert [i.id for i in log.tail(5)] == [i.id for i in other.tail(5)] == ['id-3', 'id-4', 'id-5']
+        log.close()
+        other.close()
+
+
+class TestInteractionLogStore:
+    """Test suite for the per-agent log directory."""
+    
+    def test_logs_are_isolated_per_agent(self, tmp_path):
+        """Test agents with similar IDs get separate log files."""
+        store = InteractionLogStore(str(tmp_path))
+        store.append('agent/1', _interaction(1))
+        store.append('agent_1', _interaction(2))
+        
+        assert store.get('agent/1').last_id() == 'id-1'
+        assert store.get('agent_1').last_id() == 'id-2'
+        assert not store.exists('agent_2')
+        store.close()
+    
+    def test_automatic_compaction(self, tmp_path):
+        """Test the log is compacted once it reaches twice max_records."""
+        store = InteractionLogStore(str(tmp_path), max_records=4)
+        for n in range(8):
+            store.append('agent', _interaction(n))
+        
+        assert len(store.get('agent')) == 4
+        store.close()
+
+
+class FakeMessage:
+    def __init__(self, role, content, timestamp):
+        self.role = role
+        self.content = content
+        self.timestamp = timestamp
+
+
+class FakeConversation:
+    def __init__(self):
+        self.messages = []
+    
+    def get(self, recent_n=None):
+        return self.messages[-recent_n:]
+
+
+class FakeMemory:
+    def __init__(self):
+        self.conversation = FakeConversation()
+    
+    def get_memory(self):
+        return self.conversation
+
+
+class FakeAgent:
+    """Agent double that stores each turn in its memory like the SDK does."""
+    
+    def __init__(self):
+        self._memory = FakeMemory()
+    
+    async def process_query(self, query, **kwargs):
+        response = f"Answer to: {query}"
+        messages = self._memory.conversation.messages
+        messages.append(FakeMessage('user', query, 1700000000 + len(messages)))
+        messages.append(FakeMessage('assistant', response, 1700000000 + len(messages)))
+        return response
+
+
+class TestHistoryPagination:
+    """Test suite for AIPAgentManager.get_interaction_history."""
+    
+    @pytest.mark.asyncio
+    async def test_pages_served_from_local_log(self, tmp_path):
+        """Test pagination walks backwards through the local log."""
+        with patch.dict(os.environ, {'INTERACTION_LOG_DIR': str(tmp_path)}):
+            manager = AIPAgentManager()
+            for n in range(5):
+                manager.interaction_logs.append('paged_agent', _interaction(n))
+            
+            page = await manager.get_interaction_history('paged_agent', limit=2)
+            assert [i.id for i in page['interactions']] == ['id-3', 'id-4']
+            assert page['total'] == 5
+            assert page['next_before'] == 3
+            
+            page = await manager.get_interaction_history('paged_agent', limit=2, before=page['next_before'])
+            assert [i.id for i in page['interactions']] == ['id-1', 'id-2']
+            
+            page = await manager.get_interaction_history('paged_agent', limit=2, before=page['next_before'])
+            assert [i.id for i in page['interactions']] == ['id-0']
+            assert page['next_before'] is None
+    
+    @pytest.mark.asyncio
+    async def test_first_page_reconciled_with_hub(self, tmp_path):
+        """Test turns the hub has but the log missed are served on the first page."""
+        with patch.dict(os.environ, {'INTERACTION_LOG_DIR': str(tmp_path)}):
+            manager = AIPAgentManager()
+            agent = manager.agents['hub_agent'] = FakeAgent()
+            await agent.process_query('logged')
+            manager._sync_interaction_log('hub_agent', await manager._read_state('hub_agent', am_module.Deadline()))
+            await agent.process_query('answered elsewhere')
+            
+            page = await manager.get_interaction_history('hub_agent')
+            
+            assert [i.userQuery for i in page['interactions']] == ['logged', 'answered elsewhere']
+            assert page['total'] == 2
+    
+    @pytest.mark.asyncio
+    async def test_query_appends_to_log(self, tmp_path):
+        """Test each query's interaction is recorded in the local log."""
+        with patch.dict(os.environ, {'INTERACTION_LOG_DIR': str(tmp_path)}):
+            manager = AIPAgentManager()
+            manager.agents['logged_agent'] = FakeAgent()
+            
+            result = await manager.query_agent('logged_agent', 'hello')
+            
+            log = manager.interaction_logs.get('logged_agent')
+            assert log.last_id() == result['interaction_id']
+    
+    @pytest.mark.asyncio
+    async def test_lagging_turn_logged_once(self, tmp_path):
+        """Test a turn the hub read missed is logged once, under the ID later reads return."""
+        with patch.dict(os.environ, {'INTERACTION_LOG_DIR': str(tmp_path)}):
+            manager = AIPAgentManager()
+            agent = manager.agents['lagging_agent'] = FakeAgent()
+            messages = agent._memory.conversation.messages
+            lag = {'hidden': 2}
+            agent._memory.conversation.get = lambda recent_n=None: messages[:len(messages) - lag['hidden']]
+            
+            result = await manager.query_agent('lagging_agent', 'hello')
+            assert result['agent_state'].interactionHistory[-1].id == result['interaction_id']
+            assert not manager.interaction_logs.exists('lagging_agent') \
+                or len(manager.interaction_logs.get('lagging_agent')) == 0
+            
+            lag['hidden'] = 0
+            await manager.query_agent('lagging_agent', 'again')
+            state = await manager._read_state('lagging_agent', am_module.Deadline())
+            
+            log = manager.interaction_logs.get('lagging_agent')
+            records = log.read_range(0, len(log))
+            assert [i.userQuery for i in records] == ['hello', 'again']
+            assert [i.id for i in records] == [i.id for i in state.interactionHistory]
+    
+    @pytest.mark.asyncio
+    async def test_unknown_agent_raises(self, tmp_path):
+        """Test history for an unknown agent is reported as not initialized."""
+        with patch.dict(os.environ, {'INTERACTION_LOG_DIR': str(tmp_path)}):
+            manager = AIPAgentManager()
+            with pytest.raises(ValueError):
+                await manager.get_interaction_history('missing_agent')
@@ -0,0 +1,107 @@
+"""
+Unit tests for the request validation and error envelope fast paths.
+
+Tests verify the cached TypeAdapter validation and the pre-serialized
+error envelopes produce the same results as the pydantic models.
+"""
+
+import json
+import os
+
+import pytest
+from pydantic import ValidationError
+
+# Set test environment variables before importing app
+os.environ['MEMBASE_ACCOUNT'] = '0x1234567890abcdef1234567890abcdef12345678'
+os.environ['MEMBASE_SECRET_KEY'] = 'test_secret_key'
+os.environ['MEMBASE_ID'] = 'test_agent_001'
+os.environ['MEMORY_HUB_ADDRESS'] = '54.169.29.193:8081'
+
+# Mock MEMBASE_AVAILABLE to prevent real blockchain connections
+import agent_manager as am_module
+am_module.MEMBASE_AVAILABLE = False
+
+from app import app
+from models import (
+    QueryRequest,
+    InitializeRequest,
+    ErrorResponse,
+    parse_request,
+    request_adapter,
+    error_body
+)
+
+
+@pytest.fixture
+def client():
+    """Create a test client for the Flask app."""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+class TestParseRequest:
+    """Test suite for raw-body request validation."""
+    
+    def test_valid_body(self):
+        """Test a valid body validates to the request model."""
+        req = parse_request(QueryRequest, b'{"agent_id": "a1", "query": "hi"}')
+        
+        assert isinstance(req, QueryRequest)
+        assert req.agent_id == 'a1'
+        assert req.user_context is None
+    
+    def test_defaults_applied(self):
+        """Test model defaults are applied when validating from JSON."""
+        req = parse_request(InitializeRequest, b'{"agent_id": "a1", "description": "d"}')
+        assert req.memory_hub_address == '54.169.29.193:8081'
+    
+    @pytest.mark.parametrize('body', [b'', b'not json', b'{}', b'[]', b'{"agent_id": 1}'])
+    def test_invalid_bodies_raise_validation_error(self, body):
+        """Test malformed or incomplete bodies raise a ValueError subclass."""
+        with pytest.raises(ValidationError):
+            parse_request(QueryRequest, body)
+    
+    def test_adapter_is_cached(self):
+        """Test the TypeAdapter is built once per model."""
+        assert request_adapter(QueryRequest) is request_adapter(QueryRequest)
+
+
+class TestErrorBody:
+    """Test suite for pre-serialized error envelopes."""
+    
+    @pytest.mark.parametrize('code,message,retryable,details', [
+        ('INVALID_REQUEST', 'bad input', False, None),
+        ('BLOCKCHAIN_ERROR', 'quote " and \\ backslash', True, None),
+        ('AGENT_NOT_FOUND', 'missing', False, {'agent_id': 'a1', 'suggestion': 'init'}),
+        ('INTERNAL_ERROR', 'unicode ✓', True, None),
+    ])
+    def test_matches_error_response_model(self, code, message, retryable, details):
+        """Test the template output equals the ErrorResponse model dump."""
+        error = {'code': code, 'message': message, 'retryable': retryable}
+        if details is not None:
+            error['details'] = details
+        expected = ErrorResponse(success=False, error=error).model_dump()
+        
+        assert json.loads(error_body(code, message, retryable, details)) == expected
+
+
+class TestEndpointValidation:
+    """Test suite for route-level validation errors."""
+    
+    def test_query_invalid_json_returns_400(self, client):
+        """Test malformed JSON is rejected as an invalid request."""
+        response = client.post('/agent/query', data=b'{not json', content_type='application/json')
+        
+        assert response.status_code == 400
+        data = json.loads(response.data)
+        assert data['success'] is False
+        assert data['error']['code'] == 'INVALID_REQUEST'
+        assert data['error']['retryable'] is False
+    
+    def test_unknown_route_returns_prebuilt_envelope(self, client):
+        """Test the 404 handler serves the pre-serialized envelope."""
+        response = client.get('/does/not/exist')
+        
+        assert response.status_code == 404
+        assert json.loads(response.data)['error']['code'] == 'NOT_FOUND'
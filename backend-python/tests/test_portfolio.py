@@ -0,0 +1,233 @@
+"""
+Unit tests for portfolio analytics.
+
+Tests cover the income series at each granularity, per-property income,
+claim cadence, reorg rollback, the endpoint fed by the event indexer, and
+workers following a store another worker indexes.
+"""
+
+import json
+import os
+from datetime import date
+from unittest.mock import patch
+
+import pytest
+
+# Set test environment variables before importing agent_manager
+os.environ['MEMBASE_ACCOUNT'] = '0x1234567890abcdef1234567890abcdef12345678'
+os.environ['MEMBASE_SECRET_KEY'] = 'test_secret_key'
+os.environ['MEMBASE_ID'] = 'test_agent_001'
+os.environ['MEMORY_HUB_ADDRESS'] = '54.169.29.193:8081'
+
+# Mock MEMBASE_AVAILABLE to prevent real blockchain connections in tests
+import agent_manager as am_module
+am_module.MEMBASE_AVAILABLE = False
+
+import app as app_module
+from agent_manager import AIPAgentManager
+from event_indexer import JsonRpcLogSource
+from portfolio import SECONDS_PER_DAY, SECONDS_PER_YEAR, Portfolio
+from tests.test_event_indexer import LANDLORD, REGISTRY, STREAMING, TENANT, FakeNode, claimed, created
+
+# Monday, 2024-01-01
+MONDAY = int((date(2024, 1, 1) - date(1970, 1, 1)).days) * SECONDS_PER_DAY
+BIG = 2 ** 200
+
+
+def _event(kind, block, timestamp, stream_id, sender=None, recipient=None, **args):
+    return {
+        'event': kind,
+        'block_number': block,
+        'timestamp': timestamp,
+        'stream_id': str(stream_id),
+        'sender': sender,
+        'recipient': recipient,
+        'args': {key: str(value) for key, value in args.items()}
+    }
+
+
+def _history():
+    """Two streams to the landlord: stream 1 claimed four times, stream 2 canceled."""
+    return [
+        _event('StreamCreated', 1, MONDAY, 1, TENANT, LANDLORD, total_amount=10 * BIG),
+        _event('PropertyRegistered', 1, MONDAY, 1, None, LANDLORD, token_id=7, unibase_id='prop-7'),
+        _event('ClaimedFromStream', 2, MONDAY + 3600, 1, TENANT, LANDLORD, amount=BIG),
+        _event('ClaimedFromStream', 3, MONDAY + 2 * SECONDS_PER_DAY, 1, TENANT, LANDLORD, amount=BIG),
+        _event('StreamCreated', 4, MONDAY + 5 * SECONDS_PER_DAY, 2, TENANT, LANDLORD, total_amount=500),
+        _event('ClaimedFromStream', 5, MONDAY + 9 * SECONDS_PER_DAY, 1, TENANT, LANDLORD, amount=2 * BIG),
+        _event('StreamCanceled', 6, MONDAY + 33 * SECONDS_PER_DAY, 2, TENANT, LANDLORD,
+               sender_balance=100, recipient_balance=400),
+        _event('ClaimedFromStream', 7, MONDAY + 40 * SECONDS_PER_DAY, 1, TENANT, LANDLORD, amount=3)
+    ]
+
+
+@pytest.fixture
+def portfolio():
+    portfolio = Portfolio()
+    portfolio.load(_history())
+    return portfolio
+
+
+class TestPortfolio:
+    """Test suite for Portfolio."""
+    
+    def test_daily_series(self, portfolio):
+        """Test daily buckets cover every day, with exact cumulative income."""
+        report = portfolio.report(LANDLORD.upper().replace('0X', '0x'), 'day')
+        
+        series = report['income']
+        assert len(series) == 41
+        assert series[0] == {'period': '2024-01-01', 'income': BIG, 'cumulative': BIG}
+        assert series[1]['income'] == 0 and series[1]['cumulative'] == BIG
+        assert series[-1] == {'period': '2024-02-10', 'income': 3, 'cumulative': 4 * BIG + 403}
+        assert report['total_income'] == 4 * BIG + 403
+    
+    def test_weekly_and_monthly_series(self, portfolio):
+        """Test weeks start on Mondays and months on the 1st."""
+        weekly = portfolio.report(LANDLORD, 'week')['income']
+        assert [point['period'] for point in weekly[:3]] == ['2024-01-01', '2024-01-08', '2024-01-15']
+        assert [point['income'] for point in weekly[:3]] == [2 * BIG, 2 * BIG, 0]
+        
+        monthly = portfolio.report(LANDLORD, 'month')['income']
+        assert [(point['period'], point['income']) for point in monthly] == \
+            [('2024-01-01', 4 * BIG), ('2024-02-01', 403)]
+    
+    def test_range_keeps_lifetime_cumulative(self, portfolio):
+        """Test a bounded series starts from the income received before it."""
+        series = portfolio.report(LANDLORD, 'day', start=date(2024, 1, 10), end=date(2024, 1, 12))['income']
+        assert [point['period'] for point in series] == ['2024-01-10', '2024-01-11', '2024-01-12']
+        assert series[0] == {'period': '2024-01-10', 'income': 2 * BIG, 'cumulative': 4 * BIG}
+    
+    def test_properties(self, portfolio):
+        """Test income, claims and annualized yield per stream and property."""
+        now = MONDAY + 60 * SECONDS_PER_DAY
+        first, second = portfolio.report(LANDLORD, now=now)['properties']
+        
+        assert (first['token_id'], first['unibase_id'], first['status']) == ('7', 'prop-7', 'active')
+        assert (first['received'], first['claims'], first['received_ratio']) == (4 * BIG + 3, 4, 0.4)
+        assert first['annualized_income'] == (4 * BIG + 3) * SECONDS_PER_YEAR // (60 * SECONDS_PER_DAY)
+        assert first['annualized_yield'] == pytest.approx(0.4 * 365 / 60)
+        
+        assert (second['status'], second['received'], second['claims']) == ('canceled', 400, 0)
+        assert second['annualized_income'] == 400 * SECONDS_PER_YEAR // (28 * SECONDS_PER_DAY)
+        assert second['annualized_yield'] == pytest.approx(0.8 * 365 / 28, rel=1e-3)
+        assert portfolio.report(TENANT)['properties'] == []
+    
+    def test_claim_cadence(self, portfolio):
+        """Test claim intervals in days."""
+        cadence = portfolio.report(LANDLORD, now=MONDAY + 41 * SECONDS_PER_DAY)['claim_cadence']
+        assert cadence['claims'] == 4
+        assert cadence['first_claim_at'] == MONDAY + 3600
+        assert cadence['median_interval_days'] == pytest.approx(7, abs=0.1)
+        assert cadence['days_since_last_claim'] == 1.0
+    
+    def test_rewind(self, portfolio):
+        """Test a reorg rollback drops later income and the cancel."""
+        portfolio.rewind(5)
+        report = portfolio.report(LANDLORD)
+        
+        assert report['total_income'] == 4 * BIG
+        assert [item['status'] for item in report['properties']] == ['active', 'active']
+        assert report['income'][-1]['period'] == '2024-01-10'
+    
+    def test_unknown_wallet(self, portfolio):
+        """Test a wallet without income gets an empty report."""
+        report = portfolio.report('0x' + '0' * 40)
+        assert report['total_income'] == 0 and report['income'] == []
+        assert report['claim_cadence']['claims'] == 0
+    
+    def test_invalid_granularity(self, portfolio):
+        """Test unknown granularities are rejected."""
+        with pytest.raises(ValueError):
+            portfolio.report(LANDLORD, 'hour')
+
+
+@pytest.fixture
+def client(tmp_path):
+    node = FakeNode(blocks=50)
+    node.emit(5, created(1, TENANT, LANDLORD, 10 ** 24))
+    node.emit(20, claimed(1, LANDLORD, 10 ** 20))
+    env = {
+        'EVENT_INDEX_PATH': str(tmp_path / 'events.db'),
+        'STREAMING_PROTOCOL_ADDRESS': STREAMING,
+        'PROPERTY_REGISTRY_ADDRESS': REGISTRY,
+        'EVENT_INDEXER_START_BLOCK': '0',
+        'EVENT_INDEXER_POLL_SECONDS': '60'
+    }
+    with patch.dict(os.environ, env), \
+            patch.object(am_module, 'JsonRpcLogSource', lambda url, timeout: JsonRpcLogSource(url, timeout, node)):
+        manager = AIPAgentManager()
+    manager.event_indexer.sync_once()
+    node.mine(10)
+    node.emit(55, claimed(1, LANDLORD, 5 * 10 ** 19))
+    manager.event_indexer.sync_once()
+    
+    app_module.app.config['TESTING'] = True
+    with patch.object(app_module, 'agent_manager', manager):
+        yield app_module.app.test_client()
+    manager.event_indexer.stop()
+
+
+class TestPortfolioEndpoint:
+    """Test suite for the portfolio endpoint."""
+    
+    def test_portfolio(self, client):
+        """Test the report follows the indexer, and the agent tool."""
+        data = json.loads(client.get(f'/portfolio/{LANDLORD}?granularity=month').data)
+        
+        assert data['total_income'] == str(15 * 10 ** 19)
+        assert data['income'] == [{
+            'period': '2023-11-01',
+            'income': str(15 * 10 ** 19),
+            'cumulative': str(15 * 10 ** 19)
+        }]
+        assert data['properties'][0]['received'] == str(15 * 10 ** 19)
+        assert data['claim_cadence']['claims'] == 2
+        assert data['indexed_through'] == 59
+        
+        response = client.post('/tools/get_portfolio', json={'wallet': LANDLORD, 'granularity': 'week'})
+        assert json.loads(response.data)['result']['properties'][0]['claims'] == 2
+    
+    def test_invalid_granularity(self, client):
+        """Test an unknown granularity is a 400."""
+        response = client.get(f'/portfolio/{LANDLORD}?granularity=hour')
+        assert response.status_code == 400
+
+
+class TestSharedStore:
+    """Test suite for workers sharing one event store."""
+    
+    def test_followers_replay_the_indexing_worker(self, tmp_path):
+        """Test one worker indexes, and the others' portfolios follow its commits, reorgs and exit."""
+        node = FakeNode(blocks=50)
+        node.emit(5, created(1, TENANT, LANDLORD, 10 ** 24))
+        node.emit(20, claimed(1, LANDLORD, 10 ** 20))
+        node.emit(45, claimed(1, LANDLORD, 10 ** 19))
+        env = {
+            'EVENT_INDEX_PATH': str(tmp_path / 'events.db'),
+            'STREAMING_PROTOCOL_ADDRESS': STREAMING,
+            'EVENT_INDEXER_START_BLOCK': '0',
+            'EVENT_INDEXER_POLL_SECONDS': '60'
+        }
+        with patch.dict(os.environ, env), \
+                patch.object(am_module, 'JsonRpcLogSource', lambda url, timeout: JsonRpcLogSource(url, timeout, node)):
+            leader, follower = AIPAgentManager(), AIPAgentManager()
+        
+        assert leader.event_indexer.status()['running'] is True
+        assert follower.event_indexer.status()['running'] is False
+        leader.event_indexer.sync_once()
+        follower._lead_or_follow()
+        assert follower.portfolio.report(LANDLORD)['total_income'] == 11 * 10 ** 19
+        
+        node.reorg(40)
+        node.emit(42, claimed(1, LANDLORD, 7))
+        leader.event_indexer.sync_once()
+        follower._lead_or_follow()
+        assert follower.portfolio.report(LANDLORD)['total_income'] == 10 ** 20 + 7
+        assert leader.portfolio.report(LANDLORD)['total_income'] == 10 ** 20 + 7
+        
+        leader.event_indexer.stop()
+        leader._indexer_lock.release()
+        follower._lead_or_follow()
+        assert follower.event_indexer.status()['running'] is True
+        follower.event_indexer.stop()
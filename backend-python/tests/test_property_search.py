@@ -0,0 +1,281 @@
+"""
+Unit tests for property search and the tool registry.
+
+Tests check the indexed search against a brute-force filter over a
+generated catalog, updates and removals, and the search and tool
+endpoints.
+"""
+
+import json
+import os
+import random
+from unittest.mock import patch
+
+import pytest
+
+# Set test environment variables before importing agent_manager
+os.environ['MEMBASE_ACCOUNT'] = '0x1234567890abcdef1234567890abcdef12345678'
+os.environ['MEMBASE_SECRET_KEY'] = 'test_secret_key'
+os.environ['MEMBASE_ID'] = 'test_agent_001'
+os.environ['MEMORY_HUB_ADDRESS'] = '54.169.29.193:8081'
+
+# Mock MEMBASE_AVAILABLE to prevent real blockchain connections in tests
+import agent_manager as am_module
+am_module.MEMBASE_AVAILABLE = False
+
+import app as app_module
+from agent_manager import AIPAgentManager
+from property_search import PropertyIndex, distance_km
+
+CITIES = ['Dubai', 'Lagos', 'Lisbon', 'Singapore', 'Austin']
+AMENITIES = ['pool', 'gym', 'parking', 'concierge', 'balcony', 'pet friendly']
+
+
+def _catalog(count, seed=7):
+    rng = random.Random(seed)
+    return [
+        {
+            'property_id': f"prop_{n}",
+            'city': rng.choice(CITIES),
+            'price': float(rng.randrange(500, 6000, 50)),
+            'bedrooms': rng.randint(0, 5),
+            'annual_yield': round(rng.uniform(2, 12), 2),
+            'amenities': rng.sample(AMENITIES, rng.randint(0, 4)),
+            'title': f"Listing {n}"
+        }
+        for n in range(count)
+    ]
+
+
+def _located(count, seed=3):
+    """Listings around a few cities and the antimeridian, one in ten without coordinates."""
+    rng = random.Random(seed)
+    centers = [(25.2, 55.3), (38.7, -9.1), (-17.8, 179.6), (64.1, -21.9)]
+    listings = _catalog(count, seed)
+    for n, listing in enumerate(listings):
+        if n % 10:
+            latitude, longitude = rng.choice(centers)
+            listing['latitude'] = latitude + rng.gauss(0, 0.3)
+            listing['longitude'] = (longitude + rng.gauss(0, 0.3) + 180) % 360 - 180
+    return listings
+
+
+def _within(listings, near=None, box=None):
+    matches = []
+    for listing in listings:
+        if listing.get('latitude') is None:
+            continue
+        latitude, longitude = listing['latitude'], listing['longitude']
+        if near and distance_km(latitude, longitude, near[0], near[1]) > near[2]:
+            continue
+        if box:
+            south, west, north, east = box
+            inside = west <= longitude <= east if west <= east else longitude >= west or longitude <= east
+            if not (inside and south <= latitude <= north):
+                continue
+        matches.append(listing['property_id'])
+    return matches
+
+
+def _brute_force(listings, cities=None, amenities=None, ranges=None):
+    cities = {city.lower() for city in cities or ()}
+    amenities = {amenity.lower() for amenity in amenities or ()}
+    matches = []
+    for listing in listings:
+        if cities and listing['city'].lower() not in cities:
+            continue
+        if not amenities <= {amenity.lower() for amenity in listing['amenities']}:
+            continue
+        if any(
+            (low is not None and listing[field] < low) or (high is not None and listing[field] > high)
+            for field, (low, high) in (ranges or {}).items()
+        ):
+            continue
+        matches.append(listing['property_id'])
+    return matches
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    return _catalog(3000)
+
+
+@pytest.fixture(scope='module')
+def index(catalog):
+    index = PropertyIndex()
+    index.upsert(catalog)
+    return index
+
+
+class TestPropertyIndex:
+    """Test suite for PropertyIndex."""
+    
+    @pytest.mark.parametrize('criteria', [
+        {'cities': ['Dubai'], 'ranges': {'price': (None, 2000), 'bedrooms': (2, 2)}},
+        {'cities': ['dubai', 'LISBON'], 'amenities': ['Pool', 'gym']},
+        {'amenities': ['pet friendly'], 'ranges': {'annual_yield': (8, None)}},
+        {'ranges': {'price': (1000, 1500), 'bedrooms': (3, None)}},
+        {'cities': ['Atlantis']},
+        {}
+    ])
+    def test_matches_brute_force(self, index, catalog, criteria):
+        """Test indexed results equal a full scan, whichever filter drives the query."""
+        total, page = index.search(limit=len(catalog), **criteria)
+        expected = _brute_force(catalog, **criteria)
+        assert total == len(expected)
+        assert [listing['property_id'] for listing in page] == expected
+    
+    def test_sorting_and_paging(self, index, catalog):
+        """Test results ordered by a field, paged with offset and limit."""
+        total, first = index.search(cities=['Austin'], sort_by='price', limit=10)
+        _, second = index.search(cities=['Austin'], sort_by='price', limit=10, offset=10)
+        prices = sorted(l['price'] for l in catalog if l['city'] == 'Austin')
+        assert total == len(prices)
+        assert [l['price'] for l in first + second] == prices[:20]
+        
+        _, top = index.search(sort_by='annual_yield', descending=True, limit=5)
+        assert [l['annual_yield'] for l in top] == sorted((l['annual_yield'] for l in catalog), reverse=True)[:5]
+    
+    def test_upsert_replaces_and_remove(self):
+        """Test replaced listings are re-indexed and removed ones disappear."""
+        index = PropertyIndex()
+        index.upsert(_catalog(10))
+        index.upsert([{'property_id': 'prop_3', 'city': 'Oslo', 'price': 900, 'bedrooms': 1,
+                       'annual_yield': 5, 'amenities': ['sauna']}])
+        
+        assert len(index) == 10
+        assert [l['property_id'] for l in index.search(amenities=['sauna'])[1]] == ['prop_3']
+        assert index.search(cities=['Oslo'], ranges={'price': (900, 900)})[0] == 1
+        
+        assert index.remove('prop_3') and not index.remove('prop_3')
+        assert index.search(cities=['Oslo'])[0] == 0
+        assert len(index) == 9
+    
+    @pytest.mark.parametrize('near, box', [
+        ((25.2, 55.3, 10), None),
+        ((-17.8, 180.0, 40), None),
+        (None, (-19, 179, -17, -179.5)),
+        ((38.7, -9.1, 50), (38.7, -10, 40, 0))
+    ])
+    def test_geo_matches_brute_force(self, near, box):
+        """Test radius and box queries, including across the antimeridian, equal a full scan."""
+        listings = _located(4000)
+        index = PropertyIndex()
+        index.upsert(listings)
+        
+        total, page = index.search(near=near, box=box, limit=len(listings))
+        expected = _within(listings, near, box)
+        assert total == len(expected) > 0
+        assert [listing['property_id'] for listing in page] == expected
+    
+    def test_geo_with_filters_and_distance_order(self):
+        """Test location combines with attribute filters and orders by distance."""
+        listings = _located(2000)
+        index = PropertyIndex()
+        index.upsert(listings)
+        near = (25.2, 55.3, 25)
+        
+        total, page = index.search(
+            amenities=['pool'], ranges={'price': (None, 3000)}, near=near, sort_by='distance', limit=50
+        )
+        nearby = set(_within(listings, near))
+        expected = [
+            listing for listing in listings
+            if listing['property_id'] in nearby and 'pool' in listing['amenities'] and listing['price'] <= 3000
+        ]
+        assert total == len(expected) > 0
+        distances = [listing['distance_km'] for listing in page]
+        assert distances == sorted(distances) and distances[-1] <= 25
+        with pytest.raises(ValueError):
+            index.search(sort_by='distance')
+    
+    def test_geo_incremental_updates(self):
+        """Test single inserts, moves and removals keep the geo index current."""
+        index = PropertyIndex()
+        index.upsert(_located(50))
+        point = {'property_id': 'new', 'city': 'Dubai', 'price': 1000, 'bedrooms': 1, 'annual_yield': 5,
+                 'latitude': 25.0, 'longitude': 55.0}
+        
+        index.upsert([point])
+        assert [l['property_id'] for l in index.search(near=(25.0, 55.0, 0.01))[1]] == ['new']
+        index.upsert([dict(point, latitude=26.0)])
+        assert index.search(near=(25.0, 55.0, 0.01))[0] == 0
+        assert index.search(box=(25.9, 54.9, 26.1, 55.1))[0] >= 1
+        index.remove('new')
+        assert index.search(near=(26.0, 55.0, 0.01))[0] == 0
+    
+    def test_load_file(self, tmp_path):
+        """Test JSON array and JSON Lines catalogs."""
+        listings = _catalog(5)
+        array_path = tmp_path / 'catalog.json'
+        array_path.write_text(json.dumps(listings))
+        lines_path = tmp_path / 'catalog.jsonl'
+        lines_path.write_text('\n'.join(json.dumps(l) for l in listings) + '\n')
+        
+        assert PropertyIndex().load_file(str(array_path)) == 5
+        assert PropertyIndex().load_file(str(lines_path)) == 5
+
+
+@pytest.fixture
+def client():
+    app_module.app.config['TESTING'] = True
+    with patch.object(app_module, 'agent_manager', AIPAgentManager()):
+        yield app_module.app.test_client()
+
+
+class TestPropertyEndpoints:
+    """Test suite for the property and tool endpoints."""
+    
+    def test_upsert_and_search(self, client):
+        """Test listings added through the API are searchable."""
+        response = client.put('/properties', json={'properties': _catalog(200)})
+        assert json.loads(response.data)['total'] == 200
+        
+        response = client.post('/properties/search', json={
+            'cities': ['Dubai'], 'max_price': 2000, 'min_bedrooms': 2, 'sort_by': 'price', 'limit': 5
+        })
+        data = json.loads(response.data)
+        
+        assert response.status_code == 200
+        assert data['total'] == len(_brute_force(
+            _catalog(200), ['Dubai'], None, {'price': (None, 2000), 'bedrooms': (2, None)}
+        ))
+        assert all(l['city'] == 'Dubai' and l['price'] <= 2000 for l in data['properties'])
+        assert data['properties'][0]['title'].startswith('Listing')
+    
+    def test_invalid_search(self, client):
+        """Test invalid criteria are rejected with 400."""
+        response = client.post('/properties/search', json={'limit': 0})
+        assert response.status_code == 400
+        assert json.loads(response.data)['error']['code'] == 'INVALID_REQUEST'
+        for criteria in ({'latitude': 10}, {'radius_km': 5}, {'sort_by': 'distance'}, {'latitude': 91, 'longitude': 0}):
+            assert client.post('/properties/search', json=criteria).status_code == 400
+    
+    def test_location_search(self, client):
+        """Test radius and bounding-box searches through the API."""
+        listings = _located(300)
+        client.put('/properties', json={'properties': listings})
+        
+        data = json.loads(client.post('/properties/search', json={
+            'latitude': 38.7, 'longitude': -9.1, 'radius_km': 30, 'sort_by': 'distance', 'limit': 100
+        }).data)
+        assert data['total'] == len(_within(listings, (38.7, -9.1, 30)))
+        assert data['properties'][0]['distance_km'] <= data['properties'][-1]['distance_km'] <= 30
+        
+        data = json.loads(client.post('/properties/search', json={
+            'bounding_box': {'south': 24, 'west': 54, 'north': 26, 'east': 56}, 'limit': 100
+        }).data)
+        assert data['total'] == len(_within(listings, box=(24, 54, 26, 56)))
+    
+    def test_search_tool(self, client):
+        """Test the search is listed and callable as a tool."""
+        client.put('/properties', json={'properties': _catalog(50)})
+        
+        specs = {spec['function']['name']: spec for spec in json.loads(client.get('/tools').data)['tools']}
+        assert 'max_price' in specs['search_properties']['function']['parameters']['properties']
+        
+        response = client.post('/tools/search_properties', json={'cities': ['Lagos']})
+        result = json.loads(response.data)['result']
+        assert result['total'] == len(_brute_force(_catalog(50), ['Lagos']))
+        
+        assert client.post('/tools/missing', json={}).status_code == 404
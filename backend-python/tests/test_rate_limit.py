@@ -0,0 +1,141 @@
+"""
+Unit tests for per-tenant rate limiting.
+
+Tests cover limit parsing, token bucket refill, tenant isolation, and
+early rejection in the Flask app.
+"""
+
+import json
+import os
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+# Set test environment variables before importing app
+os.environ['MEMBASE_ACCOUNT'] = '0x1234567890abcdef1234567890abcdef12345678'
+os.environ['MEMBASE_SECRET_KEY'] = 'test_secret_key'
+os.environ['MEMBASE_ID'] = 'test_agent_001'
+os.environ['MEMORY_HUB_ADDRESS'] = '54.169.29.193:8081'
+
+# Mock MEMBASE_AVAILABLE to prevent real blockchain connections
+import agent_manager as am_module
+am_module.MEMBASE_AVAILABLE = False
+
+import app as app_module
+from agent_manager import AIPAgentManager
+from rate_limit import RateLimiter, RouteLimit, parse_limits
+
+
+class TestParseLimits:
+    """Test suite for parse_limits."""
+    
+    def test_parse(self):
+        """Test rate, default burst and explicit burst."""
+        limits = parse_limits('register_agent=5/60, get_agent_status=600/60:50')
+        
+        assert limits['register_agent'] == RouteLimit(rate_per_second=5 / 60, burst=5)
+        assert limits['get_agent_status'] == RouteLimit(rate_per_second=10, burst=50)
+        assert parse_limits('') == {}
+    
+    def test_malformed_entry(self):
+        """Test malformed entries are reported."""
+        with pytest.raises(ValueError):
+            parse_limits('register_agent=lots')
+
+
+class TestRateLimiter:
+    """Test suite for RateLimiter."""
+    
+    def test_burst_then_refill(self):
+        """Test the burst is allowed, then requests wait for refill."""
+        limiter = RateLimiter({'route': RouteLimit(rate_per_second=0.5, burst=2)})
+        with patch('rate_limit.time.monotonic', return_value=100.0):
+            assert limiter.check('route', 'tenant') is None
+            assert limiter.check('route', 'tenant') is None
+            assert limiter.check('route', 'tenant') == 2
+        with patch('rate_limit.time.monotonic', return_value=102.0):
+            assert limiter.check('route', 'tenant') is None
+    
+    def test_tenants_and_routes_isolated(self):
+        """Test one tenant's usage does not affect another's or other routes."""
+        limiter = RateLimiter({'route': RouteLimit(rate_per_second=0.01, burst=1)})
+        
+        assert limiter.check('route', 'noisy') is None
+        assert limiter.check('route', 'noisy') is not None
+        assert limiter.check('route', 'quiet') is None
+        assert limiter.check('unlimited', 'noisy') is None
+    
+    def test_bucket_count_bounded(self):
+        """Test idle buckets are evicted beyond max_buckets."""
+        limiter = RateLimiter({'route': RouteLimit(rate_per_second=1, burst=1)}, max_buckets=10)
+        for n in range(50):
+            limiter.check('route', f'tenant_{n}')
+        
+        assert len(limiter._buckets) == 10
+
+
+class TestRateLimitedEndpoints:
+    """Test suite for early rejection in the Flask app."""
+    
+    def setup_method(self):
+        """Install limits and a manager whose SDK calls are counted."""
+        self.manager = AIPAgentManager()
+        self.manager.register_agent = AsyncMock(return_value={
+            'transaction_hash': '0x' + 'ab' * 32,
+            'agent_id': 'agent_a',
+            'wallet_address': '0x1234567890abcdef1234567890abcdef12345678'
+        })
+        self.limiter = RateLimiter(parse_limits('register_agent=1/3600'))
+        app_module.app.config['TESTING'] = True
+    
+    def test_register_rejected_before_sdk_work(self):
+        """Test a tenant over its limit gets 429 and the SDK is not called."""
+        with patch.object(app_module, 'agent_manager', self.manager), \
+                patch.object(app_module, 'rate_limiter', self.limiter):
+            with app_module.app.test_client() as client:
+                first = client.post('/agent/register', json={'agent_id': 'agent_a'})
+                second = client.post('/agent/register', json={'agent_id': 'agent_a'})
+                other = client.post('/agent/register', json={'agent_id': 'agent_b'})
+                status = client.get('/health')
+        
+        assert first.status_code == 200
+        assert second.status_code == 429
+        assert int(second.headers['Retry-After']) > 0
+        data = json.loads(second.data)
+        assert data['error']['code'] == 'RATE_LIMITED'
+        assert data['error']['retryable'] is True
+        assert other.status_code == 200
+        assert status.status_code == 200
+        assert self.manager.register_agent.await_count == 2
+    
+    def test_wallet_header_trusted_only_when_configured(self):
+        """Test a client cannot escape its limit by sending a new X-Wallet-Address."""
+        with patch.object(app_module, 'agent_manager', self.manager), \
+                patch.object(app_module, 'rate_limiter', self.limiter):
+            with app_module.app.test_client() as client:
+                client.post('/agent/register', json={'agent_id': 'agent_a'}, headers={'X-Wallet-Address': '0x01'})
+                spoofed = client.post(
+                    '/agent/register', json={'agent_id': 'agent_a'}, headers={'X-Wallet-Address': '0x02'}
+                )
+                with patch.object(app_module, 'TRUST_WALLET_HEADER', True):
+                    trusted = client.post(
+                        '/agent/register', json={'agent_id': 'agent_a'}, headers={'X-Wallet-Address': '0x03'}
+                    )
+        
+        assert spoofed.status_code == 429
+        assert trusted.status_code == 200
+    
+    def test_dispatcher_workers_limit_forwarded_clients(self):
+        """Test behind the dispatcher, anonymous callers are told apart by X-Forwarded-For."""
+        limiter = RateLimiter(parse_limits('list_tools=1/3600'))
+        with patch.object(app_module, 'agent_manager', self.manager), \
+                patch.object(app_module, 'rate_limiter', limiter), \
+                patch.object(app_module, 'WORKER_NAME', 'worker-0'):
+            with app_module.app.test_client() as client:
+                first = client.get('/tools', headers={'X-Forwarded-For': '10.0.0.1'})
+                other = client.get('/tools', headers={'X-Forwarded-For': '10.0.0.2'})
+                again = client.get('/tools', headers={'X-Forwarded-For': '192.0.2.7, 10.0.0.1'})
+        
+        assert first.status_code == 200
+        assert other.status_code == 200
+        assert again.status_code == 429
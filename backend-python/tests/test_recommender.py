@@ -0,0 +1,219 @@
+"""
+Unit tests for property recommendations.
+
+Tests cover the on-disk embedding cache, ranking against a brute-force
+cosine similarity, incremental profiles, catalog updates, and the
+recommendation endpoint and tool.
+"""
+
+import json
+import os
+import random
+import threading
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+# Set test environment variables before importing agent_manager
+os.environ['MEMBASE_ACCOUNT'] = '0x1234567890abcdef1234567890abcdef12345678'
+os.environ['MEMBASE_SECRET_KEY'] = 'test_secret_key'
+os.environ['MEMBASE_ID'] = 'test_agent_001'
+os.environ['MEMORY_HUB_ADDRESS'] = '54.169.29.193:8081'
+
+# Mock MEMBASE_AVAILABLE to prevent real blockchain connections in tests
+import agent_manager as am_module
+am_module.MEMBASE_AVAILABLE = False
+
+import app as app_module
+from agent_manager import AIPAgentManager
+from embeddings import HashingEmbedder
+from models import AgentState, Interaction, PropertyListing
+from property_search import PropertyIndex
+from recommender import EmbeddingCache, PropertyRecommender, listing_text
+
+CITIES = ['Dubai', 'Lagos', 'Lisbon', 'Singapore', 'Austin']
+AMENITIES = ['pool', 'gym', 'parking', 'concierge', 'sea view', 'pet friendly']
+STYLES = ['loft', 'villa', 'studio', 'penthouse', 'townhouse']
+
+
+def _catalog(count, seed=5):
+    rng = random.Random(seed)
+    return [
+        {
+            'property_id': f"prop_{n}",
+            'city': rng.choice(CITIES),
+            'price': float(rng.randrange(500, 6000, 50)),
+            'bedrooms': rng.randint(0, 5),
+            'annual_yield': round(rng.uniform(2, 12), 2),
+            'amenities': rng.sample(AMENITIES, rng.randint(0, 3)),
+            'title': f"Bright {rng.choice(STYLES)} {n}"
+        }
+        for n in range(count)
+    ]
+
+
+def _turn(n, query):
+    return Interaction(id=f"turn_{n}", userQuery=query, agentResponse='ok', timestamp=n)
+
+
+class CountingEmbedder(HashingEmbedder):
+    """HashingEmbedder that counts the texts it embeds."""
+    
+    def __init__(self):
+        super().__init__()
+        self.embedded = 0
+    
+    def embed(self, texts):
+        self.embedded += len(texts)
+        return super().embed(texts)
+
+
+class TestPropertyRecommender:
+    """Test suite for PropertyRecommender."""
+    
+    def test_cache_embeds_listings_once(self, tmp_path):
+        """Test unchanged listings are read from the disk cache, across restarts."""
+        path = str(tmp_path / 'embeddings.db')
+        listings = _catalog(200)
+        embedder = CountingEmbedder()
+        PropertyRecommender(embedder, EmbeddingCache(path)).upsert(listings)
+        assert embedder.embedded == 200
+        
+        embedder = CountingEmbedder()
+        restarted = PropertyRecommender(embedder, EmbeddingCache(path))
+        restarted.upsert(listings[:150] + [dict(listings[150], title='Renovated loft')])
+        assert embedder.embedded == 1
+        assert len(EmbeddingCache(path)) == 201
+        np.testing.assert_allclose(
+            restarted._vectors[0], HashingEmbedder().embed([listing_text(listings[0])])[0]
+        )
+    
+    def test_ranks_by_cosine_similarity(self):
+        """Test the top k equal a brute-force ranking of the profile against every listing."""
+        listings = _catalog(500)
+        recommender = PropertyRecommender()
+        recommender.upsert(listings)
+        recommender.update_profile('agent', {'city': 'Lisbon', 'amenities': ['pool', 'sea view']}, [])
+        
+        ranked = recommender.recommend('agent', k=10)
+        
+        embedder = HashingEmbedder()
+        profile = embedder.embed(["pool\nsea view\nLisbon"])[0]
+        scores = embedder.embed([listing_text(listing) for listing in listings]) @ profile
+        rows = {listing['property_id']: row for row, listing in enumerate(listings)}
+        # Identical listings tie, so compare scores rather than IDs
+        assert [score for score, _ in ranked] == pytest.approx(sorted(scores, reverse=True)[:10], abs=1e-5)
+        assert [score for score, _ in ranked] == \
+            pytest.approx([float(scores[rows[listing['property_id']]]) for _, listing in ranked], abs=1e-5)
+        assert ranked[0][1]['city'] == 'Lisbon' and {'pool', 'sea view'} <= set(ranked[0][1]['amenities'])
+    
+    def test_profile_is_incremental(self):
+        """Test only new turns are embedded, and recent queries weigh more."""
+        embedder = CountingEmbedder()
+        recommender = PropertyRecommender(embedder, history_decay=0.5)
+        recommender.upsert(_catalog(300))
+        history = [_turn(0, 'villa in Dubai with a pool')]
+        
+        assert recommender.update_profile('agent', {}, history) == 1
+        assert all(listing['city'] == 'Dubai' for _, listing in recommender.recommend('agent', k=3))
+        
+        embedder.embedded = 0
+        history += [_turn(1, 'penthouse in Singapore'), _turn(2, 'Singapore penthouse with gym')]
+        assert recommender.update_profile('agent', {}, history) == 2
+        assert embedder.embedded == 2
+        assert all(listing['city'] == 'Singapore' for _, listing in recommender.recommend('agent', k=3))
+        assert recommender.update_profile('agent', {}, history) == 0
+    
+    def test_follows_catalog_and_excludes(self):
+        """Test removed listings disappear, replaced ones re-rank, and exclusions apply."""
+        recommender = PropertyRecommender()
+        recommender.upsert(_catalog(50))
+        best = recommender.recommend('agent', k=1, query='gym in Lagos')[0][1]['property_id']
+        
+        assert recommender.recommend('agent', k=1, query='gym in Lagos', exclude=[best])[0][1]['property_id'] != best
+        assert recommender.remove(best) and not recommender.remove(best)
+        assert best not in [l['property_id'] for _, l in recommender.recommend('agent', k=50, query='gym in Lagos')]
+        
+        recommender.upsert([dict(_catalog(1)[0], property_id=best, city='Lagos', amenities=['gym'], title='Gym')])
+        assert recommender.recommend('agent', k=1, query='gym in Lagos')[0][1]['property_id'] == best
+        assert len(recommender) == 50
+    
+    def test_stale_catalog_changes_are_dropped(self):
+        """Test an upsert still embedding when its listing is removed does not revive it."""
+        release, embedding = threading.Event(), threading.Event()
+        
+        class BlockingEmbedder(HashingEmbedder):
+            def embed(self, texts):
+                embedding.set()
+                release.wait(5)
+                return super().embed(texts)
+        
+        catalog = PropertyIndex()
+        recommender = PropertyRecommender(BlockingEmbedder())
+        catalog.subscribe(recommender.upsert, recommender.remove)
+        listing = PropertyListing(property_id='p1', city='Lagos', price=900, bedrooms=2, title='Gym').model_dump()
+        writer = threading.Thread(target=catalog.upsert, args=([listing],))
+        writer.start()
+        assert embedding.wait(5)
+        
+        assert catalog.remove('p1')
+        release.set()
+        writer.join(5)
+        
+        assert len(recommender) == 0
+        assert recommender.upsert([listing], version=1) == 0
+        assert recommender.upsert([listing]) == 1
+    
+    def test_needs_a_profile_or_query(self):
+        """Test an unknown agent without a query is rejected."""
+        recommender = PropertyRecommender()
+        recommender.upsert(_catalog(10))
+        with pytest.raises(ValueError):
+            recommender.recommend('stranger')
+
+
+@pytest.fixture
+def manager():
+    manager = AIPAgentManager()
+    manager.properties.upsert(_catalog(300))
+    return manager
+
+
+class TestRecommendationEndpoint:
+    """Test suite for the recommendation endpoint."""
+    
+    def test_recommendations(self, manager):
+        """Test listings follow the catalog and the agent profile, and the agent tool."""
+        state = AgentState(
+            version=1, createdAt=0, updatedAt=0, membaseId='agent', walletAddress='0x0',
+            registeredOnChain=False, preferences={'city': 'Austin'},
+            interactionHistory=[_turn(0, 'townhouse with parking')], memoryHubConnected=True,
+            lastSyncTimestamp=0
+        )
+        manager._update_profile('agent', state)
+        app_module.app.config['TESTING'] = True
+        with patch.object(app_module, 'agent_manager', manager):
+            client = app_module.app.test_client()
+            
+            data = json.loads(client.post('/properties/recommendations', json={'agent_id': 'agent', 'limit': 5}).data)
+            assert len(data['properties']) == 5
+            assert data['properties'][0]['city'] == 'Austin'
+            scores = [listing['score'] for listing in data['properties']]
+            assert scores == sorted(scores, reverse=True)
+            
+            client.delete(f"/properties/{data['properties'][0]['property_id']}")
+            response = client.post('/tools/recommend_properties', json={'agent_id': 'agent', 'limit': 5})
+            result = json.loads(response.data)['result']
+            assert result['properties'][0]['property_id'] == data['properties'][1]['property_id']
+    
+    def test_unknown_agent(self, manager):
+        """Test an agent without a profile needs a query."""
+        app_module.app.config['TESTING'] = True
+        with patch.object(app_module, 'agent_manager', manager):
+            client = app_module.app.test_client()
+            response = client.post('/properties/recommendations', json={'agent_id': 'stranger'})
+            assert response.status_code == 400
+            
+            response = client.post('/properties/recommendations', json={'agent_id': 'stranger', 'query': 'loft in Lagos'})
+            assert json.loads(response.data)['properties'][0]['city'] == 'Lagos'
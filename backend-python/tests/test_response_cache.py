@@ -0,0 +1,152 @@
+"""
+Unit tests for the query response cache.
+
+Tests cover exact and near-duplicate lookups, TTL and LRU bounds,
+state-version invalidation, and cache use in query_agent.
+"""
+
+import os
+import pytest
+from unittest.mock import patch
+
+# Set test environment variables before importing agent_manager
+os.environ['MEMBASE_ACCOUNT'] = '0x1234567890abcdef1234567890abcdef12345678'
+os.environ['MEMBASE_SECRET_KEY'] = 'test_secret_key'
+os.environ['MEMBASE_ID'] = 'test_agent_001'
+os.environ['MEMORY_HUB_ADDRESS'] = '54.169.29.193:8081'
+
+# Mock MEMBASE_AVAILABLE to prevent real blockchain connections in tests
+import agent_manager as am_module
+am_module.MEMBASE_AVAILABLE = False
+
+from agent_manager import AIPAgentManager
+from models import AgentState, Interaction
+from response_cache import ResponseCache, normalize_query, state_version
+from tests.conftest import MemoryAgent
+
+
+def _state(history_ids=(), preferences=None):
+    return AgentState.model_construct(
+        preferences=dict(preferences or {}),
+        interactionHistory=[
+            Interaction.model_construct(id=i, userQuery='q', agentResponse='a', timestamp=0)
+            for i in history_ids
+        ]
+    )
+
+
+class TestResponseCache:
+    """Test suite for ResponseCache."""
+    
+    def test_normalize_query(self):
+        """Test case, spacing and trailing punctuation are ignored."""
+        assert normalize_query("  What's my   YIELD?? ") == "what's my yield"
+    
+    def test_exact_hit_and_miss(self):
+        """Test lookups match on agent, normalized query and version."""
+        cache = ResponseCache()
+        cache.put('agent', 'What is my yield?', 'v1', '7%', 'id-1')
+        
+        assert cache.get('agent', 'what is my yield', 'v1').response == '7%'
+        assert cache.get('agent', 'what is my yield', 'v2') is None
+        assert cache.get('other', 'what is my yield', 'v1') is None
+        assert (cache.hits, cache.misses) == (1, 2)
+    
+    def test_ttl_expiry(self):
+        """Test entries older than the TTL are not served."""
+        cache = ResponseCache(ttl_seconds=10)
+        with patch('response_cache.time.monotonic', return_value=100.0):
+            cache.put('agent', 'q', 'v1', 'r', 'id')
+        with patch('response_cache.time.monotonic', return_value=105.0):
+            assert cache.get('agent', 'q', 'v1') is not None
+        with patch('response_cache.time.monotonic', return_value=111.0):
+            assert cache.get('agent', 'q', 'v1') is None
+        assert len(cache) == 0
+    
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted first."""
+        cache = ResponseCache(max_entries=2)
+        cache.put('agent', 'a', 'v', 'ra', 'ia')
+        cache.put('agent', 'b', 'v', 'rb', 'ib')
+        cache.get('agent', 'a', 'v')
+        cache.put('agent', 'c', 'v', 'rc', 'ic')
+        
+        assert cache.get('agent', 'b', 'v') is None
+        assert cache.get('agent', 'a', 'v') is not None
+        assert cache.get('agent', 'c', 'v') is not None
+    
+    def test_near_duplicate_lookup(self):
+        """Test similar phrasings hit only when near-duplicate mode is on."""
+        exact = ResponseCache()
+        near = ResponseCache(similarity_threshold=0.6)
+        for cache in (exact, near):
+            cache.put('agent', 'show available properties in Dubai', 'v', 'list', 'id')
+        
+        assert exact.get('agent', 'show me the available properties in Dubai', 'v') is None
+        assert near.get('agent', 'show me the available properties in Dubai', 'v').response == 'list'
+        assert near.get('agent', 'register my wallet', 'v') is None
+        assert near.get('agent', 'show me the available properties in Dubai', 'v2') is None
+    
+    def test_near_duplicates_must_agree_on_numbers_and_negation(self):
+        """Test similar queries stating other numbers or a negation are not served each other's answers."""
+        cache = ResponseCache(similarity_threshold=0.6)
+        cache.put('agent', 'is a 2 bedroom flat in Dubai a good fit', 'v', 'two', 'id-1')
+        cache.put('agent', 'is the marina area safe', 'v', 'safe', 'id-2')
+        
+        assert cache.get('agent', 'is a 3 bedroom flat in Dubai a good fit', 'v') is None
+        assert cache.get('agent', 'is the marina area not safe', 'v') is None
+        assert cache.get('agent', "isn't the marina area safe", 'v') is None
+        assert cache.get('agent', 'is the marina area safe at night', 'v').response == 'safe'
+        assert cache.get('agent', 'is a 2 bedroom flat in Dubai a good fit for me', 'v').response == 'two'
+    
+    def test_state_version_tracks_preferences_and_history(self):
+        """Test the version changes with preferences and new turns only."""
+        base = state_version(_state(['i1']))
+        
+        assert state_version(_state(['i1'])) == base
+        assert state_version(_state(['i1', 'i2'])) != base
+        assert state_version(_state(['i1'], {'risk': 'low'})) != base
+        assert state_version(_state(['i1']), {'risk': 'low'}) == state_version(_state(['i1'], {'risk': 'low'}))
+
+
+class TestManagerResponseCache:
+    """Test suite for the response cache in query_agent."""
+    
+    def setup_method(self):
+        """Set up a manager with the cache enabled."""
+        with patch.dict(os.environ, {'RESPONSE_CACHE_SIZE': '16'}):
+            self.manager = AIPAgentManager()
+        self.agent = MemoryAgent()
+        self.manager.agents['cache_agent'] = self.agent
+    
+    @pytest.mark.asyncio
+    async def test_repeat_query_served_from_cache(self):
+        """Test an immediately repeated query skips the LLM and history write."""
+        first = await self.manager.query_agent('cache_agent', 'What is my yield?')
+        second = await self.manager.query_agent('cache_agent', 'what is my yield')
+        
+        assert self.agent.calls == 1
+        assert second['cached'] is True and first['cached'] is False
+        assert second['response'] == first['response']
+        assert second['interaction_id'] == first['interaction_id']
+        assert len(second['agent_state'].interactionHistory) == 1
+    
+    @pytest.mark.asyncio
+    async def test_history_and_preference_changes_invalidate(self):
+        """Test a new turn or new preferences make the cached answer stale."""
+        await self.manager.query_agent('cache_agent', 'What is my yield?')
+        await self.manager.query_agent('cache_agent', 'Show properties')
+        await self.manager.query_agent('cache_agent', 'What is my yield?')
+        assert self.agent.calls == 3
+        
+        await self.manager.query_agent('cache_agent', 'What is my yield?', {'currency': 'AED'})
+        assert self.agent.calls == 4
+    
+    @pytest.mark.asyncio
+    async def test_bypass_flag(self):
+        """Test bypass_cache always calls the LLM."""
+        await self.manager.query_agent('cache_agent', 'What is my yield?')
+        result = await self.manager.query_agent('cache_agent', 'What is my yield?', bypass_cache=True)
+        
+        assert self.agent.calls == 2
+        assert result['cached'] is False
@@ -0,0 +1,163 @@
+"""
+Unit tests for the semantic retrieval index.
+
+Tests cover the hashing embedder, exact and approximate vector search,
+per-agent incremental indexing, and retrieved context in query_agent.
+"""
+
+import os
+import numpy as np
+import pytest
+from unittest.mock import patch
+
+# Set test environment variables before importing agent_manager
+os.environ['MEMBASE_ACCOUNT'] = '0x1234567890abcdef1234567890abcdef12345678'
+os.environ['MEMBASE_SECRET_KEY'] = 'test_secret_key'
+os.environ['MEMBASE_ID'] = 'test_agent_001'
+os.environ['MEMORY_HUB_ADDRESS'] = '54.169.29.193:8081'
+
+# Mock MEMBASE_AVAILABLE to prevent real blockchain connections in tests
+import agent_manager as am_module
+am_module.MEMBASE_AVAILABLE = False
+
+from agent_manager import AIPAgentManager
+from embeddings import HashingEmbedder, tokenize
+from models import Interaction
+from semantic_index import SemanticMemory, VectorIndex
+
+
+def _interaction(n, query, response='ok'):
+    return Interaction(id=f'id-{n}', userQuery=query, agentResponse=response, timestamp=1700000000 + n)
+
+
+class TestHashingEmbedder:
+    """Test suite for HashingEmbedder."""
+    
+    def test_unit_norm_and_deterministic(self):
+        """Test embeddings are unit vectors and stable across instances."""
+        first = HashingEmbedder().embed(['Dubai marina apartment'])
+        second = HashingEmbedder().embed(['Dubai marina apartment'])
+        
+        assert first.dtype == np.float32
+        assert np.isclose(np.linalg.norm(first[0]), 1.0)
+        assert np.array_equal(first, second)
+    
+    def test_similar_texts_score_higher(self):
+        """Test lexical overlap translates into cosine similarity."""
+        embedder = HashingEmbedder()
+        query, near, far = embedder.embed([
+            'yield on the Dubai marina apartment',
+            'what is the yield of my Dubai marina apartment',
+            'register a new wallet on testnet'
+        ])
+        assert query @ near > query @ far
+    
+    def test_stopwords_removed(self):
+        """Test stopwords are not tokens."""
+        assert tokenize('What is the yield of my villa?') == ['yield', 'villa']
+        assert not HashingEmbedder().embed_one('the of and').any()
+
+
+class TestVectorIndex:
+    """Test suite for VectorIndex."""
+    
+    def test_exact_search_matches_brute_force(self):
+        """Test small indexes return the true nearest neighbours."""
+        rng = np.random.default_rng(1)
+        vectors = rng.normal(size=(200, 32)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        index = VectorIndex(32)
+        index.add(vectors, list(range(200)))
+        
+        query = vectors[17]
+        results = index.search(query, 5)
+        expected = np.argsort(-(vectors @ query))[:5]
+        
+        assert [row for _, row in results] == list(expected)
+        assert results[0][1] == 17
+    
+    def test_exclude_rows(self):
+        """Test excluded rows are never returned."""
+        vectors = np.eye(4, dtype=np.float32)
+        index = VectorIndex(4)
+        index.add(vectors, ['a', 'b', 'c', 'd'])
+        
+        results = index.search(vectors[0], 4, exclude={0})
+        assert 0 not in [row for _, row in results]
+        assert len(results) == 3
+    
+    def test_approximate_search_finds_clustered_neighbours(self):
+        """Test the IVF path is used past the limit and still finds close rows."""
+        rng = np.random.default_rng(2)
+        centers = rng.normal(size=(20, 16))
+        points = np.repeat(centers, 100, axis=0) + rng.normal(scale=0.05, size=(2000, 16))
+        points = (points / np.linalg.norm(points, axis=1, keepdims=True)).astype(np.float32)
+        
+        index = VectorIndex(16, brute_force_limit=500)
+        for start in range(0, 2000, 250):
+            index.add(points[start:start + 250], list(range(start, start + 250)))
+        
+        assert index._centroids is not None
+        results = index.search(points[1234], 10)
+        assert results[0][1] == 1234
+        assert all(row // 100 == 12 for _, row in results)
+
+
+class TestSemanticMemory:
+    """Test suite for per-agent SemanticMemory."""
+    
+    def test_incremental_add_skips_known(self):
+        """Test re-adding an overlapping history window only embeds new turns."""
+        memory = SemanticMemory()
+        assert memory.add('agent', [_interaction(1, 'a'), _interaction(2, 'b')]) == 2
+        assert memory.add('agent', [_interaction(2, 'b'), _interaction(3, 'c')]) == 1
+        assert memory.size('agent') == 3
+    
+    def test_search_relevant_turn_and_exclusion(self):
+        """Test the relevant old turn is found and excluded IDs are skipped."""
+        memory = SemanticMemory()
+        memory.add('agent', [
+            _interaction(1, 'Tell me about the Palm Jumeirah villa rental yield'),
+            _interaction(2, 'How do I connect my wallet'),
+            _interaction(3, 'Show testnet faucet'),
+        ])
+        
+        hits = memory.search('agent', 'what was the yield on the Palm Jumeirah villa?', 2)
+        assert hits[0][1].id == 'id-1'
+        
+        hits = memory.search('agent', 'what was the yield on the Palm Jumeirah villa?', 2, {'id-1'})
+        assert all(i.id != 'id-1' for _, i in hits)
+        assert memory.search('other_agent', 'anything', 2) == []
+
+
+class RecordingAgent:
+    def __init__(self):
+        self.system_prompts = []
+    
+    async def process_query(self, query, use_history=True, recent_n_messages=16,
+                            use_tool_call=True, system_prompt=None):
+        self.system_prompts.append(system_prompt)
+        return f"Answer to: {query}"
+
+
+class TestManagerRetrieval:
+    """Test suite for retrieved context in query_agent."""
+    
+    @pytest.mark.asyncio
+    async def test_relevant_turns_passed_as_context(self, tmp_path):
+        """Test old relevant turns from the local log reach the system prompt."""
+        with patch.dict(os.environ, {'RETRIEVAL_TOP_K': '2', 'INTERACTION_LOG_DIR': str(tmp_path)}):
+            manager = AIPAgentManager()
+        
+        old_turns = [_interaction(n, f'filler question number {n}') for n in range(50)]
+        old_turns[3] = _interaction(3, 'Palm Jumeirah villa rental yield', 'It yields 7.2% a year')
+        for turn in old_turns:
+            manager.interaction_logs.append('retrieval_agent', turn)
+        
+        agent = RecordingAgent()
+        manager.agents['retrieval_agent'] = agent
+        await manager.query_agent('retrieval_agent', 'remind me of the Palm Jumeirah villa yield')
+        
+        prompt = agent.system_prompts[-1]
+        assert 'Relevant earlier conversation' in prompt
+        assert 'It yields 7.2% a year' in prompt
@@ -0,0 +1,273 @@
+"""
+Unit tests for agent-affinity sharding.
+
+Tests cover the consistent hash ring (balance and minimal movement when
+workers change), routing key extraction, and request forwarding in the
+dispatcher, with worker HTTP calls faked.
+"""
+
+import json
+from collections import Counter
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError
+
+from dispatcher import Dispatcher, Worker, create_app
+from sharding import HashRing, routing_key
+
+AGENT_IDS = [f"agent_{n}" for n in range(10000)]
+
+
+class TestHashRing:
+    """Test suite for HashRing."""
+    
+    def test_owner_is_stable(self):
+        """Test the same key always maps to the same node, regardless of insertion order."""
+        ring = HashRing(['a', 'b', 'c'])
+        other = HashRing(['c', 'a', 'b'])
+        assert all(ring.owner(key) == other.owner(key) for key in AGENT_IDS[:500])
+    
+    def test_keys_are_balanced(self):
+        """Test each node owns roughly an equal share of keys."""
+        ring = HashRing([f"worker-{n}" for n in range(4)])
+        counts = Counter(ring.owner(key) for key in AGENT_IDS)
+        assert len(counts) == 4
+        assert all(0.18 < count / len(AGENT_IDS) < 0.32 for count in counts.values())
+    
+    def test_removing_node_moves_only_its_keys(self):
+        """Test keys owned by the remaining nodes stay put when one is removed."""
+        ring = HashRing([f"worker-{n}" for n in range(4)])
+        before = {key: ring.owner(key) for key in AGENT_IDS}
+        ring.remove('worker-2')
+        
+        for key, owner in before.items():
+            if owner != 'worker-2':
+                assert ring.owner(key) == owner
+            else:
+                assert ring.owner(key) != 'worker-2'
+    
+    def test_adding_node_moves_about_its_share(self):
+        """Test a new node takes roughly 1/N of keys, all moving to it."""
+        ring = HashRing([f"worker-{n}" for n in range(4)])
+        before = {key: ring.owner(key) for key in AGENT_IDS}
+        ring.add('worker-4')
+        
+        moved = [key for key in AGENT_IDS if ring.owner(key) != before[key]]
+        assert all(ring.owner(key) == 'worker-4' for key in moved)
+        assert 0.12 < len(moved) / len(AGENT_IDS) < 0.28
+    
+    def test_empty_ring(self):
+        """Test an empty ring has no owner."""
+        ring = HashRing()
+        assert ring.owner('agent') is None
+        assert ring.add('a') and not ring.add('a')
+        assert ring.remove('a') and not ring.remove('a')
+
+
+class TestRoutingKey:
+    """Test suite for routing_key."""
+    
+    def test_path_agent_id(self):
+        """Test agent_ids in status, memory and history paths."""
+        assert routing_key('/agent/status/agent_1', b'') == 'agent_1'
+        assert routing_key('/agent/history/agent_2', b'') == 'agent_2'
+    
+    def test_body_agent_id(self):
+        """Test agent_ids in JSON bodies, and requests without one."""
+        assert routing_key('/agent/query', b'{"agent_id": "agent_3", "query": "hi"}') == 'agent_3'
+        assert routing_key('/agent/query', b'not json') is None
+        assert routing_key('/health', b'') is None
+        assert routing_key('/agent/query', b'[1, 2]') is None
+
+
+def _response(status=200, payload=None):
+    response = MagicMock()
+    response.status_code = status
+    response.headers = {'Content-Type': 'application/json', 'Connection': 'keep-alive'}
+    response.content = json.dumps(payload or {}).encode()
+    response.ok = status < 400
+    response.json.return_value = payload or {}
+    return response
+
+
+@pytest.fixture
+def dispatcher():
+    workers = [Worker(f"worker-{n}", f"http://127.0.0.1:{6000 + n}") for n in range(3)]
+    dispatcher = Dispatcher(workers)
+    dispatcher._local.session = MagicMock()
+    return dispatcher
+
+
+class TestDispatcher:
+    """Test suite for Dispatcher."""
+    
+    def test_forwards_to_owner(self, dispatcher):
+        """Test a request goes to the agent's owner with hop-by-hop headers dropped."""
+        session = dispatcher.session
+        session.request.return_value = _response(200, {'success': True})
+        body = b'{"agent_id": "agent_7", "query": "hi"}'
+        
+        status, headers, content = dispatcher.forward(
+            'POST', '/agent/query', b'', {'Content-Type': 'application/json', 'Connection': 'close'}, body
+        )
+        
+        owner = dispatcher.owner('agent_7')
+        method, url = session.request.call_args.args
+        assert (method, url) == ('POST', f"{owner.url}/agent/query")
+        assert 'Connection' not in session.request.call_args.kwargs['headers']
+        assert status == 200
+        assert ('Connection', 'keep-alive') not in headers
+        assert json.loads(content) == {'success': True}
+    
+    def test_requests_without_agent_are_spread(self, dispatcher):
+        """Test requests not tied to an agent take turns across the live workers."""
+        assert {dispatcher.owner(None).name for _ in range(3)} == {'worker-0', 'worker-1', 'worker-2'}
+        
+        dispatcher.remove_worker('worker-1')
+        assert {dispatcher.owner(None).name for _ in range(4)} == {'worker-0', 'worker-2'}
+        assert dispatcher.owner('agent_7') is dispatcher.owner('agent_7')
+    
+    def test_unreachable_worker_is_rerouted(self, dispatcher):
+        """Test a refused connection takes the worker off the ring and retries on the new owner."""
+        session = dispatcher.session
+        first_owner = dispatcher.owner('agent_7')
+        session.request.side_effect = [requests.exceptions.ConnectionError('refused'), _response(200)]
+        
+        status, _, _ = dispatcher.forward('GET', '/agent/status/agent_7', b'', {}, b'')
+        
+        assert status == 200
+        assert first_owner.name not in dispatcher.ring
+        second_url = session.request.call_args.args[1]
+        assert not second_url.startswith(first_owner.url)
+    
+    def test_refused_post_is_rerouted(self, dispatcher):
+        """Test a POST the worker never received is retried on the new owner."""
+        session = dispatcher.session
+        refused = MaxRetryError(None, '/agent/query', NewConnectionError(None, 'Connection refused'))
+        session.request.side_effect = [requests.exceptions.ConnectionError(refused), _response(200)]
+        body = b'{"agent_id": "agent_7", "query": "hi"}'
+        
+        status, _, _ = dispatcher.forward('POST', '/agent/query', b'', {}, body)
+        
+        assert status == 200
+        assert session.request.call_count == 2
+    
+    def test_dropped_post_is_not_repeated(self, dispatcher):
+        """Test a POST whose connection dropped after sending is not sent to another worker."""
+        session = dispatcher.session
+        dropped = ProtocolError('Connection aborted.', ConnectionResetError('RemoteDisconnected'))
+        session.request.side_effect = [requests.exceptions.ConnectionError(dropped), _response(200)]
+        body = b'{"agent_id": "agent_7", "query": "hi"}'
+        
+        status, _, content = dispatcher.forward('POST', '/agent/query', b'', {}, body)
+        
+        assert status == 502
+        assert json.loads(content)['error']['code'] == 'WORKER_CONNECTION_LOST'
+        assert session.request.call_count == 1
+    
+    def test_no_workers(self, dispatcher):
+        """Test a 503 envelope once every worker is unreachable."""
+        dispatcher.session.request.side_effect = requests.exceptions.ConnectionError('refused')
+        
+        status, _, content = dispatcher.forward('GET', '/agent/status/agent_7', b'', {}, b'')
+        
+        assert status == 503
+        assert json.loads(content)['error']['code'] == 'WORKER_UNAVAILABLE'
+    
+    def test_forwarded_for_appended(self, dispatcher):
+        """Test workers see the caller's address, not the dispatcher's."""
+        dispatcher.session.request.return_value = _response(200)
+        
+        dispatcher.forward('GET', '/agent/status/agent_7', b'', {'X-Forwarded-For': '203.0.113.9'}, b'', '10.0.0.5')
+        
+        headers = dispatcher.session.request.call_args.kwargs['headers']
+        assert headers['X-Forwarded-For'] == '203.0.113.9, 10.0.0.5'
+    
+    def test_internal_paths_not_forwarded(self, dispatcher):
+        """Test clients cannot reach the workers' internal endpoints."""
+        status, _, _ = dispatcher.forward('PUT', '/internal/ring', b'', {}, b'{}')
+        
+        assert status == 404
+        dispatcher.session.request.assert_not_called()
+    
+    def test_catalog_writes_reach_every_worker(self, dispatcher):
+        """Test catalog and stream writes are applied on all workers and journaled."""
+        session = dispatcher.session
+        session.request.return_value = _response(200, {'success': True})
+        body = json.dumps({'properties': [{'property_id': 'p1', 'city': 'Lisbon', 'price': 1, 'bedrooms': 1}]})
+        
+        status, _, _ = dispatcher.forward('PUT', '/properties', b'', {}, body.encode())
+        dispatcher.forward('DELETE', '/properties/p0', b'', {}, b'')
+        
+        assert status == 200
+        urls = {call.args[1] for call in session.request.call_args_list}
+        assert urls == {f"{worker.url}/properties" for worker in dispatcher.workers.values()} | {
+            f"{worker.url}/properties/p0" for worker in dispatcher.workers.values()
+        }
+        assert [(method, path) for method, path, _ in dispatcher.journal.requests()] == [
+            ('DELETE', '/properties/p0'), ('PUT', '/properties')
+        ]
+    
+    def test_rejoining_worker_replays_writes(self, dispatcher):
+        """Test a worker back on the ring first receives the catalog writes it missed."""
+        session = dispatcher.session
+        session.request.return_value = _response(200)
+        dispatcher.remove_worker('worker-1')
+        body = json.dumps({'streams': [{'stream_id': 4}]}).encode()
+        dispatcher.forward('PUT', '/streams', b'', {}, body)
+        assert all('6001' not in call.args[1] for call in session.request.call_args_list)
+        
+        session.get.side_effect = lambda url, timeout: _response(200)
+        dispatcher.check_workers()
+        
+        method, url = session.request.call_args.args
+        assert (method, url) == ('PUT', 'http://127.0.0.1:6001/streams')
+        assert json.loads(session.request.call_args.kwargs['data']) == {'streams': [{'stream_id': 4}]}
+        assert 'worker-1' in dispatcher.ring
+    
+    def test_ring_changes_published(self, dispatcher):
+        """Test every ring change is sent to the workers with an increasing version."""
+        session = dispatcher.session
+        dispatcher.remove_worker('worker-2')
+        dispatcher.add_worker(dispatcher.workers['worker-2'])
+        
+        payloads = [call.kwargs['json'] for call in session.put.call_args_list]
+        assert len(payloads) == 6
+        assert payloads[0]['nodes'] == ['worker-0', 'worker-1']
+        assert payloads[-1]['nodes'] == ['worker-0', 'worker-1', 'worker-2']
+        assert payloads[-1]['version'] == payloads[0]['version'] + 1
+    
+    def test_check_workers_syncs_ring(self, dispatcher):
+        """Test health checks remove failing workers and re-add recovered ones."""
+        session = dispatcher.session
+        session.get.side_effect = lambda url, timeout: _response(503 if '6001' in url else 200)
+        dispatcher.check_workers()
+        assert dispatcher.ring.nodes == ['worker-0', 'worker-2']
+        
+        session.get.side_effect = lambda url, timeout: _response(200)
+        dispatcher.check_workers()
+        assert dispatcher.ring.nodes == ['worker-0', 'worker-1', 'worker-2']
+    
+    def test_health_aggregates_workers(self, dispatcher):
+        """Test the dispatcher's /health reports every worker."""
+        dispatcher.session.get.return_value = _response(200, {'status': 'healthy'})
+        client = create_app(dispatcher).test_client()
+        
+        data = json.loads(client.get('/health').data)
+        
+        assert data['status'] == 'healthy'
+        assert set(data['workers']) == {'worker-0', 'worker-1', 'worker-2'}
+        assert all(report['on_ring'] for report in data['workers'].values())
+    
+    def test_app_forwards_requests(self, dispatcher):
+        """Test the catch-all route forwards path, query string and body."""
+        dispatcher.session.request.return_value = _response(200, {'interactions': []})
+        client = create_app(dispatcher).test_client()
+        
+        response = client.get('/agent/history/agent_7?limit=5')
+        
+        assert response.status_code == 200
+        url = dispatcher.session.request.call_args.args[1]
+        assert url == f"{dispatcher.owner('agent_7').url}/agent/history/agent_7?limit=5"
@@ -0,0 +1,167 @@
+"""
+Unit tests for the durable agent state store.
+
+Tests cover the SQLite store itself and lazy agent rehydration in
+AIPAgentManager after a simulated worker restart.
+"""
+
+import os
+import pytest
+from unittest.mock import patch
+
+# Set test environment variables before importing agent_manager
+os.environ['MEMBASE_ACCOUNT'] = '0x1234567890abcdef1234567890abcdef12345678'
+os.environ['MEMBASE_SECRET_KEY'] = 'test_secret_key'
+os.environ['MEMBASE_ID'] = 'test_agent_001'
+os.environ['MEMORY_HUB_ADDRESS'] = '54.169.29.193:8081'
+
+# Mock MEMBASE_AVAILABLE to prevent real blockchain connections in tests
+import agent_manager as am_module
+am_module.MEMBASE_AVAILABLE = False
+
+from agent_manager import AIPAgentManager
+from models import AgentState, Interaction
+from state_store import AgentStateStore
+
+
+class MockAgent:
+    """Agent double that records how often it was created."""
+    
+    created = 0
+    
+    def __init__(self, agent_id):
+        self.agent_id = agent_id
+        MockAgent.created += 1
+    
+    async def process_query(self, query, **kwargs):
+        return f"Mock response to: {query}"
+
+
+async def _mock_create_agent(self, agent_id, description, hub_address):
+    return MockAgent(agent_id)
+
+
+def _state(agent_id):
+    return AgentState(
+        version=1,
+        createdAt=1700000000,
+        updatedAt=1700000100,
+        membaseId=agent_id,
+        walletAddress='0x1234567890abcdef1234567890abcdef12345678',
+        registeredOnChain=True,
+        interactionHistory=[Interaction(
+            id='i-1',
+            userQuery='hello',
+            agentResponse='hi',
+            timestamp=1700000050
+        )],
+        memoryHubConnected=True,
+        lastSyncTimestamp=1700000100
+    )
+
+
+class TestAgentStateStore:
+    """Test suite for AgentStateStore."""
+    
+    def test_uses_wal_journal(self, tmp_path):
+        """Test the database runs in WAL mode."""
+        store = AgentStateStore(str(tmp_path / 'state.db'))
+        mode = store._conn.execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode.lower() == 'wal'
+        store.close()
+    
+    def test_agent_round_trip(self, tmp_path):
+        """Test agent records survive reopening the store."""
+        path = str(tmp_path / 'state.db')
+        store = AgentStateStore(path)
+        store.save_agent('agent_a', 'first description', 'hub:1')
+        store.save_agent('agent_a', 'updated description', 'hub:2')
+        store.close()
+        
+        reopened = AgentStateStore(path)
+        assert reopened.get_agent('agent_a') == {
+            'agent_id': 'agent_a',
+            'description': 'updated description',
+            'memory_hub_address': 'hub:2'
+        }
+        assert reopened.get_agent('missing') is None
+        assert reopened.list_agents() == ['agent_a']
+        reopened.close()
+    
+    def test_state_round_trip(self, tmp_path):
+        """Test state snapshots are stored and restored intact."""
+        store = AgentStateStore(str(tmp_path / 'state.db'))
+        store.save_state('agent_a', _state('agent_a'))
+        
+        loaded = store.load_state('agent_a')
+        assert loaded == _state('agent_a')
+        assert store.load_state('missing') is None
+        
+        store.delete_agent('agent_a')
+        assert store.load_state('agent_a') is None
+        store.close()
+
+
+class TestManagerRehydration:
+    """Test suite for lazy rehydration after a restart."""
+    
+    @pytest.mark.asyncio
+    async def test_query_after_restart_rehydrates_agent(self, tmp_path):
+        """Test a restarted manager serves queries for previously initialized agents."""
+        path = str(tmp_path / 'state.db')
+        with patch.dict(os.environ, {'STATE_STORE_PATH': path}), \
+                patch.object(AIPAgentManager, '_create_agent', _mock_create_agent):
+            manager = AIPAgentManager()
+            await manager.initialize_agent('agent_r', 'Property matcher', 'hub:8081')
+            
+            # Simulate a worker restart
+            restarted = AIPAgentManager()
+            assert 'agent_r' not in restarted.agents
+            
+            status = await restarted.get_agent_status('agent_r')
+            assert status['status'] == 'active'
+            
+            result = await restarted.query_agent('agent_r', 'hello')
+            assert result['response'] == 'Mock response to: hello'
+            assert 'agent_r' in restarted.agents
+    
+    @pytest.mark.asyncio
+    async def test_memory_served_from_snapshot_without_rehydration(self, tmp_path):
+        """Test memory reads after a restart are served from the local snapshot."""
+        path = str(tmp_path / 'state.db')
+        with patch.dict(os.environ, {'STATE_STORE_PATH': path}), \
+                patch.object(AIPAgentManager, '_create_agent', _mock_create_agent):
+            manager = AIPAgentManager()
+            manager.state_store.save_agent('agent_m', 'desc', 'hub:8081')
+            manager.state_store.save_state('agent_m', _state('agent_m'))
+            
+            created_before = MockAgent.created
+            result = await AIPAgentManager().get_agent_memory('agent_m')
+            
+            assert MockAgent.created == created_before
+            assert result['state'].interactionHistory[0].id == 'i-1'
+    
+    @pytest.mark.asyncio
+    async def test_unknown_agent_still_not_found(self, tmp_path):
+        """Test agents absent from the store are still reported as not initialized."""
+        with patch.dict(os.environ, {'STATE_STORE_PATH': str(tmp_path / 'state.db')}):
+            manager = AIPAgentManager()
+            with pytest.raises(ValueError) as exc_info:
+                await manager.query_agent('never_initialized', 'hello')
+            assert "has not been initialized" in str(exc_info.value)
+    
+    @pytest.mark.asyncio
+    async def test_fallback_state_keeps_last_snapshot(self, tmp_path):
+        """Test a state built without a hub read does not replace the stored snapshot."""
+        with patch.dict(os.environ, {'STATE_STORE_PATH': str(tmp_path / 'state.db')}):
+            manager = AIPAgentManager()
+        manager.state_store.save_state('agent_d', _state('agent_d'))
+        manager.agents['agent_d'] = MockAgent('agent_d')
+        
+        result = await manager.query_agent('agent_d', 'hello again')
+        memory = await manager.get_agent_memory('agent_d')
+        
+        assert result['agent_state'].memoryHubConnected is False
+        assert [i.userQuery for i in result['agent_state'].interactionHistory] == ['hello again']
+        assert memory['state'].memoryHubConnected is False
+        assert [i.id for i in manager.state_store.load_state('agent_d').interactionHistory] == ['i-1']
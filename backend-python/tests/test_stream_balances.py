@@ -0,0 +1,187 @@
+"""
+Unit tests for vectorized stream balances.
+
+Balances are checked to the wei against a direct transcription of
+StreamingProtocol.claimableBalance and cancelStream, including amounts far
+beyond 64 bits.
+"""
+
+import json
+import os
+import random
+from unittest.mock import patch
+
+import pytest
+
+# Set test environment variables before importing agent_manager
+os.environ['MEMBASE_ACCOUNT'] = '0x1234567890abcdef1234567890abcdef12345678'
+os.environ['MEMBASE_SECRET_KEY'] = 'test_secret_key'
+os.environ['MEMBASE_ID'] = 'test_agent_001'
+os.environ['MEMORY_HUB_ADDRESS'] = '54.169.29.193:8081'
+
+# Mock MEMBASE_AVAILABLE to prevent real blockchain connections in tests
+import agent_manager as am_module
+am_module.MEMBASE_AVAILABLE = False
+
+import app as app_module
+from agent_manager import AIPAgentManager
+from stream_balances import StreamBook, from_limbs, to_limbs
+
+NOW = 1_700_000_000
+RECIPIENTS = ['0x' + f"{n:040x}" for n in range(1, 6)]
+
+
+def _streams(count, seed=11):
+    """Streams as createStream would produce them, some part-claimed or canceled."""
+    rng = random.Random(seed)
+    streams = []
+    for stream_id in range(1, count + 1):
+        duration = rng.randint(1, 400 * 86400)
+        total_amount = rng.choice([10 ** 18, 10 ** 24, 2 ** 200, 2 ** 255]) + rng.randrange(10 ** 18)
+        flow_rate = total_amount // duration
+        start_time = NOW - rng.randint(0, 500 * 86400)
+        earned_so_far = (min(NOW, start_time + duration) - start_time) * flow_rate
+        streams.append({
+            'stream_id': stream_id,
+            'sender': '0x' + 'ab' * 20,
+            'recipient': rng.choice(RECIPIENTS),
+            'total_amount': total_amount,
+            'flow_rate': flow_rate,
+            'start_time': start_time,
+            'stop_time': start_time + duration,
+            'amount_withdrawn': rng.choice([0, earned_so_far // 3, earned_so_far]),
+            'is_active': rng.random() > 0.1
+        })
+    return streams
+
+
+def _contract(stream, now):
+    """claimableBalance, streamed total and cancelStream's sender refund."""
+    if not stream['is_active']:
+        return 0, 0, 0
+    elapsed = max(0, min(now, stream['stop_time']) - stream['start_time'])
+    earned = elapsed * stream['flow_rate']
+    claimable = max(0, earned - stream['amount_withdrawn'])
+    return claimable, earned, stream['total_amount'] - earned
+
+
+class TestLimbs:
+    """Test suite for the uint256 limb encoding."""
+    
+    def test_round_trip(self):
+        """Test values up to 2**256 - 1 survive encoding."""
+        values = [0, 1, 2 ** 32, 2 ** 64 + 7, 10 ** 30, 2 ** 256 - 1]
+        limbs = to_limbs(values)
+        assert limbs.shape == (8, len(values))
+        assert to_limbs([1, 2 ** 40]).shape == (2, 2)
+        assert from_limbs(limbs) == values
+
+
+class TestStreamBook:
+    """Test suite for StreamBook."""
+    
+    @pytest.mark.parametrize('offset', [-600 * 86400, -86400, 0, 86400, 800 * 86400])
+    def test_matches_contract(self, offset):
+        """Test every stream's balances equal the contract's, before, during and after streaming."""
+        streams = _streams(500)
+        book = StreamBook()
+        book.upsert(streams)
+        
+        balances, missing = book.balances(NOW + offset)
+        
+        expected = {stream['stream_id']: _contract(stream, NOW + offset) for stream in streams}
+        assert missing == []
+        for row in balances.rows():
+            assert (row['claimable'], row['streamed'], row['remaining']) == expected[row['stream_id']]
+        
+        totals = balances.totals()
+        assert totals['claimable'] == sum(values[0] for values in expected.values())
+        assert totals['remaining'] == sum(values[2] for values in expected.values())
+    
+    def test_selection_and_flow_rate(self):
+        """Test selecting by ID or recipient and the combined flow rate of flowing streams."""
+        streams = _streams(200)
+        book = StreamBook()
+        book.upsert(streams)
+        
+        balances, missing = book.balances(NOW, stream_ids=[3, 5, 999])
+        assert balances.stream_ids.tolist() == [3, 5]
+        assert missing == [999]
+        
+        recipient = RECIPIENTS[2].upper().replace('0X', '0x')
+        balances, _ = book.balances(NOW, recipient=recipient)
+        paying = [s for s in streams if s['recipient'] == RECIPIENTS[2]]
+        assert sorted(balances.stream_ids.tolist()) == sorted(s['stream_id'] for s in paying)
+        assert balances.totals()['flow_rate'] == sum(
+            s['flow_rate'] for s in paying if s['is_active'] and s['start_time'] <= NOW < s['stop_time']
+        )
+    
+    def test_upsert_replaces(self):
+        """Test re-sent streams (e.g. after a claim) replace the stored ones."""
+        streams = _streams(20)
+        book = StreamBook()
+        book.upsert(streams)
+        claimed = dict(streams[4], amount_withdrawn=_contract(streams[4], NOW)[1], is_active=True)
+        book.upsert([claimed])
+        
+        balances, _ = book.balances(NOW, stream_ids=[claimed['stream_id']])
+        assert len(book) == 20
+        assert balances.rows()[0]['claimable'] == 0
+    
+    def test_rejects_impossible_streams(self):
+        """Test streams paying out more than deposited are rejected."""
+        stream = dict(_streams(1)[0])
+        stream['flow_rate'] = stream['total_amount']
+        stream['stop_time'] = stream['start_time'] + 2
+        with pytest.raises(ValueError):
+            StreamBook().upsert([stream])
+    
+    def test_empty(self):
+        """Test an empty book has zero totals."""
+        balances, _ = StreamBook().balances(NOW)
+        assert len(balances.stream_ids) == 0
+        assert balances.totals() == {'claimable': 0, 'streamed': 0, 'remaining': 0, 'flow_rate': 0}
+
+
+@pytest.fixture
+def client():
+    app_module.app.config['TESTING'] = True
+    with patch.object(app_module, 'agent_manager', AIPAgentManager()):
+        yield app_module.app.test_client()
+
+
+class TestStreamEndpoints:
+    """Test suite for the stream endpoints."""
+    
+    def test_bulk_balances(self, client):
+        """Test uint256 amounts round-trip through JSON as exact decimal strings."""
+        streams = _streams(50)
+        response = client.put('/streams', json={'streams': streams})
+        assert json.loads(response.data)['total'] == 50
+        
+        response = client.post('/streams/balances', json={'timestamp': NOW, 'stream_ids': [1, 2, 77]})
+        data = json.loads(response.data)
+        
+        assert response.status_code == 200
+        assert data['count'] == 2 and data['missing'] == [77]
+        for row in data['balances']:
+            claimable, streamed, remaining = _contract(streams[row['stream_id'] - 1], NOW)
+            assert (int(row['claimable']), int(row['streamed']), int(row['remaining'])) == \
+                (claimable, streamed, remaining)
+    
+    def test_totals_only_and_tool(self, client):
+        """Test totals without per-stream rows, and the agent tool."""
+        client.put('/streams', json={'streams': _streams(10)})
+        
+        data = json.loads(client.post('/streams/balances', json={'include_streams': False}).data)
+        assert data['balances'] == [] and data['count'] == 10
+        
+        response = client.post('/tools/get_stream_balances', json={'timestamp': NOW, 'recipient': RECIPIENTS[0]})
+        result = json.loads(response.data)['result']
+        assert result['count'] == sum(s['recipient'] == RECIPIENTS[0] for s in _streams(10))
+    
+    def test_invalid_stream(self, client):
+        """Test out-of-range amounts are rejected with 400."""
+        stream = dict(_streams(1)[0], total_amount=2 ** 256)
+        response = client.put('/streams', json={'streams': [stream]})
+        assert response.status_code == 400
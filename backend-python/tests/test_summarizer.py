@@ -0,0 +1,229 @@
+"""
+Unit tests for background history summarization.
+
+Tests cover the extractive summary, job scheduling (interval, watermark,
+persistence), and how AIPAgentManager uses the summary when querying.
+"""
+
+import os
+import time
+import pytest
+from unittest.mock import patch
+
+# Set test environment variables before importing agent_manager
+os.environ['MEMBASE_ACCOUNT'] = '0x1234567890abcdef1234567890abcdef12345678'
+os.environ['MEMBASE_SECRET_KEY'] = 'test_secret_key'
+os.environ['MEMBASE_ID'] = 'test_agent_001'
+os.environ['MEMORY_HUB_ADDRESS'] = '54.169.29.193:8081'
+
+# Mock MEMBASE_AVAILABLE to prevent real blockchain connections in tests
+import agent_manager as am_module
+am_module.MEMBASE_AVAILABLE = False
+
+from agent_manager import AIPAgentManager
+from models import Interaction
+from state_store import AgentStateStore
+from summarizer import HistorySummarizer, SummaryRecord, extractive_summary
+
+
+def _interaction(n):
+    return Interaction(
+        id=f'id-{n}',
+        userQuery=f'question {n}',
+        agentResponse=f'answer {n}',
+        timestamp=1700000000 + n
+    )
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out waiting for background summarization")
+        time.sleep(0.01)
+
+
+class TestExtractiveSummary:
+    """Test suite for the default summary function."""
+    
+    def test_appends_one_line_per_interaction(self):
+        """Test each interaction is folded into one line."""
+        summary = extractive_summary('', [_interaction(1), _interaction(2)])
+        assert summary.splitlines() == [
+            '- Q: question 1 | A: answer 1',
+            '- Q: question 2 | A: answer 2'
+        ]
+    
+    def test_bounded_length_drops_oldest(self):
+        """Test the summary stays within max_chars by dropping the oldest lines."""
+        summary = extractive_summary('', [_interaction(n) for n in range(100)], max_chars=200)
+        
+        assert len(summary) <= 200
+        assert summary.splitlines()[-1] == '- Q: question 99 | A: answer 99'
+    
+    def test_long_text_is_clipped(self):
+        """Test long queries and responses are clipped."""
+        long = Interaction(id='x', userQuery='q' * 500, agentResponse='a' * 500, timestamp=0)
+        assert len(extractive_summary('', [long])) < 300
+
+
+class TestHistorySummarizer:
+    """Test suite for HistorySummarizer scheduling."""
+    
+    def test_summarizes_only_turns_older_than_recent_window(self):
+        """Test the recent window is left raw."""
+        summarizer = HistorySummarizer(workers=1, interval_seconds=0, recent_turns=2)
+        history = [_interaction(n) for n in range(5)]
+        
+        assert summarizer.schedule('agent', history)
+        _wait_for(lambda: summarizer.get('agent') is not None)
+        
+        record = summarizer.get('agent')
+        assert record.summarized_through == 'id-2'
+        assert 'question 3' not in record.summary
+        summarizer.shutdown()
+    
+    def test_incremental_and_interval(self):
+        """Test later runs fold in only new turns and respect the interval."""
+        calls = []
+        
+        def summarize(previous, interactions):
+            calls.append([i.id for i in interactions])
+            return previous + ''.join(i.id for i in interactions)
+        
+        summarizer = HistorySummarizer(workers=1, interval_seconds=0, recent_turns=1, summarize_fn=summarize)
+        summarizer.schedule('agent', [_interaction(n) for n in range(3)])
+        _wait_for(lambda: not summarizer._in_flight and summarizer.get('agent') is not None)
+        
+        summarizer.schedule('agent', [_interaction(n) for n in range(5)])
+        _wait_for(lambda: len(calls) == 2 and not summarizer._in_flight)
+        
+        assert calls == [['id-0', 'id-1'], ['id-2', 'id-3']]
+        assert not summarizer.schedule('agent', [_interaction(n) for n in range(5)])
+        
+        summarizer.interval_seconds = 3600
+        assert not summarizer.schedule('agent', [_interaction(n) for n in range(8)])
+        summarizer.shutdown()
+    
+    def test_summary_persisted_in_store(self, tmp_path):
+        """Test summaries survive a restart through the state store."""
+        store = AgentStateStore(str(tmp_path / 'state.db'))
+        summarizer = HistorySummarizer(workers=1, interval_seconds=0, recent_turns=0, store=store)
+        summarizer.schedule('agent', [_interaction(1)])
+        _wait_for(lambda: store.load_summary('agent') is not None)
+        summarizer.shutdown()
+        
+        restored = HistorySummarizer(store=store).get('agent')
+        assert restored.summarized_through == 'id-1'
+        assert 'question 1' in restored.summary
+        store.close()
+
+
+class RecordingAgent:
+    """Agent double that records the keyword arguments of each query."""
+    
+    def __init__(self):
+        self.calls = []
+    
+    async def process_query(self, query, use_history=True, recent_n_messages=16,
+                            use_tool_call=True, system_prompt=None):
+        self.calls.append({'recent_n_messages': recent_n_messages, 'system_prompt': system_prompt})
+        return f"Answer to: {query}"
+
+
+class TestManagerSummaryContext:
+    """Test suite for summary-aware query context."""
+    
+    @pytest.mark.asyncio
+    async def test_disabled_by_default(self):
+        """Test queries keep the full raw window when summarization is off."""
+        manager = AIPAgentManager()
+        agent = RecordingAgent()
+        manager.agents['plain_agent'] = agent
+        
+        await manager.query_agent('plain_agent', 'hello')
+        
+        assert manager.summarizer is None
+        assert agent.calls[-1] == {'recent_n_messages': 16, 'system_prompt': None}
+    
+    @pytest.mark.asyncio
+    async def test_summary_sent_with_short_window(self):
+        """Test a summary is sent as system prompt with a short raw window."""
+        with patch.dict(os.environ, {'SUMMARY_WORKERS': '2', 'SUMMARY_RECENT_TURNS': '3'}):
+            manager = AIPAgentManager()
+        agent = RecordingAgent()
+        manager.agents['summary_agent'] = agent
+        manager.agent_descriptions['summary_agent'] = 'You are a property matcher.'
+        manager.summarizer._records['summary_agent'] = SummaryRecord('- Q: old | A: older', 'id-0', 0.0)
+        
+        result = await manager.query_agent('summary_agent', 'hello')
+        
+        call = agent.calls[-1]
+        assert call['recent_n_messages'] == 6
+        assert call['system_prompt'].startswith('You are a property matcher.')
+        assert '- Q: old | A: older' in call['system_prompt']
+        assert result['agent_state'].learnedSummary == '- Q: old | A: older'
+        manager.summarizer.shutdown()
+    
+    def test_raw_window_reaches_back_to_trailing_watermark(self):
+        """Test turns after a watermark older than the recent window are all sent raw."""
+        with patch.dict(os.environ, {'SUMMARY_WORKERS': '1', 'SUMMARY_RECENT_TURNS': '4'}):
+            manager = AIPAgentManager()
+        history = [_interaction(n) for n in range(1, 31)]
+        state = manager._build_agent_state('summary_agent', history)
+        
+        manager.summarizer._records['summary_agent'] = SummaryRecord('- Q: old', 'id-10', 0.0)
+        assert manager._build_query_context('summary_agent', 'hello', state)[0] == 2 * 20
+        
+        manager.summarizer._records['summary_agent'] = SummaryRecord('- Q: old', 'id-29', 0.0)
+        assert manager._build_query_context('summary_agent', 'hello', state)[0] == 2 * 4
+        
+        manager.summarizer._records['summary_agent'] = SummaryRecord('- Q: old', 'id-gone', 0.0)
+        assert manager._build_query_context('summary_agent', 'hello', state)[0] == 2 * 30
+        manager.summarizer.shutdown()
+
+
+class SummaryWriter:
+    """Agent double whose LLM replies with a fixed summary."""
+    
+    def __init__(self, reply="- Wants a 2-bedroom flat in Dubai"):
+        self.reply = reply
+        self.calls = []
+    
+    async def process_query(self, query, system_prompt=None, **kwargs):
+        self.calls.append((query, system_prompt, kwargs))
+        if isinstance(self.reply, Exception):
+            raise self.reply
+        return self.reply
+
+
+class TestLLMSummaries:
+    """Test suite for summaries written by SUMMARY_AGENT's LLM."""
+    
+    def _manager(self):
+        with patch.dict(os.environ, {'SUMMARY_WORKERS': '1', 'SUMMARY_AGENT': 'summary_writer'}):
+            return AIPAgentManager()
+    
+    def test_summary_written_by_agent_llm(self):
+        """Test turns are folded into the summary by one history-free LLM call."""
+        manager = self._manager()
+        writer = manager.agents['summary_writer'] = SummaryWriter()
+        
+        summary = manager.summarizer.summarize_fn('- Budget 2k', [_interaction(1)])
+        
+        assert summary == "- Wants a 2-bedroom flat in Dubai"
+        ((query, system_prompt, kwargs),) = writer.calls
+        assert '- Budget 2k' in query and 'question 1' in query
+        assert 'summary' in system_prompt
+        assert kwargs == {'use_history': False, 'recent_n_messages': 0, 'use_tool_call': False}
+        manager.summarizer.shutdown()
+    
+    def test_falls_back_to_extractive(self):
+        """Test the extractive digest is used without the agent or when its LLM fails."""
+        manager = self._manager()
+        expected = extractive_summary('', [_interaction(1)])
+        assert manager.summarizer.summarize_fn('', [_interaction(1)]) == expected
+        
+        manager.agents['summary_writer'] = SummaryWriter(RuntimeError("LLM down"))
+        assert manager.summarizer.summarize_fn('', [_interaction(1)]) == expected
+        manager.summarizer.shutdown()
@@ -0,0 +1,121 @@
+"""
+Unit tests for token-budgeted query context.
+
+Tests cover token counting and truncation, fitting history to a budget,
+and the budget and prompt-size metrics in query_agent.
+"""
+
+import os
+import pytest
+from unittest.mock import patch
+
+# Set test environment variables before importing agent_manager
+os.environ['MEMBASE_ACCOUNT'] = '0x1234567890abcdef1234567890abcdef12345678'
+os.environ['MEMBASE_SECRET_KEY'] = 'test_secret_key'
+os.environ['MEMBASE_ID'] = 'test_agent_001'
+os.environ['MEMORY_HUB_ADDRESS'] = '54.169.29.193:8081'
+
+# Mock MEMBASE_AVAILABLE to prevent real blockchain connections in tests
+import agent_manager as am_module
+am_module.MEMBASE_AVAILABLE = False
+
+from agent_manager import AIPAgentManager
+from metrics import metrics
+from models import Interaction
+from tests.conftest import MemoryAgent
+from token_budget import count_tokens, fit_history, truncate_to_tokens
+
+
+def _turn(n, query='short question', response='short answer'):
+    return Interaction(id=f'id-{n}', userQuery=query, agentResponse=response, timestamp=1700000000 + n)
+
+
+class TestTokenCounting:
+    """Test suite for token counting and truncation."""
+    
+    def test_count_tokens(self):
+        """Test counts grow with text length and empty text is free."""
+        assert count_tokens('') == 0
+        assert 0 < count_tokens('hello world') < count_tokens('hello world ' * 20)
+    
+    def test_truncate_to_tokens(self):
+        """Test truncation respects the limit and leaves short text alone."""
+        text = 'the rental yield of this apartment is high ' * 50
+        clipped = truncate_to_tokens(text, 20)
+        
+        assert clipped.endswith('...')
+        assert count_tokens(clipped) <= 20
+        assert truncate_to_tokens('short text', 20) == 'short text'
+
+
+class TestFitHistory:
+    """Test suite for fit_history."""
+    
+    def test_all_turns_fit(self):
+        """Test a roomy budget keeps every turn up to max_turns."""
+        history = [_turn(n) for n in range(10)]
+        plan = fit_history(history, 10000, 8, 500)
+        
+        assert plan.raw_turns == 8
+        assert plan.truncated == []
+    
+    def test_budget_limits_raw_turns(self):
+        """Test the raw window shrinks to what the budget allows."""
+        history = [_turn(n) for n in range(10)]
+        per_turn = count_tokens('short question') + count_tokens('short answer')
+        plan = fit_history(history, 3 * per_turn, 8, 500)
+        
+        assert plan.raw_turns == 3
+        assert plan.tokens == 3 * per_turn
+    
+    def test_oversized_message_is_truncated(self):
+        """Test an oversized turn ends the raw window and is sent truncated."""
+        history = [_turn(0), _turn(1, response='very long answer ' * 400), _turn(2), _turn(3)]
+        plan = fit_history(history, 1000, 8, 50)
+        
+        assert plan.raw_turns == 2
+        assert len(plan.truncated) == 2
+        assert plan.truncated[1].startswith('- Q: short question | A: very long answer')
+        assert plan.tokens <= 1000
+        
+        assert fit_history(history, 1000, 8, 50, allow_truncated=False).truncated == []
+
+
+class TestManagerTokenBudget:
+    """Test suite for token budgeting in query_agent."""
+    
+    def setup_method(self):
+        """Reset the shared metrics registry."""
+        metrics.reset()
+    
+    @pytest.mark.asyncio
+    async def test_budget_shrinks_window_and_records_metrics(self):
+        """Test long history is cut to the budget and prompt size is recorded."""
+        history = [_turn(n) for n in range(6)] + [_turn(6, response='long answer ' * 500), _turn(7)]
+        with patch.dict(os.environ, {'CONTEXT_TOKEN_BUDGET': '400', 'CONTEXT_MAX_MESSAGE_TOKENS': '60'}):
+            manager = AIPAgentManager()
+        agent = MemoryAgent(response='ok', history=history)
+        manager.agents['budget_agent'] = agent
+        
+        await manager.query_agent('budget_agent', 'What is my yield?')
+        
+        request = agent.requests[-1]
+        assert request['recent_n_messages'] == 2
+        assert 'Earlier conversation (truncated)' in request['system_prompt']
+        assert 'long answer' in request['system_prompt']
+        
+        snapshot = metrics.snapshot()
+        assert snapshot['distributions']['prompt_tokens']['max'] <= 400
+        assert snapshot['counters']['context_truncated_turns'] >= 1
+    
+    @pytest.mark.asyncio
+    async def test_prompt_tokens_recorded_without_budget(self):
+        """Test prompt size is reported even when no budget is set."""
+        manager = AIPAgentManager()
+        agent = MemoryAgent(response='ok', history=[_turn(n) for n in range(3)])
+        manager.agents['plain_agent'] = agent
+        
+        await manager.query_agent('plain_agent', 'Hello')
+        
+        assert (agent.requests[-1]['recent_n_messages'], agent.requests[-1].get('system_prompt')) == (16, None)
+        assert metrics.snapshot()['distributions']['context_turns']['max'] == 3
@@ -0,0 +1,102 @@
+"""
+Unit tests for the MCP tool server's client of the tool endpoints.
+
+Tests cover listing the registry and running tool calls through the
+service, including unknown tools and invalid arguments.
+"""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+# Set test environment variables before importing agent_manager
+os.environ['MEMBASE_ACCOUNT'] = '0x1234567890abcdef1234567890abcdef12345678'
+os.environ['MEMBASE_SECRET_KEY'] = 'test_secret_key'
+os.environ['MEMBASE_ID'] = 'test_agent_001'
+os.environ['MEMORY_HUB_ADDRESS'] = '54.169.29.193:8081'
+
+# Mock MEMBASE_AVAILABLE to prevent real blockchain connections in tests
+import agent_manager as am_module
+am_module.MEMBASE_AVAILABLE = False
+
+import app as app_module
+from agent_manager import AIPAgentManager
+from models import PropertyListing
+from tool_server import ToolCallError, ToolClient
+
+
+class Response:
+    """requests-style view of a Flask test response."""
+    
+    def __init__(self, test_response):
+        self.status_code = test_response.status_code
+        self._body = test_response.get_json()
+    
+    def json(self):
+        return self._body
+    
+    def raise_for_status(self):
+        assert self.status_code < 400
+
+
+@pytest.fixture
+def tool_client():
+    app_module.app.config['TESTING'] = True
+    manager = AIPAgentManager()
+    test_client = app_module.app.test_client()
+    
+    class Session:
+        def request(self, method, url, json=None, timeout=None):
+            return Response(test_client.open(url.replace('http://service', ''), method=method, json=json))
+    
+    with patch.object(app_module, 'agent_manager', manager):
+        yield manager, ToolClient('http://service', session=Session())
+
+
+class TestToolClient:
+    """Test suite for ToolClient."""
+    
+    def test_lists_registry(self, tool_client):
+        """Test every registered tool is listed with its argument schema."""
+        manager, client = tool_client
+        
+        tools = {tool['name']: tool for tool in client.list()}
+        
+        assert set(tools) == {spec['function']['name'] for spec in manager.tools.specs()}
+        assert 'cities' in tools['search_properties']['parameters']['properties']
+    
+    def test_calls_run_through_registry(self, tool_client):
+        """Test a tool call returns the registry's result for the validated arguments."""
+        manager, client = tool_client
+        manager.properties.upsert(PropertyListing(**listing).model_dump() for listing in [
+            {'property_id': 'p1', 'city': 'Lagos', 'price': 900, 'bedrooms': 2},
+            {'property_id': 'p2', 'city': 'Accra', 'price': 700, 'bedrooms': 1}
+        ])
+        
+        result = client.call('search_properties', {'cities': ['Lagos']})
+        
+        assert result['total'] == 1
+        assert result['properties'][0]['property_id'] == 'p1'
+    
+    def test_rejected_calls_raise(self, tool_client):
+        """Test unknown tools and invalid arguments raise with the service's message."""
+        _, client = tool_client
+        
+        with pytest.raises(ToolCallError, match='missing'):
+            client.call('missing', {})
+        with pytest.raises(ToolCallError):
+            client.call('search_properties', {'limit': 0})
+    
+    def test_non_json_errors_raise(self):
+        """Test an error page that is not JSON raises with its text, not a decoding error."""
+        class ErrorPage:
+            status_code = 502
+            text = '<html>Bad Gateway</html>'
+            
+            def json(self):
+                raise ValueError('Expecting value')
+        
+        session = type('Session', (), {'request': lambda self, *args, **kwargs: ErrorPage()})()
+        with pytest.raises(ToolCallError, match='Bad Gateway'):
+            ToolClient('http://service', session=session).call('search_properties', {})
@@ -0,0 +1,174 @@
+"""
+Unit tests for the Monte Carlo yield simulator.
+
+Tests cover the deterministic edge cases (full occupancy, no cancellation),
+percentile ordering, seeded reproducibility in-process and on a process
+pool, and the simulation endpoint over stored streams.
+"""
+
+import json
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+
+# Set test environment variables before importing agent_manager
+os.environ['MEMBASE_ACCOUNT'] = '0x1234567890abcdef1234567890abcdef12345678'
+os.environ['MEMBASE_SECRET_KEY'] = 'test_secret_key'
+os.environ['MEMBASE_ID'] = 'test_agent_001'
+os.environ['MEMORY_HUB_ADDRESS'] = '54.169.29.193:8081'
+
+# Mock MEMBASE_AVAILABLE to prevent real blockchain connections in tests
+import agent_manager as am_module
+am_module.MEMBASE_AVAILABLE = False
+
+import app as app_module
+from agent_manager import AIPAgentManager
+from yield_simulator import SECONDS_PER_DAY, YieldSimulator, parameters
+
+RATE = 10 ** 12
+LANDLORD = '0x' + 'a1' * 20
+
+
+def _portfolio(count, occupancy=1.0, cancel_probability=0.0):
+    """Streams with staggered starts and lengths, some ending inside the horizon."""
+    return parameters(
+        flow_rate=[float(RATE * (index + 1)) for index in range(count)],
+        delay=[(index % 5) * 10 * SECONDS_PER_DAY for index in range(count)],
+        remaining=[(100 + 70 * (index % 6)) * SECONDS_PER_DAY for index in range(count)],
+        occupancy=[occupancy] * count,
+        cancel_probability=[cancel_probability] * count
+    )
+
+
+class TestYieldSimulator:
+    """Test suite for YieldSimulator."""
+    
+    def test_certain_income_is_contracted(self):
+        """Test full occupancy without cancellations pays exactly the schedule."""
+        result = YieldSimulator().simulate(_portfolio(12), scenarios=200, seed=1)
+        
+        contracted = result['contracted']
+        assert contracted == sum(
+            RATE * (index + 1) * (min((index % 5) * 10 + 100 + 70 * (index % 6), 365) - (index % 5) * 10)
+            * SECONDS_PER_DAY
+            for index in range(12)
+        )
+        assert result['expected'] == pytest.approx(contracted, rel=1e-5)
+        assert set(result['percentiles'].values()) == {result['percentiles']['p50']}
+        assert result['bands'][-1]['day'] == 365 and result['bands'][-1]['p5'] == pytest.approx(contracted, rel=1e-5)
+    
+    def test_risk_lowers_and_spreads_income(self):
+        """Test vacancies and cancellations lower income, with ordered percentiles and bands."""
+        result = YieldSimulator().simulate(_portfolio(30, 0.9, 0.3), scenarios=5000, seed=7)
+        
+        values = [result['percentiles'][f"p{level}"] for level in (5, 25, 50, 75, 95)]
+        assert values == sorted(values) and values[0] < values[-1]
+        assert values[-1] <= result['contracted']
+        assert 0.5 * result['contracted'] < result['expected'] < 0.95 * result['contracted']
+        medians = [band['p50'] for band in result['bands']]
+        assert medians == sorted(medians) and len(medians) == 13
+    
+    def test_huge_flow_rates(self):
+        """Test rates past float32's range are simulated, and rates overflowing float64 rejected."""
+        streams = parameters([float(2 ** 200), 1.0], [0, 0], [SECONDS_PER_DAY] * 2, [1.0] * 2, [0.0] * 2)
+        result = YieldSimulator().simulate(streams, scenarios=100, seed=5)
+        assert result['expected'] == pytest.approx(2 ** 200 * SECONDS_PER_DAY, rel=1e-5)
+        
+        streams = parameters([1e306], [0], [SECONDS_PER_DAY], [1.0], [0.0])
+        with pytest.raises(ValueError):
+            YieldSimulator().simulate(streams, scenarios=100, seed=5)
+    
+    def test_zero_occupancy_pays_nothing(self):
+        """Test fully vacant streams earn nothing."""
+        result = YieldSimulator().simulate(_portfolio(3, occupancy=0.0), scenarios=100, seed=3)
+        assert result['expected'] == 0 and result['contracted'] > 0
+    
+    def test_seeded_runs_repeat_across_pool(self):
+        """Test a seed reproduces a run, in-process or spread over a pool."""
+        streams = _portfolio(40, 0.8, 0.2)
+        local = YieldSimulator(chunk_cells=50_000)
+        pooled = YieldSimulator(workers=2, chunk_cells=50_000, pool_threshold=0)
+        try:
+            first = local.simulate(streams, scenarios=1000, seed=42)
+            assert local.simulate(streams, scenarios=1000, seed=42)['percentiles'] == first['percentiles']
+            assert pooled.simulate(streams, scenarios=1000, seed=42)['percentiles'] == first['percentiles']
+            assert pooled._pool is not None
+        finally:
+            pooled.shutdown()
+    
+    def test_rejects_oversized_runs(self):
+        """Test runs beyond the chunk or cell limits raise ValueError."""
+        with pytest.raises(ValueError):
+            YieldSimulator(chunk_cells=999).simulate(_portfolio(1), scenarios=1000, horizon_days=30)
+        with pytest.raises(ValueError):
+            YieldSimulator(max_cells=9_999).simulate(_portfolio(10), scenarios=1000, horizon_days=30)
+
+
+@pytest.fixture
+def client():
+    app_module.app.config['TESTING'] = True
+    with patch.object(app_module, 'agent_manager', AIPAgentManager()):
+        yield app_module.app.test_client()
+
+
+class TestSimulationEndpoint:
+    """Test suite for the simulation endpoint."""
+    
+    def test_simulates_stored_streams(self, client):
+        """Test stored streams are simulated from now, with string amounts and unknown IDs."""
+        now = int(time.time())
+        client.put('/streams', json={'streams': [{
+            'stream_id': 1,
+            'sender': '0x' + 'b2' * 20,
+            'recipient': LANDLORD,
+            'total_amount': RATE * 110 * SECONDS_PER_DAY,
+            'flow_rate': RATE,
+            'start_time': now - 10 * SECONDS_PER_DAY,
+            'stop_time': now + 100 * SECONDS_PER_DAY,
+            'amount_withdrawn': 0,
+            'is_active': True
+        }]})
+        
+        response = client.post('/streams/simulate', json={'stream_ids': [1, 9], 'scenarios': 500, 'seed': 5})
+        data = json.loads(response.data)
+        
+        assert response.status_code == 200
+        assert data['streams'] == 1 and data['missing'] == [9]
+        assert int(data['contracted']) == pytest.approx(RATE * 100 * SECONDS_PER_DAY, rel=1e-4)
+        assert int(data['expected']) == pytest.approx(int(data['contracted']), rel=1e-5)
+        assert data['bands'][0]['day'] == 30 and isinstance(data['bands'][0]['p50'], str)
+    
+    def test_described_streams_and_tool(self, client):
+        """Test what-if streams with per-stream risk, through the agent tool."""
+        response = client.post('/tools/simulate_stream_income', json={
+            'streams': [
+                {'flow_rate': RATE, 'remaining_seconds': 365 * SECONDS_PER_DAY, 'occupancy': 0.5},
+                {'flow_rate': RATE, 'remaining_seconds': 365 * SECONDS_PER_DAY, 'cancel_probability': 0.5}
+            ],
+            'scenarios': 2000,
+            'seed': 11
+        })
+        result = json.loads(response.data)['result']
+        
+        assert result['streams'] == 2
+        assert int(result['percentiles']['p5']) < int(result['expected']) < int(result['contracted'])
+    
+    def test_invalid_request(self, client):
+        """Test out-of-range parameters and oversized runs are rejected with 400."""
+        assert client.post('/streams/simulate', json={'occupancy': 1.5}).status_code == 400
+        response = client.post('/streams/simulate', json={
+            'streams': [{'flow_rate': 1, 'remaining_seconds': 10}],
+            'scenarios': 100000,
+            'horizon_days': 3650,
+            'period_days': 1
+        })
+        assert response.status_code == 400
+        
+        response = client.post('/streams/simulate', json={
+            'streams': [{'flow_rate': 2 ** 255, 'remaining_seconds': 86400}],
+            'scenarios': 100
+        })
+        assert response.status_code == 200
+        assert int(json.loads(response.data)['contracted']) == pytest.approx(2 ** 255 * 86400, rel=1e-9)
@@ -0,0 +1,130 @@
+"""
+Token counting and token-budgeted conversation context.
+
+Token counts come from ``tiktoken`` when it is installed and from a
+word/punctuation heuristic otherwise; either way the tokenizer is built
+once and counts of recently seen texts are memoized, since the same
+history messages are re-counted on every query.
+"""
+
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, List, Sequence
+
+from models import Interaction
+
+logger = logging.getLogger(__name__)
+
+_PIECES = re.compile(r"\w+|[^\w\s]")
+
+
+def _estimate_tokens(text: str) -> int:
+    """Approximate BPE token count: about one token per four word characters."""
+    return sum((len(piece) + 3) // 4 for piece in _PIECES.findall(text))
+
+
+@lru_cache(maxsize=1)
+def get_tokenizer() -> Callable[[str], int]:
+    """Return the token counting function, loading the encoding once."""
+    encoding_name = os.getenv('TOKENIZER_ENCODING', 'cl100k_base')
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding(encoding_name)
+    except Exception as e:
+        logger.info(f"tiktoken encoding {encoding_name} unavailable ({str(e)}); estimating token counts")
+        return _estimate_tokens
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+@lru_cache(maxsize=8192)
+def count_tokens(text: str) -> int:
+    """Number of tokens in ``text``."""
+    return get_tokenizer()(text) if text else 0
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cut ``text`` to at most ``max_tokens`` tokens, marking the cut with "...".
+    
+    The cut point is found by binary search over the character length, so
+    only O(log n) prefixes are tokenized.
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if get_tokenizer()(text[:middle] + '...') <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low].rstrip() + '...'
+
+
+@dataclass
+class ContextPlan:
+    """How much history fits the budget."""
+    raw_turns: int = 0
+    truncated: List[str] = field(default_factory=list)
+    tokens: int = 0
+
+
+def fit_history(
+    history: Sequence[Interaction],
+    budget: int,
+    max_turns: int,
+    max_message_tokens: int,
+    allow_truncated: bool = True
+) -> ContextPlan:
+    """
+    Fit as many recent turns as the token budget allows.
+    
+    Turns are taken newest first and sent raw while both messages are
+    within ``max_message_tokens`` and fit the remaining budget. From the
+    first oversized turn on, turns can only be sent as truncated
+    "Q / A" lines in the prompt (the raw window must be a contiguous
+    suffix of the history), which stops at the first one that does not fit.
+    
+    Args:
+        history: Interactions in chronological order
+        budget: Tokens available for history
+        max_turns: Maximum turns to consider
+        max_message_tokens: Largest message sent raw; longer ones are truncated
+        allow_truncated: Whether truncated turns can be sent at all
+    
+    Returns:
+        ContextPlan with the raw turn count, truncated lines (oldest first)
+        and the tokens they use
+    """
+    plan = ContextPlan()
+    remaining = budget
+    raw_open = True
+    for interaction in reversed(history[-max_turns:] if max_turns > 0 else []):
+        query_tokens = count_tokens(interaction.userQuery)
+        response_tokens = count_tokens(interaction.agentResponse)
+        
+        if raw_open and max(query_tokens, response_tokens) <= max_message_tokens \
+                and query_tokens + response_tokens <= remaining:
+            plan.raw_turns += 1
+            remaining -= query_tokens + response_tokens
+            continue
+        
+        raw_open = False
+        if not allow_truncated:
+            break
+        line = (
+            f"- Q: {truncate_to_tokens(interaction.userQuery, max_message_tokens)}"
+            f" | A: {truncate_to_tokens(interaction.agentResponse, max_message_tokens)}"
+        )
+        line_tokens = count_tokens(line)
+        if line_tokens > remaining:
+            break
+        plan.truncated.append(line)
+        remaining -= line_tokens
+    
+    plan.truncated.reverse()
+    plan.tokens = budget - remaining
+    return plan
@@ -0,0 +1,132 @@
+"""
+MCP server exposing the service's agent tools.
+
+Agents built on the AIP SDK call tools through the MCP servers named in
+their ``server_names``, as configured in the SDK's
+``mcp_agent.config.yaml``. This server lists the service's tool registry
+and answers every call through ``POST /tools/<name>``, so tool calls run
+``ToolRegistry.invoke`` against the service's catalog, streams and event
+index. Register it as a stdio server with the service's URL (the
+dispatcher's, in multi-process mode) and set ``TOOL_SERVER_NAME`` to its
+name:
+
+    mcp:
+      servers:
+        continuum-tools:
+          command: python
+          args: ["tool_server.py"]
+          env:
+            TOOL_SERVICE_URL: http://127.0.0.1:5000
+"""
+
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for the service to answer a tool call
+DEFAULT_TIMEOUT = 30.0
+
+
+class ToolCallError(Exception):
+    """Raised when the service rejects a tool call."""
+    pass
+
+
+class ToolClient:
+    """Client of the service's tool endpoints."""
+    
+    def __init__(self, base_url: str, timeout: float = DEFAULT_TIMEOUT, session: Any = None):
+        """
+        Args:
+            base_url: URL of the service
+            timeout: Seconds to wait for the service per call
+            session: HTTP session (a new ``requests.Session`` by default)
+        """
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self._session = session or requests.Session()
+    
+    def list(self) -> List[Dict[str, Any]]:
+        """Name, description and argument schema of every registered tool."""
+        response = self._session.request('GET', f"{self.base_url}/tools", timeout=self.timeout)
+        response.raise_for_status()
+        return [spec['function'] for spec in response.json()['tools']]
+    
+    def call(self, name: str, arguments: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Run a tool in the service.
+        
+        Returns:
+            The tool's result
+        
+        Raises:
+            ToolCallError: With the service's error message if the tool is
+                unknown or the arguments are invalid, or the response body
+                if it is not a JSON error envelope (a proxy's error page)
+        """
+        response = self._session.request(
+            'POST',
+            f"{self.base_url}/tools/{name}",
+            json=arguments or {},
+            timeout=self.timeout
+        )
+        if response.status_code >= 400:
+            try:
+                error = response.json().get('error') or {}
+                message = error.get('message') if isinstance(error, dict) else str(error)
+            except (ValueError, AttributeError):
+                message = response.text.strip()[:500]
+            raise ToolCallError(message or f"Tool {name} failed with HTTP {response.status_code}")
+        return response.json()['result']
+
+
+def create_server(client: ToolClient):
+    """MCP server listing and calling the tools through ``client``."""
+    from mcp import types
+    from mcp.server.lowlevel import Server
+    
+    server = Server('continuum-tools')
+    
+    @server.list_tools()
+    async def list_tools() -> List[types.Tool]:
+        specs = await asyncio.to_thread(client.list)
+        return [
+            types.Tool(name=spec['name'], description=spec['description'], inputSchema=spec['parameters'])
+            for spec in specs
+        ]
+    
+    @server.call_tool()
+    async def call_tool(name: str, arguments: Dict[str, Any]) -> List[types.TextContent]:
+        # Errors are raised, and reported to the LLM as a failed tool call
+        result = await asyncio.to_thread(client.call, name, arguments)
+        return [types.TextContent(type='text', text=json.dumps(result))]
+    
+    return server
+
+
+async def serve(client: ToolClient) -> None:
+    """Serve the tools over stdio until the client disconnects."""
+    from mcp.server.stdio import stdio_server
+    
+    server = create_server(client)
+    async with stdio_server() as (read_stream, write_stream):
+        await server.run(read_stream, write_stream, server.create_initialization_options())
+
+
+if __name__ == '__main__':
+    # stdout carries the protocol, so log to stderr
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    client = ToolClient(
+        os.getenv('TOOL_SERVICE_URL', 'http://127.0.0.1:5000'),
+        float(os.getenv('TOOL_TIMEOUT_SECONDS', str(DEFAULT_TIMEOUT)))
+    )
+    asyncio.run(serve(client))
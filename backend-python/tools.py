@@ -0,0 +1,98 @@
+"""
+Registry of tools agents can call.
+
+Each tool has a name, a description, a JSON schema for its arguments and a
+handler. The registry lists the tools in the function-calling format LLMs
+expect, validates arguments and invokes handlers. The service exposes it
+at ``GET /tools`` and ``POST /tools/<name>``; agents reach it through the
+MCP server in ``tool_server.py``, which calls those endpoints.
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Type
+
+from pydantic import BaseModel
+
+from models import request_adapter
+
+logger = logging.getLogger(__name__)
+
+
+class ToolNotFoundError(KeyError):
+    """Raised when invoking a tool that is not registered."""
+    pass
+
+
+class Tool:
+    """A callable tool with arguments described by a request model."""
+    
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        arguments: Type[BaseModel],
+        handler: Callable[[BaseModel], Dict[str, Any]]
+    ):
+        """
+        Args:
+            name: Tool name as shown to the LLM
+            description: What the tool does and when to use it
+            arguments: Pydantic model validating the arguments
+            handler: Called with the validated arguments; returns a JSON-able dict
+        """
+        self.name = name
+        self.description = description
+        self.arguments = arguments
+        self.handler = handler
+        self.spec = {
+            'type': 'function',
+            'function': {
+                'name': name,
+                'description': description,
+                'parameters': arguments.model_json_schema()
+            }
+        }
+
+
+class ToolRegistry:
+    """Tools by name."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tools: Dict[str, Tool] = {}
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+    
+    def register(self, tool: Tool) -> None:
+        """Add a tool, replacing any with the same name."""
+        with self._lock:
+            self._tools = {**self._tools, tool.name: tool}
+        logger.info(f"Tool registered: {tool.name}")
+    
+    def specs(self) -> List[Dict[str, Any]]:
+        """Function-calling specs of every tool."""
+        return [tool.spec for tool in self._tools.values()]
+    
+    def invoke(self, name: str, arguments: Any) -> Dict[str, Any]:
+        """
+        Validate ``arguments`` and call the tool.
+        
+        Args:
+            name: Tool name
+            arguments: Argument dict, or the raw JSON bytes of one
+        
+        Raises:
+            ToolNotFoundError: If no tool has this name
+            pydantic.ValidationError: If the arguments do not match its schema
+        """
+        tool = self._tools.get(name)
+        if tool is None:
+            raise ToolNotFoundError(name)
+        adapter = request_adapter(tool.arguments)
+        if isinstance(arguments, (bytes, str)):
+            parsed = adapter.validate_json(arguments or b'{}')
+        else:
+            parsed = adapter.validate_python(arguments or {})
+        return tool.handler(parsed)
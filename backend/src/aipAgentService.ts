@@ -101,6 +101,9 @@ export class AIPAgentService {
       timeout: timeout,
       headers: {
         'Content-Type': 'application/json',
+        // Deadline for the Python service, leaving a margin so it gives up
+        // (and reports which stage timed out) before this client does
+        'X-Request-Timeout-Ms': String(Math.max(timeout - 1000, 1000)),
       },
     });
 